@@ -24,6 +24,8 @@ class Settings(BaseSettings):
     DOUBAO_RESOURCE_ID: str = "seed-tts-2.0"  # 资源ID: seed-tts-1.0, seed-tts-2.0等
     DOUBAO_HTTP_URL: str = "https://openspeech.bytedance.com/api/v3/tts/unidirectional"
     DOUBAO_WS_URL: str = "wss://openspeech.bytedance.com/api/v3/tts/unidirectional/stream"
+    # 上游流量录制目录, 设置后每次请求的原始响应流写入一个轨迹文件(凭证脱敏), 用于回放压测
+    DOUBAO_RECORD_DIR: Optional[str] = None
     
     # ============================================
     # 服务配置 (可选)
@@ -31,13 +33,99 @@ class Settings(BaseSettings):
     SERVER_HOST: str = "0.0.0.0"
     SERVER_PORT: int = 9001
     LOG_LEVEL: str = "INFO"
+    LOG_DIR: str = "logs"  # 文件日志目录, 留空不写文件日志
+    ENABLE_API_DOCS: bool = True  # 是否开放 /docs /redoc /openapi.json
     
     # ============================================
     # 性能配置 (可选)
     # ============================================
-    MAX_CONCURRENT_REQUESTS: int = 10
+    MAX_CONCURRENT_REQUESTS: int = 10  # 同时进行的上游合成调用数
     REQUEST_TIMEOUT: int = 30
     HTTP_POOL_LIMITS: int = 100
+    # 上游流中途断开时从最后一个完整句子处续传的最多次数(mp3/aac/pcm/wav), 0表示不续传
+    DOUBAO_RESUME_ATTEMPTS: int = 2
+    # 请求上游返回句子时间戳(逐字起止时间), 用于字幕输出与续传定位
+    DOUBAO_ENABLE_TIMESTAMP: bool = True
+    
+    # 是否根据上游首包时间与限流错误自动调整上游并发数(以MAX_CONCURRENT_REQUESTS为初始值)
+    ENABLE_ADAPTIVE_CONCURRENCY: bool = True
+    ADAPTIVE_CONCURRENCY_MIN: int = 1
+    ADAPTIVE_CONCURRENCY_MAX: int = 64
+    # 首包时间超过基线该倍数时视为拥塞并降低并发
+    ADAPTIVE_LATENCY_TOLERANCE: float = 2.0
+    
+    # 事件循环延迟监控: 停顿时记录阻塞栈, 延迟持续偏高时拒绝新请求(503)
+    ENABLE_LOOP_MONITOR: bool = True
+    LOOP_MONITOR_INTERVAL: float = 0.1  # 采样间隔(秒)
+    LOOP_STALL_THRESHOLD: float = 0.1  # 停顿超过该时长(秒)记录调用栈
+    LOOP_LAG_SHED_THRESHOLD: float = 0.25  # 延迟EWMA超过该值(秒)时拒绝新请求, 0表示不拒绝
+    # 上游熔断: 窗口内上游故障率达到阈值(且调用数不少于下限)时暂停调用, 冷却后放行探测调用
+    CIRCUIT_ERROR_THRESHOLD: float = 0.5  # 0表示不熔断
+    CIRCUIT_MIN_REQUESTS: int = 10
+    CIRCUIT_WINDOW_SECONDS: float = 30.0  # 统计窗口(秒)
+    CIRCUIT_OPEN_SECONDS: float = 15.0  # 熔断冷却时长(秒)
+    # 收到SIGTERM后先进入排空状态(/ready返回503), 经过该时长(秒)再开始关闭, 0表示立即关闭
+    DRAIN_GRACE_SECONDS: float = 10.0
+    # 已安装orjson时用于序列化上游请求体
+    ENABLE_ORJSON: bool = True
+    # base64音频块超过该长度(字符)时在线程池中解码, 0表示始终在事件循环中解码
+    BASE64_OFFLOAD_THRESHOLD: int = 0
+    
+    # ============================================
+    # 上游调度配置 (可选)
+    # ============================================
+    # 优先级类别: interactive / standard / bulk
+    DEFAULT_PRIORITY: str = "standard"
+    # 类别权重 (格式: 类别:权重, 逗号分隔), 权重越高分得的上游槽位越多
+    SCHEDULER_WEIGHTS: str = "interactive:8,standard:4,bulk:1"
+    # 排队超过该时长(秒)的任务优先派发, 防止低优先级/长文本饿死
+    SCHEDULER_STARVATION_SECONDS: float = 10.0
+    # 仅供最高优先级类别(interactive)使用的上游槽位数
+    SCHEDULER_RESERVED_SLOTS: int = 1
+    # API密钥的优先级上限 (格式: key:类别, 逗号分隔), 请求头只能降低不能提升
+    API_KEY_PRIORITIES: Optional[str] = None
+    # 同时未完成的预取请求数上限 (/v1/audio/speech/prefetch), 0表示停用预取
+    PREFETCH_MAX_PENDING: int = 100
+    
+    # ============================================
+    # 合成后端配置 (可选)
+    # ============================================
+    # 默认合成后端: doubao / mock (mock为进程内模拟后端, 不访问网络)
+    TTS_BACKEND: str = "doubao"
+    # 按音色或模型选择后端 (格式: voice:音色=后端 或 model:模型=后端, 逗号分隔)
+    # 示例: voice:verse=mock,model:tts-1-hd=doubao
+    BACKEND_ROUTES: Optional[str] = None
+    # 模拟后端的首包时间(秒)
+    MOCK_BACKEND_TTFB: float = 0.2
+    # 模拟后端的生成速度(每秒生成的音频秒数), 0表示不等待
+    MOCK_BACKEND_SPEED: float = 5.0
+    # 模拟后端每个音频块的字节数
+    MOCK_BACKEND_CHUNK_BYTES: int = 4096
+    
+    # ============================================
+    # 节点间共享缓存配置 (可选)
+    # ============================================
+    # 全部代理节点的基础URL (逗号分隔, 含本节点), 为空表示不启用
+    # 示例: http://10.0.0.1:9001,http://10.0.0.2:9001
+    PEER_NODES: Optional[str] = None
+    # 本节点在 PEER_NODES 中的URL
+    PEER_SELF: Optional[str] = None
+    # 节点间请求的共享密钥
+    PEER_SHARED_SECRET: Optional[str] = None
+    # 向所属节点请求音频的超时时间(秒), 超时后本地合成
+    PEER_TIMEOUT: float = 30.0
+    # 一致性哈希环上每个节点的虚拟节点数
+    PEER_VIRTUAL_NODES: int = 100
+    
+    # ============================================
+    # 实时语音配置 (可选)
+    # ============================================
+    # 实时端点分句: 短于该字符数的句子与后文合并
+    REALTIME_MIN_SEGMENT_CHARS: int = 2
+    # 超过该字符数仍无句末标点时强制切分
+    REALTIME_MAX_SEGMENT_CHARS: int = 200
+    # 每个连接同时合成的句子数(后续句子提前合成, 按顺序发送)
+    REALTIME_MAX_INFLIGHT_SEGMENTS: int = 3
     
     # ============================================
     # 高级配置 (可选)
@@ -46,6 +134,49 @@ class Settings(BaseSettings):
     ENABLE_DETAILED_ERRORS: bool = True
     DEFAULT_SAMPLE_RATE: int = 24000
     DEFAULT_BITRATE: int = 160
+    # 输出档位 (格式: 名称:字段=值;字段=值, 逗号分隔), 字段: sample_rate / bit_rate / resource_id / model
+    # 示例: telephony:sample_rate=8000;bit_rate=32,mobile:sample_rate=16000;bit_rate=64
+    OUTPUT_PROFILES: Optional[str] = None
+    # 按模型或API密钥选择输出档位 (格式: model:模型=档位 或 key:API密钥=档位, 逗号分隔)
+    # 示例: model:tts-1=mobile,key:sk-ivr=telephony
+    OUTPUT_PROFILE_ROUTES: Optional[str] = None
+    
+    # ============================================
+    # 文本规范化与缓存配置 (可选)
+    # ============================================
+    # 是否在转换前规范化输入文本
+    ENABLE_TEXT_NORMALIZATION: bool = True
+    # 启用的规范化规则 (逗号分隔): nfkc,whitespace,cjk_spacing,punctuation,trailing
+    TEXT_NORMALIZATION_RULES: str = "nfkc,whitespace,cjk_spacing,punctuation,trailing"
+    # 规范化结果缓存条目数 (0表示不缓存)
+    TEXT_NORMALIZER_CACHE_SIZE: int = 4096
+    # 进程内音频缓存容量(字节), 0表示关闭缓存(仍合并并发的相同请求)
+    AUDIO_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # 单条音频超过此大小不缓存(字节)
+    AUDIO_CACHE_MAX_ITEM_BYTES: int = 4 * 1024 * 1024
+    # 音频缓存淘汰策略: lru / tinylfu(按近期访问频率决定新条目能否挤出已有条目)
+    AUDIO_CACHE_POLICY: str = "tinylfu"
+    # 预渲染音频包路径(python -m app.pack_builder 生成), 启动时只读映射, 匹配的请求不访问上游
+    AUDIO_PACK_PATH: Optional[str] = None
+    # 不少于该字符数的输入按句缓存(只合成未缓存过的句子后按顺序拼接), 0表示关闭
+    SEGMENT_CACHE_MIN_CHARS: int = 300
+    # 按句缓存时同时合成的句子数(后续句子提前合成, 按顺序输出)
+    SEGMENT_CACHE_MAX_INFLIGHT: int = 4
+    
+    # ============================================
+    # 本地转码配置 (可选)
+    # ============================================
+    # ffmpeg可执行文件, 多格式输出时用于把PCM编码为 mp3/opus/aac/flac (未安装时只本地生成 pcm/wav)
+    FFMPEG_PATH: str = "ffmpeg"
+    # 本地编码线程数
+    TRANSCODE_WORKERS: int = 4
+    # 可按ID获取的多格式结果数(最近的结果, 音频本身保存在缓存中)
+    MULTI_FORMAT_RESULTS: int = 1024
+    # 本地变速(需要安装numpy, 仅限可本地编码的格式): off 关闭 / extend 只处理上游不支持的语速(0.5~2.0倍以外,
+    # 上游按最接近的语速合成后本地调整剩余倍数) / all 所有语速都由1.0倍音频本地变速得到(各语速共用缓存)
+    LOCAL_SPEED_MODE: str = "off"
+    # 按缓存键保存的句子时间戳条数(用于SSE、JSON结果与字幕), 0表示不保存
+    TIMESTAMP_CACHE_SIZE: int = 8192
     
     # ============================================
     # 音色映射配置 (可选)
@@ -75,6 +206,25 @@ class Settings(BaseSettings):
     # 示例: sk-abc123,sk-def456
     API_KEYS: Optional[str] = None
     
+    # ============================================
+    # 签名URL配置 (可选)
+    # ============================================
+    # 签名密钥, 设置后启用 GET /v1/audio/speech/signed/... (无需API密钥, 可由CDN缓存)
+    SIGNED_URL_SECRET: Optional[str] = None
+    # 签名URL响应的 Cache-Control max-age(秒)
+    SIGNED_URL_MAX_AGE: int = 86400
+    # 签名URL的最大长度(字符), 超过时不返回 Content-Location, /sign 返回400; 0 表示不限制
+    SIGNED_URL_MAX_LENGTH: int = 2000
+    
+    # ============================================
+    # 管理接口配置 (可选)
+    # ============================================
+    # 是否启用 /admin 运维接口(CPU/内存剖析、任务列表), 默认关闭
+    ENABLE_ADMIN_API: bool = False
+    
+    # 管理接口密钥列表 (逗号分隔), 与API_KEYS相互独立
+    ADMIN_API_KEYS: Optional[str] = None
+    
     def get_api_keys(self) -> set[str]:
         """获取API密钥集合
         
@@ -85,6 +235,78 @@ class Settings(BaseSettings):
             return set()
         # 分割密钥字符串,去除空白并过滤空值
         return {key.strip() for key in self.API_KEYS.split(",") if key.strip()}
+    
+    def get_admin_api_keys(self) -> set[str]:
+        """获取管理接口密钥集合
+        
+        Returns:
+            set[str]: 管理接口密钥集合,空集表示未配置
+        """
+        if not self.ADMIN_API_KEYS:
+            return set()
+        return {key.strip() for key in self.ADMIN_API_KEYS.split(",") if key.strip()}
+    
+    def get_scheduler_weights(self) -> dict[str, float]:
+        """获取调度类别权重
+        
+        Returns:
+            dict[str, float]: 类别 -> 权重
+        """
+        weights = {}
+        for item in self.SCHEDULER_WEIGHTS.split(","):
+            name, _, weight = item.partition(":")
+            if name.strip():
+                weights[name.strip()] = float(weight or 1)
+        return weights
+    
+    def get_api_key_priorities(self) -> dict[str, str]:
+        """获取API密钥对应的优先级类别
+        
+        Returns:
+            dict[str, str]: API密钥 -> 优先级类别
+        """
+        if not self.API_KEY_PRIORITIES:
+            return {}
+        priorities = {}
+        for item in self.API_KEY_PRIORITIES.split(","):
+            key, _, priority = item.rpartition(":")
+            if key.strip() and priority.strip():
+                priorities[key.strip()] = priority.strip()
+        return priorities
+    
+    def get_backend_routes(self) -> dict[tuple[str, str], str]:
+        """获取后端路由规则
+        
+        Returns:
+            dict[tuple[str, str], str]: (voice|model, 值) -> 后端名称
+        """
+        if not self.BACKEND_ROUTES:
+            return {}
+        routes = {}
+        for item in self.BACKEND_ROUTES.split(","):
+            target, _, backend = item.partition("=")
+            kind, _, value = target.partition(":")
+            if kind.strip() in ("voice", "model") and value.strip() and backend.strip():
+                routes[(kind.strip(), value.strip())] = backend.strip()
+        return routes
+    
+    def get_peer_nodes(self) -> list[str]:
+        """获取共享缓存节点列表
+        
+        Returns:
+            list[str]: 去掉末尾斜杠的节点URL列表
+        """
+        if not self.PEER_NODES:
+            return []
+        return [node.strip().rstrip("/") for node in self.PEER_NODES.split(",") if node.strip()]
+    
+    def get_normalization_rules(self) -> list[str]:
+        """获取启用的文本规范化规则
+        
+        Returns:
+            list[str]: 规则名列表
+        """
+        return [rule.strip() for rule in self.TEXT_NORMALIZATION_RULES.split(",") if rule.strip()]
 
 
 # 全局配置实例
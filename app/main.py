@@ -2,13 +2,28 @@
 
 豆包TTS转OpenAI兼容API
 """
+import asyncio
+import sys
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 from app.routes.audio import router as audio_router
+from app.routes.realtime import router as realtime_router
 from app.services.doubao_client import doubao_client
+from app.services.backend_router import backend_router
+from app.services.loop_monitor import loop_monitor
+from app.services.readiness import readiness
 from app.config import settings
-from app.utils.logger import logger
+from app.utils.logger import logger, setup_file_logging
+from app.utils.metrics import metrics
+
+
+def _warmup() -> None:
+    """在线程中预热: 上游客户端(httpx导入、SSL上下文)与本地编码器(查找ffmpeg)"""
+    doubao_client.warmup()
+    from app.services.transcoder import transcoder
+    transcoder.resolve()
 
 
 @asynccontextmanager
@@ -18,17 +33,57 @@ async def lifespan(app: FastAPI):
     Args:
         app: FastAPI应用实例
     """
+    # 导入时不产生副作用, 文件日志在启动时才创建
+    setup_file_logging()
+    
+    if settings.ENABLE_ADMIN_API:
+        # 记录任务创建时间, 供 /admin/tasks 展示任务存活时长
+        from app.services.profiler import install_task_tracker
+        install_task_tracker()
+        logger.warning("管理接口已启用: /admin")
+    
+    if settings.ENABLE_LOOP_MONITOR:
+        loop_monitor.start()
+    
+    if settings.AUDIO_PACK_PATH:
+        from app.services.audio_pack import audio_pack
+        try:
+            audio_pack.open()
+        except (OSError, ValueError) as e:
+            logger.error(f"音频包加载失败, 按正常流程合成: {e}")
+    
+    if settings.DRAIN_GRACE_SECONDS > 0:
+        readiness.install_signal_handler(settings.DRAIN_GRACE_SECONDS)
+    
+    # 在线程中预热, 不阻塞服务就绪
+    warmup_task = asyncio.create_task(asyncio.to_thread(_warmup))
+    
     logger.info("=" * 50)
     logger.info("TTS Proxy 启动中...")
     logger.info(f"服务地址: {settings.SERVER_HOST}:{settings.SERVER_PORT}")
     logger.info(f"日志级别: {settings.LOG_LEVEL}")
-    logger.info(f"API文档: http://{settings.SERVER_HOST}:{settings.SERVER_PORT}/docs")
+    if settings.ENABLE_API_DOCS:
+        logger.info(f"API文档: http://{settings.SERVER_HOST}:{settings.SERVER_PORT}/docs")
     logger.info("=" * 50)
     
     yield
     
     logger.info("TTS Proxy 关闭中...")
-    await doubao_client.close()
+    await warmup_task
+    # 可选功能的模块按需导入, 只关闭已经加载的
+    prefetch = sys.modules.get("app.services.prefetch")
+    if prefetch is not None:
+        await prefetch.prefetcher.close()
+    await loop_monitor.stop()
+    await backend_router.close()
+    if settings.PEER_NODES:
+        from app.services.peer_cache import peer_cache
+        await peer_cache.close()
+    if settings.AUDIO_PACK_PATH:
+        audio_pack.close()
+    transcoder = sys.modules.get("app.services.transcoder")
+    if transcoder is not None:
+        transcoder.transcoder.close()
     logger.info("TTS Proxy 已关闭")
 
 
@@ -38,9 +93,10 @@ app = FastAPI(
     description="豆包TTS转OpenAI兼容API - 将豆包TTS服务转换为OpenAI TTS API格式",
     version="1.0.0",
     lifespan=lifespan,
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    # OpenAPI文档在首次访问时才生成; 生产环境可关闭以减少路由和内存占用
+    docs_url="/docs" if settings.ENABLE_API_DOCS else None,
+    redoc_url="/redoc" if settings.ENABLE_API_DOCS else None,
+    openapi_url="/openapi.json" if settings.ENABLE_API_DOCS else None
 )
 
 # CORS配置
@@ -54,6 +110,17 @@ app.add_middleware(
 
 # 注册路由
 app.include_router(audio_router)
+app.include_router(realtime_router)
+
+# 节点间共享缓存路由仅在配置节点列表时注册
+if settings.PEER_NODES:
+    from app.routes.peer import router as peer_router
+    app.include_router(peer_router)
+
+# 管理接口默认不注册, 未启用时不产生任何开销
+if settings.ENABLE_ADMIN_API:
+    from app.routes.admin import router as admin_router
+    app.include_router(admin_router)
 
 
 @app.get("/health", tags=["System"])
@@ -70,6 +137,34 @@ async def health_check():
     }
 
 
+@app.get("/ready", tags=["System"])
+async def readiness_check():
+    """就绪与负载端点
+    
+    供负载均衡器轮询: 报告上游在途调用/并发限制、排队深度、事件循环延迟、近期上游错误率、
+    熔断状态与缓存占用, 并给出权重建议(`weight`, 0-100)。排空中、上游熔断或事件循环过载时
+    返回503。只读取内存状态, 不访问上游。
+    
+    Returns:
+        就绪状态与负载快照
+    """
+    snapshot = readiness.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+
+@app.get("/metrics", tags=["System"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """指标端点
+    
+    Returns:
+        Prometheus文本格式的指标
+    """
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/", tags=["System"])
 async def root():
     """根路径
@@ -81,7 +176,10 @@ async def root():
         "message": "TTS Proxy - 豆包TTS转OpenAI兼容API",
         "docs": "/docs",
         "health": "/health",
-        "api": "/v1/audio/speech"
+        "ready": "/ready",
+        "metrics": "/metrics",
+        "api": "/v1/audio/speech",
+        "realtime": "/v1/audio/speech/realtime"
     }
 
 
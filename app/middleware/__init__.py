@@ -1,4 +1,6 @@
 """中间件模块"""
-from app.middleware.auth import verify_api_key
+from app.middleware.auth import verify_api_key, verify_admin_key
+from app.middleware.priority import resolve_priority
+from app.middleware.load_shedding import reject_if_overloaded
 
-__all__ = ["verify_api_key"]
\ No newline at end of file
+__all__ = ["verify_api_key", "verify_admin_key", "resolve_priority", "reject_if_overloaded"]
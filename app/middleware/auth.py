@@ -11,13 +11,13 @@ from app.utils.logger import logger
 security = HTTPBearer(auto_error=False)
 
 
-async def verify_api_key(
-    credentials: HTTPAuthorizationCredentials | None = Security(security)
-) -> None:
-    """验证API密钥
+def check_api_key(provided_key: str | None) -> None:
+    """校验API密钥
+    
+    供HTTP依赖与WebSocket端点共用
     
     Args:
-        credentials: HTTP Authorization凭证
+        provided_key: 客户端提供的密钥, 未提供时为None
         
     Raises:
         HTTPException: 认证失败时抛出401错误
@@ -44,7 +44,7 @@ async def verify_api_key(
         )
     
     # 检查是否提供了凭证
-    if not credentials:
+    if not provided_key:
         raise HTTPException(
             status_code=401,
             detail={
@@ -58,7 +58,6 @@ async def verify_api_key(
         )
     
     # 验证密钥
-    provided_key = credentials.credentials
     if provided_key not in valid_keys:
         logger.warning(f"无效的API密钥: {provided_key[:10]}...")
         raise HTTPException(
@@ -76,4 +75,61 @@ async def verify_api_key(
     logger.debug(f"API密钥验证成功: {provided_key[:10]}...")
 
 
-__all__ = ["verify_api_key"]
\ No newline at end of file
+async def verify_api_key(
+    credentials: HTTPAuthorizationCredentials | None = Security(security)
+) -> None:
+    """验证API密钥
+    
+    Args:
+        credentials: HTTP Authorization凭证
+        
+    Raises:
+        HTTPException: 认证失败时抛出401错误
+    """
+    check_api_key(credentials.credentials if credentials else None)
+
+
+async def verify_admin_key(
+    credentials: HTTPAuthorizationCredentials | None = Security(security)
+) -> None:
+    """验证管理接口密钥
+    
+    管理接口始终要求认证, 与 `ENABLE_API_KEY_AUTH` 无关。
+    
+    Args:
+        credentials: HTTP Authorization凭证
+        
+    Raises:
+        HTTPException: 认证失败时抛出401错误
+    """
+    valid_keys = settings.get_admin_api_keys()
+    if not valid_keys:
+        logger.warning("管理接口已启用但未配置任何密钥")
+        raise HTTPException(
+            status_code=401,
+            detail={
+                "error": {
+                    "message": "管理接口已启用但服务器未配置ADMIN_API_KEYS",
+                    "type": "authentication_error",
+                    "code": "server_misconfigured"
+                }
+            }
+        )
+    
+    if not credentials or credentials.credentials not in valid_keys:
+        if credentials:
+            logger.warning(f"无效的管理接口密钥: {credentials.credentials[:10]}...")
+        raise HTTPException(
+            status_code=401,
+            detail={
+                "error": {
+                    "message": "无效的管理接口密钥",
+                    "type": "authentication_error",
+                    "code": "invalid_admin_key"
+                }
+            },
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+__all__ = ["verify_api_key", "verify_admin_key", "check_api_key"]
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""请求截止时间解析中间件
+
+客户端可通过请求头声明愿意等待的时间, 超过截止时间仍未完成的上游合成会被取消:
+- `X-Request-Timeout: 秒数`: 相对请求到达时刻的时长
+- `X-Request-Deadline: Unix时间戳(秒)`: 绝对截止时间(依赖双方时钟同步)
+同时提供时取较早者。
+"""
+import asyncio
+import time
+from typing import Optional
+from fastapi import Request
+
+# 相对时长与绝对截止时间的请求头
+TIMEOUT_HEADER = "X-Request-Timeout"
+DEADLINE_HEADER = "X-Request-Deadline"
+
+
+def _parse_seconds(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        return None
+    return seconds if seconds == seconds else None  # 排除NaN
+
+
+def parse_deadline(timeout: Optional[str], deadline: Optional[str]) -> Optional[float]:
+    """将请求头转换为事件循环时钟上的截止时间
+
+    Args:
+        timeout: `X-Request-Timeout` 的值
+        deadline: `X-Request-Deadline` 的值
+
+    Returns:
+        `loop.time()` 时钟上的截止时间, 未提供或无法解析时返回None
+    """
+    now = asyncio.get_running_loop().time()
+    candidates = []
+    seconds = _parse_seconds(timeout)
+    if seconds is not None:
+        candidates.append(now + seconds)
+    epoch = _parse_seconds(deadline)
+    if epoch is not None:
+        candidates.append(now + (epoch - time.time()))
+    return min(candidates) if candidates else None
+
+
+async def resolve_deadline(request: Request) -> Optional[float]:
+    """FastAPI依赖: 解析请求的截止时间
+
+    Args:
+        request: 请求对象
+
+    Returns:
+        `loop.time()` 时钟上的截止时间, 未声明时返回None
+    """
+    return parse_deadline(request.headers.get(TIMEOUT_HEADER), request.headers.get(DEADLINE_HEADER))
+
+
+__all__ = ["resolve_deadline", "parse_deadline", "TIMEOUT_HEADER", "DEADLINE_HEADER"]
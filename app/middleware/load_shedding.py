@@ -0,0 +1,33 @@
+"""负载卸载中间件
+
+事件循环延迟持续偏高时拒绝新请求, 保护已在进行的音频流
+"""
+from fastapi import HTTPException
+from app.services.loop_monitor import loop_monitor
+from app.utils.errors import TTSProxyError, format_error_response
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+_shed_counter = metrics.counter("tts_requests_shed_total", "因过载被拒绝的请求数", labels=("reason",))
+
+
+async def reject_if_overloaded() -> None:
+    """FastAPI依赖: 过载时返回503
+    
+    Raises:
+        HTTPException: 事件循环过载时抛出503错误
+    """
+    if not loop_monitor.overloaded:
+        return
+    
+    _shed_counter.inc(reason="loop_lag")
+    logger.warning(f"事件循环延迟过高({loop_monitor.lag * 1000:.0f}ms), 拒绝新请求")
+    error = TTSProxyError("服务繁忙, 请稍后重试", "service_unavailable", 503)
+    raise HTTPException(
+        status_code=503,
+        detail=format_error_response(error),
+        headers={"Retry-After": "1"}
+    )
+
+
+__all__ = ["reject_if_overloaded"]
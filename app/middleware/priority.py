@@ -0,0 +1,64 @@
+"""请求优先级解析中间件
+
+根据API密钥配置与请求头确定上游调度的优先级类别
+"""
+from fastapi import Request, Security
+from fastapi.security import HTTPAuthorizationCredentials
+from app.config import settings
+from app.middleware.auth import security
+from app.services.scheduler import PRIORITY_CLASSES
+
+# 客户端指定优先级的请求头
+PRIORITY_HEADER = "X-Priority"
+
+
+def _rank(priority: str) -> int:
+    """优先级排名, 数值越小优先级越高"""
+    try:
+        return PRIORITY_CLASSES.index(priority)
+    except ValueError:
+        return len(PRIORITY_CLASSES)
+
+
+def pick_priority(header_value: str | None, api_key: str | None) -> str:
+    """确定请求的优先级类别
+
+    API密钥配置的类别为上限: 请求头可以降低优先级但不能超过上限。
+    未配置密钥类别时, 请求头可在全部类别中选择。
+
+    Args:
+        header_value: 请求头中的优先级
+        api_key: 请求使用的API密钥
+
+    Returns:
+        优先级类别
+    """
+    ceiling = settings.get_api_key_priorities().get(api_key or "")
+    default = ceiling or settings.DEFAULT_PRIORITY
+
+    requested = (header_value or "").strip().lower()
+    if requested not in PRIORITY_CLASSES:
+        return default
+    if ceiling and _rank(requested) < _rank(ceiling):
+        return ceiling
+    return requested
+
+
+async def resolve_priority(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None = Security(security)
+) -> str:
+    """FastAPI依赖: 解析请求的优先级类别
+
+    Args:
+        request: 请求对象
+        credentials: HTTP Authorization凭证
+
+    Returns:
+        优先级类别
+    """
+    api_key = credentials.credentials if credentials else None
+    return pick_priority(request.headers.get(PRIORITY_HEADER), api_key)
+
+
+__all__ = ["resolve_priority", "pick_priority", "PRIORITY_HEADER"]
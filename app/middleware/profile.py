@@ -0,0 +1,60 @@
+"""输出档位解析中间件
+
+根据请求头与API密钥配置确定输出档位(未确定时由模型或默认档位决定, 见 `app.services.profiles`)
+"""
+from typing import Optional
+from fastapi import HTTPException, Request, Security
+from fastapi.security import HTTPAuthorizationCredentials
+from app.middleware.auth import security
+from app.services.profiles import output_profiles
+from app.utils.errors import TTSProxyError, format_error_response
+
+# 客户端指定输出档位的请求头
+PROFILE_HEADER = "X-Output-Profile"
+
+
+def pick_profile(header_value: str | None, api_key: str | None) -> Optional[str]:
+    """确定请求的输出档位名称
+
+    请求头优先, 其次为API密钥在 `OUTPUT_PROFILE_ROUTES` 中配置的档位。
+
+    Args:
+        header_value: 请求头中的档位名称
+        api_key: 请求使用的API密钥
+
+    Returns:
+        档位名称; 都未指定时返回None(由模型决定)
+    """
+    requested = (header_value or "").strip()
+    if requested:
+        return requested
+    return output_profiles.key_routes.get(api_key or "")
+
+
+async def resolve_profile(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None = Security(security)
+) -> Optional[str]:
+    """FastAPI依赖: 解析请求的输出档位
+
+    Args:
+        request: 请求对象
+        credentials: HTTP Authorization凭证
+
+    Returns:
+        档位名称, 未指定时返回None
+
+    Raises:
+        HTTPException: 档位名称未知时返回400
+    """
+    api_key = credentials.credentials if credentials else None
+    profile = pick_profile(request.headers.get(PROFILE_HEADER), api_key)
+    if profile is not None:
+        try:
+            output_profiles.get(profile)
+        except TTSProxyError as e:
+            raise HTTPException(status_code=e.status_code, detail=format_error_response(e))
+    return profile
+
+
+__all__ = ["resolve_profile", "pick_profile", "PROFILE_HEADER"]
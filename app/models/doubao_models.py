@@ -19,6 +19,7 @@ class DoubaoV3AudioParams(BaseModel):
     loudness_rate: Optional[int] = Field(default=None, description="音量[-50,100]")
     emotion: Optional[str] = Field(default=None, description="情感")
     emotion_scale: Optional[int] = Field(default=None, description="情绪值[1-5]")
+    enable_timestamp: Optional[bool] = Field(default=None, description="是否返回句子时间戳")
 
 
 class DoubaoV3ReqParams(BaseModel):
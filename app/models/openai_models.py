@@ -3,7 +3,7 @@
 定义OpenAI兼容的TTS API数据模型
 """
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 
 
 class OpenAISpeechRequest(BaseModel):
@@ -62,7 +62,12 @@ class OpenAISpeechRequest(BaseModel):
     
     stream_format: Optional[Literal["sse", "audio"]] = Field(
         default="audio",
-        description="流式格式"
+        description="流式格式: audio(音频流) / sse(音频增量与句子时间戳事件)"
+    )
+    
+    profile: Optional[str] = Field(
+        default=None,
+        description="输出档位(见 OUTPUT_PROFILES), 未指定时按 X-Output-Profile 请求头、API密钥或模型确定"
     )
     
     @field_validator("input")
@@ -84,7 +89,58 @@ class OpenAISpeechRequest(BaseModel):
         
         # V3 API无文本长度限制,移除1024字节检查
         return v
+
+
+AudioFormat = Literal["mp3", "opus", "aac", "flac", "wav", "pcm"]
+SubtitleFormat = Literal["vtt", "srt"]
+
+
+class MultiFormatSpeechRequest(OpenAISpeechRequest):
+    """多格式合成请求
+    
+    字段同 /v1/audio/speech, `formats` 代替 `response_format`
+    """
+    
+    formats: List[AudioFormat] = Field(
+        ...,
+        min_length=1,
+        max_length=6,
+        description="输出格式列表"
+    )
     
+    subtitles: List[SubtitleFormat] = Field(
+        default_factory=list,
+        description="同时生成的字幕格式(由同一次合成的句子时间戳生成)"
+    )
+    
+    inline: bool = Field(
+        default=False,
+        description="是否在响应中直接返回音频(base64)与字幕, 否则按ID获取"
+    )
+    
+    def speech_request(self) -> OpenAISpeechRequest:
+        """转换为单一格式的合成请求"""
+        return OpenAISpeechRequest(**self.model_dump(exclude={"formats", "subtitles", "inline"}))
+
+
+class PrefetchRequest(BaseModel):
+    """预取请求
+
+    一次提交一个或多个之后会用到的合成请求, 在后台合成写入缓存
+    """
+    
+    requests: List[OpenAISpeechRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="待预取的合成请求(格式同 /v1/audio/speech)"
+    )
 
 
-__all__ = ["OpenAISpeechRequest"]
\ No newline at end of file
+__all__ = [
+    "OpenAISpeechRequest",
+    "MultiFormatSpeechRequest",
+    "PrefetchRequest",
+    "AudioFormat",
+    "SubtitleFormat",
+]
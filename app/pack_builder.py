@@ -0,0 +1,198 @@
+"""预渲染音频包构建工具
+
+按清单(文本 × 音色 × 格式 × 语速)经 `ParameterConverter`/`RequestBuilder` 与 `DoubaoTTSClient`
+渲染全部条目, 写入单个音频包文件(格式见 `app.services.audio_pack`)。
+
+已渲染的条目先保存到 `<输出>.parts/` 目录, 中断或部分失败后重新运行只渲染缺少的条目;
+全部成功后打包并删除该目录。缓存键依赖音色映射、采样率等配置, 构建时应使用与服务相同的环境变量。
+
+清单为JSON:
+    {
+      "model": "tts-1",
+      "texts": ["欢迎致电客服中心", "请按1查询余额"],
+      "voices": ["alloy", "nova"],
+      "formats": ["mp3", "wav"],
+      "speeds": [1.0],
+      "items": [{"input": "单独指定的条目", "voice": "coral", "response_format": "opus"}]
+    }
+
+用法:
+    python -m app.pack_builder manifest.json -o prompts.pack --concurrency 4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.audio_cache import AudioCache
+from app.services.audio_pack import PackWriter
+from app.services.backend import TTSBackend
+from app.services.backend_router import BackendRouter
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.framing import finalize_wav
+from app.services.speech_service import SpeechService
+from app.utils.logger import logger
+
+
+def load_manifest(path: Path) -> List[OpenAISpeechRequest]:
+    """读取清单并展开为请求列表
+
+    Args:
+        path: 清单文件路径
+
+    Returns:
+        请求列表
+
+    Raises:
+        ValueError: 清单中的条目无效
+    """
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    model = manifest.get("model", "tts-1")
+    bodies = [
+        {"model": model, "input": text, "voice": voice, "response_format": audio_format, "speed": speed}
+        for text in manifest.get("texts", [])
+        for voice in manifest.get("voices", ["alloy"])
+        for audio_format in manifest.get("formats", ["mp3"])
+        for speed in manifest.get("speeds", [1.0])
+    ]
+    bodies.extend({"model": model, **item} for item in manifest.get("items", []))
+    requests = []
+    for body in bodies:
+        try:
+            requests.append(OpenAISpeechRequest(**body))
+        except Exception as e:
+            raise ValueError(f"清单条目无效: {body}: {e}") from e
+    return requests
+
+
+def _part_path(parts: Path, key: str) -> Path:
+    return parts / (hashlib.sha256(key.encode("utf-8")).hexdigest() + ".audio")
+
+
+def _save_part(path: Path, audio: bytes) -> None:
+    """先写临时文件再替换, 中断时不留下不完整的条目"""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(audio)
+    tmp.replace(path)
+
+
+async def render(
+    requests: List[OpenAISpeechRequest],
+    parts: Path,
+    service: SpeechService,
+    concurrency: int
+) -> Tuple[Dict[str, Path], int, int]:
+    """渲染尚未保存的条目
+
+    Args:
+        requests: 请求列表
+        parts: 已渲染条目目录
+        service: 合成服务(不缓存、不转发)
+        concurrency: 同时渲染的条目数
+
+    Returns:
+        (缓存键 -> 条目文件, 本次渲染数, 失败数)
+    """
+    parts.mkdir(parents=True, exist_ok=True)
+    files: Dict[str, Path] = {}
+    pending: List[Tuple[str, OpenAISpeechRequest]] = []
+    for request in requests:
+        key = service.cache_key(request)
+        if key in files:
+            continue
+        files[key] = _part_path(parts, key)
+        if not files[key].exists():
+            pending.append((key, request))
+    logger.info(f"音频包条目: total={len(files)}, pending={len(pending)}")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    failed = 0
+
+    async def one(key: str, request: OpenAISpeechRequest) -> None:
+        nonlocal failed
+        async with semaphore:
+            try:
+                stream = await service.stream(request, "bulk", allow_peer=False)
+                audio = b"".join([chunk async for chunk in stream.chunks])
+                if request.response_format == "wav":
+                    # 流式WAV头的长度未知, 写回真实长度后再打包
+                    audio = finalize_wav(audio)
+            except Exception as e:
+                failed += 1
+                logger.error(f"渲染失败: voice={request.voice}, format={request.response_format}, "
+                             f"text={request.input[:20]!r}: {e}")
+                return
+        await asyncio.to_thread(_save_part, files[key], audio)
+
+    await asyncio.gather(*(one(key, request) for key, request in pending))
+    return files, len(pending) - failed, failed
+
+
+def build_pack(
+    requests: List[OpenAISpeechRequest],
+    output: Path,
+    backend: TTSBackend,
+    concurrency: int = 4,
+    keep_parts: bool = False
+) -> int:
+    """渲染并打包
+
+    Args:
+        requests: 请求列表
+        output: 输出文件路径
+        backend: 合成后端(豆包客户端)
+        concurrency: 同时渲染的条目数
+        keep_parts: 打包后是否保留已渲染条目目录
+
+    Returns:
+        失败的条目数; 有失败时不生成音频包, 重新运行可续传
+    """
+    parts = output.with_name(output.name + ".parts")
+    service = SpeechService(
+        router=BackendRouter({"doubao": backend}, "doubao"),
+        cache=AudioCache(max_bytes=0),
+        # 失败的条目留待续传, 不熔断
+        breaker=CircuitBreaker(error_threshold=0),
+    )
+
+    async def run():
+        try:
+            return await render(requests, parts, service, concurrency)
+        finally:
+            await backend.close()
+
+    files, rendered, failed = asyncio.run(run())
+    if failed:
+        logger.error(f"{failed} 个条目渲染失败, 已渲染的 {len(files) - failed} 个保存在 {parts}, 重新运行可续传")
+        return failed
+
+    with PackWriter(output) as writer:
+        for key, path in files.items():
+            writer.add(key, path.read_bytes())
+    logger.info(f"音频包已生成: {output}, entries={len(files)}, rendered={rendered}, "
+                f"size={output.stat().st_size}")
+    if not keep_parts:
+        shutil.rmtree(parts, ignore_errors=True)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="预渲染音频包构建")
+    parser.add_argument("manifest", type=Path, help="清单文件(JSON)")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="输出的音频包路径")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时渲染的条目数")
+    parser.add_argument("--keep-parts", action="store_true", help="打包后保留已渲染条目目录")
+    args = parser.parse_args(argv)
+
+    from app.services.doubao_client import doubao_client
+
+    requests = load_manifest(args.manifest)
+    return 1 if build_pack(requests, args.output, doubao_client, args.concurrency, args.keep_parts) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
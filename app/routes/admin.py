@@ -0,0 +1,117 @@
+"""管理接口路由模块
+
+按需剖析正在运行的进程, 仅在 `ENABLE_ADMIN_API=true` 时注册, 且始终要求管理密钥
+"""
+import asyncio
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.middleware.auth import verify_admin_key
+from app.services import profiler
+from app.services.readiness import readiness
+from app.utils.logger import logger
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(verify_admin_key)]
+)
+
+
+def _conflict(message: str) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={"error": {"message": message, "type": "invalid_request_error", "code": "conflict"}}
+    )
+
+
+@router.get("/profile/cpu", summary="CPU采样剖析")
+async def profile_cpu(
+    seconds: float = Query(5.0, gt=0, le=120, description="采样时长(秒)"),
+    interval_ms: float = Query(5.0, ge=1, le=100, description="采样间隔(毫秒)"),
+    format: Literal["collapsed", "speedscope"] = Query("collapsed", description="输出格式")
+):
+    """对运行中的进程做采样剖析
+
+    采样在独立线程中进行, 事件循环在采样期间照常处理请求。
+
+    Args:
+        seconds: 采样时长
+        interval_ms: 采样间隔
+        format: collapsed(折叠栈文本) 或 speedscope(JSON)
+
+    Returns:
+        剖析结果
+    """
+    interval = interval_ms / 1000
+    logger.info(f"开始CPU采样: seconds={seconds}, interval={interval_ms}ms")
+    try:
+        stacks, samples = await asyncio.to_thread(profiler.sample_cpu, seconds, interval)
+    except RuntimeError as e:
+        raise _conflict(str(e))
+    logger.info(f"CPU采样完成: samples={samples}, stacks={len(stacks)}")
+
+    if format == "speedscope":
+        return JSONResponse(profiler.to_speedscope(stacks, interval))
+    return PlainTextResponse(profiler.to_collapsed(stacks))
+
+
+@router.post("/profile/memory/start", summary="开始内存分配跟踪")
+async def memory_start(
+    frames: int = Query(10, ge=1, le=100, description="每个分配记录的栈深度")
+):
+    """开始tracemalloc跟踪并记录基准快照
+
+    跟踪期间所有分配都有额外开销, 完成后应调用 stop。
+    """
+    return profiler.start_tracemalloc(frames)
+
+
+@router.get("/profile/memory/diff", summary="内存分配快照差异")
+async def memory_diff(
+    top: int = Query(20, ge=1, le=500, description="返回条目数"),
+    group_by: Literal["lineno", "traceback"] = Query("lineno", description="聚合维度")
+):
+    """返回自上次快照以来分配增长最多的位置
+
+    当前快照会成为下一次比较的基准。
+    """
+    try:
+        return await asyncio.to_thread(profiler.tracemalloc_diff, top, group_by)
+    except RuntimeError as e:
+        raise _conflict(str(e))
+
+
+@router.post("/profile/memory/stop", summary="停止内存分配跟踪")
+async def memory_stop():
+    """停止tracemalloc跟踪"""
+    return profiler.stop_tracemalloc()
+
+
+@router.get("/tasks", summary="当前asyncio任务")
+async def list_tasks(
+    limit: int = Query(200, ge=1, le=10000, description="最多返回的任务数")
+):
+    """列出当前asyncio任务及其存活时长与挂起位置"""
+    tasks = profiler.dump_tasks(limit)
+    return {"count": len(tasks), "tasks": tasks}
+
+
+@router.post("/drain", summary="进入排空状态")
+async def drain_start():
+    """进入排空状态: `/ready` 返回503, 负载均衡器停止分配新流量, 进行中的请求不受影响
+
+    用于滚动发布前(如 preStop 钩子)先摘除流量, 再停止进程。
+    """
+    readiness.start_drain()
+    return {"draining": True}
+
+
+@router.delete("/drain", summary="退出排空状态")
+async def drain_stop():
+    """退出排空状态, 恢复接收流量"""
+    readiness.stop_drain()
+    return {"draining": False}
+
+
+__all__ = ["router"]
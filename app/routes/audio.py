@@ -2,20 +2,112 @@
 
 实现OpenAI兼容的/v1/audio/speech端点
 """
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import StreamingResponse
-from app.models.openai_models import OpenAISpeechRequest
+import asyncio
+import base64
+import json
+from typing import AsyncIterator, Literal, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from app.config import settings
+from app.models.openai_models import (
+    AudioFormat,
+    MultiFormatSpeechRequest,
+    OpenAISpeechRequest,
+    PrefetchRequest,
+    SubtitleFormat,
+)
+from app.services.audio_cache import content_digest
 from app.services.converter import converter
-from app.services.doubao_client import doubao_client
+from app.services.profiles import output_profiles, profile_bytes, profile_requests
+from app.services.signed_url import url_signer
+from app.services.speech_service import SpeechStream, cancelled_requests, speech_service
+from app.services.timestamps import SUBTITLE_CONTENT_TYPES, render_subtitles
 from app.utils.errors import TTSProxyError, format_error_response
+from app.utils.http_cache import conditional_response
 from app.utils.logger import logger
 from app.middleware.auth import verify_api_key
+from app.middleware.priority import resolve_priority
+from app.middleware.profile import resolve_profile
+from app.middleware.deadline import resolve_deadline
+from app.middleware.load_shedding import reject_if_overloaded
 
 router = APIRouter(prefix="/v1/audio", tags=["Audio"])
 
+# 客户端在响应开始前断开时返回的状态码(nginx约定, 客户端已收不到)
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def _wait_disconnect(http_request: Request) -> None:
+    """等待客户端断开连接(请求体已读完, 之后只会收到断开消息)"""
+    while (await http_request.receive())["type"] != "http.disconnect":
+        pass
+
+
+def _apply_profile(request: OpenAISpeechRequest, profile: Optional[str]) -> Tuple[OpenAISpeechRequest, str]:
+    """填写请求的输出档位(请求体已指定时不覆盖), 并计数
+
+    Returns:
+        (请求, 最终的档位名称)
+
+    Raises:
+        TTSProxyError: 请求体中的档位名称未知
+    """
+    if profile and not request.profile:
+        request = request.model_copy(update={"profile": profile})
+    name = output_profiles.resolve(request).name
+    profile_requests.inc(profile=name)
+    return request, name
+
+
+async def _count_bytes(chunks: AsyncIterator[bytes], profile: str) -> AsyncIterator[bytes]:
+    """按输出档位统计发送的音频字节数"""
+    try:
+        async for chunk in chunks:
+            profile_bytes.inc(len(chunk), profile=profile)
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+
+def _signed_url(request: OpenAISpeechRequest) -> Optional[str]:
+    """生成请求的签名GET地址(文本先规范化, 等价的文本得到同一URL), 超过长度上限时返回None"""
+    url = f"{router.prefix}/speech/signed/{url_signer.sign(speech_service.normalize(request))}"
+    if 0 < settings.SIGNED_URL_MAX_LENGTH < len(url):
+        return None
+    return url
+
+
+def _sse(payload: dict) -> bytes:
+    return b"data: " + json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n\n"
+
+
+async def _sse_events(result: SpeechStream) -> AsyncIterator[bytes]:
+    """把音频流转换为SSE事件
+
+    每个音频块一个 `speech.audio.delta` 事件; 句子时间戳到达后紧随其后发送 `speech.audio.sentence`,
+    最后发送 `speech.audio.done`。音频块收到即发送, 不额外缓冲。
+    """
+    sent = 0
+    try:
+        async for chunk in result.chunks:
+            yield _sse({"type": "speech.audio.delta", "audio": base64.b64encode(chunk).decode("ascii")})
+            while sent < len(result.timings):
+                yield _sse({"type": "speech.audio.sentence", **result.timings[sent].to_dict()})
+                sent += 1
+        while sent < len(result.timings):
+            yield _sse({"type": "speech.audio.sentence", **result.timings[sent].to_dict()})
+            sent += 1
+        yield _sse({"type": "speech.audio.done", "sentences": sent})
+    except TTSProxyError as e:
+        logger.error(f"TTS流式输出中断: {e.message}")
+        yield _sse({"type": "error", **format_error_response(e)["error"]})
+    finally:
+        await result.chunks.aclose()
+
 
 @router.post(
     "/speech",
+    dependencies=[Depends(reject_if_overloaded)],
     summary="生成语音",
     description="将文本转换为语音音频,完全兼容OpenAI TTS API格式",
     response_description="音频文件流",
@@ -28,7 +120,8 @@ router = APIRouter(prefix="/v1/audio", tags=["Audio"])
                 "audio/aac": {},
                 "audio/flac": {},
                 "audio/wav": {},
-                "audio/pcm": {}
+                "audio/pcm": {},
+                "text/event-stream": {}
             }
         },
         401: {
@@ -58,12 +151,22 @@ router = APIRouter(prefix="/v1/audio", tags=["Audio"])
                     }
                 }
             }
+        },
+        503: {
+            "description": "服务过载(事件循环延迟过高), 可根据Retry-After重试"
+        },
+        504: {
+            "description": "超过客户端截止时间(X-Request-Timeout / X-Request-Deadline), 上游合成已取消"
         }
     }
 )
 async def create_speech(
     request: OpenAISpeechRequest,
-    _: None = Depends(verify_api_key)
+    http_request: Request,
+    _: None = Depends(verify_api_key),
+    priority: str = Depends(resolve_priority),
+    deadline: Optional[float] = Depends(resolve_deadline),
+    profile: Optional[str] = Depends(resolve_profile)
 ):
     """OpenAI兼容的TTS端点
     
@@ -77,6 +180,32 @@ async def create_speech(
     Authorization: Bearer your-api-key
     ```
     
+    ## 优先级
+    
+    可通过请求头 `X-Priority: interactive|standard|bulk` 指定上游调度优先级,
+    API密钥可在 `API_KEY_PRIORITIES` 中配置优先级上限。
+    
+    ## 输出档位
+    
+    `OUTPUT_PROFILES` 定义的档位决定采样率、比特率与豆包资源/模型, 按请求体 `profile`、
+    请求头 `X-Output-Profile`、API密钥、模型(`OUTPUT_PROFILE_ROUTES`)依次确定, 响应头 `X-Output-Profile`。
+    
+    ## 签名URL
+    
+    配置 `SIGNED_URL_SECRET` 后响应头 `Content-Location` 为同一音频的签名GET地址,
+    可交给浏览器或CDN直接获取(见 `GET /v1/audio/speech/signed/{name}`);
+    地址超过 `SIGNED_URL_MAX_LENGTH` 时不返回。
+    
+    ## SSE
+    
+    `stream_format=sse` 时返回 `text/event-stream`: `speech.audio.delta`(base64音频块)、
+    `speech.audio.sentence`(句子文本与逐字起止时间, 来自同一次合成)与结束时的 `speech.audio.done`。
+    
+    ## 截止时间
+    
+    可通过 `X-Request-Timeout: 秒数` 或 `X-Request-Deadline: Unix时间戳` 声明愿意等待的时间,
+    到期未完成时返回504(已开始输出时中断连接)并取消上游合成。客户端断开同样会取消上游合成。
+    
     ## 参数说明
     
     - **model**: TTS模型,支持 `tts-1`, `tts-1-hd`, `gpt-4o-mini-tts`
@@ -114,6 +243,7 @@ async def create_speech(
     
     Args:
         request: OpenAI格式的TTS请求
+        http_request: 原始请求(用于检测客户端断开)
         
     Returns:
         StreamingResponse: 音频流响应
@@ -122,18 +252,43 @@ async def create_speech(
         HTTPException: 处理失败时抛出HTTP异常
     """
     try:
+        request, profile = _apply_profile(request, profile)
         logger.info(
             f"收到TTS请求: model={request.model}, "
             f"voice={request.voice}, "
             f"text_length={len(request.input)}, "
-            f"format={request.response_format}"
+            f"format={request.response_format}, "
+            f"priority={priority}, "
+            f"profile={profile}"
         )
         
-        # 1. 转换参数
-        doubao_request = converter.convert(request)
+        # 1-2. 规范化文本、转换参数并调用豆包API(命中缓存时跳过上游调用)
+        #      首个音频块到达后即开始响应, 之后的块按格式分帧边收边发
+        #      等待首包期间客户端断开则立即取消(之后的断开由流式响应关闭生成器处理)
+        stream = asyncio.create_task(speech_service.stream(request, priority, deadline=deadline))
+        watcher = asyncio.create_task(_wait_disconnect(http_request))
+        try:
+            await asyncio.wait((stream, watcher), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+        if not stream.done():
+            stream.cancel()
+            cancelled_requests.inc(reason="disconnect")
+            logger.info("客户端已断开, 取消合成")
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+        result = stream.result()
+        result.chunks = _count_bytes(result.chunks, profile)
         
-        # 2. 调用豆包API
-        audio_data = await doubao_client.synthesize_http(doubao_request)
+        if request.stream_format == "sse":
+            return StreamingResponse(
+                _sse_events(result),
+                media_type="text/event-stream",
+                headers={
+                    "Cache-Control": "no-cache",
+                    "X-Cache": result.cache_status.upper(),
+                    "X-Output-Profile": profile
+                }
+            )
         
         # 3. 确定Content-Type
         content_type = converter.get_content_type(
@@ -141,12 +296,22 @@ async def create_speech(
         )
         
         # 4. 返回音频流
+        headers = {
+            "Content-Disposition": f'attachment; filename="speech.{request.response_format or "mp3"}"',
+            "X-Cache": result.cache_status.upper(),
+            "X-Output-Profile": profile
+        }
+        if result.segments:
+            # 按句缓存: 命中句数/总句数
+            headers["X-Cache-Segments"] = f"{result.segment_hits}/{result.segments}"
+        signed_url = _signed_url(request) if url_signer.enabled else None
+        if signed_url is not None:
+            # 同一音频的可缓存GET地址
+            headers["Content-Location"] = signed_url
         return StreamingResponse(
-            iter([audio_data]),
+            result.chunks,
             media_type=content_type,
-            headers={
-                "Content-Disposition": f'attachment; filename="speech.{request.response_format or "mp3"}"'
-            }
+            headers=headers
         )
         
     except TTSProxyError as e:
@@ -164,4 +329,302 @@ async def create_speech(
         )
 
 
-__all__ = ["router"]
\ No newline at end of file
+@router.post(
+    "/speech/prefetch",
+    dependencies=[Depends(reject_if_overloaded)],
+    status_code=202,
+    summary="预取语音",
+    description="在后台合成一个或多个请求并写入缓存, 立即返回202",
+    responses={
+        202: {
+            "description": "已接受, 逐条返回提交结果",
+            "content": {
+                "application/json": {
+                    "example": {"results": [{"index": 0, "status": "queued"}, {"index": 1, "status": "cached"}]}
+                }
+            }
+        },
+        503: {
+            "description": "服务过载(事件循环延迟过高), 可根据Retry-After重试"
+        }
+    }
+)
+async def prefetch_speech(
+    request: PrefetchRequest,
+    _: None = Depends(verify_api_key),
+    profile: Optional[str] = Depends(resolve_profile)
+):
+    """预取端点
+    
+    应用已知接下来要播放的内容(下一轮对话、下一页文章)时, 提前提交合成而不等待音频。
+    预取只使用空闲的上游容量(有其他请求排队时让出), 已缓存或正在合成的请求不重复提交;
+    之后的正式请求命中缓存, 或合并到进行中的预取。
+    
+    每条的 `status`:
+    - **queued**: 已提交后台合成
+    - **cached**: 已在缓存或音频包中
+    - **inflight**: 正在合成(预取或其他请求)
+    - **rejected**: 未完成的预取已达 `PREFETCH_MAX_PENDING`, 上游熔断中, 或输出档位未知
+    
+    未指定 `profile` 的条目使用请求头或API密钥确定的输出档位。
+    
+    Args:
+        request: 预取请求
+        
+    Returns:
+        JSONResponse: 各条请求的提交结果
+    """
+    from app.services.prefetch import prefetcher
+
+    results = [
+        {"index": index, "status": prefetcher.submit(
+            item.model_copy(update={"profile": profile}) if profile and not item.profile else item
+        )}
+        for index, item in enumerate(request.requests)
+    ]
+    logger.info(f"收到预取请求: count={len(results)}, queued={sum(r['status'] == 'queued' for r in results)}")
+    return JSONResponse(status_code=202, content={"results": results})
+
+
+@router.post(
+    "/speech/formats",
+    dependencies=[Depends(reject_if_overloaded)],
+    summary="多格式语音",
+    description="合成一次, 同时输出多种音频格式, 各格式写入缓存并可按ID获取",
+    responses={
+        200: {
+            "description": "各格式的大小、来源与获取地址",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "id": "3f2a...",
+                        "formats": {
+                            "wav": {"content_type": "audio/wav", "bytes": 96044, "cache": "transcoded",
+                                    "url": "/v1/audio/speech/formats/3f2a.../wav"}
+                        }
+                    }
+                }
+            }
+        },
+        503: {
+            "description": "服务过载(事件循环延迟过高), 可根据Retry-After重试"
+        }
+    }
+)
+async def create_speech_formats(
+    request: MultiFormatSpeechRequest,
+    _: None = Depends(verify_api_key),
+    priority: str = Depends(resolve_priority),
+    profile: Optional[str] = Depends(resolve_profile)
+):
+    """多格式TTS端点
+    
+    同一段语音需要多种格式(移动端opus、网页mp3、归档wav)时, 只请求一次上游PCM,
+    在本地并行编码为各格式(mp3/opus/aac/flac需要ffmpeg, 未安装时这些格式各自请求上游)。
+    各格式写入缓存, 之后按单一格式请求 /v1/audio/speech 同样命中。
+    
+    响应中的 `timestamps` 为同一次合成返回的句子时间戳(JSON); `subtitles` 指定的字幕格式(vtt/srt)
+    由这些时间戳生成, 不需要额外的对齐。`inline=true` 时响应中直接包含base64音频与字幕文本,
+    否则通过返回的 `url` 获取。
+    
+    Args:
+        request: 多格式合成请求
+        
+    Returns:
+        JSONResponse: 结果ID与各格式信息
+        
+    Raises:
+        HTTPException: 处理失败时抛出HTTP异常
+    """
+    try:
+        request, profile = _apply_profile(request, profile)
+        logger.info(
+            f"收到多格式TTS请求: voice={request.voice}, text_length={len(request.input)}, "
+            f"formats={request.formats}, priority={priority}, profile={profile}"
+        )
+        result = await speech_service.synthesize_formats(request.speech_request(), request.formats, priority)
+    except TTSProxyError as e:
+        logger.error(f"多格式TTS处理失败: {e.message}")
+        raise HTTPException(status_code=e.status_code, detail=format_error_response(e))
+
+    formats = {}
+    for fmt, item in result.results.items():
+        formats[fmt] = {
+            "content_type": converter.get_content_type(fmt),
+            "bytes": len(item.audio),
+            "cache": item.cache_status,
+            "url": f"{router.prefix}/speech/formats/{result.id}/{fmt}",
+        }
+        if request.inline:
+            formats[fmt]["data"] = base64.b64encode(item.audio).decode("ascii")
+            profile_bytes.inc(len(item.audio), profile=profile)
+    subtitles = {}
+    for fmt in dict.fromkeys(request.subtitles):
+        subtitles[fmt] = {
+            "content_type": SUBTITLE_CONTENT_TYPES[fmt],
+            "url": f"{router.prefix}/speech/formats/{result.id}/{fmt}",
+        }
+        if request.inline:
+            subtitles[fmt]["data"] = render_subtitles(result.timings, fmt)
+    return JSONResponse(content={
+        "id": result.id,
+        "profile": profile,
+        "formats": formats,
+        "timestamps": [timing.to_dict() for timing in result.timings],
+        "subtitles": subtitles,
+    })
+
+
+@router.get(
+    "/speech/formats/{result_id}/{response_format}",
+    summary="获取多格式结果",
+    description="按多格式合成返回的ID获取某一格式的音频或字幕(vtt/srt)",
+    responses={404: {"description": "ID未知或音频已被缓存淘汰, 请重新合成"}}
+)
+async def get_speech_format(
+    result_id: str,
+    response_format: Literal[AudioFormat, SubtitleFormat],
+    http_request: Request,
+    _: None = Depends(verify_api_key)
+):
+    """按ID获取多格式结果中的一种格式
+    
+    音频与时间戳保存在进程内缓存中, 缓存淘汰或服务重启后返回404。
+    音频响应支持ETag/If-None-Match与Range(同签名URL端点)。
+    
+    Args:
+        result_id: 多格式合成返回的ID
+        response_format: 音频格式或字幕格式
+        http_request: 原始请求(读取条件请求头)
+        
+    Returns:
+        Response: 音频或字幕
+    """
+    if response_format in SUBTITLE_CONTENT_TYPES:
+        subtitles = speech_service.format_subtitles(result_id, response_format)
+        if subtitles is None:
+            raise HTTPException(status_code=404, detail={"error": {
+                "message": "时间戳不存在或已过期, 请重新合成",
+                "type": "invalid_request_error",
+                "code": "result_not_found"
+            }})
+        return Response(content=subtitles, media_type=SUBTITLE_CONTENT_TYPES[response_format])
+    found = speech_service.format_audio(result_id, response_format)
+    if found is None:
+        raise HTTPException(status_code=404, detail={"error": {
+            "message": "结果不存在或已过期, 请重新合成",
+            "type": "invalid_request_error",
+            "code": "result_not_found"
+        }})
+    audio, digest = found
+    return conditional_response(
+        http_request,
+        audio,
+        converter.get_content_type(response_format),
+        "private, max-age=0, must-revalidate",
+        {"Content-Disposition": f'attachment; filename="speech.{response_format}"'},
+        f'"{digest}"'
+    )
+
+
+@router.post(
+    "/speech/sign",
+    summary="生成签名URL",
+    description="返回请求对应的确定性签名GET地址, 需要配置 SIGNED_URL_SECRET",
+    responses={
+        200: {
+            "description": "签名地址",
+            "content": {"application/json": {"example": {"url": "/v1/audio/speech/signed/eyJp....Zk3q....mp3"}}}
+        },
+        400: {"description": "地址超过 SIGNED_URL_MAX_LENGTH"},
+        404: {"description": "未配置 SIGNED_URL_SECRET"}
+    }
+)
+async def sign_speech(
+    request: OpenAISpeechRequest,
+    _: None = Depends(verify_api_key),
+    profile: Optional[str] = Depends(resolve_profile)
+):
+    """签名URL端点
+    
+    相同参数(文本规范化后)总是得到同一地址, 不发起合成。请求头或API密钥确定的输出档位编码进地址。
+    
+    Args:
+        request: OpenAI格式的TTS请求
+        
+    Returns:
+        JSONResponse: 签名地址
+    """
+    if not url_signer.enabled:
+        raise HTTPException(status_code=404, detail={"error": {
+            "message": "未启用签名URL", "type": "invalid_request_error", "code": "signed_url_disabled"
+        }})
+    if profile and not request.profile:
+        request = request.model_copy(update={"profile": profile})
+    url = _signed_url(request)
+    if url is None:
+        raise HTTPException(status_code=400, detail={"error": {
+            "message": f"签名URL超过长度上限({settings.SIGNED_URL_MAX_LENGTH}), 请缩短文本",
+            "type": "invalid_request_error",
+            "code": "signed_url_too_long"
+        }})
+    return JSONResponse(content={"url": url})
+
+
+@router.get(
+    "/speech/signed/{name}",
+    dependencies=[Depends(reject_if_overloaded)],
+    summary="按签名URL获取语音",
+    description="可由HTTP缓存与CDN缓存的GET端点, 支持ETag、If-None-Match与Range",
+    responses={
+        206: {"description": "部分内容(Range)"},
+        304: {"description": "未修改(If-None-Match)"},
+        403: {"description": "签名无效"},
+        416: {"description": "范围无法满足"}
+    }
+)
+async def get_signed_speech(name: str, http_request: Request):
+    """签名URL端点
+    
+    地址中编码了合成参数并带有HMAC签名(由 `POST /v1/audio/speech/sign` 或
+    `POST /v1/audio/speech` 响应的 `Content-Location` 获得), 因此无需API密钥。
+    已在音频包或缓存中的音频直接返回(不复制), 否则按默认优先级合成一次完整音频。
+    
+    响应带有写入缓存或音频包时计算的内容摘要作为强ETag(不必读取整段音频)与
+    `Cache-Control: public, max-age=SIGNED_URL_MAX_AGE`; 已缓存时先比较 `If-None-Match`,
+    匹配则直接返回304, 不发起合成; `Range` 返回206(单个范围)。
+    
+    Args:
+        name: 签名文件名 `<参数>.<签名>.<格式>`
+        http_request: 原始请求(读取条件请求头)
+        
+    Returns:
+        Response: 音频(200/206)或304/416
+    """
+    try:
+        request = url_signer.verify(name)
+        request, profile = _apply_profile(request, None)
+        # 先查音频包与缓存: 已缓存时 If-None-Match 匹配即返回304, 不发起合成
+        found = speech_service.lookup(request)
+        cache_status = "hit"
+        if found is None:
+            result = await speech_service.synthesize(request, settings.DEFAULT_PRIORITY)
+            # 以缓存中的完整音频为准(wav流式输出的头部长度未知, 写入缓存时已补全), 使ETag与之后命中时一致
+            found = speech_service.lookup(request) or (result.audio, content_digest(result.audio))
+            cache_status = result.cache_status
+    except TTSProxyError as e:
+        raise HTTPException(status_code=e.status_code, detail=format_error_response(e))
+    audio, digest = found
+    response = conditional_response(
+        http_request,
+        audio,
+        converter.get_content_type(request.response_format or "mp3"),
+        f"public, max-age={settings.SIGNED_URL_MAX_AGE}",
+        {"X-Cache": cache_status.upper(), "X-Output-Profile": profile},
+        f'"{digest}"'
+    )
+    profile_bytes.inc(len(response.body), profile=profile)
+    return response
+
+
+__all__ = ["router"]
@@ -0,0 +1,56 @@
+"""节点间共享缓存路由模块
+
+所属节点为其他代理节点提供音频, 仅在配置 `PEER_NODES` 时注册, 且要求共享密钥
+"""
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.converter import converter
+from app.services.peer_cache import KEY_HEADER, PEER_PATH, SECRET_HEADER, peer_cache
+from app.services.scheduler import IDLE_PRIORITY, PRIORITY_CLASSES
+from app.services.speech_service import speech_service
+from app.utils.errors import TTSProxyError, format_error_response
+from app.utils.logger import logger
+
+router = APIRouter(tags=["Internal"], include_in_schema=False)
+
+
+@router.post(PEER_PATH)
+async def peer_speech(
+    request: OpenAISpeechRequest,
+    secret: str | None = Header(None, alias=SECRET_HEADER),
+    expected_key: str | None = Header(None, alias=KEY_HEADER),
+    priority: str = Header("standard", alias="X-Priority")
+):
+    """为其他节点合成(或从缓存读取)音频
+
+    只在本节点合成, 不再转发, 避免节点列表不一致时循环转发。
+    请求方计算的缓存键与本节点不一致(配置不同)时返回409, 请求方改为本地合成。
+    """
+    if not peer_cache.verify_secret(secret):
+        raise HTTPException(status_code=401, detail={"error": {
+            "message": "无效的节点密钥", "type": "authentication_error", "code": "invalid_peer_secret"
+        }})
+    if priority not in PRIORITY_CLASSES and priority != IDLE_PRIORITY:
+        priority = "standard"
+
+    if expected_key and expected_key != speech_service.cache_key(request):
+        logger.warning("节点间缓存键不一致, 请检查各节点配置是否相同")
+        raise HTTPException(status_code=409, detail={"error": {
+            "message": "缓存键不一致", "type": "invalid_request_error", "code": "peer_key_mismatch"
+        }})
+
+    try:
+        result = await speech_service.stream(request, priority, allow_peer=False)
+    except TTSProxyError as e:
+        logger.error(f"节点间合成失败: {e.message}")
+        raise HTTPException(status_code=e.status_code, detail=format_error_response(e))
+
+    return StreamingResponse(
+        result.chunks,
+        media_type=converter.get_content_type(request.response_format or "mp3"),
+        headers={"X-Cache": result.cache_status.upper()}
+    )
+
+
+__all__ = ["router"]
@@ -0,0 +1,83 @@
+"""实时语音路由模块
+
+实现 /v1/audio/speech/realtime WebSocket端点: 增量文本输入, 按句流式返回音频
+"""
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from app.middleware.auth import check_api_key
+from app.middleware.priority import PRIORITY_HEADER, pick_priority
+from app.middleware.profile import PROFILE_HEADER, pick_profile
+from app.services.loop_monitor import loop_monitor
+from app.utils.logger import logger
+
+router = APIRouter(prefix="/v1/audio", tags=["Audio"])
+
+# WebSocket关闭码
+POLICY_VIOLATION = 1008
+TRY_AGAIN_LATER = 1013
+
+
+def _api_key(websocket: WebSocket) -> str | None:
+    """从Authorization头或 api_key 查询参数读取API密钥
+
+    浏览器的WebSocket API无法设置请求头, 因此同时支持查询参数。
+    """
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token.strip()
+    return websocket.query_params.get("api_key")
+
+
+@router.websocket("/speech/realtime")
+async def realtime_speech(websocket: WebSocket):
+    """实时语音端点
+
+    连接参数(查询参数, 也可在连接后通过 session.update 修改):
+    `voice`, `model`, `response_format`, `speed`, `profile`, `priority`, `api_key`
+    (输出档位也可由 `X-Output-Profile` 请求头或API密钥确定)
+
+    消息协议见 `app.services.realtime`。
+    """
+    # 会话模块在首个连接时导入, 不增加服务启动时间
+    from app.services.realtime import SESSION_DEFAULTS, RealtimeSession
+
+    api_key = _api_key(websocket)
+    try:
+        check_api_key(api_key)
+    except HTTPException:
+        await websocket.close(code=POLICY_VIOLATION)
+        return
+    if loop_monitor.overloaded:
+        await websocket.close(code=TRY_AGAIN_LATER)
+        return
+
+    params = websocket.query_params
+    priority = pick_priority(websocket.headers.get(PRIORITY_HEADER) or params.get("priority"), api_key)
+    config = {key: params[key] for key in SESSION_DEFAULTS if key in params}
+    profile = pick_profile(websocket.headers.get(PROFILE_HEADER) or params.get("profile"), api_key)
+    if profile:
+        config["profile"] = profile
+    if "speed" in config:
+        try:
+            config["speed"] = float(config["speed"])
+        except ValueError:
+            await websocket.close(code=POLICY_VIOLATION, reason="invalid speed")
+            return
+
+    await websocket.accept()
+    try:
+        session = RealtimeSession(websocket, priority, config)
+    except ValueError as e:
+        await websocket.close(code=POLICY_VIOLATION, reason=str(e)[:120])
+        return
+
+    logger.info(f"实时语音会话开始: priority={priority}, session={session.config}")
+    try:
+        await session.run()
+    except WebSocketDisconnect:
+        logger.info(f"实时语音会话断开: segments={session.dispatched}")
+        return
+    logger.info(f"实时语音会话结束: segments={session.dispatched}")
+    await websocket.close()
+
+
+__all__ = ["router"]
@@ -1,10 +1,29 @@
 """服务模块"""
 from app.services.converter import ParameterConverter, converter
+from app.services.request_builder import RequestBuilder, request_builder
+from app.services.backend import TTSBackend
 from app.services.doubao_client import DoubaoTTSClient, doubao_client
+from app.services.mock_backend import MockTTSBackend
+from app.services.backend_router import BackendRouter, backend_router
+from app.services.normalizer import TextNormalizer, normalizer
+from app.services.audio_cache import AudioCache, audio_cache
+from app.services.speech_service import SpeechService, speech_service
 
 __all__ = [
     "ParameterConverter",
     "converter",
+    "RequestBuilder",
+    "request_builder",
     "DoubaoTTSClient",
-    "doubao_client"
-]
\ No newline at end of file
+    "doubao_client",
+    "TTSBackend",
+    "MockTTSBackend",
+    "BackendRouter",
+    "backend_router",
+    "TextNormalizer",
+    "normalizer",
+    "AudioCache",
+    "audio_cache",
+    "SpeechService",
+    "speech_service"
+]
@@ -0,0 +1,354 @@
+"""音频缓存模块
+
+进程内音频缓存(按字节数限制), 并对相同键的并发合成做single-flight合并。
+
+淘汰策略:
+- `lru`: 按最近使用顺序淘汰
+- `tinylfu`: 在LRU之上加频率准入。用Count-Min草图(定期减半老化)记录各键的近期访问频率,
+  新条目需要挤出的条目(按LRU顺序, 直到腾出足够字节)的频率之和低于新条目的频率时才写入,
+  一次性的长文本无法挤掉多条常用的短文本
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from app.models.doubao_models import DoubaoV3TTSRequest
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+
+def make_cache_key(request: DoubaoV3TTSRequest) -> str:
+    """根据实际发往豆包的参数生成缓存键
+
+    使用转换后的参数而非原始OpenAI参数, 这样映射到同一豆包参数的请求
+    (如规范化后相同的文本、被限幅到同一语速的speed)共享同一个键。
+    与 `PreparedTTSRequest.cache_key` 一致。
+
+    Args:
+        request: 豆包V3 TTS请求
+
+    Returns:
+        缓存键(sha256十六进制)
+    """
+    from app.services.request_builder import request_builder
+    return request_builder.from_model(request).cache_key
+
+
+def content_digest(data: Union[bytes, memoryview]) -> str:
+    """音频内容摘要(blake2b-128十六进制), 写入缓存或音频包时计算一次, 用作强ETag
+
+    Args:
+        data: 音频数据
+
+    Returns:
+        摘要
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+CACHE_POLICIES = ("lru", "tinylfu")
+# 计数器减半的查找表
+_HALVE = bytes(i >> 1 for i in range(256))
+
+
+class FrequencySketch:
+    """Count-Min频率草图
+
+    4行计数器, 每个计数器上限15; 采用保守更新(只增加等于最小值的计数器)以减少高估。
+    累计增加次数达到计数器数的10倍时全部减半, 使频率反映近期热度。
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, width: int):
+        """初始化草图
+
+        Args:
+            width: 每行计数器数(向上取2的幂), 应不小于缓存可容纳的条目数
+        """
+        self.width = 1 << max(4, (width - 1).bit_length())
+        self._mask = self.width - 1
+        self._rows: List[bytearray] = [bytearray(self.width) for _ in range(self.DEPTH)]
+        self.sample_size = 10 * self.width
+        self.additions = 0
+
+    def _indexes(self, key: str) -> List[int]:
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        step = (h >> 32) | 1
+        return [(h + i * step) & self._mask for i in range(self.DEPTH)]
+
+    def frequency(self, key: str) -> int:
+        """估计键的近期访问次数"""
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def increment(self, key: str) -> None:
+        """记录一次访问"""
+        indexes = self._indexes(key)
+        current = min(row[index] for row, index in zip(self._rows, indexes))
+        if current < self.MAX_COUNT:
+            for row, index in zip(self._rows, indexes):
+                if row[index] == current:
+                    row[index] = current + 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.age()
+
+    def age(self) -> None:
+        """全部计数器减半"""
+        for row in self._rows:
+            row[:] = row.translate(_HALVE)
+        self.additions //= 2
+
+
+class _Flight:
+    """进行中的合成及其等待者数"""
+
+    __slots__ = ("task", "waiters", "promote")
+
+    def __init__(self, task: "asyncio.Task[bytes]", promote: Optional[Callable[[str], None]] = None):
+        self.task = task
+        self.waiters = 0
+        self.promote = promote
+
+
+class AudioCache:
+    """进程内音频缓存
+
+    - 按字节数限制容量, 按 `policy` 淘汰与准入
+    - 相同键的并发请求只触发一次上游合成(single-flight), 所有请求都离开后取消合成
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_item_bytes: Optional[int] = None,
+        policy: Optional[str] = None
+    ):
+        """初始化缓存
+
+        Args:
+            max_bytes: 缓存总容量(字节), 默认读取配置, 0表示不缓存
+            max_item_bytes: 单条上限(字节), 默认读取配置
+            policy: 淘汰策略 lru / tinylfu, 默认读取配置
+
+        Raises:
+            ValueError: 未知的淘汰策略
+        """
+        self.max_bytes = settings.AUDIO_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_item_bytes = (
+            settings.AUDIO_CACHE_MAX_ITEM_BYTES if max_item_bytes is None else max_item_bytes
+        )
+        self.policy = policy or settings.AUDIO_CACHE_POLICY
+        if self.policy not in CACHE_POLICIES:
+            raise ValueError(f"未知的音频缓存策略: {self.policy}, 可选: {', '.join(CACHE_POLICIES)}")
+        # 草图宽度按平均每条16KB估算可容纳的条目数
+        self.sketch: Optional[FrequencySketch] = (
+            FrequencySketch(max(1024, self.max_bytes // 16384))
+            if self.policy == "tinylfu" and self.max_bytes > 0 else None
+        )
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        # 各条目写入时计算的内容摘要
+        self._digests: Dict[str, str] = {}
+        self._inflight: Dict[str, _Flight] = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        # 等待者全部离开而被取消的合成次数
+        self.abandoned = 0
+        # 因频率低于被挤出条目而未写入的次数
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存并刷新LRU位置(同时记录一次访问频率)
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            音频数据, 未命中返回None
+        """
+        if self.sketch is not None:
+            self.sketch.increment(key)
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def entry(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """读取缓存及其内容摘要(同 `get`, 刷新LRU位置)
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            (音频数据, 内容摘要), 未命中返回None
+        """
+        value = self.get(key)
+        if value is None:
+            return None
+        return value, self._digests[key]
+
+    def put(self, key: str, value: bytes) -> bool:
+        """写入缓存
+
+        Args:
+            key: 缓存键
+            value: 音频数据
+
+        Returns:
+            是否写入成功(超过单条上限、缓存关闭或未通过频率准入时返回False)
+        """
+        size = len(value)
+        if self.max_bytes <= 0 or size > self.max_item_bytes or size > self.max_bytes:
+            return False
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= len(old)
+        elif self.sketch is not None and not self._admit(key, size):
+            self.rejected += 1
+            return False
+
+        while self._entries and self.current_bytes + size > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            del self._digests[evicted_key]
+            self.current_bytes -= len(evicted)
+
+        self._entries[key] = value
+        self._digests[key] = content_digest(value)
+        self.current_bytes += size
+        return True
+
+    def _admit(self, key: str, size: int) -> bool:
+        """频率准入: 新条目频率高于需要挤出的条目频率之和时写入"""
+        overflow = self.current_bytes + size - self.max_bytes
+        if overflow <= 0:
+            return True
+        frequency = self.sketch.frequency(key)
+        victims = 0
+        freed = 0
+        for victim, value in self._entries.items():
+            victims += self.sketch.frequency(victim)
+            if victims >= frequency:
+                return False
+            freed += len(value)
+            if freed >= overflow:
+                break
+        return True
+
+    def is_inflight(self, key: str) -> bool:
+        """键是否正在合成中"""
+        return key in self._inflight
+
+    async def get_or_create(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[bytes]],
+        priority: Optional[str] = None,
+        promote: Optional[Callable[[str], None]] = None
+    ) -> Tuple[bytes, str]:
+        """读取缓存, 未命中时合成并写入
+
+        并发的相同键请求会等待同一个合成结果。合成在独立任务中运行并按等待者计数:
+        某个等待者被取消(客户端断开、超过截止时间)时合成继续为其余等待者进行,
+        最后一个等待者离开时才取消合成。
+        合并到已有合成的请求以自己的 priority 调用发起方登记的 promote,
+        使低优先级(如预取)发起的合成不会拖慢随后合并进来的高优先级请求。
+
+        Args:
+            key: 缓存键
+            factory: 未命中时调用的合成协程工厂
+            priority: 本请求的调度优先级类别
+            promote: 发起合成时登记的优先级提升回调
+
+        Returns:
+            (音频数据, 来源): 来源为 hit / miss / shared
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached, "hit"
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.misses += 1
+            status = "miss"
+            flight = _Flight(asyncio.create_task(self._run(key, factory)), promote)
+            self._inflight[key] = flight
+        else:
+            self.shared += 1
+            status = "shared"
+            if priority is not None and flight.promote is not None:
+                flight.promote(priority)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), status
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                # 任务可能尚未开始运行, 此时 _run 的清理不会执行
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                self.abandoned += 1
+                logger.debug(f"所有等待者已离开, 取消合成: key={key[:12]}")
+
+    async def _run(self, key: str, factory: Callable[[], Awaitable[bytes]]) -> bytes:
+        """执行合成并写入缓存"""
+        try:
+            value = await factory()
+        finally:
+            flight = self._inflight.get(key)
+            if flight is not None and flight.task is asyncio.current_task():
+                del self._inflight[key]
+        self.put(key, value)
+        return value
+
+    def stats(self) -> dict:
+        """获取缓存统计
+
+        Returns:
+            统计信息字典
+        """
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "inflight": len(self._inflight),
+            "abandoned": self.abandoned,
+            "policy": self.policy,
+            "rejected": self.rejected,
+            "hit_ratio": (self.hits + self.shared) / lookups if lookups else 0.0,
+        }
+
+
+# 全局缓存实例
+audio_cache = AudioCache()
+
+metrics.gauge("tts_audio_cache_bytes", "音频缓存占用字节数", callback=lambda: audio_cache.current_bytes)
+metrics.gauge("tts_audio_cache_entries", "音频缓存条目数", callback=lambda: len(audio_cache))
+metrics.counter("tts_audio_cache_hits_total", "音频缓存命中次数", callback=lambda: audio_cache.hits)
+metrics.counter("tts_audio_cache_misses_total", "音频缓存未命中次数", callback=lambda: audio_cache.misses)
+metrics.counter(
+    "tts_audio_cache_rejected_total", "音频缓存频率准入拒绝次数", callback=lambda: audio_cache.rejected
+)
+metrics.counter(
+    "tts_upstream_abandoned_total", "所有请求方离开后取消的上游合成次数", callback=lambda: audio_cache.abandoned
+)
+
+
+__all__ = ["AudioCache", "FrequencySketch", "CACHE_POLICIES", "audio_cache", "content_digest", "make_cache_key"]
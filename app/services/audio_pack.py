@@ -0,0 +1,248 @@
+"""预渲染音频包模块
+
+固定话术(IVR菜单、界面提示语)离线渲染后打包为单个文件, 服务启动时以只读mmap映射,
+匹配的请求直接从映射页返回(memoryview切片, 不复制为Python bytes), 不访问上游。
+
+文件布局(小端):
+- 头部32字节: 魔数 `TTSPACK1`, 版本, 条目数, 索引槽位数(2的幂), 保留, 索引偏移
+- 音频数据: 各条目依次拼接
+- 索引: 开放寻址哈希表, 每槽64字节 = sha256(缓存键) + 数据偏移 + 数据长度 + 内容摘要(blake2b-128),
+  全零键摘要为空槽; 内容摘要在构建时计算, 响应直接用作强ETag, 不必读取整段音频
+
+缓存键与 `SpeechService` 一致(含后端命名空间), 音色映射、采样率等配置变化后键不再匹配,
+请求自动回退到正常合成。构建见 `app/pack_builder.py`。
+"""
+import hashlib
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+from app.config import settings
+from app.services.audio_cache import content_digest
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+MAGIC = b"TTSPACK1"
+VERSION = 2
+_HEADER = struct.Struct("<8sIIIIQ")
+_SLOT = struct.Struct("<32sQQ16s")
+_EMPTY = bytes(32)
+
+PathLike = Union[str, os.PathLike]
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode("utf-8")).digest()
+
+
+def _home_slot(digest: bytes, mask: int) -> int:
+    return int.from_bytes(digest[:8], "little") & mask
+
+
+class PackWriter:
+    """音频包写入器
+
+    先写入同目录下的临时文件, `close()` 写完索引后原子替换目标文件。
+    """
+
+    def __init__(self, path: PathLike):
+        """初始化写入器
+
+        Args:
+            path: 输出文件路径
+        """
+        self.path = Path(path)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._file = open(self._tmp, "wb")
+        self._file.write(bytes(_HEADER.size))
+        self._entries: Dict[bytes, Tuple[int, int, bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: str, audio: bytes) -> bool:
+        """写入一个条目
+
+        Args:
+            key: 缓存键
+            audio: 完整音频
+
+        Returns:
+            是否写入(相同键只写入一次)
+        """
+        digest = _digest(key)
+        if digest in self._entries:
+            return False
+        offset = self._file.tell()
+        self._file.write(audio)
+        self._entries[digest] = (offset, len(audio), bytes.fromhex(content_digest(audio)))
+        return True
+
+    def close(self) -> None:
+        """写入索引与头部并替换目标文件"""
+        slots = 8
+        while slots < len(self._entries) * 2:
+            slots *= 2
+        mask = slots - 1
+        table = bytearray(slots * _SLOT.size)
+        for digest, (offset, length, content) in self._entries.items():
+            slot = _home_slot(digest, mask)
+            while table[slot * _SLOT.size:slot * _SLOT.size + 32] != _EMPTY:
+                slot = (slot + 1) & mask
+            _SLOT.pack_into(table, slot * _SLOT.size, digest, offset, length, content)
+
+        index_offset = self._file.tell()
+        self._file.write(table)
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, VERSION, len(self._entries), slots, 0, index_offset))
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        """放弃写入并删除临时文件"""
+        self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "PackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class AudioPack:
+    """只读映射的音频包"""
+
+    def __init__(self, path: Optional[PathLike] = None):
+        """初始化音频包(不打开文件)
+
+        Args:
+            path: 音频包路径, 默认读取配置
+        """
+        self.path = path or settings.AUDIO_PACK_PATH
+        self.entries = 0
+        self.size = 0
+        self.hits = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._mask = 0
+        self._index_offset = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._view is not None
+
+    def open(self) -> None:
+        """映射音频包文件
+
+        Raises:
+            OSError: 文件无法打开
+            ValueError: 文件格式无效
+        """
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(mapped) < _HEADER.size:
+                raise ValueError(f"音频包过小: {self.path}")
+            magic, version, entries, slots, _, index_offset = _HEADER.unpack_from(mapped)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"不是有效的音频包(版本{VERSION}, 旧版本请重新构建): {self.path}")
+            if slots & (slots - 1) or index_offset + slots * _SLOT.size > len(mapped):
+                raise ValueError(f"音频包索引损坏: {self.path}")
+        except BaseException:
+            mapped.close()
+            raise
+        self.close()
+        self._mmap = mapped
+        self._view = memoryview(mapped)
+        self._mask = slots - 1
+        self._index_offset = index_offset
+        self.entries = entries
+        self.size = len(mapped)
+        logger.info(f"已映射音频包: {self.path}, entries={entries}, size={self.size}")
+
+    def _lookup(self, key: str) -> Optional[Tuple[int, int, bytes]]:
+        """在索引中查找键, 返回(数据偏移, 长度, 内容摘要)"""
+        view = self._view
+        if view is None:
+            return None
+        digest = _digest(key)
+        slot = _home_slot(digest, self._mask)
+        while True:
+            base = self._index_offset + slot * _SLOT.size
+            stored = view[base:base + 32]
+            if stored == digest:
+                _, offset, length, content = _SLOT.unpack_from(view, base)
+                return offset, length, content
+            if stored == _EMPTY:
+                return None
+            slot = (slot + 1) & self._mask
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key) is not None
+
+    def get(self, key: str) -> Optional[memoryview]:
+        """查找音频
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            映射页上的音频切片(不复制), 不存在时返回None
+        """
+        found = self.entry(key)
+        return None if found is None else found[0]
+
+    def entry(self, key: str) -> Optional[Tuple[memoryview, str]]:
+        """查找音频及其内容摘要
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            (映射页上的音频切片, 内容摘要), 不存在时返回None
+        """
+        found = self._lookup(key)
+        if found is None:
+            return None
+        offset, length, content = found
+        self.hits += 1
+        return self._view[offset:offset + length], content.hex()
+
+    def close(self) -> None:
+        """解除映射; 仍有响应引用映射页时保留到其释放"""
+        if self._view is None:
+            return
+        view, mapped = self._view, self._mmap
+        self._view = None
+        self._mmap = None
+        self.entries = 0
+        self.size = 0
+        view.release()
+        try:
+            mapped.close()
+        except BufferError:
+            logger.debug("音频包仍被引用, 延迟解除映射")
+
+    def stats(self) -> dict:
+        """获取音频包状态
+
+        Returns:
+            状态字典
+        """
+        return {"path": str(self.path) if self.path else None, "entries": self.entries,
+                "bytes": self.size, "hits": self.hits}
+
+
+# 全局音频包实例(启动时按配置映射)
+audio_pack = AudioPack()
+
+metrics.gauge("tts_audio_pack_entries", "已映射音频包的条目数", callback=lambda: audio_pack.entries)
+metrics.counter("tts_audio_pack_hits_total", "由音频包直接返回的请求数", callback=lambda: audio_pack.hits)
+
+
+__all__ = ["AudioPack", "PackWriter", "audio_pack", "MAGIC", "VERSION"]
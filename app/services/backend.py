@@ -0,0 +1,78 @@
+"""合成后端接口模块
+
+定义语音合成后端的统一接口, 豆包客户端与进程内模拟后端均实现该接口
+"""
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable, Optional
+from app.services.request_builder import PreparedTTSRequest
+from app.services.timestamps import SentenceTiming
+from app.utils.errors import DoubaoAPIError
+from app.utils.logger import logger
+
+
+class TTSBackend(ABC):
+    """语音合成后端
+
+    子类实现 `synthesize_stream`; `synthesize` 默认收集流式结果。
+
+    Attributes:
+        name: 后端名称(路由配置中使用)
+        cache_namespace: 缓存键前缀, 不同后端的音频互不混用
+    """
+
+    name: str = "backend"
+    cache_namespace: str = ""
+
+    async def synthesize(
+        self,
+        request: PreparedTTSRequest,
+        on_first_chunk: Optional[Callable[[], None]] = None
+    ) -> bytes:
+        """合成完整音频
+
+        Args:
+            request: 已序列化的豆包请求
+            on_first_chunk: 收到首个音频块时的回调(用于测量首包时间)
+
+        Returns:
+            完整音频数据
+
+        Raises:
+            DoubaoAPIError: 合成失败或未返回音频
+        """
+        audio_chunks = [
+            chunk async for chunk in self.synthesize_stream(request, on_first_chunk)
+        ]
+        if not audio_chunks:
+            raise DoubaoAPIError(3031, "未返回音频数据")
+
+        full_audio = b"".join(audio_chunks)
+        logger.info(
+            f"音频合成成功: backend={self.name}, "
+            f"总大小={len(full_audio)} bytes, 块数={len(audio_chunks)}"
+        )
+        return full_audio
+
+    @abstractmethod
+    def synthesize_stream(
+        self,
+        request: PreparedTTSRequest,
+        on_first_chunk: Optional[Callable[[], None]] = None,
+        on_sentence: Optional[Callable[[SentenceTiming], None]] = None
+    ) -> AsyncIterator[bytes]:
+        """流式合成, 逐块产出音频(字节边界任意)
+
+        Args:
+            request: 已序列化的豆包请求
+            on_first_chunk: 收到首个音频块时的回调(用于测量首包时间)
+            on_sentence: 某句音频产出后收到该句时间戳时的回调(不支持时间戳的后端不调用)
+
+        Yields:
+            音频数据块
+        """
+
+    async def close(self) -> None:
+        """释放后端资源"""
+
+
+__all__ = ["TTSBackend"]
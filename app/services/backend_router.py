@@ -0,0 +1,78 @@
+"""合成后端路由模块
+
+按请求的音色或模型选择合成后端, 未匹配规则时使用默认后端
+"""
+from typing import Dict, Optional, Tuple
+from app.config import settings
+from app.services.backend import TTSBackend
+from app.services.doubao_client import doubao_client
+from app.services.mock_backend import MockTTSBackend
+from app.utils.logger import logger
+
+
+class BackendRouter:
+    """合成后端路由器
+
+    规则优先级: 音色规则 > 模型规则 > 默认后端
+    """
+
+    def __init__(
+        self,
+        backends: Dict[str, TTSBackend],
+        default: str,
+        routes: Optional[Dict[Tuple[str, str], str]] = None
+    ):
+        """初始化路由器
+
+        Args:
+            backends: 后端名称 -> 后端实例
+            default: 默认后端名称
+            routes: (voice|model, 值) -> 后端名称
+        """
+        self.backends = backends
+        if default not in backends:
+            logger.warning(f"未知的默认合成后端: {default}, 使用 {next(iter(backends))}")
+            default = next(iter(backends))
+        self.default = backends[default]
+        self.routes: Dict[Tuple[str, str], TTSBackend] = {}
+        for target, name in (routes or {}).items():
+            if name not in backends:
+                logger.warning(f"忽略后端路由 {target[0]}:{target[1]}={name}: 未知的合成后端")
+                continue
+            self.routes[target] = backends[name]
+
+    def select(self, voice: str, model: str) -> TTSBackend:
+        """选择合成后端
+
+        Args:
+            voice: OpenAI音色
+            model: OpenAI模型
+
+        Returns:
+            合成后端
+        """
+        return (
+            self.routes.get(("voice", voice))
+            or self.routes.get(("model", model))
+            or self.default
+        )
+
+    async def close(self) -> None:
+        """关闭所有后端"""
+        for backend in self.backends.values():
+            await backend.close()
+
+
+def _create_router() -> BackendRouter:
+    backends: Dict[str, TTSBackend] = {
+        doubao_client.name: doubao_client,
+        MockTTSBackend.name: MockTTSBackend(),
+    }
+    return BackendRouter(backends, settings.TTS_BACKEND, settings.get_backend_routes())
+
+
+# 全局路由器实例
+backend_router = _create_router()
+
+
+__all__ = ["BackendRouter", "backend_router"]
@@ -0,0 +1,173 @@
+"""上游熔断模块
+
+最近窗口内上游错误率过高时暂停向上游发起新调用(快速返回503), 冷却后放行单个探测调用,
+探测成功则恢复。只统计上游自身的故障(5xx类: 连接错误、超时、服务繁忙、空音频),
+参数错误与限流(3003, 由自适应并发处理)不计入, 被取消的调用不计结果。
+"""
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Optional, Tuple
+from app.config import settings
+from app.utils.errors import DoubaoAPIError
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+# 导出为数值指标时的取值
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_rejected_counter = metrics.counter("tts_circuit_rejected_total", "熔断期间被拒绝的上游调用数")
+
+
+class CircuitBreaker:
+    """按时间窗口错误率熔断"""
+
+    def __init__(
+        self,
+        error_threshold: Optional[float] = None,
+        min_requests: Optional[int] = None,
+        window_seconds: Optional[float] = None,
+        open_seconds: Optional[float] = None
+    ):
+        """初始化熔断器
+
+        Args:
+            error_threshold: 窗口内错误率达到该值时熔断, 0表示不熔断, 默认读取配置
+            min_requests: 窗口内调用数少于该值时不熔断, 默认读取配置
+            window_seconds: 统计窗口(秒), 默认读取配置
+            open_seconds: 熔断后多久(秒)放行探测调用, 默认读取配置
+        """
+        self.error_threshold = (
+            settings.CIRCUIT_ERROR_THRESHOLD if error_threshold is None else error_threshold
+        )
+        self.min_requests = settings.CIRCUIT_MIN_REQUESTS if min_requests is None else min_requests
+        self.window_seconds = window_seconds or settings.CIRCUIT_WINDOW_SECONDS
+        self.open_seconds = settings.CIRCUIT_OPEN_SECONDS if open_seconds is None else open_seconds
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        # (时间, 是否失败), 按时间顺序
+        self._samples: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._samples and self._samples[0][0] < cutoff:
+            _, failed = self._samples.popleft()
+            self._failures -= failed
+
+    @property
+    def state(self) -> str:
+        """当前状态; 熔断冷却期结束后即为半开(无需等待下一次调用)"""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    @property
+    def error_rate(self) -> float:
+        """窗口内的上游错误率"""
+        self._prune(time.monotonic())
+        return self._failures / len(self._samples) if self._samples else 0.0
+
+    def allow(self) -> bool:
+        """是否允许发起上游调用(半开状态下同一时间只放行一个探测调用)"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == OPEN or self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            logger.warning(f"上游熔断状态: {self._state} -> {state}")
+            self._state = state
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self._set_state(OPEN)
+
+    def record(self, failed: bool) -> None:
+        """记录一次上游调用结果
+
+        Args:
+            failed: 是否为上游故障
+        """
+        now = time.monotonic()
+        if self._state == HALF_OPEN:
+            self._probing = False
+            if failed:
+                self._open(now)
+            else:
+                self._samples.clear()
+                self._failures = 0
+                self._set_state(CLOSED)
+            return
+
+        self._samples.append((now, failed))
+        self._failures += failed
+        self._prune(now)
+        if (
+            self._state == CLOSED
+            and failed
+            and self.error_threshold > 0
+            and len(self._samples) >= self.min_requests
+            and self._failures / len(self._samples) >= self.error_threshold
+        ):
+            self._open(now)
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """保护一次上游调用: 熔断中直接拒绝, 否则记录调用结果
+
+        Raises:
+            DoubaoAPIError: 熔断中(3005, 返回503)
+        """
+        if not self.allow():
+            _rejected_counter.inc()
+            raise DoubaoAPIError(3005, "上游故障率过高, 暂停调用, 请稍后重试")
+        try:
+            yield
+        except DoubaoAPIError as e:
+            self.record(e.status_code >= 500)
+            raise
+        except Exception:
+            self.record(True)
+            raise
+        except BaseException:
+            # 取消(客户端断开等)不说明上游状态, 只释放探测名额
+            if self._state == HALF_OPEN:
+                self._probing = False
+            raise
+        else:
+            self.record(False)
+
+    def stats(self) -> dict:
+        """获取熔断器状态
+
+        Returns:
+            状态字典
+        """
+        error_rate = self.error_rate
+        return {
+            "state": self.state,
+            "error_rate": round(error_rate, 4),
+            "requests": len(self._samples),
+            "window_seconds": self.window_seconds,
+        }
+
+
+# 全局熔断器实例
+circuit_breaker = CircuitBreaker()
+
+metrics.gauge(
+    "tts_circuit_state", "上游熔断状态(0关闭, 1半开, 2熔断)",
+    callback=lambda: _STATE_VALUES[circuit_breaker.state]
+)
+
+
+__all__ = ["CircuitBreaker", "circuit_breaker", "CLOSED", "OPEN", "HALF_OPEN"]
@@ -10,6 +10,7 @@ from app.models.doubao_models import (
     DoubaoV3ReqParams,
     DoubaoV3TTSRequest
 )
+from app.services.profiles import ProfileRegistry, output_profiles
 from app.config import settings
 
 
@@ -31,8 +32,13 @@ class ParameterConverter:
         "verse": "zh_male_rap_mars_bigtts",
     }
     
-    def __init__(self):
-        """初始化转换器,加载配置的音色映射"""
+    def __init__(self, profiles: ProfileRegistry = output_profiles):
+        """初始化转换器,加载配置的音色映射
+        
+        Args:
+            profiles: 输出档位注册表(决定采样率、比特率与豆包模型)
+        """
+        self.profiles = profiles
         self.voice_mapping = self._load_voice_mapping()
     
     def _load_voice_mapping(self) -> Dict[str, str]:
@@ -83,7 +89,11 @@ class ParameterConverter:
             
         Returns:
             豆包V3格式的请求
+            
+        Raises:
+            TTSProxyError: 输出档位未知
         """
+        profile = self.profiles.resolve(openai_req)
         return DoubaoV3TTSRequest(
             user=DoubaoV3User(),
             req_params=DoubaoV3ReqParams(
@@ -91,10 +101,12 @@ class ParameterConverter:
                 speaker=self.map_voice(openai_req.voice),
                 audio_params=DoubaoV3AudioParams(
                     format=self.map_format(openai_req.response_format or "mp3"),
-                    sample_rate=settings.DEFAULT_SAMPLE_RATE,
-                    bit_rate=settings.DEFAULT_BITRATE if (openai_req.response_format or "mp3") == "mp3" else None,
-                    speech_rate=self.map_speed_to_v3(openai_req.speed or 1.0)
-                )
+                    sample_rate=profile.sample_rate,
+                    bit_rate=profile.bit_rate if (openai_req.response_format or "mp3") == "mp3" else None,
+                    speech_rate=self.map_speed_to_v3(openai_req.speed or 1.0),
+                    enable_timestamp=True if settings.DOUBAO_ENABLE_TIMESTAMP else None
+                ),
+                model=profile.model
             )
         )
     
@@ -2,35 +2,98 @@
 
 封装豆包V3 TTS API的HTTP流式调用
 """
-import httpx
+import asyncio
 import base64
+import dataclasses
 import json
-from typing import AsyncIterator, Optional
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Optional, Union
 from app.models.doubao_models import DoubaoV3TTSRequest, DoubaoV3TTSResponse
+from app.services.backend import TTSBackend
+from app.services.framing import StreamSplicer
+from app.services.recorder import TraceRecorder, TraceWriter, recorder
+from app.services.request_builder import PreparedTTSRequest, get_json_dumps, request_builder
+from app.services.timestamps import SentenceTiming, parse_sentence
 from app.config import settings
 from app.utils.errors import DoubaoAPIError
 from app.utils.logger import logger
+from app.utils.metrics import metrics
 
+if TYPE_CHECKING:
+    # httpx导入耗时较长, 仅在首次创建客户端时导入
+    import httpx
 
-class DoubaoTTSClient:
+_resume_counter = metrics.counter(
+    "tts_upstream_resumes_total", "上游流中断后的续传次数", labels=("result",)
+)
+
+
+class _StreamInterrupted(Exception):
+    """上游流中途断开(可续传)"""
+
+
+class _SentenceProgress:
+    """跟踪已完整到达的句子在原文中的位置"""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.consumed = 0
+        # 已完成句子的音频时长(秒), 续传请求的时间戳以此为起点
+        self.elapsed = 0.0
+    
+    @property
+    def remaining(self) -> str:
+        return self.text[self.consumed:]
+    
+    def confirm(self, sentence: Optional[dict]) -> bool:
+        """根据句子时间戳推进已完成位置, 无法在原文中定位时返回False"""
+        fragment = str((sentence or {}).get("text") or "").strip()
+        if not fragment:
+            return False
+        pos = self.text.find(fragment, self.consumed)
+        if pos < 0:
+            return False
+        self.consumed = pos + len(fragment)
+        return True
+
+
+def _with_text(request: PreparedTTSRequest, text: str) -> PreparedTTSRequest:
+    """替换请求文本(续传剩余文本时使用)"""
+    body = json.loads(request.body)
+    body["req_params"]["text"] = text
+    return dataclasses.replace(request, text=text, body=get_json_dumps()(body))
+
+
+class DoubaoTTSClient(TTSBackend):
     """豆包V3 TTS API客户端
     
     支持HTTP流式调用,逐块解析JSON响应并拼接音频数据
     """
     
-    def __init__(self):
-        """初始化客户端"""
+    name = "doubao"
+    
+    def __init__(self, trace_recorder: TraceRecorder = recorder):
+        """初始化客户端
+        
+        Args:
+            trace_recorder: 上游流量录制器(未配置录制目录时不录制)
+        """
         self.http_url = settings.DOUBAO_HTTP_URL
         self.ws_url = settings.DOUBAO_WS_URL
         self.timeout = settings.REQUEST_TIMEOUT
+        self.resume_attempts = settings.DOUBAO_RESUME_ATTEMPTS
+        self.recorder = trace_recorder
         
         # HTTP客户端配置
-        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_client: Optional["httpx.AsyncClient"] = None
+        # 资源ID -> 请求头, 请求头只依赖配置, 无需每次构建
+        self._header_cache: Dict[str, Dict[str, str]] = {}
     
     @property
-    def http_client(self) -> httpx.AsyncClient:
+    def http_client(self) -> "httpx.AsyncClient":
         """获取HTTP客户端(懒加载)"""
         if self._http_client is None:
+            import httpx
+            
             self._http_client = httpx.AsyncClient(
                 timeout=self.timeout,
                 limits=httpx.Limits(
@@ -40,13 +103,46 @@ class DoubaoTTSClient:
             )
         return self._http_client
     
-    async def synthesize_http(self, request: DoubaoV3TTSRequest) -> bytes:
+    def _headers(self, resource_id: str) -> Dict[str, str]:
+        """获取(缓存的)V3请求头
+        
+        Args:
+            resource_id: 豆包资源ID
+            
+        Returns:
+            请求头字典
+        """
+        headers = self._header_cache.get(resource_id)
+        if headers is None:
+            headers = {
+                "X-Api-App-Id": settings.DOUBAO_APPID,
+                "X-Api-Access-Key": settings.DOUBAO_ACCESS_TOKEN,
+                "X-Api-Resource-Id": resource_id,
+                "Content-Type": "application/json"
+            }
+            self._header_cache[resource_id] = headers
+        return headers
+    
+    def warmup(self) -> None:
+        """预热HTTP客户端
+        
+        提前导入httpx并创建连接池(含SSL上下文), 避免首个请求承担这部分开销。
+        不依赖事件循环, 可在线程池中执行。
+        """
+        _ = self.http_client
+    
+    async def synthesize_http(
+        self,
+        request: Union[DoubaoV3TTSRequest, PreparedTTSRequest],
+        on_first_chunk: Optional[Callable[[], None]] = None
+    ) -> bytes:
         """HTTP流式合成
         
         V3 API返回流式JSON响应,需要逐块解析并拼接音频数据
         
         Args:
-            request: 豆包V3 TTS请求
+            request: 豆包V3 TTS请求(模型或已序列化的请求)
+            on_first_chunk: 收到首个音频块时的回调(用于测量首包时间)
             
         Returns:
             完整音频数据(字节流)
@@ -54,38 +150,138 @@ class DoubaoTTSClient:
         Raises:
             DoubaoAPIError: 豆包API调用失败
         """
-        # 构建V3请求头
-        headers = {
-            "X-Api-App-Id": settings.DOUBAO_APPID,
-            "X-Api-Access-Key": settings.DOUBAO_ACCESS_TOKEN,
-            "X-Api-Resource-Id": settings.DOUBAO_RESOURCE_ID,
-            "Content-Type": "application/json"
-        }
+        return await self.synthesize(request, on_first_chunk)
+    
+    async def synthesize_stream(
+        self,
+        request: Union[DoubaoV3TTSRequest, PreparedTTSRequest],
+        on_first_chunk: Optional[Callable[[], None]] = None,
+        on_sentence: Optional[Callable[[SentenceTiming], None]] = None
+    ) -> AsyncIterator[bytes]:
+        """HTTP流式合成, 逐块产出音频
+        
+        解析V3 API的流式JSON响应, 每收到一个音频块立即产出(字节边界任意, 
+        需要按格式分帧时见 `app.services.framing`)
+        
+        mp3/aac/pcm/wav 格式下连接中途断开时, 按句子时间戳找到最后一个完整到达的句子,
+        只重新请求其后的文本并跳过已输出的音频(最多 `DOUBAO_RESUME_ATTEMPTS` 次),
+        此时产出的块在帧边界上结束。
+        
+        句子时间戳在该句音频之后到达, 经 `on_sentence` 回调(续传时已平移到整段音频的时间轴)。
+        
+        Args:
+            request: 豆包V3 TTS请求(模型或已序列化的请求)
+            on_first_chunk: 收到首个音频块时的回调(用于测量首包时间)
+            on_sentence: 收到句子时间戳时的回调
+            
+        Yields:
+            音频数据块
+            
+        Raises:
+            DoubaoAPIError: 豆包API调用失败
+        """
+        if isinstance(request, DoubaoV3TTSRequest):
+            request = request_builder.from_model(request)
         
         logger.info(
             f"发起豆包V3 TTS请求: "
-            f"speaker={request.req_params.speaker}, "
-            f"text_length={len(request.req_params.text)}"
+            f"speaker={request.speaker}, "
+            f"text_length={len(request.text)}"
         )
-        logger.debug(
-            f"请求Headers: X-Api-App-Id={settings.DOUBAO_APPID}, "
-            f"X-Api-Resource-Id={settings.DOUBAO_RESOURCE_ID}, "
-            f"X-Api-Access-Key={settings.DOUBAO_ACCESS_TOKEN[:10]}..."
+        # 调试日志延迟求值, 非DEBUG级别时不产生格式化开销
+        logger.opt(lazy=True).debug(
+            "请求Headers: X-Api-App-Id={}, X-Api-Resource-Id={}, X-Api-Access-Key={}...",
+            lambda: settings.DOUBAO_APPID,
+            lambda: request.resource_id,
+            lambda: settings.DOUBAO_ACCESS_TOKEN[:10]
         )
-        logger.debug(
-            f"请求参数: format={request.req_params.audio_params.format}, "
-            f"speech_rate={request.req_params.audio_params.speech_rate}"
+        logger.opt(lazy=True).debug(
+            "请求参数: format={}, speech_rate={}",
+            lambda: request.format,
+            lambda: request.speech_rate
         )
-        logger.debug(f"请求Body: {request.model_dump(exclude_none=True)}")
+        logger.opt(lazy=True).debug("请求Body: {}", lambda: request.body.decode("utf-8"))
+        
+        splicer: Optional[StreamSplicer] = None
+        if self.resume_attempts > 0 and request.format in StreamSplicer.FORMATS:
+            splicer = StreamSplicer(request.format)
+        progress = _SentenceProgress(request.text)
+        notified = on_first_chunk is None
+        
+        def first_chunk() -> None:
+            nonlocal notified
+            if not notified:
+                notified = True
+                on_first_chunk()
+        
+        current = request
+        attempt = 0
+        while True:
+            chunks = self._stream_once(current, splicer, progress, first_chunk, on_sentence)
+            try:
+                async for audio_bytes in chunks:
+                    yield audio_bytes
+                return
+            except _StreamInterrupted as e:
+                if splicer is None or attempt >= self.resume_attempts:
+                    if splicer is not None:
+                        _resume_counter.inc(result="exhausted")
+                    logger.error(f"HTTP请求失败: {e}")
+                    raise DoubaoAPIError(3040, f"网络错误: {e}")
+                attempt += 1
+                remaining = progress.remaining
+                if not remaining.strip():
+                    # 全部句子已完整到达, 只缺结束标记
+                    tail = splicer.flush()
+                    if tail:
+                        yield tail
+                    return
+                _resume_counter.inc(result="resumed")
+                logger.warning(
+                    f"上游连接中断, 从第{progress.consumed}个字符处续传"
+                    f"(第{attempt}次, 剩余{len(remaining)}字符): {e}"
+                )
+                splicer.restart()
+                current = _with_text(request, remaining)
+            finally:
+                # 提前关闭时立即释放上游连接
+                await chunks.aclose()
+    
+    async def _stream_once(
+        self,
+        request: PreparedTTSRequest,
+        splicer: Optional[StreamSplicer],
+        progress: "_SentenceProgress",
+        on_first_chunk: Callable[[], None],
+        on_sentence: Optional[Callable[[SentenceTiming], None]] = None
+    ) -> AsyncIterator[bytes]:
+        """发起一次HTTP流式请求并解析响应
+        
+        启用录制时原样记录每个响应文本块; 启用续传时音频经 `splicer` 分帧,
+        并在收到句子时间戳时记录句子边界。句子时间戳以 `progress.elapsed` 为起点。
         
+        Raises:
+            _StreamInterrupted: 连接中断(或启用续传时响应在结束标记前结束)
+            DoubaoAPIError: 豆包API返回错误
+        """
+        import httpx
+        
+        headers = self._headers(request.resource_id)
+        trace: Optional[TraceWriter] = None
+        if self.recorder.enabled:
+            trace = self.recorder.start(self.http_url, headers, request.body)
+        error: Optional[BaseException] = None
+        offset = progress.elapsed
         try:
             # 发起HTTP流式请求
             async with self.http_client.stream(
                 "POST",
                 self.http_url,
-                json=request.model_dump(exclude_none=True),
+                content=request.body,
                 headers=headers
             ) as response:
+                if trace is not None:
+                    trace.response(response.status_code, response.headers)
                 # 获取并记录logid
                 logid = response.headers.get("X-Tt-Logid", "unknown")
                 logger.info(
@@ -96,6 +292,8 @@ class DoubaoTTSClient:
                 # 检查HTTP状态码
                 if response.status_code != 200:
                     error_text = await response.aread()
+                    if trace is not None:
+                        trace.chunk(error_text.decode("utf-8", errors="replace"))
                     try:
                         error_data = json.loads(error_text)
                         error_msg = error_data.get("message", f"HTTP错误: {response.status_code}")
@@ -105,10 +303,11 @@ class DoubaoTTSClient:
                     raise DoubaoAPIError(response.status_code, error_msg)
                 
                 # 流式读取并解析JSON响应
-                audio_chunks = []
                 buffer = ""
                 
                 async for chunk in response.aiter_text():
+                    if trace is not None:
+                        trace.chunk(chunk)
                     buffer += chunk
                     
                     # 尝试解析JSON行
@@ -126,62 +325,83 @@ class DoubaoTTSClient:
                         
                         try:
                             data = json.loads(line)
-                            result = DoubaoV3TTSResponse(**data)
-                            
-                            # 检查错误码
-                            if result.code == 0:
-                                # 音频数据块
-                                if result.data:
-                                    audio_bytes = base64.b64decode(result.data)
-                                    audio_chunks.append(audio_bytes)
-                                    logger.debug(f"收到音频块: {len(audio_bytes)} bytes")
-                            elif result.code == 20000000:
-                                # 成功结束
-                                logger.info("音频合成完成")
-                                break
-                            else:
-                                # 其他错误
-                                logger.error(
-                                    f"豆包V3 API错误: code={result.code}, "
-                                    f"message={result.message}"
-                                )
-                                raise DoubaoAPIError(result.code, result.message)
                         except json.JSONDecodeError:
                             # 不完整的JSON,放回buffer
                             buffer = line + buffer
                             break
+                        
+                        result = DoubaoV3TTSResponse(**data)
+                        
+                        # 检查错误码
+                        if result.code == 0:
+                            # 音频数据块
+                            if result.data:
+                                audio_bytes = await self._decode_audio(result.data)
+                                logger.debug(f"收到音频块: {len(audio_bytes)} bytes")
+                                if splicer is not None:
+                                    audio_bytes = splicer.feed(audio_bytes)
+                                if audio_bytes:
+                                    on_first_chunk()
+                                    yield audio_bytes
+                            # 句子时间戳在该句音频之后到达, 此前的音频对应完整的句子
+                            if result.sentence:
+                                timing = parse_sentence(result.sentence, offset)
+                                located = progress.confirm(result.sentence)
+                                if located and timing is not None:
+                                    progress.elapsed = timing.end
+                                if splicer is not None and located:
+                                    splicer.mark()
+                                # 续传时未定位的句子会重新合成, 只上报已定位的句子
+                                if on_sentence is not None and timing is not None and (located or splicer is None):
+                                    on_sentence(timing)
+                        elif result.code == 20000000:
+                            # 成功结束
+                            logger.info("音频合成完成")
+                            if splicer is not None:
+                                tail = splicer.flush()
+                                if tail:
+                                    yield tail
+                            return
+                        else:
+                            # 其他错误
+                            logger.error(
+                                f"豆包V3 API错误: code={result.code}, "
+                                f"message={result.message}"
+                            )
+                            raise DoubaoAPIError(result.code, result.message)
                 
-                # 拼接所有音频块
-                if not audio_chunks:
-                    raise DoubaoAPIError(3031, "未返回音频数据")
-                
-                full_audio = b"".join(audio_chunks)
-                logger.info(f"音频合成成功: 总大小={len(full_audio)} bytes, 块数={len(audio_chunks)}")
-                
-                return full_audio
+                if splicer is not None:
+                    raise _StreamInterrupted("响应在结束标记前断开")
             
+        except httpx.TransportError as e:
+            error = e
+            raise _StreamInterrupted(str(e) or type(e).__name__) from e
         except httpx.HTTPError as e:
+            error = e
             logger.error(f"HTTP请求失败: {e}")
             raise DoubaoAPIError(3040, f"网络错误: {str(e)}")
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if trace is not None:
+                await trace.close(error)
     
-    async def synthesize_stream(
-        self, 
-        request: DoubaoV3TTSRequest
-    ) -> AsyncIterator[bytes]:
-        """WebSocket流式合成
+    async def _decode_audio(self, data: str) -> bytes:
+        """解码base64音频块
         
-        注: 此功能为P1优先级,暂未实现
+        较大的音频块在线程池中解码, 避免阻塞事件循环上的其他流
         
         Args:
-            request: 豆包V3 TTS请求
+            data: base64编码的音频
             
-        Yields:
-            音频数据块
-            
-        Raises:
-            NotImplementedError: 功能未实现
+        Returns:
+            音频字节
         """
-        raise NotImplementedError("WebSocket流式传输暂未实现")
+        threshold = settings.BASE64_OFFLOAD_THRESHOLD
+        if threshold > 0 and len(data) >= threshold:
+            return await asyncio.to_thread(base64.b64decode, data)
+        return base64.b64decode(data)
     
     async def close(self):
         """关闭HTTP客户端"""
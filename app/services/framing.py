@@ -0,0 +1,551 @@
+"""音频分帧模块
+
+上游按任意字节边界返回音频块, 直接转发时客户端可能收到半个帧而无法立即解码。
+分帧器缓冲不完整的尾部, 只输出可独立解码的完整单元:
+- opus(Ogg): 完整的Ogg页
+- mp3: 以帧同步字切分的完整MPEG帧(含开头的ID3标签)
+- aac: 完整的ADTS帧
+- wav: 流式WAV头(长度字段为0xFFFFFFFF) + 按样本对齐的PCM数据
+- pcm: 按16位样本对齐
+- flac: 原样转发
+
+用法: 逐块调用 `feed`, 结束时调用 `flush` 取出剩余数据;
+`finalize` 将完整音频修正为可缓存的形式(如WAV写回真实长度)。
+"""
+import struct
+from typing import Optional
+from app.config import settings
+
+# 流式WAV头中的未知长度
+UNKNOWN_LENGTH = 0xFFFFFFFF
+
+# MPEG音频比特率表(kbps), 键为 (是否MPEG1, 层)
+_MP3_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# 采样率表, 键为版本位: 3=MPEG1, 2=MPEG2, 0=MPEG2.5
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def mp3_frame_length(header: bytes) -> Optional[int]:
+    """解析MPEG音频帧头, 返回帧长度
+
+    Args:
+        header: 至少4字节的帧头
+
+    Returns:
+        帧长度(字节), 不是合法帧头时返回None
+    """
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][sample_rate_index]
+    padding = (header[2] >> 1) & 0x01
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+
+def adts_frame_length(header: bytes) -> Optional[int]:
+    """解析ADTS帧头, 返回帧长度
+
+    Args:
+        header: 至少7字节的帧头
+
+    Returns:
+        帧长度(字节), 不是合法帧头时返回None
+    """
+    if len(header) < 7 or header[0] != 0xFF or header[1] & 0xF6 != 0xF0:
+        return None
+    length = ((header[3] & 0x03) << 11) | (header[4] << 3) | (header[5] >> 5)
+    return length if length >= 7 else None
+
+
+def strip_id3(data: bytes) -> bytes:
+    """去掉开头完整的ID3v2标签(拼接时后续句子不应重复标签)
+
+    Args:
+        data: mp3数据(分帧器输出, 标签总是完整的)
+
+    Returns:
+        去掉标签后的数据
+    """
+    length = id3_length(data)
+    return data[length:] if length else data
+
+
+def id3_length(data: bytes) -> Optional[int]:
+    """返回开头ID3v2标签的总长度, 不是ID3标签或标签头不完整时返回None"""
+    if data[:3] != b"ID3" or len(data) < 10:
+        return None
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+# ADTS采样率表
+_ADTS_SAMPLE_RATES = (96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350)
+
+
+def audio_duration(data: bytes, audio_format: str, sample_rate: int) -> Optional[float]:
+    """由帧头计算完整帧音频的时长(不解码)
+
+    Args:
+        data: 在帧边界开始与结束的音频(分帧器输出或完整音频)
+        audio_format: 豆包音频格式(pcm / mp3 / aac)
+        sample_rate: PCM采样率
+
+    Returns:
+        时长(秒), 不支持的格式返回None
+    """
+    if audio_format == "pcm":
+        return len(data) / (sample_rate * 2)
+    if audio_format not in ("mp3", "aac"):
+        return None
+    pos = (id3_length(data) or 0) if audio_format == "mp3" else 0
+    seconds = 0.0
+    while pos < len(data):
+        header = data[pos:pos + 7]
+        if audio_format == "mp3":
+            length = mp3_frame_length(header)
+            if not length:
+                break
+            version = (header[1] >> 3) & 0x03
+            layer = 4 - ((header[1] >> 1) & 0x03)
+            samples = 384 if layer == 1 else 1152 if layer == 2 or version == 3 else 576
+            seconds += samples / _MP3_SAMPLE_RATES[version][(header[2] >> 2) & 0x03]
+        else:
+            length = adts_frame_length(header)
+            rate_index = (header[2] >> 2) & 0x0F if length else len(_ADTS_SAMPLE_RATES)
+            if rate_index >= len(_ADTS_SAMPLE_RATES):
+                break
+            seconds += 1024 * ((header[6] & 0x03) + 1) / _ADTS_SAMPLE_RATES[rate_index]
+        pos += length
+    return seconds
+
+
+def wav_header(sample_rate: int, channels: int = 1, bits: int = 16, data_size: int = UNKNOWN_LENGTH) -> bytes:
+    """生成PCM WAV头
+
+    Args:
+        sample_rate: 采样率
+        channels: 声道数
+        bits: 位深
+        data_size: 数据长度, 未知时为0xFFFFFFFF
+
+    Returns:
+        44字节WAV头
+    """
+    block_align = channels * bits // 8
+    riff_size = UNKNOWN_LENGTH if data_size == UNKNOWN_LENGTH else data_size + 36
+    return (
+        b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                                sample_rate * block_align, block_align, bits)
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+def _parse_wav_header(data: bytes) -> Optional[tuple]:
+    """解析RIFF头, 返回 (数据起始偏移, 块对齐字节数)
+
+    数据不足以确定 data 块位置时返回None
+    """
+    offset = 12
+    block_align = 2
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        size = struct.unpack_from("<I", data, offset + 4)[0]
+        if chunk_id == b"data":
+            return offset + 8, block_align
+        if chunk_id == b"fmt " and offset + 22 <= len(data):
+            block_align = struct.unpack_from("<H", data, offset + 20)[0] or 2
+        offset += 8 + size + (size & 1)
+    return None
+
+
+def _patch_wav_lengths(audio: bytes, header_length: int) -> bytes:
+    fixed = bytearray(audio)
+    struct.pack_into("<I", fixed, 4, len(audio) - 8)
+    struct.pack_into("<I", fixed, header_length - 4, len(audio) - header_length)
+    return bytes(fixed)
+
+
+def finalize_wav(audio: bytes) -> bytes:
+    """把流式WAV(RIFF与data长度为 `UNKNOWN_LENGTH`)的完整音频写回真实长度
+
+    用于没有经过分帧器、直接拼接流式输出的场景(如离线构建音频包)。
+
+    Args:
+        audio: 完整的WAV音频
+
+    Returns:
+        修正后的音频; 不是WAV或头部不完整时原样返回
+    """
+    if audio[:4] != b"RIFF" or audio[8:12] != b"WAVE":
+        return audio
+    parsed = _parse_wav_header(audio)
+    if parsed is None:
+        return audio
+    return _patch_wav_lengths(audio, parsed[0])
+
+
+class AudioFramer:
+    """分帧器基类: 原样转发"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> bytes:
+        """输入一个上游音频块
+
+        Args:
+            data: 音频字节
+
+        Returns:
+            可立即发送的完整单元(可能为空)
+        """
+        self._buffer += data
+        cut = self._boundary()
+        out = bytes(self._buffer[:cut])
+        del self._buffer[:cut]
+        return out
+
+    def flush(self) -> bytes:
+        """取出剩余的缓冲数据"""
+        out = bytes(self._buffer)
+        self._buffer.clear()
+        return out
+
+    def finalize(self, audio: bytes) -> bytes:
+        """将已输出的完整音频修正为可缓存/下载的形式"""
+        return audio
+
+    def _boundary(self) -> int:
+        """返回缓冲区中最后一个完整单元的结束位置"""
+        return len(self._buffer)
+
+
+class _LengthPrefixedFramer(AudioFramer):
+    """按帧头声明的长度切分的分帧器"""
+
+    header_size = 4
+
+    def _frame_length(self, pos: int) -> Optional[int]:
+        raise NotImplementedError
+
+    def _resync(self, pos: int) -> int:
+        """从pos之后查找下一个可能的帧起点, 找不到时返回-1"""
+        return self._buffer.find(b"\xff", pos + 1)
+
+    def _boundary(self) -> int:
+        pos = 0
+        buffer = self._buffer
+        while pos + self.header_size <= len(buffer):
+            length = self._frame_length(pos)
+            if length is None:
+                # 非帧头数据(填充或损坏字节)并入下一帧发送
+                next_pos = self._resync(pos)
+                if next_pos < 0:
+                    break
+                pos = next_pos
+                continue
+            if pos + length > len(buffer):
+                break
+            pos += length
+        return pos
+
+
+class Mp3Framer(_LengthPrefixedFramer):
+    """MP3分帧器: 以帧同步字切分"""
+
+    def _frame_length(self, pos: int) -> Optional[int]:
+        buffer = self._buffer
+        if buffer[pos:pos + 3] == b"ID3":
+            return id3_length(bytes(buffer[pos:pos + 10]))
+        return mp3_frame_length(bytes(buffer[pos:pos + 4]))
+
+    def _boundary(self) -> int:
+        # ID3标签头未收全时等待, 避免把标签当作损坏数据
+        if self._buffer[:3] == b"ID3" and len(self._buffer) < 10:
+            return 0
+        return super()._boundary()
+
+
+class AdtsFramer(_LengthPrefixedFramer):
+    """AAC(ADTS)分帧器"""
+
+    header_size = 7
+
+    def _frame_length(self, pos: int) -> Optional[int]:
+        return adts_frame_length(bytes(self._buffer[pos:pos + 7]))
+
+
+class OggFramer(_LengthPrefixedFramer):
+    """Ogg分帧器: 只输出完整的页"""
+
+    header_size = 27
+
+    def _frame_length(self, pos: int) -> Optional[int]:
+        buffer = self._buffer
+        if buffer[pos:pos + 4] != b"OggS":
+            return None
+        segments = buffer[pos + 26]
+        table_end = pos + 27 + segments
+        if table_end > len(buffer):
+            # 段表未收全, 返回超出缓冲区的长度使调用方等待
+            return table_end - pos
+        return 27 + segments + sum(buffer[pos + 27:table_end])
+
+    def _resync(self, pos: int) -> int:
+        return self._buffer.find(b"OggS", pos + 1)
+
+
+class PcmFramer(AudioFramer):
+    """PCM分帧器: 按样本对齐"""
+
+    def __init__(self, block_align: int = 2):
+        super().__init__()
+        self.block_align = block_align
+
+    def _boundary(self) -> int:
+        return len(self._buffer) - len(self._buffer) % self.block_align
+
+
+class WavFramer(AudioFramer):
+    """WAV分帧器
+
+    首块输出长度字段为0xFFFFFFFF的流式WAV头, 播放器无需等待完整文件即可开始播放;
+    上游未返回WAV头时按配置的采样率生成16位单声道头。后续块开头重复出现的WAV头会被去除。
+    """
+
+    def __init__(self, sample_rate: Optional[int] = None):
+        super().__init__()
+        self.sample_rate = sample_rate or settings.DEFAULT_SAMPLE_RATE
+        self.header_length: Optional[int] = None
+        self.block_align = 2
+
+    def feed(self, data: bytes) -> bytes:
+        if self.header_length is not None and data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+            parsed = _parse_wav_header(data)
+            if parsed is not None:
+                data = data[parsed[0]:]
+        self._buffer += data
+        header = b""
+        if self.header_length is None:
+            header = self._take_header()
+            if self.header_length is None:
+                return b""
+        cut = len(self._buffer) - len(self._buffer) % self.block_align
+        out = bytes(self._buffer[:cut])
+        del self._buffer[:cut]
+        return header + out
+
+    def flush(self) -> bytes:
+        if self.header_length is None and self._buffer:
+            # 数据过短无法判断时按裸PCM处理
+            header = wav_header(self.sample_rate)
+            self.header_length = len(header)
+            return header + super().flush()
+        return super().flush()
+
+    def _take_header(self) -> bytes:
+        """从缓冲区取出并改写WAV头, 数据不足时返回空"""
+        buffer = self._buffer
+        if len(buffer) < 4 or (buffer[:4] == b"RIFF" and len(buffer) < 12):
+            return b""
+        if buffer[:4] != b"RIFF" or buffer[8:12] != b"WAVE":
+            header = wav_header(self.sample_rate)
+            self.header_length = len(header)
+            return header
+        parsed = _parse_wav_header(bytes(buffer))
+        if parsed is None:
+            return b""
+        data_offset, self.block_align = parsed
+        header = bytearray(buffer[:data_offset])
+        struct.pack_into("<I", header, 4, UNKNOWN_LENGTH)
+        struct.pack_into("<I", header, data_offset - 4, UNKNOWN_LENGTH)
+        del buffer[:data_offset]
+        self.header_length = data_offset
+        return bytes(header)
+
+    def finalize(self, audio: bytes) -> bytes:
+        """写回真实的RIFF与data长度"""
+        if self.header_length is None or len(audio) < self.header_length:
+            return audio
+        return _patch_wav_lengths(audio, self.header_length)
+
+
+def create_framer(response_format: str, sample_rate: Optional[int] = None) -> AudioFramer:
+    """按OpenAI音频格式创建分帧器
+
+    Args:
+        response_format: OpenAI音频格式(见 `ParameterConverter.FORMAT_MAPPING`)
+        sample_rate: 采样率(WAV头使用), 默认读取配置
+
+    Returns:
+        分帧器实例
+    """
+    if response_format == "mp3":
+        return Mp3Framer()
+    if response_format == "opus":
+        return OggFramer()
+    if response_format == "aac":
+        return AdtsFramer()
+    if response_format == "wav":
+        return WavFramer(sample_rate)
+    if response_format == "pcm":
+        return PcmFramer()
+    return AudioFramer()
+
+
+class StreamSplicer:
+    """上游中断续传的拼接器
+
+    对单次上游流分帧并计数已输出的可解码单元(mp3/aac为帧, pcm/wav为字节, 即按时长计数)。
+    `mark` 记录一个句子边界; 上游中断后从边界处的文本重新请求时调用 `restart`,
+    新流开头的WAV头/ID3标签与已输出过的单元被跳过, 中断时残留的半帧被丢弃,
+    输出因此无缝衔接。适用于豆包格式 mp3/aac/pcm/wav(Ogg与FLAC的新流带有新的流头, 无法拼接)。
+    """
+
+    FORMATS = frozenset({"mp3", "aac", "pcm", "wav"})
+
+    def __init__(self, audio_format: str):
+        """初始化拼接器
+
+        Args:
+            audio_format: 豆包音频格式
+        """
+        if audio_format not in self.FORMATS:
+            raise ValueError(f"不支持续传拼接的格式: {audio_format}")
+        self.format = audio_format
+        self.emitted = 0
+        self.boundary = 0
+        self._resumed = False
+        self._reset()
+
+    def _reset(self) -> None:
+        if self.format == "mp3":
+            self._framer: AudioFramer = Mp3Framer()
+        elif self.format == "aac":
+            self._framer = AdtsFramer()
+        else:
+            self._framer = PcmFramer()
+        self._skip = self.emitted - self.boundary
+        # WAV: 流开头的头部(首个流原样输出, 续传的流丢弃)
+        self._header: Optional[bytearray] = bytearray() if self.format == "wav" else None
+
+    def mark(self) -> None:
+        """记录句子边界(此前输出的音频对应已完整到达的句子)"""
+        self.boundary = self.emitted
+
+    def restart(self) -> None:
+        """开始接收从边界处续传的新流"""
+        self._resumed = True
+        self._reset()
+
+    def feed(self, data: bytes) -> bytes:
+        """输入上游音频块, 返回可输出的完整单元"""
+        prefix = b""
+        if self._header is not None:
+            self._header += data
+            header = self._header
+            if len(header) < 12 and header[:4] == b"RIFF"[:len(header)]:
+                return b""
+            data_offset = len(header) if header[:4] != b"RIFF" else None
+            if data_offset is None:
+                parsed = _parse_wav_header(bytes(header))
+                if parsed is None:
+                    return b""
+                data_offset = parsed[0]
+                if not self._resumed:
+                    prefix = bytes(header[:data_offset])
+                data = bytes(header[data_offset:])
+            else:
+                data = bytes(header)
+            self._header = None
+        return prefix + self._select(self._framer.feed(data))
+
+    def flush(self) -> bytes:
+        """取出剩余数据(流正常结束时调用)"""
+        if self._header is not None:
+            data, self._header = bytes(self._header), None
+            return data if not self._resumed else b""
+        return self._select(self._framer.flush())
+
+    def _select(self, framed: bytes) -> bytes:
+        """跳过续传时已输出过的单元, 计数新输出的单元"""
+        if not framed:
+            return framed
+        if self.format in ("pcm", "wav"):
+            skipped = min(self._skip, len(framed))
+            self._skip -= skipped
+            self.emitted += len(framed) - skipped
+            return framed[skipped:]
+        out = bytearray()
+        pos = 0
+        while pos < len(framed):
+            tag = id3_length(framed[pos:pos + 10]) if self.format == "mp3" else None
+            if tag:
+                if not self._resumed:
+                    out += framed[pos:pos + tag]
+                pos += tag
+                continue
+            if self.format == "mp3":
+                length = mp3_frame_length(framed[pos:pos + 4])
+            else:
+                length = adts_frame_length(framed[pos:pos + 7])
+            if not length:
+                # 无法识别的字节(流末尾的残片)原样输出
+                out += framed[pos:]
+                break
+            if self._skip > 0:
+                self._skip -= 1
+            else:
+                out += framed[pos:pos + length]
+                self.emitted += 1
+            pos += length
+        return bytes(out)
+
+
+# 可按句拼接的输出格式 -> 单句的合成格式
+# mp3/aac 帧可直接首尾相接; wav 各句合成PCM, 拼接结果前加一个流式WAV头;
+# opus(链式Ogg要求各段序列号不同, 部分播放器不支持)与 flac(单一STREAMINFO)不拼接
+SEGMENT_FORMATS = {"mp3": "mp3", "aac": "aac", "pcm": "pcm", "wav": "pcm"}
+
+
+__all__ = [
+    "AudioFramer",
+    "Mp3Framer",
+    "AdtsFramer",
+    "OggFramer",
+    "PcmFramer",
+    "WavFramer",
+    "create_framer",
+    "finalize_wav",
+    "wav_header",
+    "audio_duration",
+    "strip_id3",
+    "id3_length",
+    "StreamSplicer",
+    "SEGMENT_FORMATS",
+    "mp3_frame_length",
+    "adts_frame_length",
+    "UNKNOWN_LENGTH",
+]
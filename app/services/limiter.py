@@ -0,0 +1,211 @@
+"""自适应并发限制模块
+
+根据上游首包时间(TTFB)和限流错误码动态调整允许的上游并发数(AIMD):
+- 首包时间接近基线且并发已被充分使用时, 线性增加限制
+- 首包时间明显高于基线时, 按比例小幅降低
+- 收到3003(并发超限)/3005(服务繁忙)时, 按比例大幅降低
+"""
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, List, Optional, Tuple
+from app.config import settings
+from app.utils.errors import DoubaoAPIError
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.services.scheduler import scheduler
+
+# 触发大幅降低的豆包错误码
+OVERLOAD_CODES = frozenset({3003, 3005})
+
+_limit_gauge = metrics.gauge(
+    "tts_upstream_concurrency_limit", "当前自适应上游并发限制"
+)
+_ttfb_histogram = metrics.histogram(
+    "tts_upstream_ttfb_seconds", "上游首个音频块耗时(秒)"
+)
+_upstream_results = metrics.counter(
+    "tts_upstream_requests_total", "上游请求结果计数", labels=("result",)
+)
+
+
+class _Sample:
+    """单次上游调用的测量"""
+
+    __slots__ = ("start", "first_chunk_at")
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.first_chunk_at: Optional[float] = None
+
+    def mark_first_chunk(self) -> None:
+        """记录收到首个音频块的时间"""
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.monotonic()
+
+
+class AdaptiveLimiter:
+    """AIMD自适应并发限制器
+
+    基线TTFB取最近窗口内的最小值, 上游容量变化(如不同时段)时随窗口滑动更新。
+    """
+
+    def __init__(
+        self,
+        initial_limit: Optional[int] = None,
+        min_limit: Optional[int] = None,
+        max_limit: Optional[int] = None,
+        latency_tolerance: Optional[float] = None,
+        backoff_ratio: float = 0.9,
+        overload_ratio: float = 0.5,
+        window: int = 200,
+        on_change: Optional[Callable[[int], None]] = None
+    ):
+        """初始化限制器
+
+        Args:
+            initial_limit: 初始并发限制, 默认读取MAX_CONCURRENT_REQUESTS
+            min_limit: 并发限制下限, 默认读取配置
+            max_limit: 并发限制上限, 默认读取配置
+            latency_tolerance: TTFB超过基线该倍数时视为拥塞, 默认读取配置
+            backoff_ratio: 拥塞时的降低比例
+            overload_ratio: 收到限流错误码时的降低比例
+            window: 计算基线TTFB的样本窗口大小
+            on_change: 限制(取整后)变化时的回调
+        """
+        self.min_limit = min_limit or settings.ADAPTIVE_CONCURRENCY_MIN
+        self.max_limit = max_limit or settings.ADAPTIVE_CONCURRENCY_MAX
+        self.latency_tolerance = latency_tolerance or settings.ADAPTIVE_LATENCY_TOLERANCE
+        self.backoff_ratio = backoff_ratio
+        self.overload_ratio = overload_ratio
+        self._limit = float(initial_limit or settings.MAX_CONCURRENT_REQUESTS)
+        self._limit = min(max(self._limit, self.min_limit), self.max_limit)
+        self.on_change = on_change
+        self.in_flight = 0
+        # 单调递增队列, 维护滑动窗口内的最小TTFB
+        self._window = window
+        self._seq = 0
+        self._min_queue: Deque[Tuple[int, float]] = deque()
+        # 降低后在一个"往返"内不再重复降低, 避免同一拥塞被多次惩罚
+        self._last_decrease = 0.0
+        self.history: List[Tuple[float, int]] = []
+
+    @property
+    def limit(self) -> int:
+        """当前并发限制(取整)"""
+        return int(self._limit)
+
+    @property
+    def baseline(self) -> Optional[float]:
+        """窗口内最小TTFB(秒)"""
+        return self._min_queue[0][1] if self._min_queue else None
+
+    def _record_ttfb(self, ttfb: float) -> None:
+        self._seq += 1
+        while self._min_queue and self._min_queue[-1][1] >= ttfb:
+            self._min_queue.pop()
+        self._min_queue.append((self._seq, ttfb))
+        while self._min_queue[0][0] <= self._seq - self._window:
+            self._min_queue.popleft()
+
+    def _set_limit(self, value: float) -> None:
+        old = self.limit
+        self._limit = min(max(value, self.min_limit), self.max_limit)
+        if self.limit != old:
+            self.history.append((time.monotonic(), self.limit))
+            del self.history[:-1000]
+            logger.debug(f"上游并发限制调整: {old} -> {self.limit}")
+            if self.on_change is not None:
+                self.on_change(self.limit)
+
+    def _decrease(self, ratio: float, now: float, hold: float) -> None:
+        if now - self._last_decrease < hold:
+            return
+        self._last_decrease = now
+        self._set_limit(self._limit * ratio)
+
+    def on_success(self, ttfb: float, in_flight: int) -> None:
+        """记录一次成功调用
+
+        Args:
+            ttfb: 首包时间(秒)
+            in_flight: 调用开始时的在途请求数
+        """
+        self._record_ttfb(ttfb)
+        baseline = self.baseline or ttfb
+        if ttfb > baseline * self.latency_tolerance:
+            self._decrease(self.backoff_ratio, time.monotonic(), hold=baseline)
+        elif in_flight * 2 >= self.limit:
+            # 仅在并发被充分使用时增加, 避免空闲时限制无限上涨
+            self._set_limit(self._limit + 1.0 / self._limit)
+
+    def on_overload(self) -> None:
+        """记录一次限流/繁忙错误"""
+        self._decrease(self.overload_ratio, time.monotonic(), hold=self.baseline or 0.0)
+
+    @asynccontextmanager
+    async def measure(self) -> AsyncIterator[_Sample]:
+        """测量一次上游调用并据此调整限制
+
+        Yields:
+            测量对象, 调用方在收到首个音频块时调用 `mark_first_chunk`
+        """
+        sample = _Sample()
+        self.in_flight += 1
+        in_flight = self.in_flight
+        try:
+            yield sample
+        except DoubaoAPIError as e:
+            if e.doubao_code in OVERLOAD_CODES:
+                _upstream_results.inc(result="overload")
+                self.on_overload()
+            else:
+                _upstream_results.inc(result="error")
+            raise
+        except Exception:
+            _upstream_results.inc(result="error")
+            raise
+        except BaseException:
+            # 取消(客户端断开、超过截止时间、single-flight等待者全部离开)不说明上游状态, 不计入结果
+            raise
+        else:
+            _upstream_results.inc(result="success")
+            if sample.first_chunk_at is not None:
+                ttfb = sample.first_chunk_at - sample.start
+                _ttfb_histogram.observe(ttfb)
+                self.on_success(ttfb, in_flight)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """获取限制器状态
+
+        Returns:
+            状态字典
+        """
+        return {
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "baseline_ttfb": self.baseline,
+        }
+
+
+def _create_limiter() -> AdaptiveLimiter:
+    """创建全局限制器; 关闭自适应时上下限固定为MAX_CONCURRENT_REQUESTS"""
+    if settings.ENABLE_ADAPTIVE_CONCURRENCY:
+        instance = AdaptiveLimiter(on_change=scheduler.set_max_concurrency)
+    else:
+        fixed = settings.MAX_CONCURRENT_REQUESTS
+        instance = AdaptiveLimiter(initial_limit=fixed, min_limit=fixed, max_limit=fixed)
+    _limit_gauge.set_callback(lambda: instance.limit)
+    scheduler.set_max_concurrency(instance.limit)
+    return instance
+
+
+# 全局限制器实例, 调整结果同步到调度器的并发槽位数
+limiter = _create_limiter()
+
+
+__all__ = ["AdaptiveLimiter", "OVERLOAD_CODES", "limiter"]
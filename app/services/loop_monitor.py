@@ -0,0 +1,147 @@
+"""事件循环延迟监控模块
+
+所有请求共享同一个asyncio事件循环, 任何阻塞回调都会让全部在途流一起停顿。
+本模块:
+- 周期性定时器测量调度漂移(loop lag), 写入直方图并维护EWMA
+- 看门狗线程在循环停顿超过阈值时记录阻塞处的调用栈
+- 延迟持续偏高时标记为过载, 供路由层拒绝新请求(503)以保护已有流
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+_lag_histogram = metrics.histogram(
+    "tts_event_loop_lag_seconds",
+    "事件循环调度延迟(秒)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+_stall_counter = metrics.counter("tts_event_loop_stalls_total", "事件循环停顿次数")
+
+
+class LoopMonitor:
+    """事件循环延迟监控器"""
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        stall_threshold: Optional[float] = None,
+        shed_threshold: Optional[float] = None,
+        smoothing: float = 0.2
+    ):
+        """初始化监控器
+
+        Args:
+            interval: 采样间隔(秒), 默认读取配置
+            stall_threshold: 停顿超过该时长(秒)时记录调用栈, 默认读取配置
+            shed_threshold: EWMA延迟超过该值(秒)时视为过载, 0表示不卸载, 默认读取配置
+            smoothing: EWMA平滑系数
+        """
+        self.interval = interval or settings.LOOP_MONITOR_INTERVAL
+        self.stall_threshold = stall_threshold or settings.LOOP_STALL_THRESHOLD
+        self.shed_threshold = (
+            settings.LOOP_LAG_SHED_THRESHOLD if shed_threshold is None else shed_threshold
+        )
+        self.smoothing = smoothing
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def overloaded(self) -> bool:
+        """事件循环延迟是否持续高于卸载阈值"""
+        return self.running and self.shed_threshold > 0 and self.lag > self.shed_threshold
+
+    def record(self, lag: float) -> None:
+        """记录一次延迟样本
+
+        Args:
+            lag: 调度延迟(秒)
+        """
+        lag = max(lag, 0.0)
+        self.lag += self.smoothing * (lag - self.lag)
+        self.max_lag = max(self.max_lag, lag)
+        _lag_histogram.observe(lag)
+
+    async def _run(self) -> None:
+        while True:
+            start = time.monotonic()
+            self._heartbeat = start
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self.record(now - start - self.interval)
+
+    def _watch(self) -> None:
+        """看门狗线程: 心跳超时时抓取事件循环线程的调用栈"""
+        reported_heartbeat = None
+        while not self._stopped.wait(self.interval / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.stall_threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+            _stall_counter.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<未知>"
+            logger.warning(f"事件循环停顿 {stalled * 1000:.0f}ms, 阻塞位置:\n{stack}")
+
+    def start(self) -> None:
+        """在当前事件循环中启动监控"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """停止监控"""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    def stats(self) -> dict:
+        """获取监控状态
+
+        Returns:
+            状态字典
+        """
+        return {
+            "lag_seconds": round(self.lag, 6),
+            "max_lag_seconds": round(self.max_lag, 6),
+            "p99_lag_seconds": _lag_histogram.quantile(0.99),
+            "overloaded": self.overloaded,
+        }
+
+
+# 全局监控器实例
+loop_monitor = LoopMonitor()
+
+metrics.gauge("tts_event_loop_lag_ewma_seconds", "事件循环延迟EWMA(秒)", callback=lambda: loop_monitor.lag)
+
+
+__all__ = ["LoopMonitor", "loop_monitor"]
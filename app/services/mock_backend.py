@@ -0,0 +1,180 @@
+"""进程内模拟合成后端
+
+不访问网络, 按文本长度与语速生成确定性的音频字节, 并模拟首包时间与生成速度。
+音频按豆包格式构造(MPEG帧、Ogg页、ADTS帧、WAV头等), 可完整经过分帧与缓存路径,
+用于离线测试与测量代理自身的吞吐开销。
+"""
+import asyncio
+import hashlib
+import random
+import struct
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+from app.config import settings
+from app.services.backend import TTSBackend
+from app.services.framing import wav_header
+from app.services.request_builder import PreparedTTSRequest
+from app.services.segmenter import SentenceSegmenter
+from app.services.timestamps import SentenceTiming, WordTiming
+
+# 正常语速下每个字符对应的音频时长(秒)
+SECONDS_PER_CHAR = 0.2
+
+# MPEG2 Layer III, 160kbps, 24000Hz, 单声道: 每帧480字节, 24ms
+_MP3_HEADER = b"\xff\xf3\xe4\xc4"
+_MP3_FRAME_BYTES = 480
+_MP3_FRAME_SECONDS = 0.024
+
+# ADTS(AAC-LC, 24000Hz, 单声道): 每帧1024个样本, 约64kbps
+_AAC_FRAME_BYTES = 341
+_AAC_FRAME_SECONDS = 1024 / 24000
+
+# Ogg Opus: 每页200ms, 约32kbps
+_OGG_PAGE_PAYLOAD = 800
+_OGG_PAGE_SECONDS = 0.2
+
+
+def _ogg_page(payload: bytes, sequence: int) -> bytes:
+    lacing = [255] * (len(payload) // 255) + [len(payload) % 255]
+    header = b"OggS\x00" + bytes([2 if sequence == 0 else 0]) + struct.pack(
+        "<QII", sequence * 9600, 0x6D6F636B, sequence
+    ) + bytes(4)
+    return header + bytes([len(lacing)]) + bytes(lacing) + payload
+
+
+def _adts_header(length: int) -> bytes:
+    return bytes([
+        0xFF, 0xF1, 0x58, 0x40 | (length >> 11),
+        (length >> 3) & 0xFF, ((length & 0x07) << 5) | 0x1F, 0xFC
+    ])
+
+
+def generate_audio(audio_format: str, duration: float, seed: bytes, sample_rate: int) -> bytes:
+    """生成指定格式与时长的确定性音频字节
+
+    内容为伪随机数据, 只保证容器结构(帧头、页头、WAV头)有效。
+
+    Args:
+        audio_format: 豆包音频格式 mp3/ogg_opus/aac/flac/wav/pcm
+        duration: 音频时长(秒)
+        seed: 随机种子(相同种子生成相同数据)
+        sample_rate: 采样率(wav/pcm使用)
+
+    Returns:
+        音频数据
+    """
+    rng = random.Random(seed)
+    if audio_format == "mp3":
+        frames = max(1, round(duration / _MP3_FRAME_SECONDS))
+        return b"".join(
+            _MP3_HEADER + rng.randbytes(_MP3_FRAME_BYTES - 4) for _ in range(frames)
+        )
+    if audio_format == "aac":
+        frames = max(1, round(duration / _AAC_FRAME_SECONDS))
+        return b"".join(
+            _adts_header(_AAC_FRAME_BYTES) + rng.randbytes(_AAC_FRAME_BYTES - 7) for _ in range(frames)
+        )
+    if audio_format == "ogg_opus":
+        pages = max(1, round(duration / _OGG_PAGE_SECONDS))
+        return b"".join(_ogg_page(rng.randbytes(_OGG_PAGE_PAYLOAD), i) for i in range(pages))
+    pcm = rng.randbytes(max(2, int(duration * sample_rate)) * 2)
+    if audio_format == "wav":
+        return wav_header(sample_rate, data_size=len(pcm)) + pcm
+    if audio_format == "flac":
+        return b"fLaC" + pcm[:len(pcm) // 2]
+    return pcm
+
+
+class MockTTSBackend(TTSBackend):
+    """进程内模拟后端"""
+
+    name = "mock"
+    cache_namespace = "mock:"
+
+    def __init__(
+        self,
+        ttfb: Optional[float] = None,
+        speed: Optional[float] = None,
+        chunk_bytes: Optional[int] = None
+    ):
+        """初始化模拟后端
+
+        Args:
+            ttfb: 首包时间(秒), 默认读取配置
+            speed: 生成速度(每秒墙钟时间生成的音频秒数), 0表示不等待, 默认读取配置
+            chunk_bytes: 每个音频块的字节数(不按帧对齐, 与真实上游一致), 默认读取配置
+        """
+        self.ttfb = settings.MOCK_BACKEND_TTFB if ttfb is None else ttfb
+        self.speed = settings.MOCK_BACKEND_SPEED if speed is None else speed
+        self.chunk_bytes = chunk_bytes or settings.MOCK_BACKEND_CHUNK_BYTES
+        self.calls = 0
+
+    def duration(self, request: PreparedTTSRequest) -> float:
+        """按文本长度与语速估算音频时长(秒)"""
+        rate = max(0.5, 1 + request.speech_rate / 100)
+        return max(0.1, len(request.text) * SECONDS_PER_CHAR / rate)
+
+    @staticmethod
+    def sentence_timings(text: str, duration: float, size: int) -> List[Tuple[SentenceTiming, int]]:
+        """按字符数比例分配各句(逐字)时间戳
+
+        Returns:
+            [(句子时间戳, 该句音频结束处的字节偏移)]
+        """
+        segmenter = SentenceSegmenter()
+        sentences = [s for s in segmenter.feed(text) + segmenter.flush() if s.strip()]
+        per_char = duration / max(1, sum(len(sentence) for sentence in sentences))
+        timings = []
+        elapsed = 0.0
+        for sentence in sentences:
+            words = [
+                WordTiming(char, elapsed + i * per_char, elapsed + (i + 1) * per_char)
+                for i, char in enumerate(sentence)
+            ]
+            elapsed += len(sentence) * per_char
+            timing = SentenceTiming(text=sentence.strip(), start=words[0].start, end=elapsed, words=words)
+            timings.append((timing, round(size * elapsed / duration)))
+        return timings
+
+    async def synthesize_stream(
+        self,
+        request: PreparedTTSRequest,
+        on_first_chunk: Optional[Callable[[], None]] = None,
+        on_sentence: Optional[Callable[[SentenceTiming], None]] = None
+    ) -> AsyncIterator[bytes]:
+        """按块产出模拟音频
+
+        Args:
+            request: 已序列化的豆包请求
+            on_first_chunk: 首个音频块产出前的回调
+            on_sentence: 某句的音频全部产出后的回调(时间戳按字符数比例分配)
+
+        Yields:
+            音频数据块
+        """
+        self.calls += 1
+        duration = self.duration(request)
+        seed = hashlib.sha256(request.body).digest()
+        audio = generate_audio(request.format, duration, seed, request.sample_rate)
+        pending = self.sentence_timings(request.text, duration, len(audio)) if on_sentence else []
+        # 每个块对应的音频时长, 用于模拟生成速度
+        chunk_seconds = duration * self.chunk_bytes / len(audio)
+
+        if self.ttfb > 0:
+            await asyncio.sleep(self.ttfb)
+        for offset in range(0, len(audio), self.chunk_bytes):
+            if offset == 0:
+                if on_first_chunk is not None:
+                    on_first_chunk()
+            elif self.speed > 0:
+                await asyncio.sleep(chunk_seconds / self.speed)
+            else:
+                # 不等待时仍让出事件循环, 与真实网络读取一致
+                await asyncio.sleep(0)
+            yield audio[offset:offset + self.chunk_bytes]
+            while pending and pending[0][1] <= offset + self.chunk_bytes:
+                on_sentence(pending.pop(0)[0])
+        for timing, _ in pending:
+            on_sentence(timing)
+
+
+__all__ = ["MockTTSBackend", "generate_audio"]
@@ -0,0 +1,159 @@
+"""文本规范化模块
+
+在参数转换前对输入文本做规范化, 使仅在空白、全/半角标点、
+引号写法或Unicode规范化形式上不同的请求映射到同一合成文本,
+从而共享缓存与single-flight键。规则只做不改变读音的替换:
+句末标点(如缩写的"."、语气未尽的"…")与减号/破折号都会影响合成结果,
+因此保持原样。
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional
+from app.config import settings
+
+
+# 标点变体 -> 规范形式 (NFKC之后仍存在差异的部分)
+PUNCTUATION_MAPPING: Dict[str, str] = {
+    "\u2018": "'",  # 左单引号
+    "\u2019": "'",  # 右单引号
+    "\u201c": '"',  # 左双引号
+    "\u201d": '"',  # 右双引号
+    "\u300c": '"',  # 「
+    "\u300d": '"',  # 」
+    "\u300e": '"',  # 『
+    "\u300f": '"',  # 』
+    "\u2013": "-",  # en dash
+    "\u301c": "~",  # 波浪线
+}
+
+# 全角标点 -> 半角形式 (NFKC不转换句号), 句末同一标点的全/半角重复只保留一个
+_MARK_WIDTH = str.maketrans({"。": "."})
+TRAILING_MARKS = ".,;:!?"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_ELLIPSIS_RE = re.compile(r"(?:\.{3,}|…+|。{3,})")
+_REPEATED_PUNCT_RE = re.compile(r"([!?,;:。，、！？])\1+")
+# 中日韩字符及全角标点, 其间的空白对合成结果没有影响
+_CJK = "\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef"
+_CJK_SPACE_RE = re.compile(rf"(?<=[{_CJK}])\s+|\s+(?=[{_CJK}])")
+
+
+def _nfkc(text: str) -> str:
+    """Unicode NFKC规范化(全角字母数字及部分全角标点转半角)"""
+    return unicodedata.normalize("NFKC", text)
+
+
+def _whitespace(text: str) -> str:
+    """折叠连续空白为单个空格并去除首尾空白"""
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _cjk_spacing(text: str) -> str:
+    """去除与中日韩字符相邻的空白"""
+    return _CJK_SPACE_RE.sub("", text)
+
+
+def _punctuation(text: str) -> str:
+    """标点规范化: 引号/连接号变体统一, 省略号统一, 重复标点折叠"""
+    text = text.translate(_PUNCTUATION_TABLE)
+    text = _ELLIPSIS_RE.sub("…", text)
+    return _REPEATED_PUNCT_RE.sub(r"\1", text)
+
+
+def _same_mark(a: str, b: str) -> bool:
+    """判断两个字符是否为同一标点的全/半角写法"""
+    if a == b:
+        # 连续的"."可能是省略号, 不折叠
+        return a != "." and a in TRAILING_MARKS
+    a, b = _nfkc(a).translate(_MARK_WIDTH), _nfkc(b).translate(_MARK_WIDTH)
+    return a == b and a in TRAILING_MARKS
+
+
+def _trailing(text: str) -> str:
+    """去除句末空白, 折叠句末同一标点的全/半角重复(如"。.")"""
+    text = text.rstrip()
+    while len(text) >= 2 and _same_mark(text[-2], text[-1]):
+        text = text[:-1]
+    return text
+
+
+_PUNCTUATION_TABLE = str.maketrans(PUNCTUATION_MAPPING)
+
+# 规则名 -> 处理函数, 按此顺序执行
+RULES: Dict[str, Callable[[str], str]] = {
+    "nfkc": _nfkc,
+    "whitespace": _whitespace,
+    "cjk_spacing": _cjk_spacing,
+    "punctuation": _punctuation,
+    "trailing": _trailing,
+}
+
+
+class TextNormalizer:
+    """可配置的文本规范化器
+
+    规则通过 `TEXT_NORMALIZATION_RULES` 开关, 结果按LRU缓存热点文本。
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Iterable[str]] = None,
+        cache_size: Optional[int] = None
+    ):
+        """初始化规范化器
+
+        Args:
+            rules: 启用的规则名列表, 默认读取配置
+            cache_size: 结果缓存条目数, 默认读取配置, 0表示不缓存
+        """
+        if rules is None:
+            rules = settings.get_normalization_rules() if settings.ENABLE_TEXT_NORMALIZATION else []
+        rules = list(rules)
+        unknown = [name for name in rules if name not in RULES]
+        if unknown:
+            raise ValueError(f"未知的文本规范化规则: {', '.join(unknown)}")
+
+        # 保持RULES中定义的执行顺序
+        self.rules = [name for name in RULES if name in rules]
+        self._steps = [RULES[name] for name in self.rules]
+
+        if cache_size is None:
+            cache_size = settings.TEXT_NORMALIZER_CACHE_SIZE
+        self._cached = lru_cache(maxsize=cache_size)(self._apply) if cache_size > 0 else self._apply
+
+    def _apply(self, text: str) -> str:
+        for step in self._steps:
+            text = step(text)
+        return text
+
+    def normalize(self, text: str) -> str:
+        """规范化文本
+
+        Args:
+            text: 原始文本
+
+        Returns:
+            规范化后的文本; 若规范化结果为空则返回原文本
+        """
+        if not self._steps:
+            return text
+        return self._cached(text) or text
+
+    def cache_info(self) -> Optional[dict]:
+        """获取结果缓存统计
+
+        Returns:
+            缓存统计字典, 未启用缓存时返回None
+        """
+        info = getattr(self._cached, "cache_info", None)
+        if info is None:
+            return None
+        return info()._asdict()
+
+
+# 全局规范化器实例
+normalizer = TextNormalizer()
+
+
+__all__ = ["TextNormalizer", "normalizer", "RULES"]
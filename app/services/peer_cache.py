@@ -0,0 +1,195 @@
+"""节点间共享缓存模块
+
+多个代理节点部署在负载均衡之后时, 各自的进程内缓存只能命中约 1/N 的重复请求,
+且每个节点都会为同一段文本调用一次上游。本模块按 groupcache 的方式为每个缓存键
+指定唯一的所属节点(静态节点列表上的一致性哈希环):
+- 本节点拥有的键: 本地合成并缓存
+- 其他节点拥有的键: 通过HTTP向所属节点请求, 所属节点只合成一次并缓存结果,
+  本节点同时把结果写入本地缓存(热点数据无需重复跨节点传输)
+所属节点不可达或返回错误时回退为本地合成。
+"""
+import bisect
+import hashlib
+import hmac
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+from app.config import settings
+from app.models.openai_models import OpenAISpeechRequest
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    import httpx
+
+# 节点间请求的路径与请求头
+PEER_PATH = "/internal/peer/speech"
+SECRET_HEADER = "X-Peer-Secret"
+KEY_HEADER = "X-Peer-Key"
+
+_peer_counter = metrics.counter(
+    "tts_peer_requests_total", "向所属节点请求音频的次数", labels=("result",)
+)
+
+
+class PeerError(Exception):
+    """向所属节点请求失败"""
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """一致性哈希环"""
+
+    def __init__(self, nodes: List[str], replicas: int = 100):
+        """初始化哈希环
+
+        Args:
+            nodes: 节点列表
+            replicas: 每个节点的虚拟节点数
+        """
+        self.nodes = list(nodes)
+        points = sorted(
+            (_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        """获取键的所属节点
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            节点, 环为空时返回None
+        """
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class PeerCache:
+    """节点间共享缓存客户端"""
+
+    def __init__(
+        self,
+        nodes: Optional[List[str]] = None,
+        self_url: Optional[str] = None,
+        secret: Optional[str] = None,
+        timeout: Optional[float] = None,
+        replicas: Optional[int] = None
+    ):
+        """初始化共享缓存
+
+        Args:
+            nodes: 全部节点URL, 默认读取配置
+            self_url: 本节点URL, 默认读取配置
+            secret: 节点间共享密钥, 默认读取配置
+            timeout: 请求所属节点的超时时间(秒), 默认读取配置
+            replicas: 每个节点的虚拟节点数, 默认读取配置
+        """
+        self.nodes = settings.get_peer_nodes() if nodes is None else nodes
+        self.self_url = (self_url or settings.PEER_SELF or "").rstrip("/")
+        self.secret = secret or settings.PEER_SHARED_SECRET or ""
+        self.timeout = timeout or settings.PEER_TIMEOUT
+        self.ring = HashRing(self.nodes, replicas or settings.PEER_VIRTUAL_NODES)
+        self._http_client: Optional["httpx.AsyncClient"] = None
+
+        if self.nodes and self.self_url not in self.nodes:
+            logger.warning(f"PEER_SELF={self.self_url!r} 不在 PEER_NODES 中, 节点间共享缓存未启用")
+        elif self.nodes and not self.secret:
+            logger.warning("未配置 PEER_SHARED_SECRET, 节点间共享缓存未启用")
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用(至少两个节点, 本节点在列表中且配置了密钥)"""
+        return len(self.nodes) > 1 and self.self_url in self.nodes and bool(self.secret)
+
+    def owner(self, key: str) -> Optional[str]:
+        """获取键的所属节点, 本节点拥有或未启用时返回None"""
+        if not self.enabled:
+            return None
+        owner = self.ring.owner(key)
+        return None if owner == self.self_url else owner
+
+    def verify_secret(self, provided: Optional[str]) -> bool:
+        """校验节点间请求的共享密钥"""
+        return bool(self.secret) and hmac.compare_digest(provided or "", self.secret)
+
+    @property
+    def http_client(self) -> "httpx.AsyncClient":
+        """获取HTTP客户端(懒加载)"""
+        if self._http_client is None:
+            import httpx
+
+            self._http_client = httpx.AsyncClient(timeout=self.timeout)
+        return self._http_client
+
+    async def fetch(
+        self,
+        owner: str,
+        request: OpenAISpeechRequest,
+        key: str,
+        priority: str
+    ) -> AsyncIterator[bytes]:
+        """向所属节点流式请求音频
+
+        Args:
+            owner: 所属节点URL
+            request: OpenAI格式的请求(已规范化)
+            key: 本节点计算的缓存键, 所属节点据此检查配置是否一致
+            priority: 上游调度优先级类别
+
+        Yields:
+            音频数据块(已由所属节点分帧)
+
+        Raises:
+            PeerError: 连接失败、超时或所属节点返回错误
+        """
+        import httpx
+
+        headers: Dict[str, str] = {
+            SECRET_HEADER: self.secret,
+            KEY_HEADER: key,
+            "X-Priority": priority,
+        }
+        try:
+            async with self.http_client.stream(
+                "POST",
+                owner + PEER_PATH,
+                content=request.model_dump_json(exclude_none=True),
+                headers={**headers, "Content-Type": "application/json"}
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    _peer_counter.inc(result=f"http_{response.status_code}")
+                    raise PeerError(f"所属节点返回 {response.status_code}: {response.text[:200]}")
+                async for chunk in response.aiter_bytes():
+                    yield chunk
+                _peer_counter.inc(result=response.headers.get("X-Cache", "ok").lower())
+        except httpx.HTTPError as e:
+            _peer_counter.inc(result="error")
+            raise PeerError(f"请求所属节点失败: {owner}, {e!r}") from e
+
+    async def close(self) -> None:
+        """关闭HTTP客户端"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+# 全局共享缓存实例
+peer_cache = PeerCache()
+
+
+__all__ = [
+    "HashRing",
+    "PeerCache",
+    "PeerError",
+    "peer_cache",
+    "PEER_PATH",
+    "SECRET_HEADER",
+    "KEY_HEADER",
+]
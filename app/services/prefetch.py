@@ -0,0 +1,113 @@
+"""缓存预取模块
+
+客户端提前提交之后会用到的合成请求(下一轮对话、下一页文章), 在后台合成写入缓存。
+预取以空闲类别(`IDLE_PRIORITY`)获取上游槽位, 只使用其他请求都不需要的容量;
+已在音频包、缓存中或正在合成的请求不再提交。之后的正式请求命中缓存,
+或合并到进行中的预取(单飞合并), 不会重复调用上游。
+"""
+import asyncio
+from typing import Dict, Optional
+from app.config import settings
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.circuit_breaker import CLOSED
+from app.services.scheduler import IDLE_PRIORITY
+from app.services.speech_service import SpeechService, speech_service
+from app.utils.errors import TTSProxyError
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+# 提交结果
+QUEUED = "queued"
+CACHED = "cached"
+INFLIGHT = "inflight"
+REJECTED = "rejected"
+
+_prefetch_counter = metrics.counter(
+    "tts_prefetch_total", "预取请求数(按提交或完成结果)", labels=("result",)
+)
+
+
+class Prefetcher:
+    """后台预取任务管理"""
+
+    def __init__(self, service: SpeechService = speech_service, max_pending: Optional[int] = None):
+        """初始化预取管理
+
+        Args:
+            service: 合成服务
+            max_pending: 同时未完成的预取数上限, 默认读取配置, 0表示停用预取
+        """
+        self.service = service
+        self.max_pending = settings.PREFETCH_MAX_PENDING if max_pending is None else max_pending
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def pending(self) -> int:
+        """未完成的预取数"""
+        return len(self._tasks)
+
+    def submit(self, request: OpenAISpeechRequest) -> str:
+        """提交一个预取请求(需在事件循环中调用)
+
+        长文本按句缓存时各句在合成服务内部各自去重, 这里按整段请求去重。
+
+        Args:
+            request: OpenAI格式的请求
+
+        Returns:
+            queued(已提交) / cached(已在音频包或缓存中) / inflight(正在合成) / rejected(已满、上游熔断或输出档位未知)
+        """
+        try:
+            key = self.service.cache_key(request)
+        except TTSProxyError:
+            _prefetch_counter.inc(result=REJECTED)
+            return REJECTED
+        cache = self.service.cache
+        if key in self.service.pack or key in cache:
+            result = CACHED
+        elif key in self._tasks or cache.is_inflight(key):
+            result = INFLIGHT
+        elif len(self._tasks) >= self.max_pending or self.service.breaker.state != CLOSED:
+            result = REJECTED
+        else:
+            task = asyncio.create_task(self._run(request))
+            # 任务可能在开始运行前被取消, 在完成回调中移除
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self._tasks[key] = task
+            result = QUEUED
+        _prefetch_counter.inc(result=result)
+        return result
+
+    async def _run(self, request: OpenAISpeechRequest) -> None:
+        try:
+            stream = await self.service.stream(request, IDLE_PRIORITY)
+            async for _ in stream.chunks:
+                pass
+            _prefetch_counter.inc(result="completed")
+        except Exception as e:
+            _prefetch_counter.inc(result="failed")
+            logger.warning(f"预取失败: voice={request.voice}, text={request.input[:20]!r}: {e}")
+
+    async def close(self) -> None:
+        """取消未完成的预取"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """获取预取状态
+
+        Returns:
+            状态字典
+        """
+        return {"pending": self.pending, "max_pending": self.max_pending}
+
+
+# 全局预取实例
+prefetcher = Prefetcher()
+
+metrics.gauge("tts_prefetch_pending", "未完成的预取数", callback=lambda: prefetcher.pending)
+
+
+__all__ = ["Prefetcher", "prefetcher", "QUEUED", "CACHED", "INFLIGHT", "REJECTED"]
@@ -0,0 +1,246 @@
+"""运行时剖析模块
+
+为管理接口提供按需剖析能力, 空闲时不产生任何开销:
+- CPU采样: 后台线程按固定间隔读取各线程栈帧, 输出折叠栈或speedscope JSON
+- 内存: tracemalloc快照差异, 定位分配热点
+- 任务: 当前asyncio任务及其存活时长
+"""
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# 任务创建时间, 仅在启用管理接口并安装任务工厂后记录
+_task_created_at: "weakref.WeakKeyDictionary[asyncio.Task, float]" = weakref.WeakKeyDictionary()
+
+# 同一时间只允许一个CPU采样, 避免叠加开销
+_cpu_lock = threading.Lock()
+
+# 上一次tracemalloc快照, 用于计算差异
+_last_snapshot: Optional[tracemalloc.Snapshot] = None
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def _collapse(frame, thread_name: str) -> str:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.append(thread_name)
+    return ";".join(reversed(stack))
+
+
+def sample_cpu(seconds: float, interval: float = 0.005) -> Tuple[Counter, int]:
+    """在当前线程中采样所有其他线程的调用栈
+
+    该函数会阻塞调用线程, 应通过 `asyncio.to_thread` 调用。
+
+    Args:
+        seconds: 采样时长(秒)
+        interval: 采样间隔(秒)
+
+    Returns:
+        (折叠栈计数, 采样次数)
+
+    Raises:
+        RuntimeError: 已有采样在进行
+    """
+    if not _cpu_lock.acquire(blocking=False):
+        raise RuntimeError("已有CPU采样在进行中")
+    try:
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stacks[_collapse(frame, names.get(thread_id, str(thread_id)))] += 1
+            samples += 1
+            time.sleep(interval)
+        return stacks, samples
+    finally:
+        _cpu_lock.release()
+
+
+def to_collapsed(stacks: Counter) -> str:
+    """转换为折叠栈文本(flamegraph.pl / speedscope均可导入)"""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+def to_speedscope(stacks: Counter, interval: float, name: str = "tts-proxy") -> dict:
+    """转换为speedscope的sampled格式
+
+    Args:
+        stacks: 折叠栈计数
+        interval: 采样间隔(秒), 作为每个样本的权重
+        name: 剖析名称
+
+    Returns:
+        speedscope JSON对象
+    """
+    frames: List[dict] = []
+    frame_index: Dict[str, int] = {}
+    samples: List[List[int]] = []
+    weights: List[float] = []
+    for stack, count in stacks.items():
+        indexes = []
+        for label in stack.split(";"):
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                frames.append({"name": label})
+            indexes.append(frame_index[label])
+        samples.append(indexes)
+        weights.append(count * interval)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": name,
+        "exporter": "tts-proxy",
+    }
+
+
+def start_tracemalloc(frames: int = 10) -> dict:
+    """开始跟踪内存分配并记录基准快照
+
+    Args:
+        frames: 每个分配记录的栈深度
+
+    Returns:
+        状态字典
+    """
+    global _last_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _last_snapshot = tracemalloc.take_snapshot()
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+
+def stop_tracemalloc() -> dict:
+    """停止跟踪内存分配并释放快照"""
+    global _last_snapshot
+    _last_snapshot = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return {"tracing": False}
+
+
+def tracemalloc_diff(top: int = 20, key_type: str = "lineno") -> dict:
+    """与上一次快照比较, 返回分配增长最多的位置
+
+    每次调用后当前快照成为新的基准。
+
+    Args:
+        top: 返回条目数
+        key_type: 聚合维度, lineno 或 traceback
+
+    Returns:
+        差异字典
+
+    Raises:
+        RuntimeError: 尚未开始跟踪
+    """
+    global _last_snapshot
+    if not tracemalloc.is_tracing() or _last_snapshot is None:
+        raise RuntimeError("tracemalloc未启动")
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    stats = snapshot.compare_to(_last_snapshot, key_type)[:top]
+    _last_snapshot = snapshot
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {
+                "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats
+        ],
+    }
+
+
+def _tracking_task_factory(loop, coro, **kwargs):
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    _task_created_at[task] = time.monotonic()
+    return task
+
+
+def install_task_tracker(loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+    """安装记录任务创建时间的任务工厂
+
+    仅在启用管理接口时调用; 若已有自定义工厂则不覆盖。
+
+    Args:
+        loop: 事件循环, 默认为当前运行的循环
+    """
+    loop = loop or asyncio.get_running_loop()
+    if loop.get_task_factory() is None:
+        loop.set_task_factory(_tracking_task_factory)
+
+
+def dump_tasks(limit: int = 200) -> List[dict]:
+    """列出当前asyncio任务
+
+    Args:
+        limit: 最多返回的任务数
+
+    Returns:
+        按存活时长降序排列的任务信息
+    """
+    now = time.monotonic()
+    result = []
+    for task in asyncio.all_tasks():
+        created = _task_created_at.get(task)
+        frames = task.get_stack(limit=1)
+        location = None
+        if frames:
+            location = f"{frames[0].f_code.co_filename}:{frames[0].f_lineno} in {frames[0].f_code.co_name}"
+        coro = task.get_coro()
+        result.append({
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", repr(coro)),
+            "age_seconds": round(now - created, 3) if created is not None else None,
+            "awaiting": location,
+            "done": task.done(),
+        })
+    result.sort(key=lambda item: item["age_seconds"] or 0.0, reverse=True)
+    return result[:limit]
+
+
+__all__ = [
+    "sample_cpu",
+    "to_collapsed",
+    "to_speedscope",
+    "start_tracemalloc",
+    "stop_tracemalloc",
+    "tracemalloc_diff",
+    "install_task_tracker",
+    "dump_tasks",
+]
@@ -0,0 +1,210 @@
+"""输出档位模块
+
+输出档位决定上游合成的采样率、比特率与豆包资源/模型。电话、移动端等低保真客户端
+选择低采样率、低码率的档位, 不再接收之后立即被降采样的24kHz/160kbps音频, 出口流量随之减少。
+
+档位按以下顺序确定: 请求体 `profile` 字段 → `X-Output-Profile` 请求头 → API密钥 → 模型 → 默认档位。
+档位参数进入请求体与缓存键, 不同档位的音频分别缓存。
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from app.config import settings
+from app.models.openai_models import OpenAISpeechRequest
+from app.utils.errors import TTSProxyError
+from app.utils.metrics import metrics
+
+# 未指定档位时使用的名称(参数来自 DEFAULT_SAMPLE_RATE 等配置)
+DEFAULT_PROFILE = "default"
+
+# 豆包支持的采样率
+SAMPLE_RATES = (8000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+profile_requests = metrics.counter(
+    "tts_profile_requests_total", "按输出档位统计的请求数", labels=("profile",)
+)
+profile_bytes = metrics.counter(
+    "tts_profile_bytes_total", "按输出档位统计的响应音频字节数", labels=("profile",)
+)
+
+
+@dataclass(frozen=True)
+class OutputProfile:
+    """输出档位
+
+    Attributes:
+        name: 档位名称
+        sample_rate: 采样率
+        bit_rate: MP3比特率(kbps)
+        resource_id: 豆包资源ID
+        model: 豆包模型版本, None表示由资源决定
+    """
+    name: str
+    sample_rate: int
+    bit_rate: int
+    resource_id: str
+    model: Optional[str] = None
+
+
+def parse_profiles(spec: Optional[str]) -> Dict[str, OutputProfile]:
+    """解析档位配置
+
+    Args:
+        spec: 格式为 `名称:字段=值;字段=值`, 多个档位以逗号分隔,
+            字段为 sample_rate / bit_rate / resource_id / model, 未给出的字段取默认配置
+
+    Returns:
+        档位名称 -> 档位(含默认档位)
+
+    Raises:
+        ValueError: 字段未知或采样率不受支持
+    """
+    default = OutputProfile(
+        name=DEFAULT_PROFILE,
+        sample_rate=settings.DEFAULT_SAMPLE_RATE,
+        bit_rate=settings.DEFAULT_BITRATE,
+        resource_id=settings.DOUBAO_RESOURCE_ID,
+    )
+    profiles = {DEFAULT_PROFILE: default}
+    for item in (spec or "").split(","):
+        name, _, fields = item.partition(":")
+        if not name.strip():
+            continue
+        values = {"name": name.strip()}
+        for field in fields.split(";"):
+            key, _, value = field.partition("=")
+            key, value = key.strip(), value.strip()
+            if not key:
+                continue
+            if key in ("sample_rate", "bit_rate"):
+                values[key] = int(value)
+            elif key in ("resource_id", "model"):
+                values[key] = value or None
+            else:
+                raise ValueError(f"输出档位 {name.strip()} 的字段未知: {key}")
+        profile = OutputProfile(**{**default.__dict__, **values})
+        if profile.sample_rate not in SAMPLE_RATES:
+            raise ValueError(f"输出档位 {profile.name} 的采样率不受支持: {profile.sample_rate}")
+        profiles[profile.name] = profile
+    return profiles
+
+
+def parse_profile_routes(
+    spec: Optional[str],
+    profiles: Dict[str, OutputProfile]
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """解析档位路由配置
+
+    Args:
+        spec: 格式为 `model:模型=档位` 或 `key:API密钥=档位`, 逗号分隔
+        profiles: 已解析的档位, 用于校验路由目标
+
+    Returns:
+        (OpenAI模型 -> 档位名称, API密钥 -> 档位名称)
+
+    Raises:
+        ValueError: 条目格式无效或档位未定义
+    """
+    routes: Dict[str, Dict[str, str]] = {"model": {}, "key": {}}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        target, _, name = item.rpartition("=")
+        kind, _, value = target.partition(":")
+        kind, value, name = kind.strip(), value.strip(), name.strip()
+        if kind not in routes or not value or not name:
+            raise ValueError(f"输出档位路由无效: {item.strip()}, 格式为 model:模型=档位 或 key:API密钥=档位")
+        if name not in profiles:
+            raise ValueError(f"输出档位路由指向未定义的档位: {item.strip()}")
+        routes[kind][value] = name
+    return routes["model"], routes["key"]
+
+
+class ProfileRegistry:
+    """输出档位注册表"""
+
+    def __init__(
+        self,
+        profiles: Optional[Dict[str, OutputProfile]] = None,
+        model_routes: Optional[Dict[str, str]] = None,
+        key_routes: Optional[Dict[str, str]] = None
+    ):
+        """初始化注册表(配置在此解析并校验一次, 无效时启动即失败)
+
+        Args:
+            profiles: 档位名称 -> 档位, 默认读取 `OUTPUT_PROFILES`
+            model_routes: OpenAI模型 -> 档位名称, 默认读取 `OUTPUT_PROFILE_ROUTES`
+            key_routes: API密钥 -> 档位名称, 默认读取 `OUTPUT_PROFILE_ROUTES`
+
+        Raises:
+            ValueError: 档位或路由配置无效
+        """
+        self.profiles = parse_profiles(settings.OUTPUT_PROFILES) if profiles is None else profiles
+        if model_routes is None or key_routes is None:
+            parsed = parse_profile_routes(settings.OUTPUT_PROFILE_ROUTES, self.profiles)
+            model_routes = parsed[0] if model_routes is None else model_routes
+            key_routes = parsed[1] if key_routes is None else key_routes
+        self.model_routes = model_routes
+        self.key_routes = key_routes
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.profiles
+
+    @property
+    def default(self) -> OutputProfile:
+        """默认档位"""
+        return self.profiles[DEFAULT_PROFILE]
+
+    def get(self, name: str) -> OutputProfile:
+        """按名称获取档位
+
+        Args:
+            name: 档位名称
+
+        Returns:
+            输出档位
+
+        Raises:
+            TTSProxyError: 档位名称未知(400)
+        """
+        profile = self.profiles.get(name)
+        if profile is None:
+            raise TTSProxyError(f"未知的输出档位: {name}", "invalid_request_error", 400, "unknown_profile")
+        return profile
+
+    def resolve(self, request: OpenAISpeechRequest) -> OutputProfile:
+        """确定请求的输出档位
+
+        Args:
+            request: OpenAI格式的请求(`profile` 字段已由路由按请求头与API密钥填写)
+
+        Returns:
+            输出档位
+
+        Raises:
+            TTSProxyError: 档位名称未知(400)
+        """
+        return self.get(request.profile or self.model_routes.get(request.model, DEFAULT_PROFILE))
+
+    def stats(self) -> dict:
+        """获取档位配置
+
+        Returns:
+            档位名称 -> 参数
+        """
+        return {name: profile.__dict__ for name, profile in self.profiles.items()}
+
+
+# 全局档位注册表
+output_profiles = ProfileRegistry()
+
+
+__all__ = [
+    "OutputProfile",
+    "ProfileRegistry",
+    "output_profiles",
+    "parse_profiles",
+    "parse_profile_routes",
+    "profile_requests",
+    "profile_bytes",
+    "DEFAULT_PROFILE",
+]
@@ -0,0 +1,154 @@
+"""就绪与负载上报模块
+
+汇总本节点的实时负载供负载均衡器轮询: 上游在途调用与并发限制、排队深度、事件循环延迟、
+近期上游错误率、熔断状态与缓存占用, 并给出权重建议。全部读取内存中的计数,
+每次探测不访问上游。
+"""
+import asyncio
+import signal
+import threading
+from typing import List
+from app.services.audio_cache import AudioCache, audio_cache
+from app.services.circuit_breaker import HALF_OPEN, OPEN, CircuitBreaker, circuit_breaker
+from app.services.loop_monitor import LoopMonitor, loop_monitor
+from app.services.scheduler import UpstreamScheduler, scheduler
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+# 权重建议的上限(满载为1, 未就绪为0)
+MAX_WEIGHT = 100
+
+
+class Readiness:
+    """就绪状态与负载快照"""
+
+    def __init__(
+        self,
+        scheduler: UpstreamScheduler = scheduler,
+        monitor: LoopMonitor = loop_monitor,
+        breaker: CircuitBreaker = circuit_breaker,
+        cache: AudioCache = audio_cache
+    ):
+        self.scheduler = scheduler
+        self.monitor = monitor
+        self.breaker = breaker
+        self.cache = cache
+        self.draining = False
+
+    def start_drain(self) -> None:
+        """进入排空状态: 报告未就绪, 已有与新到的请求照常处理"""
+        if not self.draining:
+            logger.warning("进入排空状态, 就绪检查返回503")
+        self.draining = True
+
+    def stop_drain(self) -> None:
+        """退出排空状态"""
+        if self.draining:
+            logger.info("退出排空状态")
+        self.draining = False
+
+    def install_signal_handler(self, grace_seconds: float) -> bool:
+        """收到SIGTERM时先进入排空状态, `grace_seconds` 后再交给原有处理器关闭
+
+        服务器(uvicorn)收到SIGTERM后立即停止接收连接, 此时再报告未就绪已无意义;
+        在其处理器之前插入排空期, 负载均衡器在此期间经 `/ready` 摘除本节点, 请求照常处理。
+        排空期间再次收到SIGTERM时立即关闭。需要在事件循环中、主线程上调用。
+
+        Args:
+            grace_seconds: 排空时长(秒)
+
+        Returns:
+            是否已安装(不在主线程或SIGTERM未由服务器接管时不安装)
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return False
+        previous = signal.getsignal(signal.SIGTERM)
+        if not callable(previous):
+            return False
+        loop = asyncio.get_running_loop()
+        pending = []
+
+        def handle(signum, frame):
+            if pending:
+                previous(signum, frame)
+                return
+            self.start_drain()
+            logger.warning(f"收到SIGTERM, {grace_seconds:g}秒后关闭")
+            pending.append(loop.call_soon_threadsafe(loop.call_later, grace_seconds, previous, signum, frame))
+
+        signal.signal(signal.SIGTERM, handle)
+        return True
+
+    def snapshot(self) -> dict:
+        """计算当前就绪状态与负载
+
+        未就绪的原因: draining(排空中)、circuit_open(上游熔断)、loop_overloaded(事件循环过载)。
+        权重按剩余上游容量、近期上游成功率与事件循环余量相乘, 就绪时不低于1。
+
+        Returns:
+            状态字典
+        """
+        limit = max(1, self.scheduler.max_concurrency)
+        in_flight = self.scheduler.in_flight
+        queue_depth = self.scheduler.queue_depth
+        load = (in_flight + queue_depth) / limit
+
+        monitoring = self.monitor.running
+        lag = self.monitor.lag if monitoring else 0.0
+        shed = self.monitor.shed_threshold
+        lag_headroom = max(0.0, 1.0 - lag / shed) if monitoring and shed > 0 else 1.0
+
+        circuit = self.breaker.state
+        error_rate = self.breaker.error_rate
+
+        reasons: List[str] = []
+        if self.draining:
+            reasons.append("draining")
+        if circuit == OPEN:
+            reasons.append("circuit_open")
+        if self.monitor.overloaded:
+            reasons.append("loop_overloaded")
+        ready = not reasons
+
+        weight = 0
+        if ready:
+            score = max(0.0, 1.0 - load) * (1.0 - error_rate) * lag_headroom
+            if circuit == HALF_OPEN:
+                # 探测期间只分到少量流量
+                score *= 0.1
+            weight = max(1, round(MAX_WEIGHT * score))
+
+        cache_capacity = self.cache.max_bytes
+        return {
+            "status": "draining" if self.draining else "ready" if ready else "not_ready",
+            "ready": ready,
+            "reasons": reasons,
+            "weight": weight,
+            "upstream": {
+                "in_flight": in_flight,
+                "limit": limit,
+                "queue_depth": queue_depth,
+                "utilization": round(load, 4),
+                "error_rate": round(error_rate, 4),
+                "circuit": circuit,
+            },
+            "event_loop": {
+                "lag_seconds": round(lag, 6),
+                "shed_threshold": shed,
+            },
+            "cache": {
+                "entries": len(self.cache),
+                "bytes": self.cache.current_bytes,
+                "fill": round(self.cache.current_bytes / cache_capacity, 4) if cache_capacity > 0 else 0.0,
+                "hit_ratio": round(self.cache.stats()["hit_ratio"], 4),
+            },
+        }
+
+
+# 全局就绪状态实例
+readiness = Readiness()
+
+metrics.gauge("tts_draining", "是否处于排空状态", callback=lambda: int(readiness.draining))
+
+
+__all__ = ["Readiness", "readiness", "MAX_WEIGHT"]
@@ -0,0 +1,233 @@
+"""实时语音会话模块
+
+WebSocket连接上的增量文本转语音: 文本增量到达时分句, 每个完整句子立即提交合成
+(后续句子与当前句子的发送并行合成), 音频按句子顺序写回同一连接。
+
+客户端消息(JSON):
+- {"type": "session.update", "voice": ..., "model": ..., "response_format": ..., "speed": ..., "profile": ...}
+- {"type": "input_text.delta", "delta": "..."}
+- {"type": "input_text.flush"}: 立即合成尚未断句的文本
+- {"type": "input_text.close"}: 合成剩余文本, 发送完所有音频后关闭连接
+
+服务端消息:
+- 二进制帧: 音频数据(按句子顺序, 每帧在可解码边界结束)
+- {"type": "session.updated", "session": {...}}
+- {"type": "segment.start", "index": n, "text": "..."} / {"type": "segment.done", "index": n, "cache": "hit|miss|shared"}
+- {"type": "error", "error": {...}}: 单个句子失败或消息无法解析时不中断会话
+- {"type": "done", "segments": n}
+"""
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set, Tuple
+from pydantic import ValidationError
+from starlette.websockets import WebSocketDisconnect
+from app.models.openai_models import OpenAISpeechRequest
+from app.config import settings
+from app.services.framing import wav_header
+from app.services.profiles import output_profiles
+from app.services.segmenter import SentenceSegmenter
+from app.services.speech_service import SpeechService, SpeechStream, speech_service
+from app.utils.errors import TTSProxyError, format_error_response
+from app.utils.logger import logger
+
+# 会话可配置的字段及默认值
+SESSION_DEFAULTS: Dict[str, Any] = {
+    "model": "gpt-4o-mini-tts",
+    "voice": "alloy",
+    "response_format": "mp3",
+    "speed": 1.0,
+    "profile": None,
+}
+
+
+def _error_message(message: str, code: str) -> dict:
+    return {
+        "type": "error",
+        "error": {"message": message, "type": "invalid_request_error", "code": code}
+    }
+
+
+class RealtimeSession:
+    """单个WebSocket连接上的实时语音会话"""
+
+    def __init__(
+        self,
+        websocket,
+        priority: str,
+        config: Optional[Dict[str, Any]] = None,
+        service: SpeechService = speech_service,
+        max_inflight: Optional[int] = None
+    ):
+        """初始化会话
+
+        Args:
+            websocket: 已接受的WebSocket连接
+            priority: 上游调度优先级类别
+            config: 初始会话配置(音色、模型、格式、语速)
+            service: 语音合成服务
+            max_inflight: 同时合成的句子数, 默认读取配置
+        """
+        self.websocket = websocket
+        self.priority = priority
+        self.service = service
+        self.config = dict(SESSION_DEFAULTS)
+        self.segmenter = SentenceSegmenter()
+        self.dispatched = 0
+        self._slots = asyncio.Semaphore(max_inflight or settings.REALTIME_MAX_INFLIGHT_SEGMENTS)
+        # 按提交顺序排列的 (序号, 文本, 合成任务); None 表示输入结束
+        self._order: "asyncio.Queue[Optional[Tuple[int, str, asyncio.Task]]]" = asyncio.Queue()
+        self._tasks: Set[asyncio.Task] = set()
+        if config:
+            self.update(config)
+
+    def update(self, config: Dict[str, Any]) -> None:
+        """更新会话配置
+
+        Args:
+            config: 待更新的字段
+
+        Raises:
+            ValueError: 配置无效或在已开始合成后修改音频格式、输出档位
+        """
+        updated = dict(self.config)
+        updated.update({key: value for key, value in config.items() if key in SESSION_DEFAULTS})
+        try:
+            OpenAISpeechRequest(input="-", **updated)
+        except ValidationError as e:
+            raise ValueError(e.errors()[0]["msg"]) from None
+        if updated["profile"] is not None and updated["profile"] not in output_profiles:
+            raise ValueError(f"未知的输出档位: {updated['profile']}")
+        if self.dispatched and updated["response_format"] != self.config["response_format"]:
+            raise ValueError("已开始合成后不能修改音频格式")
+        if self.dispatched and updated["profile"] != self.config["profile"]:
+            raise ValueError("已开始合成后不能修改输出档位")
+        self.config = updated
+
+    def _request(self, text: str) -> OpenAISpeechRequest:
+        fields = dict(self.config)
+        if fields["response_format"] == "wav":
+            # 每句单独合成会各带一个WAV头; 改为合成PCM, 会话开头发送一个流式WAV头
+            fields["response_format"] = "pcm"
+        return OpenAISpeechRequest(input=text, **fields)
+
+    async def _dispatch(self, text: str) -> None:
+        """提交一个句子的合成"""
+        await self._slots.acquire()
+        index = self.dispatched
+        self.dispatched += 1
+        task = asyncio.create_task(self.service.stream(self._request(text), self.priority))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._order.put_nowait((index, text, task))
+
+    async def _send_loop(self) -> None:
+        """按提交顺序发送各句子的音频"""
+        while True:
+            item = await self._order.get()
+            if item is None:
+                break
+            index, text, task = item
+            try:
+                if index == 0 and self.config["response_format"] == "wav":
+                    await self.websocket.send_bytes(wav_header(self.service.builder.build(self._request(text)).sample_rate))
+                await self.websocket.send_json({"type": "segment.start", "index": index, "text": text})
+                stream: SpeechStream = await task
+                try:
+                    async for chunk in stream.chunks:
+                        await self.websocket.send_bytes(chunk)
+                finally:
+                    # 发送失败或会话取消时立即释放上游流
+                    await stream.chunks.aclose()
+                await self.websocket.send_json(
+                    {"type": "segment.done", "index": index, "cache": stream.cache_status}
+                )
+            except TTSProxyError as e:
+                logger.error(f"实时合成失败: index={index}, {e.message}")
+                payload = format_error_response(e)
+                payload.update({"type": "error", "index": index})
+                await self.websocket.send_json(payload)
+            finally:
+                self._slots.release()
+        await self.websocket.send_json({"type": "done", "segments": self.dispatched})
+
+    async def _receive(self) -> Optional[Dict[str, Any]]:
+        """接收一条客户端消息
+
+        Returns:
+            JSON对象; 二进制帧、无法解析或不是对象时返回None
+
+        Raises:
+            WebSocketDisconnect: 客户端断开
+        """
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+        try:
+            data = json.loads(message.get("text") or "")
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    async def _handle(self, message: Dict[str, Any]) -> bool:
+        """处理一条客户端消息
+
+        Returns:
+            是否结束输入
+        """
+        kind = message.get("type")
+        if kind == "input_text.delta":
+            for sentence in self.segmenter.feed(str(message.get("delta", ""))):
+                await self._dispatch(sentence)
+        elif kind == "input_text.flush":
+            for sentence in self.segmenter.flush():
+                await self._dispatch(sentence)
+        elif kind == "input_text.close":
+            for sentence in self.segmenter.flush():
+                await self._dispatch(sentence)
+            return True
+        elif kind == "session.update":
+            try:
+                self.update(message)
+            except ValueError as e:
+                await self.websocket.send_json(_error_message(str(e), "invalid_session"))
+            else:
+                await self.websocket.send_json({"type": "session.updated", "session": self.config})
+        else:
+            await self.websocket.send_json(_error_message(f"未知的消息类型: {kind}", "unknown_message_type"))
+        return False
+
+    async def _receive_loop(self) -> None:
+        """接收客户端消息直到关闭输入"""
+        while True:
+            message = await self._receive()
+            if message is None:
+                await self.websocket.send_json(_error_message("消息必须是JSON对象", "invalid_message"))
+                continue
+            if await self._handle(message):
+                break
+        self._order.put_nowait(None)
+
+    async def run(self) -> None:
+        """运行会话直到客户端关闭输入或断开连接
+
+        客户端断开(`WebSocketDisconnect`)时取消所有未完成的合成后重新抛出。
+        发送循环异常结束(如连接已不可写)时停止接收, 不再等待合成槽位, 并重新抛出该异常。
+        """
+        sender = asyncio.create_task(self._send_loop())
+        receiver = asyncio.create_task(self._receive_loop())
+        try:
+            await asyncio.wait((sender, receiver), return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                receiver.result()
+                await sender
+            else:
+                receiver.cancel()
+                sender.result()
+        finally:
+            sender.cancel()
+            receiver.cancel()
+            for task in list(self._tasks):
+                task.cancel()
+
+
+__all__ = ["RealtimeSession", "SESSION_DEFAULTS"]
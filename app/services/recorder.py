@@ -0,0 +1,159 @@
+"""上游流量录制模块
+
+启用 `DOUBAO_RECORD_DIR` 后, 每次豆包请求的原始NDJSON响应流连同块间时间戳、
+请求/响应头(凭证脱敏)写入一个JSONL轨迹文件, 供 `benchmarks/replay_server.py` 回放。
+
+轨迹格式(每行一个JSON对象):
+- 第1行 {"type": "request", "url", "headers", "body", "started_at"}
+- {"type": "response", "t", "status", "headers"}
+- {"type": "chunk", "t", "data"}: 原始响应文本块, t 为相对请求开始的秒数
+- {"type": "end", "t", "error"}
+
+记录先在内存中缓冲, 累计到 `FLUSH_BYTES` 或请求结束时在线程池中追加写入文件,
+事件循环上不做文件IO; 内存中最多保留约 `FLUSH_BYTES` 的未写入数据。
+"""
+import asyncio
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+from app.config import settings
+from app.utils.logger import logger
+
+# 需要脱敏的请求/响应头(小写)
+REDACTED_HEADERS = frozenset({
+    "x-api-app-id",
+    "x-api-access-key",
+    "authorization",
+    "cookie",
+    "set-cookie",
+})
+REDACTED = "***"
+
+# 缓冲达到该字节数(按字符数估算)时写入文件
+FLUSH_BYTES = 64 * 1024
+
+
+def redact_headers(headers: Mapping[str, str]) -> Dict[str, str]:
+    """返回凭证脱敏后的请求头副本"""
+    return {
+        key: REDACTED if key.lower() in REDACTED_HEADERS else value
+        for key, value in headers.items()
+    }
+
+
+class TraceWriter:
+    """单个请求的轨迹写入器(需要在事件循环中使用)"""
+
+    def __init__(self, path: Path, url: str, headers: Mapping[str, str], body: bytes):
+        self.path = path
+        self._start = time.monotonic()
+        self._buffer: List[str] = []
+        self._buffered = 0
+        # 最近一次写入任务; 各次写入按顺序串行执行
+        self._pending: Optional[asyncio.Task] = None
+        self._closed = False
+        self._write({
+            "type": "request",
+            "url": url,
+            "headers": redact_headers(headers),
+            "body": json.loads(body),
+            "started_at": time.time(),
+        })
+
+    def _elapsed(self) -> float:
+        return round(time.monotonic() - self._start, 6)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self._buffer.append(line)
+        self._buffered += len(line)
+        if self._buffered >= FLUSH_BYTES:
+            self._flush()
+
+    def _flush(self) -> None:
+        """把缓冲的记录交给后台写入"""
+        if not self._buffer:
+            return
+        data = "".join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+        self._pending = asyncio.ensure_future(self._append(self._pending, data))
+
+    async def _append(self, previous: Optional[asyncio.Task], data: str) -> None:
+        if previous is not None:
+            await previous
+        try:
+            await asyncio.to_thread(self._append_sync, data)
+        except OSError as e:
+            logger.warning(f"无法写入上游轨迹: {e}")
+
+    def _append_sync(self, data: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(data)
+
+    def response(self, status: int, headers: Mapping[str, str]) -> None:
+        """记录响应状态与响应头"""
+        self._write({
+            "type": "response",
+            "t": self._elapsed(),
+            "status": status,
+            "headers": redact_headers(headers),
+        })
+
+    def chunk(self, data: str) -> None:
+        """记录一个原始响应文本块"""
+        self._write({"type": "chunk", "t": self._elapsed(), "data": data})
+
+    async def close(self, error: Optional[BaseException] = None) -> None:
+        """结束录制, 等待剩余记录写入文件"""
+        if self._closed:
+            return
+        self._closed = True
+        self._write({"type": "end", "t": self._elapsed(), "error": repr(error) if error else None})
+        self._flush()
+        if self._pending is not None:
+            await asyncio.shield(self._pending)
+
+
+class TraceRecorder:
+    """上游流量录制器"""
+
+    def __init__(self, directory: Optional[str] = None):
+        """初始化录制器
+
+        Args:
+            directory: 轨迹目录, 默认读取配置, 为空表示不录制
+        """
+        self.directory = Path(directory) if directory else (
+            Path(settings.DOUBAO_RECORD_DIR) if settings.DOUBAO_RECORD_DIR else None
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def start(self, url: str, headers: Mapping[str, str], body: bytes) -> Optional[TraceWriter]:
+        """开始录制一个请求
+
+        Args:
+            url: 上游URL
+            headers: 请求头(写入前脱敏)
+            body: 请求体
+
+        Returns:
+            轨迹写入器, 未启用时返回None(目录不可写时在写入时记录警告)
+        """
+        if self.directory is None:
+            return None
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:12]}.jsonl"
+        return TraceWriter(self.directory / name, url, headers, body)
+
+
+# 全局录制器实例
+recorder = TraceRecorder()
+
+
+__all__ = ["TraceRecorder", "TraceWriter", "recorder", "redact_headers", "REDACTED"]
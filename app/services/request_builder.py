@@ -0,0 +1,183 @@
+"""上游请求构建模块
+
+从已校验的OpenAI请求直接生成发往豆包V3的JSON请求体(bytes),
+跳过逐请求构建嵌套Pydantic模型与重复序列化。
+
+请求体由按 (voice, format, 输出档位) 预计算的前缀片段 + 语速 + 文本拼接而成;
+`ParameterConverter.convert` 产出的模型仍作为参考实现, 两者序列化结果等价。
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.models.doubao_models import DoubaoV3TTSRequest, DoubaoV3User
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.converter import ParameterConverter, converter
+from app.services.profiles import OutputProfile
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+
+def _json_dumps_stdlib(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def get_json_dumps() -> Callable[[Any], bytes]:
+    """获取JSON序列化函数, 已安装orjson且未禁用时使用orjson"""
+    if orjson is not None and settings.ENABLE_ORJSON:
+        return orjson.dumps
+    return _json_dumps_stdlib
+
+
+@dataclass(frozen=True)
+class PreparedTTSRequest:
+    """已序列化的豆包V3请求
+
+    Attributes:
+        body: JSON请求体
+        text: 待合成文本
+        speaker: 豆包音色ID
+        format: 豆包音频格式
+        speech_rate: 豆包语速
+        sample_rate: 采样率
+        bit_rate: 比特率(仅MP3)
+        resource_id: 豆包资源ID
+        model: 豆包模型版本
+    """
+    body: bytes
+    text: str
+    speaker: str
+    format: str
+    speech_rate: int
+    sample_rate: int
+    bit_rate: Optional[int]
+    resource_id: str
+    model: Optional[str] = None
+
+    @cached_property
+    def cache_key(self) -> str:
+        """缓存键: 影响合成结果的全部参数的sha256
+
+        不依赖请求体的字段顺序, 由模型或构建器生成的等价请求得到相同的键。
+        """
+        raw = json.dumps(
+            [self.resource_id, self.model, self.speaker, self.format,
+             self.sample_rate, self.bit_rate, self.speech_rate, self.text],
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RequestBuilder:
+    """豆包V3请求体构建器"""
+
+    def __init__(self, converter: ParameterConverter = converter):
+        """初始化构建器
+
+        Args:
+            converter: 提供音色/格式/语速映射的参数转换器
+        """
+        self.converter = converter
+        self._dumps = get_json_dumps()
+        self._user = self._dumps(DoubaoV3User().model_dump())
+        # (voice, response_format, 档位名称) -> (请求体前缀, 豆包音色, 豆包格式)
+        self._fragments: Dict[Tuple[str, str, str], Tuple[bytes, str, str]] = {}
+
+    def _fragment(self, voice: str, response_format: str, profile: OutputProfile) -> Tuple[bytes, str, str]:
+        """获取(必要时生成)音色、格式与输出档位对应的请求体前缀"""
+        key = (voice, response_format, profile.name)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            speaker = self.converter.map_voice(voice)
+            doubao_format = self.converter.map_format(response_format)
+            audio_params = {"format": doubao_format, "sample_rate": profile.sample_rate}
+            if response_format == "mp3":
+                audio_params["bit_rate"] = profile.bit_rate
+            if settings.DOUBAO_ENABLE_TIMESTAMP:
+                audio_params["enable_timestamp"] = True
+            # 去掉末尾的 "}", 之后拼接 speech_rate 字段
+            audio_prefix = self._dumps(audio_params)[:-1]
+            model = b'"model":' + self._dumps(profile.model) + b"," if profile.model else b""
+            prefix = (
+                b'{"user":' + self._user
+                + b',"req_params":{' + model + b'"speaker":' + self._dumps(speaker)
+                + b',"audio_params":' + audio_prefix + b',"speech_rate":'
+            )
+            fragment = (prefix, speaker, doubao_format)
+            self._fragments[key] = fragment
+        return fragment
+
+    def build(
+        self,
+        request: OpenAISpeechRequest,
+        text: Optional[str] = None
+    ) -> PreparedTTSRequest:
+        """由OpenAI请求构建豆包请求体
+
+        Args:
+            request: OpenAI格式的请求
+            text: 覆盖请求中的文本(如规范化后的文本或剩余文本)
+
+        Returns:
+            已序列化的请求
+            
+        Raises:
+            TTSProxyError: 输出档位未知
+        """
+        text = request.input if text is None else text
+        profile = self.converter.profiles.resolve(request)
+        prefix, speaker, doubao_format = self._fragment(
+            request.voice, request.response_format or "mp3", profile
+        )
+        speech_rate = self.converter.map_speed_to_v3(request.speed or 1.0)
+        body = (
+            prefix + str(speech_rate).encode("ascii")
+            + b'},"text":' + self._dumps(text) + b"}}"
+        )
+        return PreparedTTSRequest(
+            body=body,
+            text=text,
+            speaker=speaker,
+            format=doubao_format,
+            speech_rate=speech_rate,
+            sample_rate=profile.sample_rate,
+            bit_rate=profile.bit_rate if (request.response_format or "mp3") == "mp3" else None,
+            resource_id=profile.resource_id,
+            model=profile.model,
+        )
+
+    def from_model(self, request: DoubaoV3TTSRequest, resource_id: Optional[str] = None) -> PreparedTTSRequest:
+        """由参考实现的请求模型构建请求体
+
+        Args:
+            request: 豆包V3 TTS请求模型
+            resource_id: 豆包资源ID(在请求头中, 不在模型内), 默认读取配置
+
+        Returns:
+            已序列化的请求
+        """
+        params = request.req_params
+        return PreparedTTSRequest(
+            body=self._dumps(request.model_dump(exclude_none=True)),
+            text=params.text,
+            speaker=params.speaker,
+            format=params.audio_params.format,
+            speech_rate=params.audio_params.speech_rate,
+            sample_rate=params.audio_params.sample_rate,
+            bit_rate=params.audio_params.bit_rate,
+            resource_id=resource_id or settings.DOUBAO_RESOURCE_ID,
+            model=params.model,
+        )
+
+
+# 全局构建器实例
+request_builder = RequestBuilder()
+
+
+__all__ = ["PreparedTTSRequest", "RequestBuilder", "request_builder", "get_json_dumps"]
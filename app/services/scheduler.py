@@ -0,0 +1,355 @@
+"""上游调用调度模块
+
+在豆包上游调用前排队, 按优先级类别加权公平分配并发槽位,
+同类别内短任务优先(SJF), 并对等待过久的任务做防饿死处理。
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, List, Optional
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+
+# 优先级类别, 按优先级从高到低排列
+PRIORITY_CLASSES = ("interactive", "standard", "bulk")
+# 空闲类别(预取): 不参与加权, 只在没有其他任务排队且有非预留空闲槽位时派发
+IDLE_PRIORITY = "idle"
+
+# 不同格式的相对开销(输出体积越大, 传输与解码开销越高)
+FORMAT_COST_FACTORS: Dict[str, float] = {
+    "mp3": 1.0,
+    "opus": 1.0,
+    "aac": 1.0,
+    "flac": 1.5,
+    "wav": 2.0,
+    "pcm": 2.0,
+}
+
+
+def estimate_cost(text_length: int, response_format: str = "mp3") -> float:
+    """估算一次合成的开销
+
+    合成时长近似与文本长度成正比, 并叠加固定的首包开销。
+
+    Args:
+        text_length: 文本长度(字符数)
+        response_format: OpenAI音频格式
+
+    Returns:
+        相对开销(无量纲)
+    """
+    return (20 + text_length) * FORMAT_COST_FACTORS.get(response_format, 1.0)
+
+
+@dataclass(order=True)
+class _Waiter:
+    """排队中的任务"""
+    cost: float
+    seq: int
+    priority: str = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+@dataclass
+class SlotTicket:
+    """一次槽位申请
+
+    由调用方创建并传给 `slot`, 排队期间可通过 `UpstreamScheduler.promote` 提升优先级
+    (例如预取发起的合成被交互请求合并时)。
+    """
+    priority: str
+    cost: float
+    future: Optional[asyncio.Future] = None
+
+
+class UpstreamScheduler:
+    """上游调用调度器
+
+    - 类别间: 按权重的开始时间公平排队(SFQ), 权重高的类别获得更多槽位
+    - 类别内: 开销小的任务优先
+    - 预留槽位: 部分槽位只分配给最高优先级类别, 长任务占满时短交互请求仍可立即执行
+    - 防饿死: 等待超过阈值的任务无视权重与开销, 按入队顺序优先派发
+    - 空闲类别: 只使用其他类别都不需要的槽位, 按入队顺序派发, 不受防饿死保护
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        weights: Optional[Dict[str, float]] = None,
+        starvation_seconds: Optional[float] = None,
+        reserved_slots: Optional[int] = None
+    ):
+        """初始化调度器
+
+        Args:
+            max_concurrency: 最大并发上游调用数, 默认读取配置
+            weights: 各类别权重, 默认读取配置
+            starvation_seconds: 防饿死等待阈值(秒), 默认读取配置
+            reserved_slots: 仅供最高优先级类别使用的槽位数, 默认读取配置
+        """
+        self.max_concurrency = max_concurrency or settings.MAX_CONCURRENT_REQUESTS
+        self.weights = weights or settings.get_scheduler_weights()
+        self.starvation_seconds = (
+            settings.SCHEDULER_STARVATION_SECONDS
+            if starvation_seconds is None else starvation_seconds
+        )
+        self.reserved_slots = (
+            settings.SCHEDULER_RESERVED_SLOTS if reserved_slots is None else reserved_slots
+        )
+        # 权重表中排在最前的类别视为最高优先级
+        self.top_class = next(iter(self.weights))
+        self.in_flight = 0
+        self._queues: Dict[str, List[_Waiter]] = {name: [] for name in self.weights}
+        # 每个类别下一个任务的虚拟结束时间, 与全局虚拟时间共同决定派发顺序
+        self._pass: Dict[str, float] = {name: 0.0 for name in self.weights}
+        self._virtual_time = 0.0
+        # 优先级从高到低, 空闲类别最低
+        self._ranks: Dict[str, int] = {name: rank for rank, name in enumerate([*self.weights, IDLE_PRIORITY])}
+        self._seq = itertools.count()
+        self._idle: Deque[asyncio.Future] = deque()
+        self.dispatched: Dict[str, int] = {name: 0 for name in self.weights}
+        self.dispatched[IDLE_PRIORITY] = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """排队中的任务数"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def idle_depth(self) -> int:
+        """等待空闲槽位的任务数(不计入排队数)"""
+        return len(self._idle)
+
+    def _has_capacity(self, priority: str) -> bool:
+        """类别当前是否可获得槽位"""
+        if priority == self.top_class:
+            return self.in_flight < self.max_concurrency
+        reserved = min(self.reserved_slots, self.max_concurrency - 1)
+        return self.in_flight < self.max_concurrency - reserved
+
+    def _start_tag(self, priority: str) -> float:
+        return max(self._pass[priority], self._virtual_time)
+
+    def _pop_starved(self, now: float) -> Optional[_Waiter]:
+        """取出等待最久且超过防饿死阈值的任务"""
+        oldest: Optional[_Waiter] = None
+        for queue in self._queues.values():
+            for waiter in queue:
+                if oldest is None or waiter.enqueued_at < oldest.enqueued_at:
+                    oldest = waiter
+        if oldest is None or now - oldest.enqueued_at < self.starvation_seconds:
+            return None
+        if not self._has_capacity(oldest.priority):
+            return None
+        queue = self._queues[oldest.priority]
+        queue.remove(oldest)
+        heapq.heapify(queue)
+        return oldest
+
+    def _pop_next(self) -> Optional[_Waiter]:
+        """选择开始时间最早的类别, 再取该类别开销最小的任务"""
+        waiter = self._pop_starved(time.monotonic())
+        if waiter is not None:
+            return waiter
+
+        active = [
+            name for name, queue in self._queues.items()
+            if queue and self._has_capacity(name)
+        ]
+        if not active:
+            return None
+        name = min(active, key=self._start_tag)
+        return heapq.heappop(self._queues[name])
+
+    def _idle_available(self) -> bool:
+        """是否有可分给空闲类别的槽位"""
+        return self.queue_depth == 0 and self._has_capacity(IDLE_PRIORITY)
+
+    def _dispatch(self) -> None:
+        """在有空闲槽位时派发排队任务, 其余槽位再分给空闲类别"""
+        while self.in_flight < self.max_concurrency:
+            waiter = self._pop_next()
+            if waiter is None:
+                break
+            if waiter.future.done():
+                # 等待期间已被取消
+                continue
+            self._charge(waiter.priority, waiter.cost)
+            waiter.future.set_result(None)
+        while self._idle and self._idle_available():
+            future = self._idle.popleft()
+            if not future.done():
+                self.dispatched[IDLE_PRIORITY] += 1
+                self.in_flight += 1
+                future.set_result(None)
+
+    def _charge(self, priority: str, cost: float) -> None:
+        """占用槽位并推进类别的虚拟时间"""
+        start = self._start_tag(priority)
+        self._virtual_time = start
+        self._pass[priority] = start + cost / self.weights[priority]
+        self.dispatched[priority] += 1
+        self.in_flight += 1
+
+    async def acquire(self, priority: str, cost: float, ticket: Optional[SlotTicket] = None) -> None:
+        """获取上游调用槽位
+
+        Args:
+            priority: 优先级类别
+            cost: 任务开销估计
+            ticket: 槽位申请, 给出时以其中的优先级与开销为准, 排队期间可被提升
+        """
+        if ticket is None:
+            ticket = SlotTicket(priority, cost)
+        if ticket.priority != IDLE_PRIORITY and ticket.priority not in self._queues:
+            ticket.priority = settings.DEFAULT_PRIORITY
+        priority = ticket.priority
+
+        if priority == IDLE_PRIORITY:
+            if not self._idle and self._idle_available():
+                # 空闲类别不推进虚拟时间, 不影响其他类别的公平分配
+                self.dispatched[IDLE_PRIORITY] += 1
+                self.in_flight += 1
+                return
+            ticket.future = asyncio.get_running_loop().create_future()
+            self._idle.append(ticket.future)
+        elif self._has_capacity(priority) and not self._queues[priority]:
+            self._charge(priority, ticket.cost)
+            return
+        else:
+            ticket.future = asyncio.get_running_loop().create_future()
+            self._enqueue(ticket, time.monotonic())
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # 已分配槽位但调用方被取消, 归还槽位
+                self.release()
+            else:
+                self._discard(ticket)
+            raise
+
+    def promote(self, ticket: SlotTicket, priority: str) -> None:
+        """提升槽位申请的优先级
+
+        尚在排队的申请移入新类别的队列并立即尝试派发; 尚未开始排队的申请在排队时使用新类别;
+        已获得槽位或新类别不高于当前类别时不做任何事。
+
+        Args:
+            ticket: 槽位申请
+            priority: 新的优先级类别
+        """
+        if priority not in self._queues or self._ranks[priority] >= self._ranks.get(ticket.priority, len(self._ranks)):
+            return
+        if ticket.future is None:
+            ticket.priority = priority
+            return
+        if ticket.future.done():
+            return
+        enqueued_at = self._discard(ticket)
+        ticket.priority = priority
+        self._enqueue(ticket, enqueued_at or time.monotonic())
+        logger.debug(f"上游调度提升优先级: priority={priority}, cost={ticket.cost:.0f}")
+        self._dispatch()
+
+    def _enqueue(self, ticket: SlotTicket, enqueued_at: float) -> None:
+        waiter = _Waiter(
+            cost=ticket.cost,
+            seq=next(self._seq),
+            priority=ticket.priority,
+            enqueued_at=enqueued_at,
+            future=ticket.future,
+        )
+        heapq.heappush(self._queues[ticket.priority], waiter)
+
+    def _discard(self, ticket: SlotTicket) -> Optional[float]:
+        """从队列中移除申请, 返回其入队时间(空闲类别没有入队时间)"""
+        if ticket.priority == IDLE_PRIORITY:
+            if ticket.future in self._idle:
+                self._idle.remove(ticket.future)
+            return None
+        queue = self._queues[ticket.priority]
+        for waiter in queue:
+            if waiter.future is ticket.future:
+                queue.remove(waiter)
+                heapq.heapify(queue)
+                return waiter.enqueued_at
+        return None
+
+    def set_max_concurrency(self, value: int) -> None:
+        """调整并发槽位数, 增加时立即派发排队任务
+
+        Args:
+            value: 新的槽位数
+        """
+        self.max_concurrency = max(1, value)
+        self._dispatch()
+
+    def release(self) -> None:
+        """归还上游调用槽位"""
+        self.in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: str,
+        cost: float,
+        ticket: Optional[SlotTicket] = None
+    ) -> AsyncIterator[None]:
+        """在上下文内占用一个上游调用槽位
+
+        Args:
+            priority: 优先级类别
+            cost: 任务开销估计
+            ticket: 槽位申请, 给出时以其中的优先级与开销为准, 排队期间可被提升
+        """
+        start = time.monotonic()
+        await self.acquire(priority, cost, ticket)
+        waited = time.monotonic() - start
+        if waited > 1.0:
+            logger.debug(f"上游调度等待: priority={priority}, cost={cost:.0f}, waited={waited:.2f}s")
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """获取调度统计
+
+        Returns:
+            统计信息字典
+        """
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "reserved_slots": self.reserved_slots,
+            "queue_depth": self.queue_depth,
+            "queued": {name: len(queue) for name, queue in self._queues.items()},
+            "idle_waiting": self.idle_depth,
+            "dispatched": dict(self.dispatched),
+        }
+
+
+# 全局调度器实例
+scheduler = UpstreamScheduler()
+
+metrics.gauge("tts_upstream_in_flight", "进行中的上游调用数", callback=lambda: scheduler.in_flight)
+metrics.gauge("tts_upstream_queue_depth", "排队等待上游槽位的请求数", callback=lambda: scheduler.queue_depth)
+
+
+__all__ = [
+    "PRIORITY_CLASSES",
+    "IDLE_PRIORITY",
+    "UpstreamScheduler",
+    "scheduler",
+    "estimate_cost",
+]
@@ -0,0 +1,100 @@
+"""增量分句模块
+
+接收逐token到达的文本, 尽早切出完整的句子供合成, 无需等待全文
+"""
+from typing import List, Optional
+from app.config import settings
+
+# 句末标点
+TERMINATORS = frozenset("。！？；!?;…\n.")
+# 句末标点后可能紧跟的右引号/右括号, 归入当前句
+CLOSERS = frozenset("\"'”’)）】」』》")
+# 超长句的软切分点
+SOFT_BREAKS = frozenset("，,、：:— \t")
+
+
+class SentenceSegmenter:
+    """增量分句器
+
+    - 句末标点后出现下一个非标点字符时确认断句(句末的连续标点与右引号归入当前句)
+    - 英文句点仅在其后为空白时断句, 避免切开小数与缩写
+    - 短于 `min_chars` 的句子与后文合并, 减少上游调用次数
+    - 超过 `max_chars` 仍无句末标点时在最后一个逗号/空白处切分
+    """
+
+    def __init__(self, min_chars: Optional[int] = None, max_chars: Optional[int] = None):
+        """初始化分句器
+
+        Args:
+            min_chars: 句子最少字符数, 默认读取配置
+            max_chars: 句子最多字符数, 默认读取配置
+        """
+        self.min_chars = settings.REALTIME_MIN_SEGMENT_CHARS if min_chars is None else min_chars
+        self.max_chars = max_chars or settings.REALTIME_MAX_SEGMENT_CHARS
+        self._buffer = ""
+        # 下次扫描的起始位置, 避免重复扫描已确认不是断句点的文本
+        self._pos = 0
+
+    def feed(self, delta: str) -> List[str]:
+        """输入一段增量文本
+
+        Args:
+            delta: 新到达的文本
+
+        Returns:
+            新确认的完整句子(可能为空)
+        """
+        buffer = self._buffer + delta
+        sentences: List[str] = []
+        start = 0
+        i = self._pos
+        while i < len(buffer):
+            if buffer[i] not in TERMINATORS:
+                i += 1
+                continue
+            end = i + 1
+            while end < len(buffer) and (buffer[end] in TERMINATORS or buffer[end] in CLOSERS):
+                end += 1
+            if end == len(buffer):
+                # 尚不确定标点之后的内容, 等待更多文本
+                break
+            run = buffer[i:end]
+            if all(ch == "." or ch in CLOSERS for ch in run) and not buffer[end].isspace():
+                i = end
+                continue
+            sentence = buffer[start:end].strip()
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = end
+            i = end
+
+        while len(buffer) - start > self.max_chars:
+            window = buffer[start:start + self.max_chars]
+            cut = max(window.rfind(ch) for ch in SOFT_BREAKS) + 1 or self.max_chars
+            sentence = buffer[start:start + cut].strip()
+            if sentence:
+                sentences.append(sentence)
+            start += cut
+
+        self._buffer = buffer[start:]
+        self._pos = max(0, i - start)
+        return sentences
+
+    def flush(self) -> List[str]:
+        """取出缓冲区中剩余的文本
+
+        Returns:
+            剩余文本(非空时为单个句子)
+        """
+        rest = self._buffer.strip()
+        self._buffer = ""
+        self._pos = 0
+        return [rest] if rest else []
+
+    @property
+    def pending(self) -> str:
+        """尚未切出的文本"""
+        return self._buffer
+
+
+__all__ = ["SentenceSegmenter"]
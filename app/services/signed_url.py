@@ -0,0 +1,108 @@
+"""签名URL模块
+
+把合成参数(模型、文本、音色、格式、语速、输出档位)编码为确定性的GET地址, 并以HMAC签名防止篡改。
+相同参数总是得到相同的URL, HTTP缓存与CDN可以直接缓存响应, 重复请求不再到达代理。
+
+地址形如 `/v1/audio/speech/signed/<参数>.<签名>.<格式>`:
+参数为紧凑JSON的base64url编码, 签名为 HMAC-SHA256 的前16字节(base64url)。
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+from typing import Optional
+from pydantic import ValidationError
+from app.config import settings
+from app.models.openai_models import OpenAISpeechRequest
+from app.utils.errors import TTSProxyError
+
+# 编码进URL的请求字段
+SIGNED_FIELDS = ("model", "input", "voice", "response_format", "speed", "profile")
+
+# 签名长度(字节)
+SIGNATURE_BYTES = 16
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _invalid() -> TTSProxyError:
+    return TTSProxyError("无效的签名URL", "authentication_error", 403)
+
+
+class URLSigner:
+    """签名URL的生成与校验"""
+
+    def __init__(self, secret: Optional[str] = None):
+        """初始化签名器
+
+        Args:
+            secret: 签名密钥, 默认读取配置
+        """
+        self.secret = (secret or settings.SIGNED_URL_SECRET or "").encode("utf-8")
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用(配置了密钥)"""
+        return bool(self.secret)
+
+    def _signature(self, payload: str) -> str:
+        digest = hmac.new(self.secret, payload.encode("ascii"), hashlib.sha256).digest()
+        return _b64encode(digest[:SIGNATURE_BYTES])
+
+    def sign(self, request: OpenAISpeechRequest) -> str:
+        """生成签名文件名(相同参数总是得到相同结果)
+
+        Args:
+            request: OpenAI格式的请求(建议先规范化文本, 使等价的文本得到同一URL)
+
+        Returns:
+            `<参数>.<签名>.<格式>`
+        """
+        fields = request.model_dump(include=set(SIGNED_FIELDS))
+        fields["response_format"] = fields["response_format"] or "mp3"
+        fields["speed"] = fields["speed"] or 1.0
+        data = json.dumps(fields, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        payload = _b64encode(data.encode("utf-8"))
+        return f"{payload}.{self._signature(payload)}.{fields['response_format']}"
+
+    def verify(self, name: str) -> OpenAISpeechRequest:
+        """校验签名文件名并还原请求
+
+        Args:
+            name: `sign` 生成的文件名
+
+        Returns:
+            OpenAI格式的请求
+
+        Raises:
+            TTSProxyError: 未启用、签名不匹配或参数无效(403)
+        """
+        parts = name.split(".")
+        # 合法地址只含base64url字符, 非ASCII字符无法参与签名比较
+        if not self.enabled or len(parts) != 3 or not name.isascii():
+            raise _invalid()
+        payload, signature, extension = parts
+        if not hmac.compare_digest(signature, self._signature(payload)):
+            raise _invalid()
+        try:
+            fields = json.loads(_b64decode(payload))
+            request = OpenAISpeechRequest(**{key: fields[key] for key in SIGNED_FIELDS})
+        except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+            raise _invalid() from None
+        if extension != request.response_format:
+            raise _invalid()
+        return request
+
+
+# 全局签名器
+url_signer = URLSigner()
+
+
+__all__ = ["URLSigner", "url_signer", "SIGNED_FIELDS"]
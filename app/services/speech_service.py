@@ -0,0 +1,776 @@
+"""语音合成服务模块
+
+串联文本规范化、参数转换、缓存与豆包客户端, 供路由层调用
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from app.config import settings
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.audio_cache import AudioCache, audio_cache
+from app.services.request_builder import RequestBuilder, request_builder
+from app.services.backend_router import BackendRouter, backend_router
+from app.services.normalizer import TextNormalizer, normalizer
+from app.services.scheduler import SlotTicket, UpstreamScheduler, estimate_cost, scheduler
+from app.services.limiter import AdaptiveLimiter, limiter
+from app.services.circuit_breaker import CircuitBreaker, circuit_breaker
+from app.services.framing import SEGMENT_FORMATS, audio_duration, create_framer, strip_id3, wav_header
+from app.services.segmenter import SentenceSegmenter
+from app.services.timestamps import SentenceTiming, TimingStore, render_subtitles, timing_store
+from app.utils.errors import DoubaoAPIError
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from app.services.audio_pack import AudioPack
+    from app.services.peer_cache import PeerCache
+    from app.services.transcoder import Transcoder
+
+_segment_counter = metrics.counter(
+    "tts_segment_cache_total", "按句缓存的句子数(请求开始时是否已缓存)", labels=("result",)
+)
+_local_speed_counter = metrics.counter(
+    "tts_local_speed_total", "本地变速的请求数", labels=("format",)
+)
+cancelled_requests = metrics.counter(
+    "tts_requests_cancelled_total", "客户端断开或超过截止时间而提前结束的请求数", labels=("reason",)
+)
+
+
+def _deadline_error() -> DoubaoAPIError:
+    return DoubaoAPIError(3032, "超过客户端截止时间, 已取消合成")
+
+
+@dataclass
+class SpeechResult:
+    """合成结果"""
+    audio: bytes
+    cache_key: str
+    cache_status: str  # hit / miss / shared / peer / pack, 本地转码时为 transcoded
+    timings: List[SentenceTiming] = field(default_factory=list)  # 句子时间戳(来源没有时为空)
+
+
+@dataclass
+class MultiFormatResult:
+    """多格式合成结果"""
+    id: str  # 可按ID获取各格式音频与字幕(见 `SpeechService.format_audio`)
+    results: Dict[str, SpeechResult]
+    timings: List[SentenceTiming] = field(default_factory=list)
+
+
+@dataclass
+class SpeechStream:
+    """流式合成结果
+
+    `chunks` 产出的每一块都在可解码的边界上结束(见 `app.services.framing`)
+    """
+    chunks: AsyncIterator[bytes]
+    cache_key: str
+    cache_status: str  # hit / miss / shared / peer / pack, 按句缓存时为 hit / miss / partial
+    segments: int = 0  # 按句缓存时的句子数
+    segment_hits: int = 0  # 其中请求开始时已缓存的句子数
+    # 句子时间戳, 边合成边追加(某句的时间戳在该句音频之后出现); 来自音频包或其他节点时为空
+    timings: List[SentenceTiming] = field(default_factory=list)
+
+
+class SpeechService:
+    """语音合成服务
+
+    处理流程: 规范化文本 → 构建请求体 → 按缓存键查预渲染音频包、缓存/合并并发 → 检查上游熔断
+    → 排队获取上游槽位 → 按音色/模型选择后端并调用(测量首包时间, 调整自适应并发限制) → 按格式分帧
+
+    长文本(不少于 `SEGMENT_CACHE_MIN_CHARS`)按句拆分, 每句作为独立请求走上述流程,
+    不同文档或修订间相同的句子只合成一次。启用本地变速(`LOCAL_SPEED_MODE`)时,
+    按基准语速的PCM走上述流程后在本地变速。
+    """
+
+    def __init__(
+        self,
+        builder: RequestBuilder = request_builder,
+        router: BackendRouter = backend_router,
+        cache: AudioCache = audio_cache,
+        normalizer: TextNormalizer = normalizer,
+        scheduler: UpstreamScheduler = scheduler,
+        limiter: AdaptiveLimiter = limiter,
+        peers: Optional["PeerCache"] = None,
+        breaker: CircuitBreaker = circuit_breaker,
+        pack: Optional["AudioPack"] = None,
+        transcoder: Optional["Transcoder"] = None,
+        timings: TimingStore = timing_store
+    ):
+        self.builder = builder
+        self.router = router
+        self.cache = cache
+        self.normalizer = normalizer
+        self.scheduler = scheduler
+        self.limiter = limiter
+        self.breaker = breaker
+        # 可选功能的组件未注入时在首次使用时导入全局实例, 导入本模块时不加载它们
+        self._peers = peers
+        self._pack = pack
+        self._transcoder = transcoder
+        self.timings = timings
+        # 多格式结果ID -> {格式: 缓存键}, 只保留最近的结果
+        self._format_sets: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+
+    @property
+    def peers(self) -> "PeerCache":
+        """节点间共享缓存(未注入时首次访问导入全局实例)"""
+        if self._peers is None:
+            from app.services.peer_cache import peer_cache
+            self._peers = peer_cache
+        return self._peers
+
+    @peers.setter
+    def peers(self, value: "PeerCache") -> None:
+        self._peers = value
+
+    @property
+    def pack(self) -> "AudioPack":
+        """预渲染音频包(未注入时首次访问导入全局实例)"""
+        if self._pack is None:
+            from app.services.audio_pack import audio_pack
+            self._pack = audio_pack
+        return self._pack
+
+    @pack.setter
+    def pack(self, value: "AudioPack") -> None:
+        self._pack = value
+
+    @property
+    def transcoder(self) -> "Transcoder":
+        """本地编码器(未注入时首次访问导入全局实例)"""
+        if self._transcoder is None:
+            from app.services.transcoder import transcoder
+            self._transcoder = transcoder
+        return self._transcoder
+
+    @transcoder.setter
+    def transcoder(self, value: "Transcoder") -> None:
+        self._transcoder = value
+
+    def _pack_loaded(self) -> bool:
+        """是否有已映射的音频包(未注入且未配置 AUDIO_PACK_PATH 时不导入音频包模块)"""
+        if self._pack is None and not settings.AUDIO_PACK_PATH:
+            return False
+        return self.pack.loaded
+
+    def _peer_owner(self, key: str) -> Optional[str]:
+        """键的所属节点(未注入且未配置 PEER_NODES 时不导入共享缓存模块)"""
+        if self._peers is None and not settings.PEER_NODES:
+            return None
+        return self.peers.owner(key)
+
+    def normalize(self, request: OpenAISpeechRequest) -> OpenAISpeechRequest:
+        """返回输入文本规范化后的请求副本
+
+        Args:
+            request: OpenAI格式的请求
+
+        Returns:
+            规范化后的请求(文本未变化时返回原对象)
+        """
+        text = self.normalizer.normalize(request.input)
+        if text == request.input:
+            return request
+        return request.model_copy(update={"input": text})
+
+    def _prepare(self, request: OpenAISpeechRequest):
+        """规范化并构建请求, 选择后端, 计算缓存键"""
+        request = self.normalize(request)
+        prepared = self.builder.build(request)
+        backend = self.router.select(request.voice, request.model)
+        return request, prepared, backend, backend.cache_namespace + prepared.cache_key
+
+    def cache_key(self, request: OpenAISpeechRequest) -> str:
+        """计算请求的缓存键(不发起合成)
+
+        Args:
+            request: OpenAI格式的请求
+
+        Returns:
+            缓存键
+        """
+        return self._prepare(request)[3]
+
+    def lookup(self, request: OpenAISpeechRequest) -> Optional[Tuple[Union[bytes, memoryview], str]]:
+        """读取已在音频包或缓存中的完整音频(不发起合成, 不复制)
+
+        Args:
+            request: OpenAI格式的请求
+
+        Returns:
+            (音频数据, 写入时计算的内容摘要), 未缓存时返回None
+        """
+        key = self.cache_key(request)
+        found = self.pack.entry(key) if self._pack_loaded() else None
+        return found if found is not None else self.cache.entry(key)
+
+    async def synthesize(
+        self,
+        request: OpenAISpeechRequest,
+        priority: str = "standard"
+    ) -> SpeechResult:
+        """合成语音
+
+        Args:
+            request: OpenAI格式的请求
+            priority: 上游调度优先级类别
+
+        Returns:
+            合成结果
+
+        Raises:
+            DoubaoAPIError: 豆包API调用失败
+        """
+        stream = await self.stream(request, priority)
+        audio = b"".join([chunk async for chunk in stream.chunks])
+        return SpeechResult(
+            audio=audio, cache_key=stream.cache_key, cache_status=stream.cache_status, timings=stream.timings
+        )
+
+    async def synthesize_formats(
+        self,
+        request: OpenAISpeechRequest,
+        formats: Sequence[str],
+        priority: str = "standard"
+    ) -> MultiFormatResult:
+        """合成一次, 输出多种格式
+
+        已缓存的格式直接返回; 其余可本地编码的格式(见 `Transcoder.formats`)共用一次PCM合成,
+        在线程池中并行编码后分别写入缓存, 之后按单一格式的请求同样命中;
+        不能本地编码的格式各自按原流程请求上游。
+
+        Args:
+            request: OpenAI格式的请求(`response_format` 被忽略)
+            formats: OpenAI音频格式列表
+            priority: 上游调度优先级类别
+
+        Returns:
+            多格式合成结果, 各格式来源为 hit / miss / shared / peer / pack / transcoded
+
+        Raises:
+            TTSProxyError: 上游调用或本地编码失败
+        """
+        requests = {fmt: request.model_copy(update={"response_format": fmt}) for fmt in dict.fromkeys(formats)}
+        keys = {fmt: self.cache_key(item) for fmt, item in requests.items()}
+        pcm_request = request.model_copy(update={"response_format": "pcm"})
+        result_id = hashlib.sha256(self.cache_key(pcm_request).encode("utf-8")).hexdigest()[:32]
+
+        results: Dict[str, SpeechResult] = {}
+        local: List[str] = []
+        remote: List[str] = []
+        for fmt, key in keys.items():
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[fmt] = SpeechResult(
+                    audio=cached, cache_key=key, cache_status="hit", timings=self.timings.get(key) or []
+                )
+            elif self._pack_loaded() and key in self.pack:
+                results[fmt] = SpeechResult(
+                    audio=self.pack.get(key), cache_key=key, cache_status="pack", timings=self.timings.get(key) or []
+                )
+            elif fmt in self.transcoder.formats:
+                local.append(fmt)
+            else:
+                remote.append(fmt)
+
+        async def encode(fmt: str, source: SpeechResult, sample_rate: int) -> SpeechResult:
+            if fmt == "pcm":
+                return source
+            bit_rate = self._prepare(requests[fmt])[1].bit_rate
+            audio, status = await self.cache.get_or_create(
+                keys[fmt], lambda: self.transcoder.encode(source.audio, fmt, sample_rate, bit_rate)
+            )
+            if status == "miss":
+                status = "transcoded"
+                if source.timings:
+                    self.timings.put(keys[fmt], source.timings)
+            return SpeechResult(
+                audio=audio, cache_key=keys[fmt], cache_status=status, timings=source.timings
+            )
+
+        async def transcoded() -> List[SpeechResult]:
+            if not local:
+                return []
+            source = await self.synthesize(pcm_request, priority)
+            sample_rate = self._prepare(pcm_request)[1].sample_rate
+            return await asyncio.gather(*(encode(fmt, source, sample_rate) for fmt in local))
+
+        local_results, remote_results = await asyncio.gather(
+            transcoded(),
+            asyncio.gather(*(self.synthesize(requests[fmt], priority) for fmt in remote)),
+        )
+        results.update(zip(local, local_results))
+        results.update(zip(remote, remote_results))
+        logger.info(f"多格式合成: formats={list(keys)}, transcoded={local}, upstream={remote}")
+
+        self._format_sets[result_id] = keys
+        self._format_sets.move_to_end(result_id)
+        while len(self._format_sets) > settings.MULTI_FORMAT_RESULTS:
+            self._format_sets.popitem(last=False)
+        timings = next((item.timings for item in results.values() if item.timings), [])
+        return MultiFormatResult(id=result_id, results={fmt: results[fmt] for fmt in keys}, timings=timings)
+
+    def format_audio(
+        self,
+        result_id: str,
+        response_format: str
+    ) -> Optional[Tuple[Union[bytes, memoryview], str]]:
+        """按多格式结果ID读取某一格式的音频
+
+        Args:
+            result_id: `synthesize_formats` 返回的ID
+            response_format: OpenAI音频格式
+
+        Returns:
+            (音频数据, 内容摘要); ID未知、不含该格式或已被缓存淘汰时返回None
+        """
+        key = self._format_sets.get(result_id, {}).get(response_format)
+        if key is None:
+            return None
+        found = self.cache.entry(key)
+        if found is None and self._pack_loaded():
+            found = self.pack.entry(key)
+        return found
+
+    def format_subtitles(self, result_id: str, subtitle_format: str) -> Optional[str]:
+        """按多格式结果ID生成字幕
+
+        Args:
+            result_id: `synthesize_formats` 返回的ID
+            subtitle_format: vtt / srt
+
+        Returns:
+            字幕文本; ID未知或时间戳已被淘汰时返回None
+        """
+        for key in self._format_sets.get(result_id, {}).values():
+            timings = self.timings.get(key)
+            if timings:
+                return render_subtitles(timings, subtitle_format)
+        return None
+
+    async def stream(
+        self,
+        request: OpenAISpeechRequest,
+        priority: str = "standard",
+        allow_peer: bool = True,
+        deadline: Optional[float] = None
+    ) -> SpeechStream:
+        """流式合成语音
+
+        未命中缓存时边接收上游音频边按格式分帧输出, 完整音频在结束后写入缓存;
+        命中缓存或合并到进行中的合成时一次性输出完整音频。
+        启用节点间共享缓存且键属于其他节点时, 向所属节点请求音频(失败时本地合成)。
+        返回前会等待首个音频块, 因此首包之前的上游错误仍以异常形式抛出。
+
+        给定截止时间时, 到期仍未收完的请求以3032(等待超时)结束; 请求离开(到期或客户端断开)
+        且没有其他请求等待同一合成时, 上游合成随即取消。
+
+        Args:
+            request: OpenAI格式的请求
+            priority: 上游调度优先级类别
+            allow_peer: 是否允许转发到所属节点(处理节点间请求时为False, 避免循环转发)
+            deadline: 截止时间(`loop.time()` 时钟), None表示不限
+
+        Returns:
+            流式合成结果, 来源为 hit / miss / shared / peer / pack
+
+        Raises:
+            DoubaoAPIError: 豆包API调用失败或超过截止时间
+        """
+        if deadline is not None and asyncio.get_running_loop().time() >= deadline:
+            cancelled_requests.inc(reason="deadline")
+            raise _deadline_error()
+
+        if self._pack_loaded():
+            key = self.cache_key(request)
+            audio = self.pack.get(key)
+            if audio is not None:
+                # 直接返回映射页上的切片, 不复制
+                return SpeechStream(
+                    chunks=self._single(audio), cache_key=key, cache_status="pack", timings=self.timings.get(key) or []
+                )
+
+        local_speed = self.local_speed(request)
+        if local_speed is not None:
+            return await self._stream_stretched(request, *local_speed, priority, allow_peer, deadline)
+
+        sentences = self.split_segments(request)
+        if sentences:
+            return await self._stream_segments(request, sentences, priority, allow_peer, deadline)
+
+        request, prepared, backend, key = self._prepare(request)
+        response_format = request.response_format or "mp3"
+        cost = estimate_cost(len(request.input), response_format)
+        # 合并进来的更高优先级请求会提升这次合成的排队优先级
+        ticket = SlotTicket(priority, cost)
+        owner = self._peer_owner(key) if allow_peer else None
+        # 分帧后的音频块; None 表示合成任务结束
+        queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+        source = "miss"
+        timings: List[SentenceTiming] = []
+
+        async def upstream() -> bytes:
+            nonlocal source
+            framer = create_framer(response_format, prepared.sample_rate)
+            parts = []
+
+            def emit(chunk: bytes) -> None:
+                framed = framer.feed(chunk)
+                if framed:
+                    parts.append(framed)
+                    queue.put_nowait(framed)
+
+            fetched = False
+            if owner is not None:
+                from app.services.peer_cache import PeerError
+                source = "peer"
+                try:
+                    async for chunk in self.peers.fetch(owner, request, key, priority):
+                        emit(chunk)
+                    fetched = True
+                except PeerError as e:
+                    if parts:
+                        raise DoubaoAPIError(3040, str(e)) from e
+                    logger.warning(f"{e}, 改为本地合成")
+                    source = "miss"
+                    framer = create_framer(response_format, prepared.sample_rate)
+
+            if not fetched:
+                # 先登记时间戳列表, 合并到本次合成的请求读取同一份
+                self.timings.put(key, timings)
+                try:
+                    async with self.breaker.guard(), self.scheduler.slot(priority, cost, ticket):
+                        async with self.limiter.measure() as sample:
+                            async for chunk in backend.synthesize_stream(
+                                prepared,
+                                on_first_chunk=sample.mark_first_chunk,
+                                on_sentence=timings.append
+                            ):
+                                emit(chunk)
+                except BaseException:
+                    self.timings.discard(key)
+                    raise
+            tail = framer.flush()
+            if tail:
+                parts.append(tail)
+                queue.put_nowait(tail)
+            if not parts:
+                raise DoubaoAPIError(3031, "未返回音频数据")
+            return framer.finalize(b"".join(parts))
+
+        task = asyncio.create_task(self.cache.get_or_create(
+            key, upstream, priority, lambda higher: self.scheduler.promote(ticket, higher)
+        ))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            if deadline is None:
+                first = await queue.get()
+            else:
+                async with asyncio.timeout_at(deadline):
+                    first = await queue.get()
+        except TimeoutError:
+            task.cancel()
+            cancelled_requests.inc(reason="deadline")
+            raise _deadline_error() from None
+        except BaseException:
+            task.cancel()
+            raise
+
+        if first is None:
+            audio, status = task.result()
+            if status == "miss":
+                status = source
+            return SpeechStream(
+                chunks=self._single(audio), cache_key=key, cache_status=status, timings=self.timings.get(key) or []
+            )
+        return SpeechStream(
+            chunks=self._drain(first, queue, task, deadline), cache_key=key, cache_status=source, timings=timings
+        )
+
+    def local_speed(self, request: OpenAISpeechRequest) -> Optional[Tuple[float, float]]:
+        """计算本地变速参数
+
+        `extend` 模式下上游按最接近的受支持语速(0.5~2.0倍)合成, 本地调整剩余倍数;
+        `all` 模式下上游总是按1.0倍合成, 各语速共用同一份缓存。
+
+        Args:
+            request: OpenAI格式的请求
+
+        Returns:
+            (上游合成语速, 本地变速倍数); 不需要或不能本地变速时返回None
+        """
+        mode = settings.LOCAL_SPEED_MODE
+        speed = request.speed or 1.0
+        if mode not in ("extend", "all") or speed == 1.0:
+            return None
+        from app.services.time_stretch import available as time_stretch_available
+        if not time_stretch_available():
+            return None
+        if (request.response_format or "mp3") not in self.transcoder.formats:
+            return None
+        base = 1.0 if mode == "all" else min(max(speed, 0.5), 2.0)
+        if base == speed:
+            return None
+        return base, speed / base
+
+    async def _stream_stretched(
+        self,
+        request: OpenAISpeechRequest,
+        base_speed: float,
+        ratio: float,
+        priority: str,
+        allow_peer: bool,
+        deadline: Optional[float] = None
+    ) -> SpeechStream:
+        """按基准语速合成PCM后本地变速, 再按请求的格式输出
+
+        `pcm`/`wav` 逐块变速输出; 其余格式把变速后的PCM逐块送入ffmpeg增量编码。变速结果不单独缓存。
+        """
+        response_format = request.response_format or "mp3"
+        base = request.model_copy(update={"speed": base_speed, "response_format": "pcm"})
+        source = await self.stream(base, priority, allow_peer, deadline)
+        prepared = self._prepare(request)[1]
+        _local_speed_counter.inc(format=response_format)
+        timings: List[SentenceTiming] = []
+        return SpeechStream(
+            chunks=self._stretch(source, ratio, prepared.sample_rate, response_format, prepared.bit_rate, timings),
+            cache_key=self.cache_key(request),
+            cache_status=source.cache_status,
+            segments=source.segments,
+            segment_hits=source.segment_hits,
+            timings=timings,
+        )
+
+    async def _stretch(
+        self,
+        source: SpeechStream,
+        ratio: float,
+        sample_rate: int,
+        response_format: str,
+        bit_rate: Optional[int],
+        timings: List[SentenceTiming]
+    ) -> AsyncIterator[bytes]:
+        """变速 `source` 产出的PCM, 时间戳按变速倍数缩放后追加到 `timings`"""
+        from app.services.time_stretch import TimeStretcher
+        from app.services.transcoder import BUILTIN_FORMATS
+        stretcher = TimeStretcher(ratio, sample_rate)
+        # 命中缓存时整段音频为一块, 按1秒分块处理, 期间让出事件循环
+        block = sample_rate * 2
+        copied = 0
+        encoder = None
+
+        def collect() -> None:
+            nonlocal copied
+            while copied < len(source.timings):
+                timings.append(source.timings[copied].scaled(1 / ratio))
+                copied += 1
+
+        try:
+            if response_format == "wav":
+                yield wav_header(sample_rate)
+            elif response_format not in BUILTIN_FORMATS:
+                encoder = await self.transcoder.open_stream(response_format, sample_rate, bit_rate)
+            async for chunk in source.chunks:
+                for start in range(0, len(chunk), block):
+                    out = stretcher.feed(chunk[start:start + block])
+                    collect()
+                    if encoder is not None:
+                        out = await encoder.feed(out)
+                    if out:
+                        yield out
+            out = stretcher.flush()
+            collect()
+            if encoder is not None:
+                out = await encoder.feed(out) + await encoder.finish()
+            if out:
+                yield out
+        finally:
+            if encoder is not None:
+                await encoder.close()
+            await source.chunks.aclose()
+
+    def split_segments(self, request: OpenAISpeechRequest) -> List[str]:
+        """按句拆分长文本
+
+        Args:
+            request: OpenAI格式的请求
+
+        Returns:
+            句子列表; 文本较短、格式不支持拼接或只有一句时返回空列表
+        """
+        threshold = settings.SEGMENT_CACHE_MIN_CHARS
+        if threshold <= 0 or len(request.input) < threshold:
+            return []
+        if (request.response_format or "mp3") not in SEGMENT_FORMATS:
+            return []
+        segmenter = SentenceSegmenter()
+        sentences = segmenter.feed(self.normalize(request).input) + segmenter.flush()
+        return sentences if len(sentences) > 1 else []
+
+    async def _stream_segments(
+        self,
+        request: OpenAISpeechRequest,
+        sentences: List[str],
+        priority: str,
+        allow_peer: bool,
+        deadline: Optional[float] = None
+    ) -> SpeechStream:
+        """按句合成并按顺序拼接
+
+        每句以 (音色, 格式, 语速, 文本) 为键单独缓存; 当前句输出时后续句子提前合成,
+        同时合成的句子数不超过 `SEGMENT_CACHE_MAX_INFLIGHT`(已缓存的句子立即完成)。
+        """
+        response_format = request.response_format or "mp3"
+        segment_format = SEGMENT_FORMATS[response_format]
+        requests = [
+            request.model_copy(update={"input": sentence, "response_format": segment_format})
+            for sentence in sentences
+        ]
+        keys = [self.cache_key(segment) for segment in requests]
+        pack_loaded = self._pack_loaded()
+        hits = sum((pack_loaded and key in self.pack) or key in self.cache for key in keys)
+        _segment_counter.inc(hits, result="hit")
+        _segment_counter.inc(len(keys) - hits, result="miss")
+        logger.info(f"按句缓存: segments={len(keys)}, hits={hits}")
+
+        window = max(1, settings.SEGMENT_CACHE_MAX_INFLIGHT)
+        tasks: List[asyncio.Task] = []
+
+        def schedule(limit: int) -> None:
+            while len(tasks) < min(limit, len(requests)):
+                tasks.append(asyncio.create_task(
+                    self.stream(requests[len(tasks)], priority, allow_peer, deadline)
+                ))
+
+        schedule(window)
+        try:
+            first: SpeechStream = await tasks[0]
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        prepared = self.builder.build(requests[0])
+        header = wav_header(prepared.sample_rate) if response_format == "wav" else None
+        status = "hit" if hits == len(keys) else "miss" if hits == 0 else "partial"
+        timings: List[SentenceTiming] = []
+        return SpeechStream(
+            chunks=self._concat(
+                first, tasks, schedule, window, len(requests), response_format, header, timings,
+                segment_format, prepared.sample_rate
+            ),
+            cache_key=self.cache_key(request),
+            cache_status=status,
+            segments=len(keys),
+            segment_hits=hits,
+            timings=timings,
+        )
+
+    @staticmethod
+    async def _concat(
+        first: SpeechStream,
+        tasks: List[asyncio.Task],
+        schedule: Callable[[int], None],
+        window: int,
+        count: int,
+        response_format: str,
+        header: Optional[bytes],
+        timings: List[SentenceTiming],
+        segment_format: str,
+        sample_rate: int
+    ) -> AsyncIterator[bytes]:
+        """按顺序产出各句音频, 包括当前句在内保持 `window` 句在合成
+
+        各句的时间戳以前面各句最后一句的结束时间为起点, 追加到 `timings`;
+        没有时间戳的句子(如来自音频包)按帧头计算的音频时长推进起点。
+        """
+        segment: Optional[SpeechStream] = None
+        offset = 0.0
+        copied = 0
+        duration = 0.0
+
+        def collect() -> None:
+            nonlocal copied
+            while copied < len(segment.timings):
+                timings.append(segment.timings[copied].shifted(offset))
+                copied += 1
+
+        try:
+            if header is not None:
+                yield header
+            for index in range(count):
+                schedule(index + window)
+                segment = first if index == 0 else await tasks[index]
+                copied = 0
+                duration = 0.0
+                async for chunk in segment.chunks:
+                    collect()
+                    duration += audio_duration(chunk, segment_format, sample_rate) or 0.0
+                    if index and response_format == "mp3":
+                        chunk = strip_id3(chunk)
+                        if not chunk:
+                            continue
+                    yield chunk
+                collect()
+                offset = timings[-1].end if copied else offset + duration
+        finally:
+            if segment is not None:
+                # 提前结束时关闭当前句, 使其上游合成随之取消
+                await segment.chunks.aclose()
+            # 客户端提前断开时取消仍在等待首包的句子(已开始的句子在后台完成并写入缓存)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
+
+    @staticmethod
+    async def _single(audio: Union[bytes, memoryview]) -> AsyncIterator[bytes]:
+        yield audio
+
+    @staticmethod
+    async def _drain(
+        first: bytes,
+        queue: "asyncio.Queue[Optional[bytes]]",
+        task: asyncio.Task,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[bytes]:
+        """依次产出队列中的音频块, 结束后传播合成任务的异常"""
+        reason = "disconnect"
+        try:
+            chunk: Optional[bytes] = first
+            while chunk is not None:
+                yield chunk
+                if deadline is None:
+                    chunk = await queue.get()
+                    continue
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        chunk = await queue.get()
+                except TimeoutError:
+                    reason = "deadline"
+                    raise _deadline_error() from None
+            task.result()
+        finally:
+            # 客户端提前断开或超过截止时间时离开合成(没有其他等待者时上游随之取消)
+            if not task.done():
+                task.cancel()
+                cancelled_requests.inc(reason=reason)
+
+
+# 全局服务实例
+speech_service = SpeechService()
+
+
+__all__ = [
+    "SpeechService",
+    "SpeechResult",
+    "SpeechStream",
+    "MultiFormatResult",
+    "speech_service",
+    "cancelled_requests",
+]
@@ -0,0 +1,182 @@
+"""本地变速模块
+
+在16位单声道小端PCM上做WSOLA(波形相似叠加)变速不变调, 逐块流式处理。
+上游语速参数只支持0.5~2.0倍(见 `Converter.map_speed_to_v3`), 且每个语速都是独立的缓存键与上游调用;
+启用 `LOCAL_SPEED_MODE` 后由缓存中基准语速的音频在本地得到0.25~4.0倍的任意语速。
+
+依赖 numpy(可选), 未安装时不启用本地变速。numpy 在首次变速时才导入, 不增加服务启动时间。
+"""
+import importlib.util
+from typing import List, Optional
+
+# 首次创建变速器时导入
+np = None
+
+# 分析帧长(秒), 相邻输出帧重叠一半
+FRAME_SECONDS = 0.02
+# 在名义位置前后搜索最相似波形的范围(秒)
+TOLERANCE_SECONDS = 0.01
+
+
+def available() -> bool:
+    """是否可以本地变速(已安装numpy, 不导入)"""
+    return np is not None or importlib.util.find_spec("numpy") is not None
+
+
+def _load_numpy() -> bool:
+    """导入numpy, 未安装时返回False"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - 可选依赖
+            return False
+        np = numpy
+    return True
+
+
+class TimeStretcher:
+    """流式WSOLA变速器
+
+    第k个输出帧名义上取自输入的 `k * hop * ratio` 处, 在其前后 `TOLERANCE_SECONDS` 内
+    选取与上一帧自然延续波形最相似的位置(归一化互相关, 一次矩阵乘法算出全部候选位置),
+    加汉宁窗后以 `hop` 为步长重叠相加。输出长度为输入的 `1 / ratio`, 音高不变。
+    """
+
+    def __init__(self, ratio: float, sample_rate: int):
+        """初始化变速器
+
+        Args:
+            ratio: 语速倍数(大于1加快, 小于1放慢)
+            sample_rate: 采样率
+
+        Raises:
+            RuntimeError: 未安装numpy
+        """
+        if not _load_numpy():
+            raise RuntimeError("本地变速需要安装 numpy")
+        self.ratio = ratio
+        self.frame = max(4, int(sample_rate * FRAME_SECONDS) // 2 * 2)
+        self.hop = self.frame // 2
+        self.tolerance = max(1, int(sample_rate * TOLERANCE_SECONDS))
+        # 周期汉宁窗, 重叠一半时各点权重之和为1
+        n = np.arange(self.frame)
+        self._window = (0.5 - 0.5 * np.cos(2 * np.pi * n / self.frame)).astype(np.float32)
+        self._input = np.zeros(0, dtype=np.float32)
+        self._offset = 0  # _input[0] 在整段输入中的位置
+        self._received = 0  # 已收到的样本数
+        self._emitted = 0  # 已输出的样本数
+        self._index = 0  # 下一输出帧序号
+        self._previous: Optional[int] = None  # 上一帧在输入中的位置
+        self._overlap = np.zeros(self.hop, dtype=np.float32)
+        self._odd = b""
+
+    def _nominal(self, index: int) -> int:
+        return int(round(index * self.hop * self.ratio))
+
+    def _next_frame(self, final: bool) -> Optional["np.ndarray"]:
+        """合成下一输出帧的前 `hop` 个样本, 输入不足且未结束时返回None"""
+        nominal = self._nominal(self._index)
+        if self._previous is None:
+            low = high = 0
+            need = self.frame
+        else:
+            natural = self._previous + self.hop
+            low = max(0, nominal - self.tolerance)
+            high = nominal + self.tolerance
+            need = max(high, natural) + self.frame
+        end = self._offset + len(self._input)
+        if need > end:
+            if not final:
+                return None
+            # 输入已结束, 用静音补齐
+            self._input = np.concatenate((self._input, np.zeros(need - end, dtype=np.float32)))
+
+        x = self._input
+        base = self._offset
+        if self._previous is None:
+            best = 0
+        else:
+            template = x[natural - base:natural - base + self.frame]
+            region = x[low - base:high - base + self.frame]
+            candidates = np.lib.stride_tricks.sliding_window_view(region, self.frame)
+            scores = candidates @ template
+            energy = np.concatenate(([0.0], np.cumsum(region.astype(np.float64) ** 2)))
+            energy = energy[self.frame:] - energy[:-self.frame]
+            best = low + int(np.argmax(scores / np.sqrt(energy + 1e-9)))
+
+        segment = x[best - base:best - base + self.frame] * self._window
+        out = self._overlap + segment[:self.hop]
+        self._overlap = segment[self.hop:]
+        self._previous = best
+        self._index += 1
+
+        # 丢弃之后的帧不再用到的输入
+        keep = max(base, min(best + self.hop, self._nominal(self._index) - self.tolerance))
+        if keep - base >= 4 * self.frame:
+            self._input = x[keep - base:].copy()
+            self._offset = keep
+        return out
+
+    def _encode(self, frames: List["np.ndarray"], limit: Optional[int] = None) -> bytes:
+        if not frames:
+            return b""
+        samples = np.concatenate(frames)
+        if limit is not None:
+            samples = samples[:max(0, limit - self._emitted)]
+        self._emitted += len(samples)
+        return (np.clip(samples, -1.0, 32767 / 32768) * 32768).astype("<i2").tobytes()
+
+    def feed(self, pcm: bytes) -> bytes:
+        """输入一块PCM, 返回已可输出的变速结果
+
+        Args:
+            pcm: 16位单声道小端PCM(可在样本中间截断)
+
+        Returns:
+            变速后的PCM(可能为空)
+        """
+        data = self._odd + bytes(pcm)
+        usable = len(data) // 2 * 2
+        self._odd = data[usable:]
+        if usable:
+            samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768
+            self._input = np.concatenate((self._input, samples))
+            self._received += len(samples)
+        frames = []
+        while (frame := self._next_frame(final=False)) is not None:
+            frames.append(frame)
+        return self._encode(frames)
+
+    def flush(self) -> bytes:
+        """输入结束, 返回剩余的变速结果(总长度为输入的 `1 / ratio`)
+
+        Returns:
+            变速后的PCM
+        """
+        target = int(round(self._received / self.ratio))
+        frames = []
+        produced = self._emitted
+        while produced < target:
+            frame = self._next_frame(final=True)
+            frames.append(frame)
+            produced += len(frame)
+        return self._encode(frames, limit=target)
+
+
+def stretch(pcm: bytes, ratio: float, sample_rate: int) -> bytes:
+    """一次性变速整段PCM
+
+    Args:
+        pcm: 16位单声道小端PCM
+        ratio: 语速倍数
+        sample_rate: 采样率
+
+    Returns:
+        变速后的PCM
+    """
+    stretcher = TimeStretcher(ratio, sample_rate)
+    return stretcher.feed(pcm) + stretcher.flush()
+
+
+__all__ = ["TimeStretcher", "available", "stretch"]
@@ -0,0 +1,201 @@
+"""句子时间戳模块
+
+豆包在每句音频之后返回该句的时间戳(`sentence` 字段, 含逐字起止时间)。
+合成时随音频一并收集, 不额外缓冲音频, 供SSE事件、JSON结果与WebVTT/SRT字幕使用。
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from app.config import settings
+
+# 字幕格式 -> Content-Type
+SUBTITLE_CONTENT_TYPES = {
+    "vtt": "text/vtt; charset=utf-8",
+    "srt": "application/x-subrip; charset=utf-8",
+}
+
+
+@dataclass
+class WordTiming:
+    """单字(词)时间戳(秒)"""
+    word: str
+    start: float
+    end: float
+
+
+@dataclass
+class SentenceTiming:
+    """句子时间戳(秒, 相对于整段音频开头)"""
+    text: str
+    start: float
+    end: float
+    words: List[WordTiming] = field(default_factory=list)
+
+    def shifted(self, offset: float) -> "SentenceTiming":
+        """返回整体平移后的副本"""
+        return SentenceTiming(
+            text=self.text,
+            start=self.start + offset,
+            end=self.end + offset,
+            words=[WordTiming(w.word, w.start + offset, w.end + offset) for w in self.words],
+        )
+
+    def scaled(self, factor: float) -> "SentenceTiming":
+        """返回时间轴整体缩放后的副本(本地变速时使用)"""
+        return SentenceTiming(
+            text=self.text,
+            start=self.start * factor,
+            end=self.end * factor,
+            words=[WordTiming(w.word, w.start * factor, w.end * factor) for w in self.words],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为JSON结构(时间保留3位小数)"""
+        return {
+            "text": self.text,
+            "start": round(self.start, 3),
+            "end": round(self.end, 3),
+            "words": [
+                {"word": w.word, "start": round(w.start, 3), "end": round(w.end, 3)} for w in self.words
+            ],
+        }
+
+
+def _seconds(word: dict, *names: str) -> Optional[float]:
+    for name in names:
+        value = word.get(name)
+        if isinstance(value, (int, float)):
+            # 下划线命名的字段为毫秒
+            return value / 1000 if "_" in name else float(value)
+    return None
+
+
+def parse_sentence(payload: Optional[dict], offset: float = 0.0) -> Optional[SentenceTiming]:
+    """解析豆包响应中的 `sentence` 字段
+
+    Args:
+        payload: `sentence` 字段, 形如 {"text": "...", "words": [{"word": "你", "startTime": 0.1, "endTime": 0.3}]}
+        offset: 本次上游请求的音频在整段音频中的起点(续传时为已完成部分的时长)
+
+    Returns:
+        句子时间戳; 没有文本或逐字时间时返回None
+    """
+    if not payload:
+        return None
+    text = str(payload.get("text") or "").strip()
+    words = []
+    for word in payload.get("words") or []:
+        start = _seconds(word, "startTime", "start_time")
+        end = _seconds(word, "endTime", "end_time")
+        if start is not None and end is not None:
+            words.append(WordTiming(str(word.get("word", "")), start + offset, end + offset))
+    if not text or not words:
+        return None
+    return SentenceTiming(text=text, start=words[0].start, end=words[-1].end, words=words)
+
+
+def _clock(seconds: float, separator: str) -> str:
+    millis = max(0, round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def to_vtt(timings: List[SentenceTiming]) -> str:
+    """生成WebVTT字幕(每句一条)"""
+    cues = [
+        f"{_clock(t.start, '.')} --> {_clock(t.end, '.')}\n{t.text}\n"
+        for t in timings
+    ]
+    return "WEBVTT\n\n" + "\n".join(cues)
+
+
+def to_srt(timings: List[SentenceTiming]) -> str:
+    """生成SRT字幕(每句一条)"""
+    return "\n".join(
+        f"{index}\n{_clock(t.start, ',')} --> {_clock(t.end, ',')}\n{t.text}\n"
+        for index, t in enumerate(timings, 1)
+    )
+
+
+def render_subtitles(timings: List[SentenceTiming], subtitle_format: str) -> str:
+    """按格式生成字幕
+
+    Args:
+        timings: 句子时间戳
+        subtitle_format: vtt / srt
+
+    Returns:
+        字幕文本
+    """
+    return to_vtt(timings) if subtitle_format == "vtt" else to_srt(timings)
+
+
+class TimingStore:
+    """按缓存键保存句子时间戳
+
+    合成开始时登记(列表随上游响应增长), 合并到同一合成或之后命中缓存的请求读取同一份;
+    只保留最近的条目, 被淘汰或来自音频包、其他节点的音频没有时间戳。
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """初始化存储
+
+        Args:
+            max_entries: 最多保存的条目数, 默认读取配置
+        """
+        self.max_entries = settings.TIMESTAMP_CACHE_SIZE if max_entries is None else max_entries
+        self._entries: "OrderedDict[str, List[SentenceTiming]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[List[SentenceTiming]]:
+        """读取时间戳
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            句子时间戳列表, 不存在时返回None
+        """
+        timings = self._entries.get(key)
+        if timings is not None:
+            self._entries.move_to_end(key)
+        return timings
+
+    def put(self, key: str, timings: List[SentenceTiming]) -> None:
+        """保存时间戳(保存列表本身, 之后追加的句子同样可见)
+
+        Args:
+            key: 缓存键
+            timings: 句子时间戳列表
+        """
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = timings
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        """删除时间戳(合成失败时)"""
+        self._entries.pop(key, None)
+
+
+# 全局时间戳存储
+timing_store = TimingStore()
+
+
+__all__ = [
+    "SentenceTiming",
+    "WordTiming",
+    "TimingStore",
+    "timing_store",
+    "parse_sentence",
+    "render_subtitles",
+    "to_vtt",
+    "to_srt",
+    "SUBTITLE_CONTENT_TYPES",
+]
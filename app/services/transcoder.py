@@ -0,0 +1,275 @@
+"""本地转码模块
+
+把上游返回的PCM(16位单声道小端)编码为各OpenAI音频格式, 供一次合成输出多种格式时使用。
+`pcm` 与 `wav` 直接拼接, 不依赖外部程序; 其余格式调用 ffmpeg(`FFMPEG_PATH`),
+未安装时这些格式仍按原流程各自请求上游。编码在线程池中执行, 多个格式并行。
+边产出边编码的场景(如本地变速)使用 `open_stream`: ffmpeg子进程增量读入PCM并输出已编码的数据。
+"""
+import asyncio
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, FrozenSet, List, Optional
+from app.config import settings
+from app.services.framing import wav_header
+from app.utils.errors import TTSProxyError
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+# 不依赖外部程序即可编码的格式
+BUILTIN_FORMATS = frozenset({"pcm", "wav"})
+
+# ffmpeg 输出参数(码率与上游默认值相近, mp3按请求的比特率)
+# libopus 只接受 8/12/16/24/48kHz 输入, 其余采样率(22050/32000/44100)统一重采样到48kHz(Ogg Opus 按48kHz解码)
+FFMPEG_OUTPUT_ARGS: Dict[str, List[str]] = {
+    "mp3": ["-c:a", "libmp3lame", "-f", "mp3"],
+    "opus": ["-c:a", "libopus", "-ar", "48000", "-b:a", "32k", "-f", "ogg"],
+    "aac": ["-c:a", "aac", "-b:a", "96k", "-f", "adts"],
+    "flac": ["-c:a", "flac", "-f", "flac"],
+}
+
+_transcode_counter = metrics.counter(
+    "tts_transcode_total", "本地转码次数", labels=("format", "result")
+)
+
+
+class EncodeStream:
+    """增量编码: 向ffmpeg子进程写入PCM, 同时读取已编码的输出"""
+
+    def __init__(self, process: asyncio.subprocess.Process, response_format: str):
+        """初始化编码流
+
+        Args:
+            process: 标准输入输出与错误输出均为管道的ffmpeg子进程
+            response_format: OpenAI音频格式
+        """
+        self.process = process
+        self.response_format = response_format
+        self._output = bytearray()
+        self._produced = 0
+        self._finished = False
+        # 同时读取输出, 避免ffmpeg写满管道后阻塞写入
+        self._reader = asyncio.create_task(self._read())
+        self._stderr = asyncio.create_task(process.stderr.read())
+
+    async def _read(self) -> None:
+        while True:
+            data = await self.process.stdout.read(1 << 16)
+            if not data:
+                return
+            self._output += data
+            self._produced += len(data)
+
+    def _take(self) -> bytes:
+        data = bytes(self._output)
+        self._output.clear()
+        return data
+
+    async def _fail(self) -> None:
+        """读取错误输出, 记录并抛出编码失败"""
+        await self.process.wait()
+        message = (await self._stderr).decode("utf-8", "replace").strip()[:200]
+        _transcode_counter.inc(format=self.response_format, result="error")
+        self._finished = True
+        raise TTSProxyError(f"{self.response_format} 编码失败: {message}", "internal_error", 500)
+
+    async def feed(self, pcm: bytes) -> bytes:
+        """写入一段PCM
+
+        Args:
+            pcm: 16位单声道小端PCM
+
+        Returns:
+            目前已编码、尚未取走的数据(可能为空)
+
+        Raises:
+            TTSProxyError: 编码进程已退出
+        """
+        try:
+            self.process.stdin.write(pcm)
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            await self._fail()
+        # 让读取任务取走已输出的数据
+        await asyncio.sleep(0)
+        return self._take()
+
+    async def finish(self) -> bytes:
+        """结束输入并等待编码完成
+
+        Returns:
+            剩余的编码数据
+
+        Raises:
+            TTSProxyError: 编码失败或没有输出
+        """
+        try:
+            self.process.stdin.close()
+            await self.process.stdin.wait_closed()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        await self._reader
+        if await self.process.wait() != 0 or not self._produced:
+            await self._fail()
+        self._finished = True
+        _transcode_counter.inc(format=self.response_format, result="ok")
+        return self._take()
+
+    async def close(self) -> None:
+        """未完成时终止编码进程(调用方中途放弃时使用)"""
+        if not self._finished and self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+        self._reader.cancel()
+        self._stderr.cancel()
+
+
+class Transcoder:
+    """PCM到各格式的本地编码器"""
+
+    def __init__(self, ffmpeg_path: Optional[str] = None, workers: Optional[int] = None):
+        """初始化编码器
+
+        Args:
+            ffmpeg_path: ffmpeg可执行文件, 默认读取配置
+            workers: 编码线程数, 默认读取配置
+        """
+        self.ffmpeg_path = ffmpeg_path or settings.FFMPEG_PATH
+        self.workers = workers or settings.TRANSCODE_WORKERS
+        self._ffmpeg: Optional[str] = None
+        self._resolved = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def resolve(self) -> None:
+        """查找ffmpeg(会访问文件系统, 服务启动时在线程中调用, 不在请求中阻塞事件循环)"""
+        if self._resolved:
+            return
+        self._ffmpeg = shutil.which(self.ffmpeg_path)
+        self._resolved = True
+        if self._ffmpeg is None:
+            logger.info(f"未找到 {self.ffmpeg_path}, 本地转码仅支持 pcm/wav")
+
+    @property
+    def ffmpeg(self) -> Optional[str]:
+        """ffmpeg完整路径(未预先查找时首次访问时查找), 未安装时为None"""
+        self.resolve()
+        return self._ffmpeg
+
+    @property
+    def formats(self) -> FrozenSet[str]:
+        """可本地编码的格式"""
+        if self.ffmpeg is None:
+            return BUILTIN_FORMATS
+        return BUILTIN_FORMATS | frozenset(FFMPEG_OUTPUT_ARGS)
+
+    def _command(self, response_format: str, sample_rate: int, bit_rate: Optional[int]) -> List[str]:
+        """ffmpeg命令行(从标准输入读PCM, 编码结果写到标准输出)"""
+        if response_format not in FFMPEG_OUTPUT_ARGS or self.ffmpeg is None:
+            raise TTSProxyError(f"不支持本地编码: {response_format}", "internal_error", 500)
+
+        args = list(FFMPEG_OUTPUT_ARGS[response_format])
+        if response_format == "mp3" and bit_rate:
+            args += ["-b:a", f"{bit_rate}k"]
+        return [
+            self.ffmpeg, "-hide_banner", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+            *args, "pipe:1",
+        ]
+
+    def encode_sync(self, pcm: bytes, response_format: str, sample_rate: int, bit_rate: Optional[int] = None) -> bytes:
+        """同步编码(在线程池中调用)
+
+        Args:
+            pcm: 16位单声道小端PCM
+            response_format: OpenAI音频格式
+            sample_rate: 采样率
+            bit_rate: 比特率(kbps, 仅mp3)
+
+        Returns:
+            编码后的音频
+
+        Raises:
+            TTSProxyError: 格式不支持本地编码或编码失败
+        """
+        if response_format == "pcm":
+            return pcm
+        if response_format == "wav":
+            return wav_header(sample_rate, data_size=len(pcm)) + pcm
+        command = self._command(response_format, sample_rate, bit_rate)
+        completed = subprocess.run(command, input=pcm, capture_output=True, check=False)
+        if completed.returncode != 0 or not completed.stdout:
+            message = completed.stderr.decode("utf-8", "replace").strip()[:200]
+            raise TTSProxyError(f"{response_format} 编码失败: {message}", "internal_error", 500)
+        return completed.stdout
+
+    async def encode(self, pcm: bytes, response_format: str, sample_rate: int, bit_rate: Optional[int] = None) -> bytes:
+        """在线程池中编码
+
+        Args:
+            pcm: 16位单声道小端PCM
+            response_format: OpenAI音频格式
+            sample_rate: 采样率
+            bit_rate: 比特率(kbps, 仅mp3)
+
+        Returns:
+            编码后的音频
+
+        Raises:
+            TTSProxyError: 格式不支持本地编码或编码失败
+        """
+        try:
+            if response_format in BUILTIN_FORMATS:
+                # 只是拼接, 不值得切换线程
+                audio = self.encode_sync(pcm, response_format, sample_rate)
+            else:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="transcode")
+                audio = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self.encode_sync, pcm, response_format, sample_rate, bit_rate
+                )
+        except TTSProxyError:
+            _transcode_counter.inc(format=response_format, result="error")
+            raise
+        _transcode_counter.inc(format=response_format, result="ok")
+        return audio
+
+    async def open_stream(
+        self,
+        response_format: str,
+        sample_rate: int,
+        bit_rate: Optional[int] = None
+    ) -> EncodeStream:
+        """启动增量编码(仅ffmpeg格式)
+
+        Args:
+            response_format: OpenAI音频格式
+            sample_rate: 采样率
+            bit_rate: 比特率(kbps, 仅mp3)
+
+        Returns:
+            编码流, 用完后须调用 `close`
+
+        Raises:
+            TTSProxyError: 格式不支持本地编码
+        """
+        command = self._command(response_format, sample_rate, bit_rate)
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        return EncodeStream(process, response_format)
+
+    def close(self) -> None:
+        """关闭编码线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局编码器实例
+transcoder = Transcoder()
+
+
+__all__ = ["EncodeStream", "Transcoder", "transcoder", "BUILTIN_FORMATS", "FFMPEG_OUTPUT_ARGS"]
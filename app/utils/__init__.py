@@ -1,5 +1,5 @@
 """工具模块"""
-from app.utils.logger import logger, mask_token
+from app.utils.logger import logger, mask_token, setup_file_logging
 from app.utils.errors import (
     TTSProxyError,
     DoubaoAPIError,
@@ -9,6 +9,7 @@ from app.utils.errors import (
 __all__ = [
     "logger",
     "mask_token",
+    "setup_file_logging",
     "TTSProxyError",
     "DoubaoAPIError",
     "format_error_response",
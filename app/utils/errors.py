@@ -12,11 +12,14 @@ class TTSProxyError(Exception):
         self, 
         message: str, 
         error_type: str = "api_error", 
-        status_code: int = 500
+        status_code: int = 500,
+        code: Optional[str] = None
     ):
         self.message = message
         self.error_type = error_type
         self.status_code = status_code
+        # 错误响应中的 code, 未给出时按豆包错误码生成
+        self.code = code
         super().__init__(message)
 
 
@@ -85,7 +88,7 @@ def format_error_response(
             "message": error.message,
             "type": error.error_type,
             "param": param,
-            "code": f"doubao_{getattr(error, 'doubao_code', 'unknown')}"
+            "code": error.code or f"doubao_{getattr(error, 'doubao_code', 'unknown')}"
         }
     }
 
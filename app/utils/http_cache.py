@@ -0,0 +1,119 @@
+"""HTTP缓存与范围请求模块
+
+为可缓存的GET音频响应生成强ETag, 处理 If-None-Match(304)、Range / If-Range(206、416)。
+部分内容以 `memoryview` 切片返回, 音频包(mmap)中的音频只读取被请求的页, 缓存中的音频不复制。
+音频响应的ETag使用写入缓存或音频包时计算的内容摘要(`content_digest`), 不必为每次请求读取并哈希整段音频。
+"""
+import hashlib
+from typing import Dict, Optional, Tuple, Union
+from fastapi import Request
+from fastapi.responses import Response
+
+AudioData = Union[bytes, memoryview]
+
+
+def strong_etag(data: AudioData) -> str:
+    """按内容生成强ETag(与 `content_digest` 相同的摘要)
+
+    Args:
+        data: 响应内容
+
+    Returns:
+        带引号的ETag
+    """
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 是否匹配(弱比较, 支持列表与 `*`)
+
+    Args:
+        header: If-None-Match 请求头
+        etag: 当前ETag
+
+    Returns:
+        是否匹配
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """解析单个字节范围
+
+    Args:
+        header: Range 请求头, 如 `bytes=0-1023`、`bytes=1024-`、`bytes=-500`
+        size: 内容长度
+
+    Returns:
+        (起始, 结束) 闭区间; 没有或无法解析(含多个范围)时返回None, 按完整内容响应
+
+    Raises:
+        ValueError: 范围无法满足(起点超出内容长度)
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, separator, end_text = header[len("bytes="):].strip().partition("-")
+    if not separator or not (start_text or end_text):
+        return None
+    if not all(text.isdigit() for text in (start_text, end_text) if text):
+        return None
+    if not start_text:
+        # 最后N个字节
+        suffix = int(end_text)
+        if suffix == 0 or size == 0:
+            raise ValueError("范围无法满足")
+        return max(0, size - suffix), size - 1
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if end_text and end < start:
+        return None
+    if start >= size:
+        raise ValueError("范围无法满足")
+    return start, min(end, size - 1)
+
+
+def conditional_response(
+    request: Request,
+    data: AudioData,
+    media_type: str,
+    cache_control: str,
+    headers: Optional[Dict[str, str]] = None,
+    etag: Optional[str] = None
+) -> Response:
+    """按条件请求头生成完整(200)、未修改(304)、部分(206)或范围无法满足(416)的响应
+
+    Args:
+        request: 请求对象
+        data: 完整内容
+        media_type: Content-Type
+        cache_control: Cache-Control
+        headers: 其他响应头
+        etag: 强ETag(写入时计算的内容摘要), 未给出时按内容计算
+
+    Returns:
+        响应
+    """
+    if etag is None:
+        etag = strong_etag(data)
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = len(data)
+    if_range = request.headers.get("if-range")
+    try:
+        byte_range = None if if_range not in (None, etag) else parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        return Response(content=data, media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=memoryview(data)[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+
+
+__all__ = ["strong_etag", "etag_matches", "parse_range", "conditional_response"]
@@ -5,6 +5,7 @@
 from loguru import logger
 import sys
 from pathlib import Path
+from typing import Optional
 
 # 延迟导入避免循环依赖
 def _get_log_level():
@@ -26,19 +27,39 @@ logger.add(
     colorize=True
 )
 
-# 创建日志目录
-log_dir = Path("logs")
-log_dir.mkdir(exist_ok=True)
+# 文件处理器ID, 由setup_file_logging在应用启动时添加
+_file_handler_id: Optional[int] = None
 
-# 添加文件处理器(可选)
-logger.add(
-    "logs/tts_proxy_{time:YYYY-MM-DD}.log",
-    rotation="00:00",
-    retention="7 days",
-    level=_get_log_level(),
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-    encoding="utf-8"
-)
+
+def setup_file_logging(log_dir: Optional[str] = None) -> None:
+    """添加文件日志处理器
+    
+    创建日志目录和文件sink有磁盘IO开销, 因此不在导入时执行,
+    而是由应用lifespan在启动时调用。重复调用不会重复添加。
+    
+    Args:
+        log_dir: 日志目录, 默认读取配置 `LOG_DIR`, 为空时不写文件日志
+    """
+    global _file_handler_id
+    if _file_handler_id is not None:
+        return
+    if log_dir is None:
+        from app.config import settings
+        log_dir = settings.LOG_DIR
+    if not log_dir:
+        return
+    
+    # 创建日志目录
+    Path(log_dir).mkdir(parents=True, exist_ok=True)
+    
+    _file_handler_id = logger.add(
+        f"{log_dir}/tts_proxy_{{time:YYYY-MM-DD}}.log",
+        rotation="00:00",
+        retention="7 days",
+        level=_get_log_level(),
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        encoding="utf-8"
+    )
 
 
 def mask_token(token: str, show_chars: int = 6) -> str:
@@ -63,4 +84,4 @@ def mask_token(token: str, show_chars: int = 6) -> str:
 
 
 # 导出logger
-__all__ = ["logger", "mask_token"]
\ No newline at end of file
+__all__ = ["logger", "mask_token", "setup_file_logging"]
\ No newline at end of file
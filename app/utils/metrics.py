@@ -0,0 +1,214 @@
+"""指标模块
+
+轻量的进程内指标注册表, 以Prometheus文本格式导出, 不依赖第三方库
+"""
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """指标基类"""
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> List[Tuple[str, LabelValues, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, value in self.samples():
+            names = self.label_names
+            if suffix.startswith("_bucket"):
+                suffix, le = suffix.split(":", 1)
+                names = names + ("le",)
+                values = values + (le,)
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {value:g}")
+        return lines
+
+
+class Counter(_Metric):
+    """单调递增计数器, 也可在导出时通过回调读取累计值(如对象上的计数属性)"""
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Iterable[str] = (),
+        callback: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        if self._callback is not None and not self.label_names:
+            return float(self._callback())
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        if self._callback is not None and not self.label_names:
+            return [("", (), float(self._callback()))]
+        return [("", key, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """瞬时值, 可设置或在导出时通过回调读取"""
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Iterable[str] = (),
+        callback: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def set_callback(self, callback: Callable[[], float]) -> None:
+        self._callback = callback
+
+    def value(self, **labels: str) -> float:
+        if self._callback is not None and not self.label_names:
+            return float(self._callback())
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        if self._callback is not None and not self.label_names:
+            return [("", (), float(self._callback()))]
+        return [("", key, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+    kind = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def quantile(self, q: float, **labels: str) -> float:
+        """按桶上界估算分位数"""
+        counts = self._counts.get(self._key(labels))
+        if not counts:
+            return 0.0
+        target = q * sum(counts)
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        result = []
+        for key in sorted(self._counts):
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self._counts[key]):
+                running += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                result.append((f"_bucket:{le}", key, running))
+            result.append(("_sum", key, self._sums[key]))
+            result.append(("_count", key, running))
+        return result
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self,
+        name: str,
+        description: str,
+        labels: Iterable[str] = (),
+        callback: Optional[Callable[[], float]] = None
+    ) -> Counter:
+        return self._register(Counter(name, description, labels, callback))
+
+    def gauge(
+        self,
+        name: str,
+        description: str,
+        labels: Iterable[str] = (),
+        callback: Optional[Callable[[], float]] = None
+    ) -> Gauge:
+        return self._register(Gauge(name, description, labels, callback))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = Histogram.DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, description, labels, buckets))
+
+    def render(self) -> str:
+        """导出Prometheus文本格式"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+
+__all__ = ["MetricsRegistry", "Counter", "Gauge", "Histogram", "metrics"]
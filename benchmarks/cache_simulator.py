@@ -0,0 +1,150 @@
+"""音频缓存策略模拟
+
+回放请求日志, 在不同容量下比较 LRU 与 TinyLFU 的命中率(按请求数)与字节命中率(按音频字节数)。
+直接驱动 `AudioCache`, 缓存键与服务一致(规范化文本 + 转换后的豆包参数)。
+
+日志为JSONL, 每行是一个 /v1/audio/speech 请求体, 或形如 {"body": {...}, "bytes": 音频字节数} 的记录;
+没有 `bytes` 时按文本长度与格式估算音频大小:
+    {"model": "tts-1", "input": "你好，世界。", "voice": "alloy"}
+
+用法:
+    python benchmarks/cache_simulator.py requests.log.jsonl --capacity 16 64 256
+    python benchmarks/cache_simulator.py --synthetic 200000          # 热门短句 + 一次性长文本
+    python benchmarks/cache_simulator.py --synthetic 200000 --long-ratio 0.3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DOUBAO_APPID", "bench_appid")
+os.environ.setdefault("DOUBAO_ACCESS_TOKEN", "bench_token")
+
+from app.models.openai_models import OpenAISpeechRequest  # noqa: E402
+from app.services.audio_cache import CACHE_POLICIES, AudioCache  # noqa: E402
+from app.services.mock_backend import SECONDS_PER_CHAR  # noqa: E402
+from app.services.normalizer import normalizer  # noqa: E402
+from app.services.request_builder import request_builder  # noqa: E402
+
+MB = 1024 * 1024
+# 各格式每秒音频的大致字节数(24kHz单声道, mp3/aac为默认码率)
+BYTES_PER_SECOND = {"mp3": 20000, "opus": 6000, "aac": 16000, "flac": 30000, "wav": 48000, "pcm": 48000}
+
+
+def estimate_bytes(request: OpenAISpeechRequest) -> int:
+    """按文本长度估算音频字节数"""
+    seconds = max(0.1, len(request.input) * SECONDS_PER_CHAR / request.speed)
+    return int(seconds * BYTES_PER_SECOND.get(request.response_format or "mp3", 20000))
+
+
+def read_log(path: str) -> Iterator[dict]:
+    """读取JSONL请求日志"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def synthetic_log(count: int, long_ratio: float, seed: int = 42) -> Iterator[dict]:
+    """生成热门短句(Zipf分布)与一次性长文本(用户生成内容)混合的请求日志"""
+    rng = random.Random(seed)
+    prompts = [f"常用提示语{i}：" + "请稍候，正在为您处理"[: rng.randint(4, 10)] for i in range(2000)]
+    weights = [1 / (rank + 1) for rank in range(len(prompts))]
+    for i in range(count):
+        if rng.random() < long_ratio:
+            text = f"用户内容{i}：" + "这是一段用户生成的长文本，只会被朗读一次。" * rng.randint(5, 30)
+        else:
+            text = rng.choices(prompts, weights)[0]
+        yield {"model": "tts-1", "input": text, "voice": rng.choice(["alloy", "nova"])}
+
+
+def prepare(records: Iterable[dict]) -> Tuple[List[Tuple[str, int]], int]:
+    """计算每条请求的缓存键与音频大小"""
+    trace: List[Tuple[str, int]] = []
+    skipped = 0
+    for record in records:
+        body = record.get("body", record)
+        try:
+            request = OpenAISpeechRequest(**body)
+        except Exception:
+            skipped += 1
+            continue
+        request = request.model_copy(update={"input": normalizer.normalize(request.input)})
+        size = int(record.get("bytes") or estimate_bytes(request))
+        trace.append((request_builder.build(request).cache_key, size))
+    return trace, skipped
+
+
+def simulate(trace: List[Tuple[str, int]], capacity: int, policy: str) -> dict:
+    """按请求顺序查缓存, 未命中时写入(模拟合成完成)"""
+    cache = AudioCache(max_bytes=capacity, max_item_bytes=capacity, policy=policy)
+    # 写入只用到长度, 用同一块内存的切片代替真实音频
+    buffer = memoryview(bytes(max((size for _, size in trace), default=0)))
+    hits = hit_bytes = total_bytes = 0
+    for key, size in trace:
+        total_bytes += size
+        if cache.get(key) is not None:
+            hits += 1
+            hit_bytes += size
+        else:
+            cache.put(key, buffer[:size])
+    return {
+        "policy": policy,
+        "capacity_mb": capacity / MB,
+        "hit_ratio": hits / len(trace) if trace else 0.0,
+        "byte_hit_ratio": hit_bytes / total_bytes if total_bytes else 0.0,
+        "rejected": cache.rejected,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="音频缓存策略(LRU / TinyLFU)命中率模拟")
+    parser.add_argument("log", nargs="?", help="JSONL请求日志路径")
+    parser.add_argument("--synthetic", type=int, default=0, help="生成N条模拟请求代替日志")
+    parser.add_argument("--long-ratio", type=float, default=0.2, help="模拟日志中一次性长文本的比例")
+    parser.add_argument("--capacity", type=float, nargs="+", default=[4, 16, 64], help="缓存容量(MB)")
+    parser.add_argument("--json", action="store_true", help="输出JSON")
+    args = parser.parse_args()
+
+    if args.log:
+        records = read_log(args.log)
+    elif args.synthetic:
+        records = synthetic_log(args.synthetic, args.long_ratio)
+    else:
+        parser.error("需要提供日志路径或 --synthetic N")
+
+    trace, skipped = prepare(records)
+    unique = {}
+    for key, size in trace:
+        unique[key] = size
+    print(
+        f"请求 {len(trace)} 条(跳过 {skipped}), 不同键 {len(unique)} 个, "
+        f"全部音频 {sum(unique.values()) / MB:.1f}MB",
+        file=sys.stderr,
+    )
+
+    results = [
+        simulate(trace, int(capacity * MB), policy)
+        for capacity in args.capacity
+        for policy in CACHE_POLICIES
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'容量(MB)':>10}{'策略':>10}{'命中率':>10}{'字节命中率':>12}{'拒绝写入':>10}")
+    for result in results:
+        print(
+            f"{result['capacity_mb']:>10.1f}{result['policy']:>10}{result['hit_ratio']:>10.2%}"
+            f"{result['byte_hit_ratio']:>12.2%}{result['rejected']:>10}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""导入耗时基准测试
+
+基于 `python -X importtime` 测量 `import app.main` 的冷启动耗时,
+并可选测量从进程启动到服务首次响应的时间。
+
+用法:
+    python benchmarks/import_time.py                 # 默认预算检查
+    python benchmarks/import_time.py --budget-ms 500 --runs 7
+    python benchmarks/import_time.py --serve         # 额外测量服务就绪时间
+
+超出预算时以非零状态码退出, 可直接用于CI。
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 子进程环境: 提供必填配置, 避免读取本地.env
+BENCH_ENV = {
+    **os.environ,
+    "DOUBAO_APPID": "bench_appid",
+    "DOUBAO_ACCESS_TOKEN": "bench_token",
+    "DRAIN_GRACE_SECONDS": "0",
+    "PYTHONPATH": str(ROOT),
+}
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import(module: str = "app.main") -> tuple[int, list[tuple[str, int, int]]]:
+    """在新进程中导入模块并解析importtime输出
+
+    在临时目录中运行, 以便同时检查导入是否产生文件系统副作用。
+
+    Args:
+        module: 待导入的模块名
+
+    Returns:
+        (模块累计耗时微秒, [(模块名, 自身耗时, 累计耗时), ...])
+    """
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=cwd,
+            env=BENCH_ENV,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"导入失败:\n{proc.stderr[-2000:]}")
+        if os.listdir(cwd):
+            print(f"警告: 导入 {module} 时在工作目录创建了文件: {os.listdir(cwd)}")
+
+    entries = []
+    total = 0
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        entries.append((name, int(self_us), int(cumulative_us)))
+        if name == module:
+            total = int(cumulative_us)
+    return total, entries
+
+
+def measure_ready(timeout: float = 30.0) -> float:
+    """测量从启动uvicorn进程到/health首次成功响应的耗时
+
+    Args:
+        timeout: 最长等待时间(秒)
+
+    Returns:
+        就绪耗时(秒)
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as cwd:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+            ],
+            cwd=cwd,
+            env=BENCH_ENV,
+        )
+        try:
+            url = f"http://127.0.0.1:{port}/health"
+            while time.perf_counter() - start < timeout:
+                try:
+                    with urllib.request.urlopen(url, timeout=1) as resp:
+                        if resp.status == 200:
+                            return time.perf_counter() - start
+                except OSError:
+                    time.sleep(0.005)
+            raise TimeoutError("服务未在超时时间内就绪")
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="TTS Proxy 冷启动基准测试")
+    parser.add_argument("--module", default="app.main", help="待测量的模块")
+    parser.add_argument("--runs", type=int, default=5, help="重复次数(取中位数)")
+    parser.add_argument("--budget-ms", type=float, default=800.0, help="导入耗时预算(毫秒)")
+    parser.add_argument("--top", type=int, default=15, help="展示自身耗时最高的N个模块")
+    parser.add_argument("--serve", action="store_true", help="同时测量服务就绪时间")
+    args = parser.parse_args()
+
+    totals = []
+    entries: list[tuple[str, int, int]] = []
+    for _ in range(args.runs):
+        total, entries = measure_import(args.module)
+        totals.append(total / 1000)
+
+    median_ms = statistics.median(totals)
+    print(f"import {args.module}: 中位数 {median_ms:.1f} ms "
+          f"(min {min(totals):.1f} / max {max(totals):.1f}, runs={args.runs})")
+
+    print(f"\n自身耗时最高的 {args.top} 个模块(最后一次运行):")
+    for name, self_us, cumulative_us in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.2f} ms  (累计 {cumulative_us / 1000:8.2f} ms)  {name}")
+
+    if args.serve:
+        ready = measure_ready()
+        print(f"\n进程启动到 /health 可用: {ready * 1000:.1f} ms")
+
+    if median_ms > args.budget_ms:
+        print(f"\n超出预算: {median_ms:.1f} ms > {args.budget_ms:.1f} ms")
+        return 1
+    print(f"\n预算内: {median_ms:.1f} ms <= {args.budget_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""自适应并发限制收敛基准
+
+模拟容量随时间变化的上游: 在途请求数不超过容量时首包时间为基线,
+超过容量时首包时间随排队线性增长, 超过容量1.5倍时返回3003。
+大量客户端持续请求, 观察限制是否收敛到各阶段的上游容量附近。
+
+用法:
+    python benchmarks/limiter_bench.py
+    python benchmarks/limiter_bench.py --phases 20,8,30 --phase-seconds 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DOUBAO_APPID", "bench_appid")
+os.environ.setdefault("DOUBAO_ACCESS_TOKEN", "bench_token")
+
+from app.services.limiter import AdaptiveLimiter  # noqa: E402
+from app.services.scheduler import UpstreamScheduler  # noqa: E402
+from app.utils.errors import DoubaoAPIError  # noqa: E402
+
+BASE_TTFB = 0.02
+BODY_SECONDS = 0.03
+
+
+class FakeUpstream:
+    """容量可变的模拟上游"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def call(self, mark_first_chunk) -> None:
+        self.in_flight += 1
+        try:
+            load = self.in_flight / self.capacity
+            if load > 1.5:
+                self.rejected += 1
+                await asyncio.sleep(BASE_TTFB / 2)
+                raise DoubaoAPIError(3003, "并发超限")
+            await asyncio.sleep(BASE_TTFB * max(1.0, load * load))
+            mark_first_chunk()
+            await asyncio.sleep(BODY_SECONDS)
+        finally:
+            self.in_flight -= 1
+
+
+async def run(phases: list[int], phase_seconds: float, clients: int, initial: int) -> None:
+    scheduler = UpstreamScheduler(initial, {"standard": 1}, starvation_seconds=60, reserved_slots=0)
+    limiter = AdaptiveLimiter(
+        initial_limit=initial, min_limit=1, max_limit=200,
+        on_change=scheduler.set_max_concurrency,
+    )
+    upstream = FakeUpstream(phases[0])
+    stop = False
+
+    async def client():
+        while not stop:
+            try:
+                async with scheduler.slot("standard", 1):
+                    async with limiter.measure() as sample:
+                        await upstream.call(sample.mark_first_chunk)
+            except DoubaoAPIError:
+                await asyncio.sleep(0.01)
+
+    tasks = [asyncio.create_task(client()) for _ in range(clients)]
+    print(f"{'阶段':<6}{'上游容量':>10}{'限制(后半段中位数)':>20}{'3003次数':>12}")
+    for index, capacity in enumerate(phases):
+        upstream.capacity = capacity
+        upstream.rejected = 0
+        samples = []
+        start = time.monotonic()
+        while time.monotonic() - start < phase_seconds:
+            await asyncio.sleep(0.05)
+            if time.monotonic() - start > phase_seconds / 2:
+                samples.append(limiter.limit)
+        print(f"{index + 1:<6}{capacity:>10}{statistics.median(samples):>20.0f}{upstream.rejected:>12}")
+
+    stop = True
+    await asyncio.gather(*tasks)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="自适应并发限制收敛基准")
+    parser.add_argument("--phases", default="20,8,30,12", help="各阶段上游容量(逗号分隔)")
+    parser.add_argument("--phase-seconds", type=float, default=3.0, help="每阶段时长(秒)")
+    parser.add_argument("--clients", type=int, default=100, help="并发客户端数")
+    parser.add_argument("--initial", type=int, default=10, help="初始并发限制")
+    args = parser.parse_args()
+    phases = [int(p) for p in args.phases.split(",")]
+    asyncio.run(run(phases, args.phase_seconds, args.clients, args.initial))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
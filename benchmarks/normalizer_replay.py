@@ -0,0 +1,157 @@
+"""文本规范化命中率回放
+
+回放请求日志, 对比使用原始文本与规范化文本作为缓存键时的命中率。
+
+日志为JSONL, 每行是一个 /v1/audio/speech 请求体, 或形如 {"body": {...}} 的记录:
+    {"model": "tts-1", "input": "你好，世界。", "voice": "alloy"}
+
+用法:
+    python benchmarks/normalizer_replay.py requests.log.jsonl
+    python benchmarks/normalizer_replay.py --synthetic 5000   # 生成带变体的模拟日志
+    python benchmarks/normalizer_replay.py log.jsonl --capacity 1000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DOUBAO_APPID", "bench_appid")
+os.environ.setdefault("DOUBAO_ACCESS_TOKEN", "bench_token")
+
+from app.models.openai_models import OpenAISpeechRequest  # noqa: E402
+from app.services.audio_cache import make_cache_key  # noqa: E402
+from app.services.converter import ParameterConverter  # noqa: E402
+from app.services.normalizer import RULES, TextNormalizer  # noqa: E402
+
+SAMPLE_TEXTS = [
+    "您好，欢迎致电客服中心",
+    "请输入您的会员卡号",
+    "正在为您转接人工服务，请稍候",
+    "今天天气晴，最高气温二十五度",
+    "Your order has been shipped",
+    "感谢您的耐心等待",
+    "抱歉，我没有听清楚，请再说一遍",
+    "会议将在五分钟后开始",
+]
+
+
+def _variant(text: str, rng: random.Random) -> str:
+    """生成与原文本合成结果相同的书写变体"""
+    choice = rng.random()
+    if choice < 0.2:
+        return text + "。"
+    if choice < 0.35:
+        return " " + text.replace("，", ", ") + "  "
+    if choice < 0.5:
+        return text.replace("，", ",")
+    if choice < 0.6:
+        return text.replace("，", "， ") + "\n"
+    return text
+
+
+def synthetic_log(count: int, seed: int = 42) -> Iterator[dict]:
+    """生成带书写变体的Zipf分布请求日志"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(SAMPLE_TEXTS))]
+    for _ in range(count):
+        text = rng.choices(SAMPLE_TEXTS, weights)[0]
+        yield {
+            "model": "tts-1",
+            "input": _variant(text, rng),
+            "voice": rng.choice(["alloy", "nova"]),
+        }
+
+
+def read_log(path: str) -> Iterator[dict]:
+    """读取JSONL请求日志"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            yield record.get("body", record)
+
+
+class _LRU:
+    """按条目数限制的LRU命中模拟"""
+
+    def __init__(self, capacity: Optional[int]):
+        self.capacity = capacity
+        self.entries: "OrderedDict[str, None]" = OrderedDict()
+
+    def access(self, key: str) -> bool:
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return True
+        self.entries[key] = None
+        if self.capacity is not None and len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return False
+
+
+def replay(records: Iterable[dict], capacity: Optional[int]) -> dict:
+    """回放请求并统计两种缓存键下的命中率"""
+    converter = ParameterConverter()
+    normalizer = TextNormalizer(rules=list(RULES))
+    raw_cache, norm_cache = _LRU(capacity), _LRU(capacity)
+    total = raw_hits = norm_hits = skipped = 0
+    normalize_seconds = 0.0
+
+    for body in records:
+        try:
+            request = OpenAISpeechRequest(**body)
+        except Exception:
+            skipped += 1
+            continue
+        total += 1
+        raw_hits += raw_cache.access(make_cache_key(converter.convert(request)))
+
+        start = time.perf_counter()
+        text = normalizer.normalize(request.input)
+        normalize_seconds += time.perf_counter() - start
+        normalized = request.model_copy(update={"input": text})
+        norm_hits += norm_cache.access(make_cache_key(converter.convert(normalized)))
+
+    return {
+        "requests": total,
+        "skipped": skipped,
+        "raw_hit_ratio": raw_hits / total if total else 0.0,
+        "normalized_hit_ratio": norm_hits / total if total else 0.0,
+        "raw_unique_keys": len(raw_cache.entries) if capacity is None else None,
+        "normalized_unique_keys": len(norm_cache.entries) if capacity is None else None,
+        "normalize_us_per_request": normalize_seconds / total * 1e6 if total else 0.0,
+        "normalizer_cache": normalizer.cache_info(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="文本规范化缓存命中率回放")
+    parser.add_argument("log", nargs="?", help="JSONL请求日志路径")
+    parser.add_argument("--synthetic", type=int, default=0, help="生成N条模拟请求代替日志")
+    parser.add_argument("--capacity", type=int, default=None, help="缓存条目数上限(默认不限)")
+    args = parser.parse_args()
+
+    if args.log:
+        records = read_log(args.log)
+    elif args.synthetic:
+        records = synthetic_log(args.synthetic)
+    else:
+        parser.error("需要提供日志路径或 --synthetic N")
+
+    result = replay(records, args.capacity)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    gain = result["normalized_hit_ratio"] - result["raw_hit_ratio"]
+    print(f"\n命中率: {result['raw_hit_ratio']:.2%} → {result['normalized_hit_ratio']:.2%} "
+          f"(+{gain:.2%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
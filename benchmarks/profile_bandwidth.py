@@ -0,0 +1,97 @@
+"""输出档位带宽基准
+
+列出各输出档位每秒音频的字节数与相对默认档位的比例, 衡量低保真档位节省的出口流量。
+
+默认按档位参数计算名义值: pcm/wav 为 采样率 × 2 字节(单声道16位), mp3 为 比特率 × 125 字节。
+`--live` 时实际请求上游: 以同一档位的 pcm 合成结果确定音频时长, 再用各格式的字节数除以时长,
+可得到 opus/aac 等无法按参数推算的格式(需要配置豆包凭证)。
+
+用法:
+    python benchmarks/profile_bandwidth.py
+    python benchmarks/profile_bandwidth.py --profiles "telephony:sample_rate=8000;bit_rate=32" --formats mp3 wav
+    OUTPUT_PROFILES=... python benchmarks/profile_bandwidth.py --live --text "欢迎致电，请按一号键。"
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DOUBAO_APPID", "bench_appid")
+os.environ.setdefault("DOUBAO_ACCESS_TOKEN", "bench_token")
+
+from app.services.profiles import DEFAULT_PROFILE, OutputProfile, output_profiles, parse_profiles  # noqa: E402
+
+NOMINAL_FORMATS = ("pcm", "wav", "mp3")
+# 流式WAV头长度
+WAV_HEADER_BYTES = 44
+
+
+def nominal_bytes_per_second(profile: OutputProfile, fmt: str) -> Optional[float]:
+    """按档位参数计算每秒音频的字节数, 无法推算的格式返回None"""
+    if fmt in ("pcm", "wav"):
+        return profile.sample_rate * 2
+    if fmt == "mp3":
+        return profile.bit_rate * 125
+    return None
+
+
+async def measure_live(profiles: Dict[str, OutputProfile], formats, text: str, voice: str) -> Dict[str, Dict[str, float]]:
+    """实际请求上游, 返回 档位 -> 格式 -> 每秒音频的字节数"""
+    from app.models.openai_models import OpenAISpeechRequest
+    from app.services.doubao_client import doubao_client
+    from app.services.speech_service import speech_service
+
+    results = {}
+    try:
+        for name, profile in profiles.items():
+            base = OpenAISpeechRequest(model="tts-1", input=text, voice=voice, response_format="pcm", profile=name)
+            pcm = await speech_service.synthesize(base)
+            seconds = len(pcm.audio) / (profile.sample_rate * 2)
+            results[name] = {}
+            for fmt in formats:
+                result = await speech_service.synthesize(base.model_copy(update={"response_format": fmt}))
+                size = len(result.audio) - (WAV_HEADER_BYTES if fmt == "wav" else 0)
+                results[name][fmt] = size / seconds
+            print(f"{name}: 音频 {seconds:.2f}s")
+    finally:
+        await doubao_client.close()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="输出档位带宽基准")
+    parser.add_argument("--profiles", help="档位配置(格式同 OUTPUT_PROFILES), 默认读取配置; --live 时忽略")
+    parser.add_argument("--formats", nargs="+", default=list(NOMINAL_FORMATS), help="输出格式")
+    parser.add_argument("--live", action="store_true", help="实际请求上游测量")
+    parser.add_argument("--text", default="您好，欢迎致电客户服务中心。查询账单请按一，办理业务请按二，人工服务请按零。")
+    parser.add_argument("--voice", default="alloy", help="OpenAI音色")
+    args = parser.parse_args()
+
+    if args.live:
+        profiles = output_profiles.profiles
+        rates = asyncio.run(measure_live(profiles, args.formats, args.text, args.voice))
+    else:
+        profiles = parse_profiles(args.profiles) if args.profiles else output_profiles.profiles
+        rates = {
+            name: {fmt: nominal_bytes_per_second(profile, fmt) for fmt in args.formats}
+            for name, profile in profiles.items()
+        }
+
+    print(f"{'档位':<12}{'采样率':>8}{'比特率':>8}{'格式':>10}{'字节/秒':>10}{'相对default':>14}")
+    for name, profile in profiles.items():
+        for fmt in args.formats:
+            rate = rates[name].get(fmt)
+            baseline = rates[DEFAULT_PROFILE].get(fmt)
+            if rate is None:
+                print(f"{name:<12}{profile.sample_rate:>8}{profile.bit_rate:>8}{fmt:>10}{'-':>10}{'(需要 --live)':>14}")
+                continue
+            ratio = f"{rate / baseline:.1%}" if baseline else "-"
+            print(f"{name:<12}{profile.sample_rate:>8}{profile.bit_rate:>8}{fmt:>10}{rate:>10.0f}{ratio:>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""代理自身吞吐基准
+
+使用进程内模拟后端(不访问网络), 通过ASGI直接调用 /v1/audio/speech,
+测量代理本身(校验、规范化、请求构建、调度、分帧、缓存)的吞吐与延迟。
+
+用法:
+    python benchmarks/proxy_throughput.py
+    python benchmarks/proxy_throughput.py --requests 5000 --concurrency 64 --format wav
+    python benchmarks/proxy_throughput.py --ttfb 0.2 --speed 5   # 模拟真实上游耗时
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DOUBAO_APPID", "bench_appid")
+os.environ.setdefault("DOUBAO_ACCESS_TOKEN", "bench_token")
+os.environ["TTS_BACKEND"] = "mock"
+os.environ.setdefault("ENABLE_ADAPTIVE_CONCURRENCY", "false")
+os.environ.setdefault("MAX_CONCURRENT_REQUESTS", "1000")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+async def run(args) -> None:
+    import httpx
+    from app.main import app
+    from app.services.speech_service import speech_service
+    from app.services.mock_backend import MockTTSBackend
+    from app.services.backend_router import BackendRouter
+
+    speech_service.router = BackendRouter(
+        {"mock": MockTTSBackend(ttfb=args.ttfb, speed=args.speed)}, "mock"
+    )
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    total_bytes = 0
+    counter = iter(range(args.requests))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal total_bytes
+            for index in counter:
+                text = "今天天气不错, 我们一起去公园散步吧。"
+                if not args.repeat:
+                    text = f"{text}第{index}次。"
+                start = time.perf_counter()
+                response = await client.post("/v1/audio/speech", json={
+                    "model": "tts-1", "input": text, "voice": "alloy",
+                    "response_format": args.format,
+                })
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+                total_bytes += len(response.content)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"请求数: {len(latencies)}, 并发: {args.concurrency}, 格式: {args.format}, "
+          f"{'重复文本(命中缓存)' if args.repeat else '唯一文本(未命中缓存)'}")
+    print(f"吞吐: {len(latencies) / elapsed:.0f} req/s, {total_bytes / elapsed / 1e6:.1f} MB/s")
+    print(f"延迟: p50={statistics.median(latencies) * 1000:.2f}ms, "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="代理自身吞吐基准")
+    parser.add_argument("--requests", type=int, default=2000, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=32, help="并发数")
+    parser.add_argument("--format", default="mp3", help="音频格式")
+    parser.add_argument("--repeat", action="store_true", help="使用相同文本(测量缓存命中路径)")
+    parser.add_argument("--ttfb", type=float, default=0.0, help="模拟后端首包时间(秒)")
+    parser.add_argument("--speed", type=float, default=0.0, help="模拟后端生成速度, 0表示不等待")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
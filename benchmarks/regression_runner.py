@@ -0,0 +1,293 @@
+"""性能回归对比
+
+用同一组录制轨迹比较多个代码版本: 启动一个回放服务器作为上游, 依次在各版本的
+git worktree 中启动代理, 按轨迹文本发送相同的请求序列, 统计首字节时间、
+总延迟与代理进程CPU时间, 可选地同时采集CPU剖析(折叠栈, 需该版本提供管理接口)。
+
+代理关闭音频缓存, 每个请求都经过完整的上游解析、分帧路径。
+
+用法:
+    python benchmarks/regression_runner.py traces/ --revs HEAD~5 HEAD WORKTREE
+    python benchmarks/regression_runner.py traces/ --speed max --rounds 5 --concurrency 16
+    python benchmarks/regression_runner.py traces/ --profile 5 --output results/
+
+WORKTREE 表示当前工作区(含未提交的修改)。
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from replay_server import load_traces, parse_speed  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+ADMIN_KEY = "regression-runner"
+# 豆包格式 -> OpenAI格式
+OPENAI_FORMATS = {"mp3": "mp3", "ogg_opus": "opus", "aac": "aac", "flac": "flac", "wav": "wav", "pcm": "pcm"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    """读取进程累计CPU时间(用户态+内核态), 非Linux返回None"""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _wait_healthy(url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(f"进程已退出: {url}, code={process.returncode}")
+        try:
+            httpx.get(f"{url}/health", timeout=0.5)
+            return
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"启动超时: {url}")
+            time.sleep(0.1)
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(f"回放服务器已退出, code={process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError("回放服务器启动超时")
+            time.sleep(0.1)
+
+
+def _stop(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+@contextmanager
+def checkout(rev: str) -> Iterator[Path]:
+    """获取指定版本的源码目录(临时 git worktree)"""
+    if rev == "WORKTREE":
+        yield ROOT
+        return
+    directory = Path(tempfile.mkdtemp(prefix="tts-regression-"))
+    subprocess.run(
+        ["git", "worktree", "add", "--detach", str(directory), rev],
+        cwd=ROOT, check=True, stdout=subprocess.DEVNULL
+    )
+    try:
+        yield directory
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", str(directory)], cwd=ROOT, check=False)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def drive(url: str, bodies: List[dict], concurrency: int, profile: float) -> Dict:
+    """按顺序发送请求, 返回延迟统计与可选的剖析结果"""
+    import httpx
+
+    ttfb: List[float] = []
+    latency: List[float] = []
+    errors = 0
+    total_bytes = 0
+    queue = iter(bodies)
+
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        async def worker():
+            nonlocal errors, total_bytes
+            for body in queue:
+                start = time.perf_counter()
+                first = None
+                try:
+                    async with client.stream("POST", "/v1/audio/speech", json=body) as response:
+                        async for chunk in response.aiter_bytes():
+                            if first is None:
+                                first = time.perf_counter() - start
+                            total_bytes += len(chunk)
+                        if response.status_code != 200:
+                            errors += 1
+                            continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latency.append(time.perf_counter() - start)
+                ttfb.append(first if first is not None else latency[-1])
+
+        async def sample_profile() -> Optional[str]:
+            response = await client.get(
+                "/admin/profile/cpu",
+                params={"seconds": profile},
+                headers={"Authorization": f"Bearer {ADMIN_KEY}"},
+                timeout=profile + 30,
+            )
+            return response.text if response.status_code == 200 else None
+
+        profiler = asyncio.create_task(sample_profile()) if profile > 0 else None
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        collapsed = await profiler if profiler is not None else None
+
+    return {
+        "requests": len(bodies),
+        "errors": errors,
+        "elapsed": elapsed,
+        "bytes": total_bytes,
+        "ttfb_p50": _percentile(ttfb, 0.5),
+        "ttfb_p99": _percentile(ttfb, 0.99),
+        "latency_p50": _percentile(latency, 0.5),
+        "latency_p99": _percentile(latency, 0.99),
+        "latency_mean": statistics.fmean(latency) if latency else float("nan"),
+        "collapsed": collapsed,
+    }
+
+
+def run_revision(rev: str, upstream: str, bodies: List[dict], args) -> Dict:
+    """在指定版本上启动代理并运行请求序列"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        DOUBAO_APPID=os.environ.get("DOUBAO_APPID", "replay_appid"),
+        DOUBAO_ACCESS_TOKEN=os.environ.get("DOUBAO_ACCESS_TOKEN", "replay_token"),
+        DOUBAO_HTTP_URL=upstream,
+        DOUBAO_RECORD_DIR="",
+        TTS_BACKEND="doubao",
+        AUDIO_CACHE_MAX_BYTES="0",
+        PEER_NODES="",
+        ENABLE_LOOP_MONITOR="false",
+        DRAIN_GRACE_SECONDS="0",
+        ENABLE_ADAPTIVE_CONCURRENCY="false",
+        MAX_CONCURRENT_REQUESTS=str(max(args.concurrency, 10)),
+        ENABLE_API_KEY_AUTH="false",
+        ENABLE_ADMIN_API="true" if args.profile > 0 else "false",
+        ADMIN_API_KEYS=ADMIN_KEY,
+        LOG_LEVEL="WARNING",
+    )
+    with checkout(rev) as directory:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+            cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_healthy(url, process)
+            # 预热: 首批请求承担连接池与懒加载开销, 不计入结果
+            asyncio.run(drive(url, bodies[:args.concurrency], args.concurrency, 0))
+            cpu_before = _cpu_seconds(process.pid)
+            result = asyncio.run(drive(url, bodies, args.concurrency, args.profile))
+            cpu_after = _cpu_seconds(process.pid)
+        finally:
+            _stop(process)
+    result["rev"] = rev
+    result["cpu"] = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+    return result
+
+
+def _ms(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value * 1000:.1f}"
+
+
+def report(results: List[Dict]) -> None:
+    """打印各版本的对比表(差异相对第一个版本)"""
+    header = f"{'版本':<16}{'请求':>6}{'错误':>6}{'TTFB p50':>10}{'TTFB p99':>10}" \
+             f"{'延迟 p50':>10}{'延迟 p99':>10}{'CPU/请求':>10}{'ΔCPU':>8}"
+    print(header)
+    base_cpu = None
+    for result in results:
+        per_request = result["cpu"] / result["requests"] if result["cpu"] is not None else None
+        if base_cpu is None:
+            base_cpu = per_request
+        delta = f"{(per_request / base_cpu - 1) * 100:+.0f}%" if per_request and base_cpu else "-"
+        print(
+            f"{result['rev']:<16}{result['requests']:>6}{result['errors']:>6}"
+            f"{_ms(result['ttfb_p50']):>10}{_ms(result['ttfb_p99']):>10}"
+            f"{_ms(result['latency_p50']):>10}{_ms(result['latency_p99']):>10}"
+            f"{_ms(per_request):>10}{delta:>8}"
+        )
+    print("(时间单位: 毫秒)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="基于录制轨迹的多版本性能回归对比")
+    parser.add_argument("traces", type=Path, help="轨迹目录(DOUBAO_RECORD_DIR)")
+    parser.add_argument("--revs", nargs="+", default=["HEAD", "WORKTREE"], help="待比较的git版本")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="回放倍速: 1, 4, max")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发数")
+    parser.add_argument("--rounds", type=int, default=1, help="轨迹集重复次数")
+    parser.add_argument("--profile", type=float, default=0.0, help="CPU剖析时长(秒), 0表示不剖析")
+    parser.add_argument("--output", type=Path, help="结果目录(JSON汇总与折叠栈)")
+    args = parser.parse_args()
+
+    traces = load_traces(args.traces)
+    if not traces:
+        print(f"没有可回放的轨迹: {args.traces}", file=sys.stderr)
+        return 1
+    bodies = [
+        {"model": "tts-1", "input": trace.text, "voice": "alloy",
+         "response_format": OPENAI_FORMATS.get(trace.format, "mp3")}
+        for _ in range(args.rounds) for trace in traces
+    ]
+
+    replay_port = _free_port()
+    replay = subprocess.Popen(
+        [sys.executable, str(Path(__file__).with_name("replay_server.py")), str(args.traces),
+         "--port", str(replay_port), "--speed", str(args.speed or "max")],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    upstream = f"http://127.0.0.1:{replay_port}/api/v3/tts/unidirectional"
+    results = []
+    try:
+        _wait_for_port(replay_port, replay)
+        for rev in args.revs:
+            print(f"运行 {rev} ...", file=sys.stderr)
+            results.append(run_revision(rev, upstream, bodies, args))
+    finally:
+        _stop(replay)
+
+    report(results)
+    if args.output:
+        args.output.mkdir(parents=True, exist_ok=True)
+        for result in results:
+            collapsed = result.pop("collapsed")
+            if collapsed:
+                name = result["rev"].replace("/", "_").replace("~", "-")
+                (args.output / f"{name}.collapsed").write_text(collapsed, encoding="utf-8")
+        (args.output / "summary.json").write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""豆包上游回放服务器
+
+回放 `DOUBAO_RECORD_DIR` 录制的轨迹: 按录制时的响应头时间、块大小与块间间隔
+原样返回NDJSON响应流, 使代理在不访问真实上游的情况下承受真实的时序与块分布。
+
+请求按 req_params.text 匹配轨迹, 找不到时按顺序轮流使用全部轨迹。
+
+用法:
+    python benchmarks/replay_server.py traces/ --port 9100              # 1× 原速
+    python benchmarks/replay_server.py traces/ --port 9100 --speed 4    # 4× 加速
+    python benchmarks/replay_server.py traces/ --port 9100 --speed max  # 不等待
+
+代理端设置:
+    DOUBAO_HTTP_URL=http://127.0.0.1:9100/api/v3/tts/unidirectional
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# 不回放的响应头(由服务器重新生成, 或录制的是已解码文本)
+HOP_HEADERS = frozenset({"content-length", "transfer-encoding", "content-encoding", "connection"})
+
+
+@dataclass
+class Trace:
+    """一次录制的上游请求"""
+
+    path: Path
+    body: dict
+    status: int = 200
+    headers: List[Tuple[str, str]] = field(default_factory=list)
+    # 响应头相对请求开始的时间(秒)
+    response_at: float = 0.0
+    # (相对请求开始的时间, 原始文本块)
+    chunks: List[Tuple[float, str]] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return self.body.get("req_params", {}).get("text", "")
+
+    @property
+    def format(self) -> str:
+        return self.body.get("req_params", {}).get("audio_params", {}).get("format", "mp3")
+
+
+def load_trace(path: Path) -> Optional[Trace]:
+    """读取单个轨迹文件, 没有响应记录时返回None"""
+    trace: Optional[Trace] = None
+    responded = False
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            kind = record.get("type")
+            if kind == "request":
+                trace = Trace(path=path, body=record["body"])
+            elif trace is None:
+                break
+            elif kind == "response":
+                responded = True
+                trace.status = record["status"]
+                trace.response_at = record["t"]
+                trace.headers = [
+                    (key, value) for key, value in record["headers"].items()
+                    if key.lower() not in HOP_HEADERS
+                ]
+            elif kind == "chunk":
+                trace.chunks.append((record["t"], record["data"]))
+    return trace if responded else None
+
+
+def load_traces(directory: Path) -> List[Trace]:
+    """读取目录下全部轨迹(按文件名排序)"""
+    traces = [load_trace(path) for path in sorted(directory.glob("*.jsonl"))]
+    return [trace for trace in traces if trace is not None]
+
+
+class ReplayApp:
+    """回放轨迹的ASGI应用"""
+
+    def __init__(self, traces: List[Trace], speed: float = 1.0):
+        """初始化回放应用
+
+        Args:
+            traces: 轨迹列表
+            speed: 回放倍速, 0表示不等待(最大速度)
+        """
+        if not traces:
+            raise ValueError("没有可回放的轨迹")
+        self.traces = traces
+        self.speed = speed
+        self.by_text: Dict[str, List[Trace]] = {}
+        for trace in traces:
+            self.by_text.setdefault(trace.text, []).append(trace)
+        self._cursors = {text: itertools.cycle(items) for text, items in self.by_text.items()}
+        self._fallback = itertools.cycle(traces)
+        self.served = 0
+        self.unmatched = 0
+
+    def select(self, body: bytes) -> Trace:
+        """按请求文本选择轨迹"""
+        try:
+            text = json.loads(body).get("req_params", {}).get("text", "")
+        except (ValueError, AttributeError):
+            text = ""
+        cursor = self._cursors.get(text)
+        if cursor is None:
+            self.unmatched += 1
+            return next(self._fallback)
+        return next(cursor)
+
+    async def _wait_until(self, start: float, offset: float) -> None:
+        if self.speed <= 0:
+            return
+        delay = start + offset / self.speed - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        start = time.monotonic()
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        trace = self.select(body)
+        self.served += 1
+        await self._wait_until(start, trace.response_at)
+        await send({
+            "type": "http.response.start",
+            "status": trace.status,
+            "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in trace.headers],
+        })
+        for offset, data in trace.chunks:
+            await self._wait_until(start, offset)
+            await send({"type": "http.response.body", "body": data.encode("utf-8"), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def parse_speed(value: str) -> float:
+    """解析倍速参数, max 表示不等待"""
+    if value.lower() in ("max", "0", "inf"):
+        return 0.0
+    speed = float(value.rstrip("xX×"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("倍速必须大于0")
+    return speed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="豆包上游回放服务器")
+    parser.add_argument("traces", type=Path, help="轨迹目录(DOUBAO_RECORD_DIR)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="回放倍速: 1, 4, max")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    traces = load_traces(args.traces)
+    print(f"已加载 {len(traces)} 条轨迹, 倍速: {args.speed or 'max'}", file=sys.stderr)
+    uvicorn.run(ReplayApp(traces, args.speed), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
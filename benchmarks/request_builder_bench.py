@@ -0,0 +1,68 @@
+"""上游请求构建基准
+
+对比逐请求构建Pydantic模型并序列化(原路径)与预计算片段拼接(RequestBuilder)的耗时。
+
+用法:
+    python benchmarks/request_builder_bench.py
+    python benchmarks/request_builder_bench.py --number 50000
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DOUBAO_APPID", "bench_appid")
+os.environ.setdefault("DOUBAO_ACCESS_TOKEN", "bench_token")
+
+from app.config import settings  # noqa: E402
+from app.models.openai_models import OpenAISpeechRequest  # noqa: E402
+from app.services.converter import converter  # noqa: E402
+
+builder_module = importlib.import_module("app.services.request_builder")
+
+
+def legacy(request: OpenAISpeechRequest) -> tuple:
+    """原路径: 转换模型, 调试日志与请求体各序列化一次, 重建请求头"""
+    doubao_request = converter.convert(request)
+    json.dumps(doubao_request.model_dump(exclude_none=True), ensure_ascii=False)
+    body = json.dumps(doubao_request.model_dump(exclude_none=True)).encode("utf-8")
+    headers = {
+        "X-Api-App-Id": settings.DOUBAO_APPID,
+        "X-Api-Access-Key": settings.DOUBAO_ACCESS_TOKEN,
+        "X-Api-Resource-Id": settings.DOUBAO_RESOURCE_ID,
+        "Content-Type": "application/json",
+    }
+    return body, headers
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="上游请求构建基准")
+    parser.add_argument("--number", type=int, default=20000, help="每种实现的调用次数")
+    args = parser.parse_args()
+
+    request = OpenAISpeechRequest(
+        model="tts-1", input="今天天气不错, 我们一起去公园散步吧。" * 4,
+        voice="alloy", speed=1.25, response_format="mp3"
+    )
+    candidates = {"pydantic + json": lambda: legacy(request)}
+    if builder_module.orjson is not None:
+        fast_builder = builder_module.RequestBuilder()
+        candidates["builder (orjson)"] = lambda: fast_builder.build(request)
+    saved, builder_module.orjson = builder_module.orjson, None
+    stdlib_builder = builder_module.RequestBuilder()
+    builder_module.orjson = saved
+    candidates["builder (json)"] = lambda: stdlib_builder.build(request)
+
+    print(f"{'实现':<20}{'每次耗时(us)':>14}")
+    for name, func in candidates.items():
+        seconds = min(timeit.repeat(func, number=args.number, repeat=3))
+        print(f"{name:<20}{seconds / args.number * 1e6:>14.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""上游调度基准测试
+
+使用模拟上游(耗时与文本长度成正比、并发受限)对比:
+  1. 无负载时短交互请求的延迟
+  2. 批量任务占满上游时, 普通FIFO信号量下短交互请求的延迟
+  3. 同样负载下, 使用UpstreamScheduler时短交互请求的延迟
+
+用法:
+    python benchmarks/scheduler_bench.py
+    python benchmarks/scheduler_bench.py --duration 5 --concurrency 8 --bulk-clients 64
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DOUBAO_APPID", "bench_appid")
+os.environ.setdefault("DOUBAO_ACCESS_TOKEN", "bench_token")
+
+from app.services.scheduler import UpstreamScheduler, estimate_cost  # noqa: E402
+
+SHORT_TEXT = 20
+LONG_TEXT = 2000
+
+
+async def fake_upstream(text_length: int) -> None:
+    """模拟上游: 首包10ms + 每字符0.1ms"""
+    await asyncio.sleep(0.01 + text_length * 0.0001)
+
+
+class FifoGate:
+    """基线: 普通FIFO信号量"""
+
+    def __init__(self, concurrency: int):
+        self._sem = asyncio.Semaphore(concurrency)
+
+    @asynccontextmanager
+    async def slot(self, priority: str, cost: float):
+        async with self._sem:
+            yield
+
+
+async def run_scenario(gate, duration: float, bulk_clients: int, interval: float) -> list[float]:
+    """运行一个场景, 返回短交互请求的延迟列表(毫秒)"""
+    stop = time.monotonic() + duration
+    latencies: list[float] = []
+
+    async def bulk_client():
+        while time.monotonic() < stop:
+            async with gate.slot("bulk", estimate_cost(LONG_TEXT)):
+                await fake_upstream(LONG_TEXT)
+
+    async def interactive_request():
+        start = time.monotonic()
+        async with gate.slot("interactive", estimate_cost(SHORT_TEXT)):
+            await fake_upstream(SHORT_TEXT)
+        latencies.append((time.monotonic() - start) * 1000)
+
+    bulk = [asyncio.create_task(bulk_client()) for _ in range(bulk_clients)]
+    interactive = []
+    while time.monotonic() < stop:
+        interactive.append(asyncio.create_task(interactive_request()))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*interactive, *bulk)
+    return latencies
+
+
+def _summary(name: str, latencies: list[float]) -> str:
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return (f"{name:<28} n={len(latencies):<5} p50={statistics.median(latencies):8.1f} ms  "
+            f"p99={p99:8.1f} ms")
+
+
+async def main_async(args) -> None:
+    weights = {"interactive": 8, "standard": 4, "bulk": 1}
+    print(f"上游并发={args.concurrency}, 批量客户端={args.bulk_clients}, "
+          f"交互请求间隔={args.interval * 1000:.0f} ms, 时长={args.duration}s\n")
+
+    idle = await run_scenario(
+        UpstreamScheduler(args.concurrency, weights, starvation_seconds=args.starvation),
+        args.duration, 0, args.interval,
+    )
+    print(_summary("无负载", idle))
+
+    fifo = await run_scenario(FifoGate(args.concurrency), args.duration, args.bulk_clients, args.interval)
+    print(_summary("批量饱和 + FIFO", fifo))
+
+    scheduled = await run_scenario(
+        UpstreamScheduler(args.concurrency, weights, starvation_seconds=args.starvation),
+        args.duration, args.bulk_clients, args.interval,
+    )
+    print(_summary("批量饱和 + UpstreamScheduler", scheduled))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="上游调度基准测试")
+    parser.add_argument("--duration", type=float, default=3.0, help="每个场景的时长(秒)")
+    parser.add_argument("--concurrency", type=int, default=4, help="上游并发槽位数")
+    parser.add_argument("--bulk-clients", type=int, default=32, help="批量任务并发客户端数")
+    parser.add_argument("--interval", type=float, default=0.02, help="交互请求间隔(秒)")
+    parser.add_argument("--starvation", type=float, default=10.0, help="防饿死阈值(秒)")
+    asyncio.run(main_async(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""本地变速基准
+
+单线程逐块变速一段合成的类语音信号(PCM), 输出各语速的实时率(处理耗时 / 输入音频时长)
+与单核可同时支撑的实时流数(1 / 实时率)。
+
+用法:
+    python benchmarks/time_stretch_bench.py
+    python benchmarks/time_stretch_bench.py --seconds 30 --ratios 0.5 1.5 3 --sample-rate 16000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DOUBAO_APPID", "bench_appid")
+os.environ.setdefault("DOUBAO_ACCESS_TOKEN", "bench_token")
+
+from app.services.time_stretch import TimeStretcher, available  # noqa: E402
+
+
+def synthetic_speech(seconds: float, sample_rate: int) -> bytes:
+    """生成基频缓慢变化、带谐波与音节包络的测试信号"""
+    import numpy as np
+
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 160 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    signal = 0.3 * voiced * envelope / np.max(np.abs(voiced))
+    return (signal * 32767).astype("<i2").tobytes()
+
+
+def run(pcm: bytes, ratio: float, sample_rate: int, chunk_bytes: int) -> float:
+    """逐块变速整段PCM, 返回耗时(秒)"""
+    stretcher = TimeStretcher(ratio, sample_rate)
+    start = time.perf_counter()
+    for offset in range(0, len(pcm), chunk_bytes):
+        stretcher.feed(pcm[offset:offset + chunk_bytes])
+    stretcher.flush()
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="本地变速基准")
+    parser.add_argument("--seconds", type=float, default=20.0, help="输入音频时长(秒)")
+    parser.add_argument("--sample-rate", type=int, default=24000, help="采样率")
+    parser.add_argument("--chunk-bytes", type=int, default=4096, help="每次输入的字节数")
+    parser.add_argument(
+        "--ratios", type=float, nargs="+", default=[0.25, 0.5, 0.75, 1.25, 1.5, 2.0, 3.0, 4.0], help="语速倍数"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="每个语速重复次数(取最小值)")
+    args = parser.parse_args()
+
+    if not available():
+        print("未安装 numpy, 无法本地变速")
+        return 1
+
+    pcm = synthetic_speech(args.seconds, args.sample_rate)
+    print(f"输入: {args.seconds:.0f}s, {args.sample_rate}Hz, 每块 {args.chunk_bytes} 字节")
+    print(f"{'语速':>6}{'耗时(ms)':>12}{'实时率':>10}{'单核实时流数':>14}")
+    for ratio in args.ratios:
+        elapsed = min(run(pcm, ratio, args.sample_rate, args.chunk_bytes) for _ in range(args.repeat))
+        rtf = elapsed / args.seconds
+        print(f"{ratio:>6.2f}{elapsed * 1000:>12.1f}{rtf:>10.4f}{1 / rtf:>14.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
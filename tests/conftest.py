@@ -0,0 +1,5 @@
+"""测试公共配置"""
+import os
+
+# 测试启动应用(TestClient lifespan)时不写文件日志, 避免在工作目录的 logs/ 下产生文件
+os.environ["LOG_DIR"] = ""
@@ -0,0 +1,90 @@
+"""管理接口测试模块"""
+import asyncio
+import os
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.routes.admin import router as admin_router
+from app.services import profiler
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """挂载管理路由的测试客户端"""
+    monkeypatch.setattr(settings, "ADMIN_API_KEYS", "admin-secret")
+    app = FastAPI()
+    app.include_router(admin_router)
+    return TestClient(app)
+
+
+AUTH = {"Authorization": "Bearer admin-secret"}
+
+
+class TestAdminAPI:
+    """管理接口测试类"""
+
+    def test_requires_admin_key(self, client):
+        """测试缺少或错误密钥时拒绝"""
+        assert client.get("/admin/tasks").status_code == 401
+        assert client.get("/admin/tasks", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+    def test_cpu_profile_collapsed(self, client):
+        """测试CPU采样返回折叠栈"""
+        response = client.get("/admin/profile/cpu?seconds=0.05&interval_ms=5", headers=AUTH)
+        assert response.status_code == 200
+        line = response.text.strip().splitlines()[0]
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) >= 1 and ";" in stack
+
+    def test_cpu_profile_speedscope(self, client):
+        """测试CPU采样返回speedscope JSON"""
+        response = client.get("/admin/profile/cpu?seconds=0.05&format=speedscope", headers=AUTH)
+        body = response.json()
+        assert body["profiles"][0]["type"] == "sampled"
+        assert body["shared"]["frames"]
+
+    def test_memory_diff(self, client):
+        """测试内存快照差异"""
+        assert client.get("/admin/profile/memory/diff", headers=AUTH).status_code == 409
+        try:
+            assert client.post("/admin/profile/memory/start", headers=AUTH).json()["tracing"]
+            retained = [bytearray(1024) for _ in range(100)]
+            body = client.get("/admin/profile/memory/diff?top=5", headers=AUTH).json()
+            assert body["top"] and retained
+        finally:
+            client.post("/admin/profile/memory/stop", headers=AUTH)
+
+    def test_tasks(self, client):
+        """测试任务列表"""
+        body = client.get("/admin/tasks", headers=AUTH).json()
+        assert body["count"] >= 1
+
+
+class TestTaskTracker:
+    """任务存活时长测试类"""
+
+    def test_task_ages(self):
+        """测试安装任务工厂后记录任务存活时长"""
+        async def run():
+            profiler.install_task_tracker()
+            task = asyncio.create_task(asyncio.sleep(1), name="sleeper")
+            await asyncio.sleep(0.02)
+            tasks = {item["name"]: item for item in profiler.dump_tasks()}
+            task.cancel()
+            return tasks["sleeper"]
+
+        info = asyncio.run(run())
+        assert info["age_seconds"] >= 0.01
+        assert "sleep" in info["awaiting"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,190 @@
+"""预渲染音频包测试模块"""
+import asyncio
+import base64
+import json
+import mmap
+import os
+import struct
+
+import httpx
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.openai_models import OpenAISpeechRequest
+from app.pack_builder import build_pack, load_manifest
+from app.routes.audio import router as audio_router
+from app.services.audio_cache import AudioCache, content_digest
+from app.services.audio_pack import AudioPack, PackWriter
+from app.services.backend_router import BackendRouter
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.doubao_client import DoubaoTTSClient
+from app.services.mock_backend import generate_audio
+from app.services.recorder import TraceRecorder
+from app.services.speech_service import SpeechService, speech_service
+
+
+class FakeDoubao:
+    """按文本返回确定性MP3的上游, 可指定失败的文本"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.texts = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)["req_params"]
+        self.texts.append(params["text"])
+        if params["text"] in self.fail:
+            return httpx.Response(500, json={"message": "upstream failure"})
+        audio = generate_audio(params["audio_params"]["format"], 0.3, params["text"].encode(), 24000)
+        lines = [
+            {"code": 0, "message": "", "data": base64.b64encode(audio).decode()},
+            {"code": 20000000, "message": "OK", "data": None},
+        ]
+        return httpx.Response(200, content="".join(json.dumps(line) + "\n" for line in lines).encode())
+
+    def client(self) -> DoubaoTTSClient:
+        client = DoubaoTTSClient(TraceRecorder(None))
+        client.resume_attempts = 0
+        client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        return client
+
+
+def write_manifest(tmp_path, texts):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"texts": texts, "voices": ["alloy", "nova"], "formats": ["mp3"]}),
+                    encoding="utf-8")
+    return path
+
+
+class TestPackFormat:
+    """音频包文件格式测试类"""
+
+    def test_round_trip_zero_copy(self, tmp_path):
+        """测试写入后按键读取, 返回映射页上的切片"""
+        path = tmp_path / "test.pack"
+        items = {f"key-{i}": bytes([i % 251]) * (i + 1) for i in range(300)}
+        with PackWriter(path) as writer:
+            for key, audio in items.items():
+                writer.add(key, audio)
+            assert not writer.add("key-0", b"dup")
+
+        pack = AudioPack(path)
+        pack.open()
+        try:
+            assert pack.entries == len(items)
+            for key, audio in items.items():
+                view = pack.get(key)
+                assert isinstance(view, memoryview) and isinstance(view.obj, mmap.mmap)
+                assert view == audio
+            # 内容摘要在构建时写入索引
+            assert pack.entry("key-7")[1] == content_digest(items["key-7"])
+            assert pack.get("missing") is None and pack.entry("missing") is None
+        finally:
+            pack.close()
+        assert not pack.loaded and pack.get("key-1") is None
+
+    def test_invalid_file(self, tmp_path):
+        """测试拒绝非音频包文件"""
+        path = tmp_path / "bad.pack"
+        path.write_bytes(b"not a pack" * 10)
+        with pytest.raises(ValueError):
+            AudioPack(path).open()
+        assert not (tmp_path / "bad.pack.tmp").exists()
+
+
+class TestPackBuilder:
+    """音频包构建测试类"""
+
+    def test_resume_after_failure(self, tmp_path):
+        """测试部分失败时不生成音频包, 重新运行只渲染缺少的条目"""
+        texts = ["欢迎致电", "请按一", "请按二"]
+        requests = load_manifest(write_manifest(tmp_path, texts))
+        assert len(requests) == 6
+        output = tmp_path / "prompts.pack"
+
+        first = FakeDoubao(fail={"请按二"})
+        assert build_pack(requests, output, first.client(), concurrency=2) == 2
+        assert not output.exists()
+        assert len(list((tmp_path / "prompts.pack.parts").glob("*.audio"))) == 4
+
+        second = FakeDoubao()
+        assert build_pack(requests, output, second.client(), concurrency=2) == 0
+        assert second.texts == ["请按二", "请按二"]
+        assert output.exists() and not (tmp_path / "prompts.pack.parts").exists()
+
+    def test_served_without_upstream(self, tmp_path, monkeypatch):
+        """测试匹配的请求直接由音频包返回, 不访问上游"""
+        output = tmp_path / "prompts.pack"
+        requests = load_manifest(write_manifest(tmp_path, ["欢迎致电客服中心"]))
+        assert build_pack(requests, output, FakeDoubao().client()) == 0
+        expected = generate_audio("mp3", 0.3, "欢迎致电客服中心".encode(), 24000)
+
+        pack = AudioPack(output)
+        pack.open()
+        upstream = FakeDoubao(fail={"欢迎致电客服中心", "不在包里"})
+        monkeypatch.setattr(speech_service, "router", BackendRouter({"doubao": upstream.client()}, "doubao"))
+        monkeypatch.setattr(speech_service, "cache", AudioCache(max_bytes=1 << 20, max_item_bytes=1 << 20))
+        monkeypatch.setattr(speech_service, "pack", pack)
+        monkeypatch.setattr(speech_service, "breaker", CircuitBreaker())
+        app = FastAPI()
+        app.include_router(audio_router)
+        client = TestClient(app)
+        try:
+            # 规范化后与清单文本相同的请求同样命中
+            response = client.post(
+                "/v1/audio/speech", json={"model": "tts-1", "input": " 欢迎致电客服中心 ", "voice": "nova"}
+            )
+            assert response.status_code == 200
+            assert response.headers["x-cache"] == "PACK"
+            assert response.content == expected
+            assert upstream.texts == [] and pack.hits == 1
+
+            response = client.post("/v1/audio/speech", json={"model": "tts-1", "input": "不在包里", "voice": "nova"})
+            assert response.status_code == 500 and upstream.texts == ["不在包里"]
+        finally:
+            pack.close()
+
+    def test_wav_lengths_finalized(self, tmp_path):
+        """测试打包的WAV条目写回真实的RIFF与data长度(而非流式头的未知长度)"""
+        output = tmp_path / "prompts.pack"
+        request = OpenAISpeechRequest(model="tts-1", input="请稍候", voice="alloy", response_format="wav")
+        assert build_pack([request], output, FakeDoubao().client()) == 0
+        key = SpeechService(router=BackendRouter({"doubao": FakeDoubao().client()}, "doubao")).cache_key(request)
+        pack = AudioPack(output)
+        pack.open()
+        try:
+            audio = bytes(pack.get(key))
+        finally:
+            pack.close()
+        assert struct.unpack_from("<I", audio, 4)[0] == len(audio) - 8
+        assert struct.unpack_from("<I", audio, 40)[0] == len(audio) - 44
+
+    def test_service_synthesize_from_pack(self, tmp_path):
+        """测试非流式合成同样可使用音频包"""
+        output = tmp_path / "prompts.pack"
+        request = OpenAISpeechRequest(model="tts-1", input="请稍候", voice="alloy")
+        assert build_pack([request], output, FakeDoubao().client()) == 0
+        pack = AudioPack(output)
+        pack.open()
+        service = SpeechService(
+            router=BackendRouter({"doubao": FakeDoubao(fail={"请稍候"}).client()}, "doubao"),
+            cache=AudioCache(max_bytes=0),
+            breaker=CircuitBreaker(),
+            pack=pack,
+        )
+        try:
+            result = asyncio.run(service.synthesize(request))
+            assert result.cache_status == "pack"
+            assert result.audio == generate_audio("mp3", 0.3, "请稍候".encode(), 24000)
+        finally:
+            pack.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,137 @@
+"""合成后端与路由测试模块"""
+import asyncio
+import os
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.models.openai_models import OpenAISpeechRequest
+from app.routes.audio import router as audio_router
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.doubao_client import doubao_client
+from app.services.framing import mp3_frame_length
+from app.services.mock_backend import MockTTSBackend
+from app.services.request_builder import request_builder
+from app.services.speech_service import speech_service
+
+
+def collect(backend, prepared, on_first_chunk=None):
+    async def run():
+        return [chunk async for chunk in backend.synthesize_stream(prepared, on_first_chunk)]
+    return asyncio.run(run())
+
+
+class TestMockBackend:
+    """模拟后端测试类"""
+
+    def setup_method(self):
+        """测试初始化"""
+        self.backend = MockTTSBackend(ttfb=0, speed=0, chunk_bytes=1000)
+
+    def test_deterministic(self):
+        """测试相同请求产生相同音频, 不同文本产生不同音频"""
+        request = OpenAISpeechRequest(model="tts-1", input="你好世界", voice="alloy")
+        first = collect(self.backend, request_builder.build(request))
+        second = collect(self.backend, request_builder.build(request))
+        other = collect(self.backend, request_builder.build(request, text="再见世界"))
+        assert first == second
+        assert b"".join(first) != b"".join(other)
+
+    def test_chunks_and_first_chunk_callback(self):
+        """测试按固定大小分块, 且只回调一次首包"""
+        calls = []
+        request = OpenAISpeechRequest(model="tts-1", input="测试" * 20, voice="alloy")
+        chunks = collect(self.backend, request_builder.build(request), lambda: calls.append(1))
+        assert calls == [1]
+        assert all(len(chunk) == 1000 for chunk in chunks[:-1])
+        assert 0 < len(chunks[-1]) <= 1000
+
+    def test_mp3_frames_valid(self):
+        """测试MP3音频由合法帧组成, 时长随语速变化"""
+        slow = OpenAISpeechRequest(model="tts-1", input="测试" * 20, voice="alloy", speed=1.0)
+        fast = slow.model_copy(update={"speed": 2.0})
+        audio = b"".join(collect(self.backend, request_builder.build(slow)))
+        assert mp3_frame_length(audio[:4]) == 480
+        assert len(audio) % 480 == 0
+        fast_audio = b"".join(collect(self.backend, request_builder.build(fast)))
+        assert len(fast_audio) < len(audio)
+
+    def test_synthesize_all(self):
+        """测试完整合成等于流式结果拼接"""
+        request = request_builder.build(
+            OpenAISpeechRequest(model="tts-1", input="你好", voice="alloy", response_format="wav")
+        )
+        audio = asyncio.run(self.backend.synthesize(request))
+        assert audio[:4] == b"RIFF"
+        assert audio == b"".join(collect(self.backend, request))
+
+
+class TestBackendRouter:
+    """后端路由测试类"""
+
+    def test_voice_rule_before_model_rule(self):
+        """测试音色规则优先于模型规则, 未匹配时使用默认后端"""
+        mock = MockTTSBackend(ttfb=0, speed=0)
+        router = BackendRouter(
+            {"doubao": doubao_client, "mock": mock},
+            "doubao",
+            {("voice", "verse"): "mock", ("model", "tts-1-hd"): "mock", ("voice", "nova"): "doubao"}
+        )
+        assert router.select("verse", "tts-1") is mock
+        assert router.select("alloy", "tts-1-hd") is mock
+        assert router.select("nova", "tts-1-hd") is doubao_client
+        assert router.select("alloy", "tts-1") is doubao_client
+
+    def test_unknown_backend_ignored(self):
+        """测试未知后端名称被忽略"""
+        router = BackendRouter({"doubao": doubao_client}, "nope", {("voice", "alloy"): "nope"})
+        assert router.select("alloy", "tts-1") is doubao_client
+
+    def test_parse_routes(self, monkeypatch):
+        """测试路由配置解析"""
+        monkeypatch.setattr(settings, "BACKEND_ROUTES", "voice:verse=mock, model:tts-1-hd=doubao,bad=mock")
+        assert settings.get_backend_routes() == {
+            ("voice", "verse"): "mock",
+            ("model", "tts-1-hd"): "doubao",
+        }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """使用模拟后端的测试客户端"""
+    mock = MockTTSBackend(ttfb=0, speed=0)
+    monkeypatch.setattr(speech_service, "router", BackendRouter({"mock": mock}, "mock"))
+    monkeypatch.setattr(speech_service, "cache", AudioCache(max_bytes=1 << 24, max_item_bytes=1 << 22))
+    app = FastAPI()
+    app.include_router(audio_router)
+    return TestClient(app)
+
+
+class TestOfflineEndpoint:
+    """离线端到端测试类"""
+
+    @pytest.mark.parametrize("response_format", ["mp3", "opus", "aac", "flac", "wav", "pcm"])
+    def test_speech_endpoint(self, client, response_format):
+        """测试不访问网络完成整个请求路径, 第二次命中缓存"""
+        body = {"model": "tts-1", "input": "你好, 欢迎使用。", "voice": "alloy", "response_format": response_format}
+        first = client.post("/v1/audio/speech", json=body)
+        assert first.status_code == 200
+        assert first.headers["x-cache"] == "MISS"
+        assert len(first.content) > 0
+
+        second = client.post("/v1/audio/speech", json=body)
+        assert second.headers["x-cache"] == "HIT"
+        if response_format != "wav":
+            assert second.content == first.content
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
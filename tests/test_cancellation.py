@@ -0,0 +1,246 @@
+"""客户端断开与截止时间取消测试模块"""
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.deadline import parse_deadline
+from app.models.openai_models import OpenAISpeechRequest
+from app.routes.audio import router as audio_router
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.mock_backend import MockTTSBackend
+from app.services.speech_service import SpeechService, cancelled_requests, speech_service
+from app.utils.errors import DoubaoAPIError
+
+TEXT = "这是一段用于测试取消上游合成的文本。"
+
+
+class TrackingBackend(MockTTSBackend):
+    """记录上游合成被取消次数的模拟后端"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.cancelled = 0
+        self.finished = 0
+
+    async def synthesize_stream(self, request, on_first_chunk=None, on_sentence=None):
+        try:
+            async for chunk in super().synthesize_stream(request, on_first_chunk, on_sentence):
+                yield chunk
+            self.finished += 1
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled += 1
+            raise
+
+
+def make_service(backend: MockTTSBackend) -> SpeechService:
+    return SpeechService(
+        router=BackendRouter({"mock": backend}, "mock"),
+        cache=AudioCache(max_bytes=1 << 26, max_item_bytes=1 << 22),
+    )
+
+
+def request(text: str = TEXT) -> OpenAISpeechRequest:
+    return OpenAISpeechRequest(model="tts-1", input=text, voice="alloy")
+
+
+class TestRefcountedFlight:
+    """按等待者计数的single-flight测试类"""
+
+    def test_shared_waiter_survives_originator_cancel(self):
+        """测试发起者取消后合成继续为其余等待者进行"""
+        cache = AudioCache(max_bytes=1 << 20, max_item_bytes=1 << 20)
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return b"audio"
+
+        async def run():
+            first = asyncio.create_task(cache.get_or_create("k", factory))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(cache.get_or_create("k", factory))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run()) == (b"audio", "shared")
+        assert calls == [1]
+        assert cache.get("k") == b"audio" and cache.abandoned == 0
+
+    def test_last_waiter_leaving_cancels(self):
+        """测试所有等待者离开后取消合成"""
+        cache = AudioCache(max_bytes=1 << 20, max_item_bytes=1 << 20)
+        cancelled = []
+
+        async def factory():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return b"audio"
+
+        async def run():
+            waiters = [asyncio.create_task(cache.get_or_create("k", factory)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+        assert cancelled == [1]
+        assert cache.abandoned == 1
+        assert not cache.is_inflight("k") and "k" not in cache
+
+
+class TestDeadline:
+    """截止时间测试类"""
+
+    def test_parse_deadline(self):
+        """测试相对时长与绝对时间取较早者, 无效值被忽略"""
+        async def run():
+            now = asyncio.get_running_loop().time()
+            return now, [
+                parse_deadline("2", None),
+                parse_deadline("2", str(time.time() + 1)),
+                parse_deadline("abc", None),
+                parse_deadline(None, None),
+            ]
+
+        now, (relative, both, invalid, missing) = asyncio.run(run())
+        assert relative == pytest.approx(now + 2, abs=0.1)
+        assert both == pytest.approx(now + 1, abs=0.1)
+        assert invalid is None and missing is None
+
+    def test_expires_before_first_chunk(self):
+        """测试首包前到期时返回等待超时并取消上游"""
+        backend = TrackingBackend(ttfb=1.0, speed=0)
+        service = make_service(backend)
+        before = cancelled_requests.value(reason="deadline")
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            with pytest.raises(DoubaoAPIError) as exc:
+                await service.stream(request(), deadline=start + 0.05)
+            await asyncio.sleep(0.01)
+            return exc.value, loop.time() - start
+
+        error, elapsed = asyncio.run(run())
+        assert error.doubao_code == 3032 and error.status_code == 504
+        assert elapsed < 0.5
+        assert backend.cancelled == 1 and backend.finished == 0
+        assert cancelled_requests.value(reason="deadline") == before + 1
+
+    def test_expires_mid_stream(self):
+        """测试输出过程中到期时中断并取消上游"""
+        backend = TrackingBackend(ttfb=0, speed=1.0, chunk_bytes=2000)
+        service = make_service(backend)
+
+        async def run():
+            stream = await service.stream(request(TEXT * 4), deadline=asyncio.get_running_loop().time() + 0.2)
+            received = []
+            with pytest.raises(DoubaoAPIError) as exc:
+                async for chunk in stream.chunks:
+                    received.append(chunk)
+            await asyncio.sleep(0.01)
+            return received, exc.value
+
+        received, error = asyncio.run(run())
+        assert received and error.doubao_code == 3032
+        assert backend.cancelled == 1
+        assert not service.cache.is_inflight(service.cache_key(request(TEXT * 4)))
+
+
+class TestDisconnect:
+    """客户端断开测试类"""
+
+    def test_closing_stream_cancels_upstream(self):
+        """测试客户端中途断开(关闭生成器)时取消上游"""
+        backend = TrackingBackend(ttfb=0, speed=1.0, chunk_bytes=2000)
+        service = make_service(backend)
+        before = cancelled_requests.value(reason="disconnect")
+
+        async def run():
+            stream = await service.stream(request(TEXT * 4))
+            await stream.chunks.__anext__()
+            await stream.chunks.aclose()
+            await asyncio.sleep(0.01)
+
+        asyncio.run(run())
+        assert backend.cancelled == 1
+        assert cancelled_requests.value(reason="disconnect") == before + 1
+
+    def test_disconnect_before_first_chunk(self, monkeypatch):
+        """测试等待首包期间断开时立即取消上游"""
+        backend = TrackingBackend(ttfb=1.0, speed=0)
+        monkeypatch.setattr(speech_service, "router", BackendRouter({"mock": backend}, "mock"))
+        monkeypatch.setattr(speech_service, "cache", AudioCache(max_bytes=1 << 20, max_item_bytes=1 << 20))
+        app = FastAPI()
+        app.include_router(audio_router)
+        body = json.dumps({"model": "tts-1", "input": TEXT, "voice": "alloy"}).encode()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": "/v1/audio/speech", "raw_path": b"/v1/audio/speech",
+            "query_string": b"", "root_path": "", "client": ("test", 1), "server": ("test", 80),
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        }
+
+        async def run():
+            messages = [{"type": "http.request", "body": body, "more_body": False}]
+            sent = []
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                await asyncio.sleep(0.05)
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                sent.append(message)
+
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await app(scope, receive, send)
+            await asyncio.sleep(0.01)
+            return sent, loop.time() - start
+
+        sent, elapsed = asyncio.run(run())
+        assert sent[0]["status"] == 499
+        assert elapsed < 0.5
+        assert backend.cancelled == 1 and backend.finished == 0
+
+    def test_deadline_header_returns_504(self, monkeypatch):
+        """测试请求头声明的截止时间到期返回504"""
+        backend = TrackingBackend(ttfb=1.0, speed=0)
+        monkeypatch.setattr(speech_service, "router", BackendRouter({"mock": backend}, "mock"))
+        monkeypatch.setattr(speech_service, "cache", AudioCache(max_bytes=1 << 20, max_item_bytes=1 << 20))
+        app = FastAPI()
+        app.include_router(audio_router)
+        client = TestClient(app)
+
+        response = client.post(
+            "/v1/audio/speech",
+            json={"model": "tts-1", "input": TEXT, "voice": "alloy"},
+            headers={"X-Request-Timeout": "0.05"},
+        )
+        assert response.status_code == 504
+        assert response.json()["detail"]["error"]["type"] == "timeout_error"
+        assert backend.finished == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,227 @@
+"""音频分帧与流式合成测试模块"""
+import asyncio
+import io
+import os
+import random
+import struct
+import wave
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.framing import (
+    UNKNOWN_LENGTH,
+    create_framer,
+    mp3_frame_length,
+    wav_header,
+)
+from app.services.limiter import AdaptiveLimiter
+from app.services.scheduler import UpstreamScheduler
+from app.services.speech_service import SpeechService
+from app.utils.errors import DoubaoAPIError
+
+# MPEG1 Layer III, 128kbps, 44100Hz, 无填充 -> 417字节
+MP3_HEADER = b"\xff\xfb\x90\x00"
+
+
+def mp3_frames(count: int) -> bytes:
+    return b"".join(MP3_HEADER + bytes([i % 200 + 1]) * 413 for i in range(count))
+
+
+def ogg_page(payload: bytes, sequence: int) -> bytes:
+    lacing = [255] * (len(payload) // 255) + [len(payload) % 255]
+    header = b"OggS" + bytes(2) + struct.pack("<QII", 0, 1, sequence) + bytes(4)
+    return header + bytes([len(lacing)]) + bytes(lacing) + payload
+
+
+def adts_frame(payload: bytes) -> bytes:
+    length = len(payload) + 7
+    return bytes([
+        0xFF, 0xF1, 0x50, 0x80 | (length >> 11),
+        (length >> 3) & 0xFF, ((length & 0x07) << 5) | 0x1F, 0xFC
+    ]) + payload
+
+
+def split_randomly(data: bytes, seed: int = 0):
+    rng = random.Random(seed)
+    pos = 0
+    while pos < len(data):
+        step = rng.randint(1, 300)
+        yield data[pos:pos + step]
+        pos += step
+
+
+def run_framer(response_format: str, data: bytes):
+    framer = create_framer(response_format)
+    outputs = [framer.feed(chunk) for chunk in split_randomly(data)]
+    outputs.append(framer.flush())
+    return framer, [out for out in outputs if out]
+
+
+class TestFramers:
+    """分帧器测试类"""
+
+    def test_mp3_frame_length(self):
+        """测试MPEG帧长计算"""
+        assert mp3_frame_length(MP3_HEADER) == 417
+        assert mp3_frame_length(b"\xff\xf3\x64\xc4") == 72 * 48000 // 24000
+        assert mp3_frame_length(b"\x00\x00\x00\x00") is None
+
+    def test_mp3_cut_on_frame_boundaries(self):
+        """测试MP3按帧边界输出"""
+        data = mp3_frames(20)
+        _, outputs = run_framer("mp3", data)
+        assert b"".join(outputs) == data
+        for out in outputs:
+            assert out.startswith(MP3_HEADER)
+            assert len(out) % 417 == 0
+
+    def test_mp3_id3_tag_emitted_whole(self):
+        """测试开头的ID3标签完整输出"""
+        tag = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+        frames = mp3_frames(3)
+        framer = create_framer("mp3")
+        assert framer.feed(tag[:5]) == b""
+        assert framer.feed(tag[5:15]) == b""
+        assert framer.feed(tag[15:] + frames[:100]) == tag
+        assert framer.feed(frames[100:]) == frames
+
+    def test_ogg_whole_pages(self):
+        """测试Ogg只输出完整页"""
+        pages = [ogg_page(bytes([i]) * (100 + i * 97), i) for i in range(10)]
+        data = b"".join(pages)
+        _, outputs = run_framer("opus", data)
+        assert b"".join(outputs) == data
+        boundaries = set()
+        offset = 0
+        for page in pages:
+            offset += len(page)
+            boundaries.add(offset)
+        offset = 0
+        for out in outputs:
+            assert out.startswith(b"OggS")
+            offset += len(out)
+            assert offset in boundaries
+
+    def test_adts_frames(self):
+        """测试AAC按ADTS帧输出"""
+        frames = [adts_frame(bytes([i]) * (50 + i)) for i in range(30)]
+        data = b"".join(frames)
+        _, outputs = run_framer("aac", data)
+        assert b"".join(outputs) == data
+        assert all(out[0] == 0xFF and out[1] & 0xF6 == 0xF0 for out in outputs)
+
+    def test_wav_streaming_header(self):
+        """测试WAV首块为未知长度的流式头, 结束后可修正为真实长度"""
+        samples = bytes(range(256)) * 40
+        upstream = wav_header(24000, data_size=len(samples)) + samples
+        framer, outputs = run_framer("wav", upstream)
+
+        first = outputs[0]
+        assert first[:4] == b"RIFF"
+        assert struct.unpack_from("<I", first, 4)[0] == UNKNOWN_LENGTH
+        assert struct.unpack_from("<I", first, 40)[0] == UNKNOWN_LENGTH
+        assert all(len(out) % 2 == 0 for out in outputs)
+
+        fixed = framer.finalize(b"".join(outputs))
+        with wave.open(io.BytesIO(fixed)) as reader:
+            assert reader.getframerate() == 24000
+            assert reader.readframes(reader.getnframes()) == samples
+
+    def test_wav_header_added_for_raw_pcm(self):
+        """测试上游返回裸PCM时生成WAV头, 并去除后续块中重复的头"""
+        framer = create_framer("wav")
+        out = framer.feed(b"\x01\x02\x03\x04\x05")
+        assert out[:4] == b"RIFF"
+        assert out[44:] == b"\x01\x02\x03\x04"
+        repeated = wav_header(24000, data_size=4) + b"\x06\x07\x08\x09"
+        assert framer.feed(repeated) == b"\x05\x06\x07\x08"
+        assert framer.flush() == b"\x09"
+
+    def test_pcm_sample_aligned(self):
+        """测试PCM按16位样本对齐"""
+        framer = create_framer("pcm")
+        assert framer.feed(b"\x01\x02\x03") == b"\x01\x02"
+        assert framer.feed(b"\x04") == b"\x03\x04"
+
+
+class FakeStreamingClient:
+    """按块返回音频的模拟客户端"""
+
+    name = "fake"
+    cache_namespace = ""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def synthesize_stream(self, prepared, on_first_chunk=None, on_sentence=None):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        for index, chunk in enumerate(self.chunks):
+            if index == 0 and on_first_chunk is not None:
+                on_first_chunk()
+            if index == 1:
+                await self.release.wait()
+            yield chunk
+
+
+def make_service(client) -> SpeechService:
+    return SpeechService(
+        router=BackendRouter({"fake": client}, "fake"),
+        cache=AudioCache(max_bytes=1 << 20, max_item_bytes=1 << 20),
+        scheduler=UpstreamScheduler(4, {"standard": 1}, starvation_seconds=60, reserved_slots=0),
+        limiter=AdaptiveLimiter(initial_limit=4, min_limit=1, max_limit=8),
+    )
+
+
+class TestSpeechStream:
+    """流式合成测试类"""
+
+    def test_first_frame_before_upstream_finishes(self):
+        """测试首帧在上游结束前即可发送, 结束后写入缓存"""
+        data = mp3_frames(4)
+
+        async def run():
+            client = FakeStreamingClient([data[:500], data[500:]])
+            service = make_service(client)
+            request = OpenAISpeechRequest(model="tts-1", input="你好", voice="alloy")
+
+            stream = await service.stream(request)
+            assert stream.cache_status == "miss"
+            first = await stream.chunks.__anext__()
+            assert first == data[:417]
+
+            client.release.set()
+            rest = [chunk async for chunk in stream.chunks]
+            assert first + b"".join(rest) == data
+
+            again = await service.synthesize(request)
+            assert again.cache_status == "hit"
+            assert again.audio == data
+            assert client.calls == 1
+
+        asyncio.run(run())
+
+    def test_error_before_first_chunk_raises(self):
+        """测试首包前的上游错误直接抛出"""
+        async def run():
+            service = make_service(FakeStreamingClient([], error=DoubaoAPIError(3050, "音色不存在")))
+            request = OpenAISpeechRequest(model="tts-1", input="你好", voice="alloy")
+            with pytest.raises(DoubaoAPIError):
+                await service.stream(request)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,133 @@
+"""自适应并发限制与指标测试模块"""
+import asyncio
+import os
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from app.services.limiter import AdaptiveLimiter, _upstream_results
+from app.utils.errors import DoubaoAPIError
+from app.utils.metrics import MetricsRegistry
+
+
+class TestAdaptiveLimiter:
+    """自适应限制器测试类"""
+
+    def test_overload_halves_limit(self):
+        """测试限流错误码大幅降低限制"""
+        changes = []
+        limiter = AdaptiveLimiter(initial_limit=20, min_limit=1, max_limit=100, on_change=changes.append)
+
+        async def run():
+            with pytest.raises(DoubaoAPIError):
+                async with limiter.measure():
+                    raise DoubaoAPIError(3003, "并发超限")
+
+        asyncio.run(run())
+        assert limiter.limit == 10
+        assert changes == [10]
+
+    def test_other_errors_do_not_change_limit(self):
+        """测试非限流错误不影响限制"""
+        limiter = AdaptiveLimiter(initial_limit=20, min_limit=1, max_limit=100)
+
+        async def run():
+            with pytest.raises(DoubaoAPIError):
+                async with limiter.measure():
+                    raise DoubaoAPIError(3050, "音色不存在")
+
+        asyncio.run(run())
+        assert limiter.limit == 20
+
+    def test_cancellation_not_recorded(self):
+        """测试调用被取消时不计为上游错误, 也不影响限制"""
+        limiter = AdaptiveLimiter(initial_limit=20, min_limit=1, max_limit=100)
+        errors = _upstream_results.value(result="error")
+        started = asyncio.Event()
+
+        async def call():
+            async with limiter.measure():
+                started.set()
+                await asyncio.sleep(10)
+
+        async def run():
+            task = asyncio.create_task(call())
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        assert _upstream_results.value(result="error") == errors
+        assert limiter.limit == 20 and limiter.in_flight == 0
+
+    def test_increase_only_when_utilized(self):
+        """测试仅在并发被充分使用时增加"""
+        limiter = AdaptiveLimiter(initial_limit=4, min_limit=1, max_limit=100)
+        for _ in range(20):
+            limiter.on_success(0.05, in_flight=1)
+        assert limiter.limit == 4
+        for _ in range(20):
+            limiter.on_success(0.05, in_flight=4)
+        assert limiter.limit > 4
+
+    def test_latency_spike_decreases(self):
+        """测试首包时间明显高于基线时降低"""
+        limiter = AdaptiveLimiter(initial_limit=20, min_limit=1, max_limit=100, latency_tolerance=2.0)
+        limiter.on_success(0.05, in_flight=20)
+        limiter.on_success(0.5, in_flight=20)
+        assert limiter.limit < 20
+
+    def test_limit_bounds(self):
+        """测试限制在上下限之间"""
+        limiter = AdaptiveLimiter(initial_limit=2, min_limit=2, max_limit=3)
+        for _ in range(3):
+            limiter.on_overload()
+            limiter._last_decrease = 0.0
+        assert limiter.limit == 2
+
+    def test_baseline_window_slides(self):
+        """测试基线随窗口滑动更新"""
+        limiter = AdaptiveLimiter(initial_limit=4, window=3)
+        for ttfb in (0.01, 0.2, 0.2, 0.2):
+            limiter._record_ttfb(ttfb)
+        assert limiter.baseline == 0.2
+
+
+class TestMetrics:
+    """指标测试类"""
+
+    def test_render_prometheus_text(self):
+        """测试导出文本格式"""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "请求数", labels=("result",))
+        counter.inc(result="ok")
+        counter.inc(2, result="ok")
+        registry.gauge("limit", "限制", callback=lambda: 7)
+        histogram = registry.histogram("ttfb_seconds", "首包", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+
+        text = registry.render()
+        assert 'requests_total{result="ok"} 3' in text
+        assert "limit 7" in text
+        assert 'ttfb_seconds_bucket{le="0.1"} 1' in text
+        assert 'ttfb_seconds_bucket{le="+Inf"} 2' in text
+        assert "ttfb_seconds_count 2" in text
+        assert histogram.quantile(0.5) == 0.1
+
+    def test_callback_counter(self):
+        """测试回调读取的累计值以counter类型导出"""
+        registry = MetricsRegistry()
+        hits = {"count": 3}
+        registry.counter("cache_hits_total", "命中", callback=lambda: hits["count"])
+        text = registry.render()
+        assert "# TYPE cache_hits_total counter" in text
+        assert "cache_hits_total 3" in text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
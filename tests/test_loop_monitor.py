@@ -0,0 +1,92 @@
+"""事件循环延迟监控测试模块"""
+import asyncio
+import base64
+import os
+import time
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.middleware import load_shedding
+from app.services.doubao_client import DoubaoTTSClient
+from app.services.loop_monitor import LoopMonitor
+from app.utils.logger import logger
+
+
+def _block_loop(seconds: float) -> None:
+    """模拟阻塞事件循环的同步调用"""
+    time.sleep(seconds)
+
+
+class TestLoopMonitor:
+    """事件循环监控测试类"""
+
+    def test_detects_lag_and_logs_stack(self):
+        """测试阻塞时记录延迟与阻塞栈"""
+        messages = []
+        sink_id = logger.add(lambda message: messages.append(str(message)), level="WARNING")
+        monitor = LoopMonitor(interval=0.02, stall_threshold=0.05, shed_threshold=0.05, smoothing=1.0)
+
+        async def run():
+            monitor.start()
+            await asyncio.sleep(0.05)
+            _block_loop(0.2)
+            await asyncio.sleep(0.05)
+            overloaded = monitor.overloaded or monitor.max_lag > 0.1
+            await monitor.stop()
+            return overloaded
+
+        try:
+            assert asyncio.run(run())
+        finally:
+            logger.remove(sink_id)
+        assert monitor.max_lag >= 0.15
+        assert any("_block_loop" in message for message in messages)
+
+    def test_not_overloaded_when_idle(self):
+        """测试空闲时不判定过载"""
+        monitor = LoopMonitor(interval=0.01, stall_threshold=0.5, shed_threshold=0.05)
+
+        async def run():
+            monitor.start()
+            await asyncio.sleep(0.1)
+            overloaded = monitor.overloaded
+            await monitor.stop()
+            return overloaded
+
+        assert asyncio.run(run()) is False
+
+    def test_shedding_dependency(self, monkeypatch):
+        """测试过载时拒绝新请求"""
+        monitor = LoopMonitor(interval=0.01, shed_threshold=0.05)
+        monkeypatch.setattr(load_shedding, "loop_monitor", monitor)
+        asyncio.run(load_shedding.reject_if_overloaded())
+
+        monkeypatch.setattr(LoopMonitor, "running", property(lambda self: True))
+        monitor.lag = 0.5
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(load_shedding.reject_if_overloaded())
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers["Retry-After"] == "1"
+
+
+class TestBase64Offload:
+    """base64解码卸载测试类"""
+
+    def test_offloaded_decode_matches(self, monkeypatch):
+        """测试线程池解码结果一致"""
+        monkeypatch.setattr(settings, "BASE64_OFFLOAD_THRESHOLD", 8)
+        client = DoubaoTTSClient()
+        data = base64.b64encode(b"\x00\x01audio" * 100).decode()
+        assert asyncio.run(client._decode_audio(data)) == b"\x00\x01audio" * 100
+        assert asyncio.run(client._decode_audio("AAE=")) == b"\x00\x01"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,144 @@
+"""多格式输出测试模块"""
+import asyncio
+import base64
+import os
+import stat
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.openai_models import OpenAISpeechRequest
+from app.routes.audio import router as audio_router
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.framing import wav_header
+from app.services.mock_backend import MockTTSBackend
+from app.services.speech_service import SpeechService, speech_service
+from app.services.transcoder import BUILTIN_FORMATS, Transcoder
+
+TEXT = "同一段语音需要多种格式。"
+
+
+def make_service(backend: MockTTSBackend, transcoder: Transcoder) -> SpeechService:
+    return SpeechService(
+        router=BackendRouter({"mock": backend}, "mock"),
+        cache=AudioCache(max_bytes=1 << 26, max_item_bytes=1 << 22),
+        breaker=CircuitBreaker(),
+        transcoder=transcoder,
+    )
+
+
+def fake_ffmpeg(tmp_path):
+    """把输入原样输出的ffmpeg替身, 只验证调用流程"""
+    path = tmp_path / "ffmpeg"
+    path.write_text("#!/bin/sh\ncat\n")
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def request(response_format: str = "mp3") -> OpenAISpeechRequest:
+    return OpenAISpeechRequest(model="tts-1", input=TEXT, voice="alloy", response_format=response_format)
+
+
+class TestSynthesizeFormats:
+    """多格式合成测试类"""
+
+    def test_builtin_formats_share_one_synthesis(self):
+        """测试未安装ffmpeg时 pcm/wav 共用一次合成, 其余格式单独请求上游"""
+        backend = MockTTSBackend(ttfb=0, speed=0)
+        service = make_service(backend, Transcoder(ffmpeg_path="missing-ffmpeg-binary"))
+        assert service.transcoder.formats == BUILTIN_FORMATS
+
+        async def run():
+            result = await service.synthesize_formats(request(), ["wav", "pcm", "mp3"])
+            cached = await service.synthesize(request("wav"))
+            return result, cached
+
+        result, cached = asyncio.run(run())
+        assert backend.calls == 2
+        assert list(result.results) == ["wav", "pcm", "mp3"]
+        assert result.results["wav"].cache_status == "transcoded"
+        assert result.results["mp3"].cache_status == "miss"
+        pcm = result.results["pcm"].audio
+        assert result.results["wav"].audio == wav_header(24000, data_size=len(pcm)) + pcm
+        assert cached.cache_status == "hit" and cached.audio == result.results["wav"].audio
+        assert service.format_audio(result.id, "wav")[0] == cached.audio
+
+    def test_ffmpeg_formats_encoded_locally(self, tmp_path):
+        """测试安装ffmpeg时全部格式只请求一次上游, 重复请求全部命中缓存"""
+        backend = MockTTSBackend(ttfb=0, speed=0)
+        service = make_service(backend, Transcoder(ffmpeg_path=fake_ffmpeg(tmp_path), workers=2))
+
+        async def run():
+            first = await service.synthesize_formats(request(), ["mp3", "opus", "flac"])
+            second = await service.synthesize_formats(request(), ["opus", "mp3"])
+            service.transcoder.close()
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert backend.calls == 1
+        assert {item.cache_status for item in first.results.values()} == {"transcoded"}
+        assert first.results["opus"].audio == first.results["mp3"].audio  # 替身原样输出PCM
+        assert {item.cache_status for item in second.results.values()} == {"hit"}
+        assert first.id == second.id
+
+    def test_encode_failure_raises(self, tmp_path):
+        """测试编码失败时报错"""
+        path = tmp_path / "ffmpeg"
+        path.write_text("#!/bin/sh\necho broken >&2\nexit 1\n")
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+        transcoder = Transcoder(ffmpeg_path=str(path))
+        with pytest.raises(Exception, match="broken"):
+            transcoder.encode_sync(b"\x00\x00" * 100, "mp3", 24000, 160)
+
+    def test_opus_resampled_to_supported_rate(self, tmp_path):
+        """测试opus输出重采样到48kHz(libopus不接受22050/32000/44100Hz输入)"""
+        transcoder = Transcoder(ffmpeg_path=fake_ffmpeg(tmp_path))
+        transcoder.resolve()
+        command = transcoder._command("opus", 44100, None)
+        output = command[command.index("pipe:0") + 1:]
+        assert output[output.index("-ar") + 1] == "48000"
+        assert "-ar" not in transcoder._command("mp3", 44100, 128)[command.index("pipe:0") + 1:]
+
+
+class TestFormatsEndpoint:
+    """多格式端点测试类"""
+
+    def test_inline_and_fetch_by_id(self, monkeypatch):
+        """测试响应返回各格式信息, 并可按ID获取"""
+        backend = MockTTSBackend(ttfb=0, speed=0)
+        service = make_service(backend, Transcoder(ffmpeg_path="missing-ffmpeg-binary"))
+        monkeypatch.setattr(speech_service, "synthesize_formats", service.synthesize_formats)
+        monkeypatch.setattr(speech_service, "format_audio", service.format_audio)
+        app = FastAPI()
+        app.include_router(audio_router)
+        client = TestClient(app)
+
+        response = client.post("/v1/audio/speech/formats", json={
+            "model": "tts-1", "input": TEXT, "voice": "alloy", "formats": ["pcm", "wav"], "inline": True
+        })
+        assert response.status_code == 200
+        body = response.json()
+        assert set(body["formats"]) == {"pcm", "wav"}
+        wav = body["formats"]["wav"]
+        assert wav["content_type"] == "audio/wav" and wav["cache"] == "transcoded"
+
+        response = client.get(wav["url"])
+        assert response.status_code == 200
+        assert response.content == base64.b64decode(wav["data"])
+        assert len(response.content) == wav["bytes"]
+        assert backend.calls == 1
+
+        assert client.get(f"/v1/audio/speech/formats/{body['id']}/mp3").status_code == 404
+        assert client.get("/v1/audio/speech/formats/unknown/wav").status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
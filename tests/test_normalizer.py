@@ -0,0 +1,159 @@
+"""文本规范化与音频缓存测试模块"""
+import asyncio
+import os
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.audio_cache import AudioCache, FrequencySketch, make_cache_key
+from app.services.converter import ParameterConverter
+from app.services.normalizer import TextNormalizer, RULES
+
+
+class TestTextNormalizer:
+    """文本规范化测试类"""
+
+    def setup_method(self):
+        """测试初始化"""
+        self.normalizer = TextNormalizer(rules=list(RULES))
+
+    def test_whitespace_collapse(self):
+        """测试空白折叠"""
+        assert self.normalizer.normalize("  hello \t\n world  ") == "hello world"
+
+    def test_cjk_spacing(self):
+        """测试去除中文字符间空白"""
+        assert self.normalizer.normalize("你好 世界") == "你好世界"
+
+    def test_fullwidth_equivalence(self):
+        """测试全角/半角文本规范化结果一致"""
+        assert self.normalizer.normalize("ＡＢＣ，你好！") == self.normalizer.normalize("ABC,你好!")
+
+    def test_trailing_punctuation(self):
+        """测试句末只去除空白与全/半角重复, 保留标点本身"""
+        assert self.normalizer.normalize("你好。 ") == "你好。"
+        assert self.normalizer.normalize("你好。.") == self.normalizer.normalize("你好。")
+        assert self.normalizer.normalize("你好？") == "你好?"
+        assert self.normalizer.normalize("你好？?") == "你好?"
+
+    def test_meaning_preserved(self):
+        """测试缩写句点、省略号与减号不被改写"""
+        assert self.normalizer.normalize("U.S.") == "U.S."
+        assert self.normalizer.normalize("等等…") == "等等…"
+        assert self.normalizer.normalize("等等...") == "等等…"
+        assert self.normalizer.normalize("−5") == "−5"
+        assert self.normalizer.normalize("气温−5度—明天转晴") == "气温−5度—明天转晴"
+
+    def test_punctuation_variants(self):
+        """测试引号、省略号与重复标点"""
+        assert self.normalizer.normalize("“好”...真的!!!") == '"好"…真的!'
+
+    def test_only_punctuation_kept(self):
+        """测试全标点文本不会被规范化为空"""
+        assert self.normalizer.normalize("。") == "。"
+
+    def test_rules_can_be_disabled(self):
+        """测试可关闭规则"""
+        normalizer = TextNormalizer(rules=["whitespace"])
+        assert normalizer.normalize("你好 世界。") == "你好 世界。"
+        assert TextNormalizer(rules=[]).normalize(" a ") == " a "
+
+    def test_unknown_rule(self):
+        """测试未知规则报错"""
+        with pytest.raises(ValueError):
+            TextNormalizer(rules=["nope"])
+
+    def test_memoization(self):
+        """测试热点文本缓存"""
+        normalizer = TextNormalizer(rules=["nfkc"], cache_size=8)
+        normalizer.normalize("abc")
+        normalizer.normalize("abc")
+        assert normalizer.cache_info()["hits"] == 1
+
+
+class TestAudioCache:
+    """音频缓存测试类"""
+
+    def test_same_key_for_equivalent_requests(self):
+        """测试规范化后等价的请求得到相同缓存键"""
+        converter = ParameterConverter()
+        normalizer = TextNormalizer(rules=list(RULES))
+        keys = set()
+        for text in ["你好，世界。", "你好, 世界。", " 你好，世界。 "]:
+            req = OpenAISpeechRequest(model="tts-1", input=normalizer.normalize(text), voice="alloy")
+            keys.add(make_cache_key(converter.convert(req)))
+        assert len(keys) == 1
+
+    def test_lru_eviction_by_bytes(self):
+        """测试按字节数淘汰"""
+        cache = AudioCache(max_bytes=10, max_item_bytes=10, policy="lru")
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        cache.get("a")
+        cache.put("c", b"12345")
+        assert "a" in cache and "c" in cache and "b" not in cache
+        assert not cache.put("big", b"x" * 11)
+
+    def test_tinylfu_rejects_rare_large_item(self):
+        """测试低频大条目不能挤掉常用小条目, 高频条目可以写入"""
+        cache = AudioCache(max_bytes=100, max_item_bytes=100, policy="tinylfu")
+        for key in "abcd":
+            for _ in range(3):
+                cache.get(key)
+            assert cache.put(key, b"x" * 20)
+        cache.get("big")
+        assert not cache.put("big", b"y" * 60)
+        assert all(key in cache for key in "abcd") and cache.rejected == 1
+        # 频率超过需要挤出的条目之和后写入, 按LRU顺序挤出
+        for _ in range(12):
+            cache.get("hot")
+        assert cache.put("hot", b"z" * 30)
+        assert "a" not in cache and "hot" in cache and cache.current_bytes <= 100
+
+    def test_frequency_sketch_aging(self):
+        """测试频率草图计数上限与减半老化"""
+        sketch = FrequencySketch(16)
+        for _ in range(20):
+            sketch.increment("k")
+        assert sketch.frequency("k") == FrequencySketch.MAX_COUNT
+        assert sketch.frequency("other") <= 1
+        sketch.age()
+        assert sketch.frequency("k") == FrequencySketch.MAX_COUNT // 2
+
+    def test_single_flight(self):
+        """测试并发相同请求只合成一次"""
+        cache = AudioCache(max_bytes=1024, max_item_bytes=1024)
+        calls = 0
+
+        async def factory():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return b"audio"
+
+        async def run():
+            return await asyncio.gather(*[cache.get_or_create("k", factory) for _ in range(5)])
+
+        results = asyncio.run(run())
+        assert calls == 1
+        assert sorted(status for _, status in results) == ["miss"] + ["shared"] * 4
+        assert asyncio.run(cache.get_or_create("k", factory))[1] == "hit"
+
+    def test_failure_not_cached(self):
+        """测试合成失败不写入缓存"""
+        cache = AudioCache(max_bytes=1024, max_item_bytes=1024)
+
+        async def factory():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(cache.get_or_create("k", factory))
+        assert "k" not in cache and not cache.is_inflight("k")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
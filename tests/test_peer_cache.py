@@ -0,0 +1,177 @@
+"""节点间共享缓存测试模块"""
+import asyncio
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.mock_backend import MockTTSBackend
+from app.services.peer_cache import HashRing, PeerCache
+from app.services.speech_service import SpeechService
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestHashRing:
+    """一致性哈希环测试类"""
+
+    def test_keys_spread_across_nodes(self):
+        """测试键大致均匀地分布到各节点"""
+        nodes = ["http://a:9001", "http://b:9001", "http://c:9001"]
+        ring = HashRing(nodes, replicas=100)
+        owners = [ring.owner(f"key-{i}") for i in range(3000)]
+        for node in nodes:
+            assert 600 < owners.count(node) < 1500
+
+    def test_removing_node_only_moves_its_keys(self):
+        """测试移除节点时只有该节点的键改变归属"""
+        nodes = ["http://a:9001", "http://b:9001", "http://c:9001"]
+        full = HashRing(nodes)
+        reduced = HashRing(nodes[:2])
+        for i in range(1000):
+            key = f"key-{i}"
+            if full.owner(key) != nodes[2]:
+                assert reduced.owner(key) == full.owner(key)
+
+    def test_enabled_requires_self_and_secret(self):
+        """测试本节点不在列表中或缺少密钥时不启用"""
+        nodes = ["http://a:9001", "http://b:9001"]
+        assert PeerCache(nodes, "http://a:9001/", "s").enabled
+        assert not PeerCache(nodes, "http://c:9001", "s").enabled
+        assert not PeerCache(nodes[:1], "http://a:9001", "s").enabled
+        cache = PeerCache(nodes, "http://a:9001", "s")
+        owned = {cache.owner(f"key-{i}") for i in range(100)}
+        assert owned == {None, "http://b:9001"}
+        assert cache.verify_secret("s") and not cache.verify_secret("x")
+
+
+class TestPeerFallback:
+    """所属节点不可达测试类"""
+
+    def test_unreachable_owner_falls_back_to_local(self):
+        """测试所属节点不可达时本地合成"""
+        backend = MockTTSBackend(ttfb=0, speed=0)
+        peers = PeerCache(["http://127.0.0.1:9", "http://self"], "http://self", "s", timeout=1)
+        service = SpeechService(
+            router=BackendRouter({"mock": backend}, "mock"),
+            cache=AudioCache(max_bytes=1 << 20, max_item_bytes=1 << 20),
+            peers=peers,
+        )
+        request = next(
+            r for r in (
+                OpenAISpeechRequest(model="tts-1", input=f"文本{i}", voice="alloy") for i in range(100)
+            )
+            if peers.owner(service.cache_key(r)) is not None
+        )
+
+        async def run():
+            result = await service.synthesize(request)
+            await peers.close()
+            return result
+
+        result = asyncio.run(run())
+        assert result.cache_status == "miss"
+        assert backend.calls == 1
+        assert len(result.audio) > 0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _upstream_calls(client, url: str) -> float:
+    text = client.get(f"{url}/metrics").text
+    match = re.search(r'^tts_upstream_requests_total\{result="success"\} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+@pytest.fixture
+def cluster():
+    """在本机启动两个使用模拟后端的uvicorn节点"""
+    pytest.importorskip("uvicorn")
+    ports = [_free_port(), _free_port()]
+    urls = [f"http://127.0.0.1:{port}" for port in ports]
+    processes = []
+    for port, url in zip(ports, urls):
+        env = dict(
+            os.environ,
+            TTS_BACKEND="mock",
+            MOCK_BACKEND_TTFB="0.05",
+            MOCK_BACKEND_SPEED="0",
+            PEER_NODES=",".join(urls),
+            PEER_SELF=url,
+            PEER_SHARED_SECRET="peer-secret",
+            ENABLE_LOOP_MONITOR="false",
+            DRAIN_GRACE_SECONDS="0",
+            LOG_LEVEL="WARNING",
+        )
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+
+    import httpx
+    deadline = time.monotonic() + 20
+    for url in urls:
+        while True:
+            try:
+                httpx.get(f"{url}/health", timeout=0.5)
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    for process in processes:
+                        process.kill()
+                    pytest.fail("节点启动超时")
+                time.sleep(0.1)
+    try:
+        yield urls
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+
+class TestPeerCluster:
+    """多进程节点测试类"""
+
+    def test_each_text_synthesized_once_cluster_wide(self, cluster):
+        """测试同一文本无论由哪个节点接收, 整个集群只调用一次上游"""
+        import httpx
+
+        texts = [f"第{i}句测试文本。" for i in range(8)]
+        statuses = []
+        with httpx.Client(timeout=10) as client:
+            for text in texts:
+                body = {"model": "tts-1", "input": text, "voice": "alloy"}
+                first = client.post(f"{cluster[0]}/v1/audio/speech", json=body)
+                second = client.post(f"{cluster[1]}/v1/audio/speech", json=body)
+                assert first.status_code == second.status_code == 200
+                assert first.content == second.content
+                statuses.append((first.headers["x-cache"], second.headers["x-cache"]))
+
+            calls = sum(_upstream_calls(client, url) for url in cluster)
+
+        assert calls == len(texts)
+        # 键属于另一节点时第一次经由所属节点合成, 第二次命中本地或所属节点的缓存
+        assert {"PEER", "MISS"} >= {first for first, _ in statuses}
+        assert any(first == "PEER" for first, _ in statuses)
+        assert all(second in ("HIT", "PEER") for _, second in statuses)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,175 @@
+"""缓存预取测试模块"""
+import asyncio
+import os
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.openai_models import OpenAISpeechRequest
+from app.routes.audio import router as audio_router
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.mock_backend import MockTTSBackend
+from app.services.prefetch import CACHED, INFLIGHT, QUEUED, REJECTED, Prefetcher, prefetcher
+from app.services.scheduler import UpstreamScheduler
+from app.services.speech_service import SpeechService, speech_service
+
+
+class OrderedBackend(MockTTSBackend):
+    """记录上游合成文本顺序的模拟后端"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.texts = []
+
+    async def synthesize_stream(self, request, on_first_chunk=None, on_sentence=None):
+        self.texts.append(request.text)
+        async for chunk in super().synthesize_stream(request, on_first_chunk, on_sentence):
+            yield chunk
+
+
+def make_service(backend: MockTTSBackend, **kwargs) -> SpeechService:
+    return SpeechService(
+        router=BackendRouter({"mock": backend}, "mock"),
+        cache=AudioCache(max_bytes=1 << 26, max_item_bytes=1 << 22),
+        breaker=CircuitBreaker(),
+        **kwargs
+    )
+
+
+def request(text: str) -> OpenAISpeechRequest:
+    return OpenAISpeechRequest(model="tts-1", input=text, voice="alloy")
+
+
+class TestPrefetcher:
+    """预取管理测试类"""
+
+    def test_later_request_hits_cache(self):
+        """测试预取完成后正式请求命中缓存, 重复预取不再提交"""
+        backend = MockTTSBackend(ttfb=0, speed=0)
+        service = make_service(backend)
+        prefetch = Prefetcher(service, max_pending=10)
+
+        async def run():
+            assert prefetch.submit(request("下一轮对话的回复。")) == QUEUED
+            assert prefetch.submit(request(" 下一轮对话的回复。 ")) == INFLIGHT
+            await asyncio.sleep(0.05)
+            assert prefetch.pending == 0
+            assert prefetch.submit(request("下一轮对话的回复。")) == CACHED
+            return await service.synthesize(request("下一轮对话的回复。"), "interactive")
+
+        result = asyncio.run(run())
+        assert result.cache_status == "hit"
+        assert backend.calls == 1
+
+    def test_request_attaches_to_inflight_prefetch(self):
+        """测试预取进行中到达的正式请求合并到同一次上游合成"""
+        backend = MockTTSBackend(ttfb=0.1, speed=0)
+        service = make_service(backend)
+        prefetch = Prefetcher(service, max_pending=10)
+
+        async def run():
+            assert prefetch.submit(request("下一页文章的第一段。")) == QUEUED
+            await asyncio.sleep(0.02)
+            return await service.synthesize(request("下一页文章的第一段。"), "interactive")
+
+        result = asyncio.run(run())
+        assert result.cache_status == "shared"
+        assert backend.calls == 1
+
+    def test_waits_for_spare_capacity(self):
+        """测试有其他请求排队时预取不占用上游槽位"""
+        backend = OrderedBackend(ttfb=0, speed=0)
+        scheduler = UpstreamScheduler(max_concurrency=1, reserved_slots=0)
+        service = make_service(backend, scheduler=scheduler)
+        prefetch = Prefetcher(service, max_pending=10)
+
+        async def run():
+            await scheduler.acquire("standard", 1)
+            assert prefetch.submit(request("预取的句子。")) == QUEUED
+            foreground = asyncio.create_task(service.synthesize(request("正式请求的句子。"), "bulk"))
+            await asyncio.sleep(0.01)
+            assert scheduler.queue_depth == 1 and scheduler.idle_depth == 1
+            scheduler.release()
+            await foreground
+            await asyncio.sleep(0.05)
+
+        asyncio.run(run())
+        assert backend.texts == ["正式请求的句子。", "预取的句子。"]
+
+    def test_interactive_request_promotes_prefetch(self):
+        """测试正式请求合并到排队中的预取时提升其优先级, 不被排在其后的批量任务拖慢"""
+        backend = OrderedBackend(ttfb=0, speed=0)
+        scheduler = UpstreamScheduler(max_concurrency=1, reserved_slots=0, starvation_seconds=60)
+        service = make_service(backend, scheduler=scheduler)
+        prefetch = Prefetcher(service, max_pending=10)
+
+        async def run():
+            await scheduler.acquire("standard", 1)
+            bulk = asyncio.create_task(service.synthesize(request("批量任务的句子。"), "bulk"))
+            assert prefetch.submit(request("预取的句子。")) == QUEUED
+            await asyncio.sleep(0.01)
+            assert scheduler.queue_depth == 1 and scheduler.idle_depth == 1
+            interactive = asyncio.create_task(service.synthesize(request("预取的句子。"), "interactive"))
+            await asyncio.sleep(0.01)
+            assert scheduler.idle_depth == 0 and scheduler.stats()["queued"]["interactive"] == 1
+            scheduler.release()
+            result = await interactive
+            await bulk
+            return result
+
+        result = asyncio.run(run())
+        assert result.cache_status == "shared"
+        assert backend.texts == ["预取的句子。", "批量任务的句子。"]
+
+    def test_rejected_when_full(self):
+        """测试未完成的预取达到上限时拒绝"""
+        service = make_service(MockTTSBackend(ttfb=0.1, speed=0))
+        prefetch = Prefetcher(service, max_pending=1)
+
+        async def run():
+            results = [prefetch.submit(request(text)) for text in ("第一句。", "第二句。")]
+            await prefetch.close()
+            return results
+
+        assert asyncio.run(run()) == [QUEUED, REJECTED]
+        assert prefetch.pending == 0
+
+
+class TestPrefetchEndpoint:
+    """预取端点测试类"""
+
+    def test_accepted_with_statuses(self, monkeypatch):
+        """测试立即返回202与逐条结果"""
+        service = make_service(MockTTSBackend(ttfb=0, speed=0))
+        service.cache.put(service.cache_key(request("已缓存的句子。")), b"audio")
+        monkeypatch.setattr(prefetcher, "service", service)
+        app = FastAPI()
+        app.include_router(audio_router)
+        client = TestClient(app)
+
+        body = {"requests": [
+            {"model": "tts-1", "input": "需要预取的句子。", "voice": "alloy"},
+            {"model": "tts-1", "input": "已缓存的句子。", "voice": "alloy"},
+        ]}
+        response = client.post("/v1/audio/speech/prefetch", json=body)
+        assert response.status_code == 202
+        assert response.json() == {"results": [
+            {"index": 0, "status": QUEUED},
+            {"index": 1, "status": CACHED},
+        ]}
+
+        response = client.post("/v1/audio/speech/prefetch", json={"requests": []})
+        assert response.status_code == 422
+        assert speech_service is not service
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
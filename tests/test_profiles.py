@@ -0,0 +1,193 @@
+"""输出档位测试模块"""
+import json
+import os
+import struct
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.middleware.profile import pick_profile
+from app.models.openai_models import OpenAISpeechRequest
+from app.routes import audio as audio_routes
+from app.routes.realtime import router as realtime_router
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.converter import ParameterConverter
+from app.services.mock_backend import MockTTSBackend
+from app.services.profiles import ProfileRegistry, output_profiles, parse_profile_routes, parse_profiles
+from app.services.request_builder import RequestBuilder
+from app.services.speech_service import SpeechService, speech_service
+from app.utils.errors import TTSProxyError
+
+SPEC = (
+    "telephony:sample_rate=8000;bit_rate=32,"
+    "premium:sample_rate=48000;bit_rate=192;resource_id=seed-tts-hd;model=seed-tts-1.1"
+)
+ROUTES = "model:tts-1-hd=premium,key:sk-ivr=telephony"
+
+
+def request(**fields) -> OpenAISpeechRequest:
+    return OpenAISpeechRequest(**{"model": "tts-1", "input": "欢迎致电", "voice": "alloy", **fields})
+
+
+@pytest.fixture
+def profiles(monkeypatch):
+    """以 SPEC 替换全局档位, tts-1-hd 路由到 premium, 密钥 sk-ivr 路由到 telephony"""
+    registry = ProfileRegistry(parse_profiles(SPEC), *parse_profile_routes(ROUTES, parse_profiles(SPEC)))
+    for name in ("profiles", "model_routes", "key_routes"):
+        monkeypatch.setattr(output_profiles, name, getattr(registry, name))
+    return output_profiles
+
+
+class TestProfiles:
+    """档位解析与选择测试类"""
+
+    def test_parse(self):
+        """测试未给出的字段取默认配置, 默认档位总是存在"""
+        profiles = parse_profiles(SPEC)
+        assert set(profiles) == {"default", "telephony", "premium"}
+        telephony = profiles["telephony"]
+        assert (telephony.sample_rate, telephony.bit_rate) == (8000, 32)
+        assert telephony.resource_id == settings.DOUBAO_RESOURCE_ID and telephony.model is None
+        assert profiles["premium"].model == "seed-tts-1.1"
+        assert profiles["default"].sample_rate == settings.DEFAULT_SAMPLE_RATE
+        with pytest.raises(ValueError):
+            parse_profiles("bad:channels=2")
+        with pytest.raises(ValueError):
+            parse_profiles("bad:sample_rate=11025")
+
+    def test_parse_routes(self):
+        """测试路由在构建注册表时解析并校验"""
+        profiles = parse_profiles(SPEC)
+        assert parse_profile_routes(ROUTES, profiles) == ({"tts-1-hd": "premium"}, {"sk-ivr": "telephony"})
+        for spec in ("model:tts-1", "user:x=premium", "key:=premium", "model:tts-1=nope"):
+            with pytest.raises(ValueError):
+                parse_profile_routes(spec, profiles)
+        monkeypatch = pytest.MonkeyPatch()
+        try:
+            monkeypatch.setattr(settings, "OUTPUT_PROFILE_ROUTES", "model:tts-1=nope")
+            with pytest.raises(ValueError):
+                ProfileRegistry(profiles)
+        finally:
+            monkeypatch.undo()
+
+    def test_resolve_order(self, profiles):
+        """测试请求体 → 请求头 → API密钥 → 模型 → 默认的顺序"""
+        assert pick_profile("premium", "sk-ivr") == "premium"
+        assert pick_profile(None, "sk-ivr") == "telephony"
+        assert pick_profile(" ", "sk-other") is None
+        registry = ProfileRegistry(parse_profiles(SPEC), {"tts-1-hd": "premium"})
+        assert registry.resolve(request(model="tts-1-hd", profile="telephony")).name == "telephony"
+        assert registry.resolve(request(model="tts-1-hd")).name == "premium"
+        assert registry.resolve(request()).name == "default"
+        with pytest.raises(TTSProxyError) as info:
+            registry.resolve(request(profile="nope"))
+        assert (info.value.status_code, info.value.code) == (400, "unknown_profile")
+
+
+class TestProfileRequests:
+    """档位对上游请求与缓存键的影响测试类"""
+
+    def setup_method(self):
+        self.converter = ParameterConverter(ProfileRegistry(parse_profiles(SPEC), {}))
+        self.builder = RequestBuilder(self.converter)
+
+    @pytest.mark.parametrize("name", ["default", "telephony", "premium"])
+    @pytest.mark.parametrize("response_format", ["mp3", "wav"])
+    def test_matches_reference(self, name, response_format):
+        """测试带档位时仍与参考实现等价"""
+        item = request(profile=name, response_format=response_format)
+        reference = self.converter.convert(item)
+        prepared = self.builder.build(item)
+        assert json.loads(prepared.body) == reference.model_dump(exclude_none=True)
+        profile = self.converter.profiles.profiles[name]
+        assert prepared.cache_key == self.builder.from_model(reference, profile.resource_id).cache_key
+
+    def test_parameters_and_cache_key(self):
+        """测试档位参数写入请求体, 不同档位的缓存键不同"""
+        built = {name: self.builder.build(request(profile=name)) for name in ("default", "telephony", "premium")}
+        telephony = json.loads(built["telephony"].body)["req_params"]
+        assert telephony["audio_params"]["sample_rate"] == 8000
+        assert telephony["audio_params"]["bit_rate"] == 32
+        assert "model" not in telephony
+        premium = built["premium"]
+        assert json.loads(premium.body)["req_params"]["model"] == "seed-tts-1.1"
+        assert (premium.resource_id, premium.model) == ("seed-tts-hd", "seed-tts-1.1")
+        assert len({prepared.cache_key for prepared in built.values()}) == 3
+
+
+class TestProfileEndpoints:
+    """档位端点测试类"""
+
+    @pytest.fixture
+    def client(self, monkeypatch, profiles):
+        backend = MockTTSBackend(ttfb=0, speed=0)
+        service = SpeechService(
+            router=BackendRouter({"mock": backend}, "mock"),
+            cache=AudioCache(max_bytes=1 << 26, max_item_bytes=1 << 22),
+            breaker=CircuitBreaker(),
+        )
+        monkeypatch.setattr(audio_routes, "speech_service", service)
+        app = FastAPI()
+        app.include_router(audio_routes.router)
+        return TestClient(app)
+
+    def test_header_and_key(self, client):
+        """测试请求头与API密钥选择档位, 影响WAV采样率"""
+        body = {"model": "tts-1", "input": "欢迎致电。", "voice": "alloy", "response_format": "wav"}
+        response = client.post("/v1/audio/speech", json=body, headers={"X-Output-Profile": "telephony"})
+        assert response.status_code == 200
+        assert response.headers["x-output-profile"] == "telephony"
+        assert struct.unpack("<I", response.content[24:28])[0] == 8000
+
+        response = client.post("/v1/audio/speech", json=body, headers={"Authorization": "Bearer sk-ivr"})
+        assert response.headers["x-output-profile"] == "telephony"
+        assert response.headers["x-cache"] == "HIT"
+
+        response = client.post("/v1/audio/speech", json=body)
+        assert response.headers["x-output-profile"] == "default"
+        assert struct.unpack("<I", response.content[24:28])[0] == settings.DEFAULT_SAMPLE_RATE
+
+    def test_unknown_profile(self, client):
+        """测试未知档位返回400"""
+        body = {"model": "tts-1", "input": "欢迎致电。", "voice": "alloy"}
+        response = client.post("/v1/audio/speech", json=body, headers={"X-Output-Profile": "nope"})
+        assert response.status_code == 400
+        assert response.json()["detail"]["error"]["code"] == "unknown_profile"
+        response = client.post("/v1/audio/speech", json={**body, "profile": "nope"})
+        assert response.status_code == 400
+        assert response.json()["detail"]["error"]["code"] == "unknown_profile"
+
+    def test_realtime_session(self, monkeypatch, profiles):
+        """测试实时会话按档位合成, 拒绝未知档位"""
+        backend = MockTTSBackend(ttfb=0, speed=0)
+        monkeypatch.setattr(speech_service, "router", BackendRouter({"mock": backend}, "mock"))
+        monkeypatch.setattr(speech_service, "cache", AudioCache(max_bytes=0))
+        app = FastAPI()
+        app.include_router(realtime_router)
+        client = TestClient(app)
+        with client.websocket_connect("/v1/audio/speech/realtime?response_format=wav&profile=telephony") as ws:
+            ws.send_json({"type": "session.update", "profile": "nope"})
+            assert ws.receive_json()["error"]["code"] == "invalid_session"
+            ws.send_json({"type": "input_text.delta", "delta": "第一句。"})
+            ws.send_json({"type": "input_text.close"})
+            audio = b""
+            while True:
+                message = ws.receive()
+                if message.get("bytes"):
+                    audio += message["bytes"]
+                elif json.loads(message["text"])["type"] == "done":
+                    break
+        assert struct.unpack("<I", audio[24:28])[0] == 8000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
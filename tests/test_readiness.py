@@ -0,0 +1,185 @@
+"""就绪检查与上游熔断测试模块"""
+import asyncio
+import os
+import signal
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.audio_cache import AudioCache
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.services.loop_monitor import LoopMonitor
+from app.services.readiness import MAX_WEIGHT, Readiness, readiness
+from app.services.scheduler import UpstreamScheduler
+from app.utils.errors import DoubaoAPIError
+
+
+async def call(breaker: CircuitBreaker, error=None):
+    async with breaker.guard():
+        if error is not None:
+            raise error
+
+
+def run(breaker: CircuitBreaker, error=None):
+    try:
+        asyncio.run(call(breaker, error))
+    except (DoubaoAPIError, RuntimeError) as e:
+        return e
+    return None
+
+
+class TestCircuitBreaker:
+    """熔断器测试类"""
+
+    def test_opens_on_upstream_failures(self):
+        """测试故障率达到阈值后熔断并快速拒绝"""
+        breaker = CircuitBreaker(error_threshold=0.5, min_requests=4, window_seconds=30, open_seconds=60)
+        for _ in range(2):
+            run(breaker)
+        run(breaker, DoubaoAPIError(3040, "连接错误"))
+        assert breaker.state == CLOSED
+        run(breaker, DoubaoAPIError(3030, "处理超时"))
+        assert breaker.state == OPEN
+        rejected = run(breaker)
+        assert isinstance(rejected, DoubaoAPIError) and rejected.status_code == 503
+
+    def test_client_errors_not_counted(self):
+        """测试参数错误与限流不计入上游故障"""
+        breaker = CircuitBreaker(error_threshold=0.5, min_requests=2)
+        for _ in range(5):
+            run(breaker, DoubaoAPIError(3050, "音色不存在"))
+            run(breaker, DoubaoAPIError(3003, "并发超限"))
+        assert breaker.state == CLOSED and breaker.error_rate == 0.0
+
+    def test_half_open_probe(self):
+        """测试冷却后只放行一个探测调用, 成功则恢复"""
+        breaker = CircuitBreaker(error_threshold=0.5, min_requests=1, open_seconds=0)
+        run(breaker, RuntimeError("boom"))
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() and not breaker.allow()
+        breaker.record(True)
+        assert breaker._state == OPEN
+        assert breaker.allow()
+        breaker.record(False)
+        assert breaker.state == CLOSED
+
+    def test_cancelled_probe_releases_slot(self):
+        """测试被取消的探测调用不计结果并释放探测名额"""
+        breaker = CircuitBreaker(error_threshold=0.5, min_requests=1, open_seconds=0)
+        run(breaker, RuntimeError("boom"))
+
+        async def probe():
+            async with breaker.guard():
+                await asyncio.sleep(10)
+
+        async def scenario():
+            task = asyncio.create_task(probe())
+            await asyncio.sleep(0.01)
+            busy = not breaker.allow()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return busy
+
+        assert asyncio.run(scenario())
+        assert breaker.state == HALF_OPEN and breaker.allow()
+
+
+def make_readiness(**breaker_kwargs) -> Readiness:
+    return Readiness(
+        scheduler=UpstreamScheduler(max_concurrency=4),
+        monitor=LoopMonitor(),
+        breaker=CircuitBreaker(**breaker_kwargs),
+        cache=AudioCache(max_bytes=1000, max_item_bytes=1000),
+    )
+
+
+class TestReadiness:
+    """就绪快照测试类"""
+
+    def test_idle_full_weight(self):
+        """测试空闲时权重为满值"""
+        snapshot = make_readiness().snapshot()
+        assert snapshot["ready"] and snapshot["status"] == "ready"
+        assert snapshot["weight"] == MAX_WEIGHT
+        assert snapshot["upstream"]["limit"] == 4 and snapshot["upstream"]["circuit"] == CLOSED
+
+    def test_weight_follows_load_and_errors(self):
+        """测试权重随上游占用与错误率下降, 就绪时不低于1"""
+        state = make_readiness(error_threshold=0)
+        state.scheduler.in_flight = 2
+        assert state.snapshot()["weight"] == MAX_WEIGHT // 2
+        state.breaker.record(True)
+        state.breaker.record(False)
+        assert state.snapshot()["weight"] == MAX_WEIGHT // 4
+        state.scheduler.in_flight = 4
+        snapshot = state.snapshot()
+        assert snapshot["ready"] and snapshot["weight"] == 1
+        assert snapshot["upstream"]["utilization"] == 1.0
+
+    def test_not_ready_when_circuit_open_or_draining(self):
+        """测试熔断或排空时未就绪且权重为0"""
+        state = make_readiness(error_threshold=0.5, min_requests=1, open_seconds=60)
+        state.breaker.record(True)
+        snapshot = state.snapshot()
+        assert not snapshot["ready"] and snapshot["reasons"] == ["circuit_open"] and snapshot["weight"] == 0
+
+        state = make_readiness()
+        state.start_drain()
+        snapshot = state.snapshot()
+        assert snapshot["status"] == "draining" and snapshot["weight"] == 0
+
+    def test_cache_warmth(self):
+        """测试报告缓存占用"""
+        state = make_readiness()
+        state.cache.put("a", b"x" * 250)
+        assert state.snapshot()["cache"] == {"entries": 1, "bytes": 250, "fill": 0.25, "hit_ratio": 0.0}
+
+
+class TestReadyEndpoint:
+    """就绪端点测试类"""
+
+    def test_ready_and_drain(self):
+        """测试就绪时返回200, 排空时返回503"""
+        client = TestClient(app)
+        try:
+            response = client.get("/ready")
+            assert response.status_code == 200
+            assert response.json()["status"] == "ready"
+            readiness.start_drain()
+            response = client.get("/ready")
+            assert response.status_code == 503
+            assert response.json()["reasons"] == ["draining"]
+        finally:
+            readiness.stop_drain()
+
+    def test_sigterm_drains_before_shutdown(self):
+        """测试SIGTERM先进入排空状态, 排空期后才交给原有处理器; 再次收到时立即关闭"""
+        calls = []
+        original = signal.signal(signal.SIGTERM, lambda signum, frame: calls.append(signum))
+        state = Readiness()
+
+        async def run():
+            assert state.install_signal_handler(0.05)
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.sleep(0.01)
+            assert state.draining and calls == []
+            await asyncio.sleep(0.1)
+            assert calls == [signal.SIGTERM]
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.sleep(0.01)
+            assert len(calls) == 2
+
+        try:
+            asyncio.run(run())
+        finally:
+            signal.signal(signal.SIGTERM, original)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,251 @@
+"""增量分句与实时语音端点测试模块"""
+import asyncio
+import json
+import os
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.config import settings
+from app.routes.realtime import router as realtime_router
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.mock_backend import MockTTSBackend
+from app.services.realtime import RealtimeSession
+from app.services.segmenter import SentenceSegmenter
+from app.services.speech_service import SpeechService, SpeechStream, speech_service
+
+
+def feed_chars(segmenter: SentenceSegmenter, text: str):
+    sentences = []
+    for ch in text:
+        sentences.extend(segmenter.feed(ch))
+    return sentences
+
+
+class TestSentenceSegmenter:
+    """增量分句测试类"""
+
+    def test_chinese_sentences(self):
+        """测试中文句末标点, 连续标点与右引号归入当前句"""
+        segmenter = SentenceSegmenter(min_chars=1, max_chars=200)
+        sentences = feed_chars(segmenter, "你好，世界。真的吗？！他说：“走吧。”然后")
+        assert sentences == ["你好，世界。", "真的吗？！", "他说：“走吧。”"]
+        assert segmenter.flush() == ["然后"]
+
+    def test_period_needs_whitespace(self):
+        """测试英文句点后为空白时才断句"""
+        segmenter = SentenceSegmenter(min_chars=1, max_chars=200)
+        sentences = feed_chars(segmenter, "Pi is 3.14 today. Next")
+        assert sentences == ["Pi is 3.14 today."]
+
+    def test_waits_for_next_character(self):
+        """测试句末标点后尚无内容时等待"""
+        segmenter = SentenceSegmenter(min_chars=1, max_chars=200)
+        assert segmenter.feed("第一句。") == []
+        assert segmenter.feed("第") == ["第一句。"]
+        assert segmenter.pending == "第"
+
+    def test_short_sentences_merged(self):
+        """测试过短的句子与后文合并"""
+        segmenter = SentenceSegmenter(min_chars=4, max_chars=200)
+        assert feed_chars(segmenter, "嗯。好的，我们开始吧。x") == ["嗯。好的，我们开始吧。"]
+
+    def test_long_text_cut_at_soft_break(self):
+        """测试超长无标点文本在逗号处切分"""
+        segmenter = SentenceSegmenter(min_chars=1, max_chars=10)
+        sentences = feed_chars(segmenter, "一二三四五，六七八九十一二三")
+        assert sentences == ["一二三四五，"]
+        assert all(len(s) <= 10 for s in sentences)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """使用模拟后端的实时端点测试客户端"""
+    backend = MockTTSBackend(ttfb=0, speed=0, chunk_bytes=700)
+    monkeypatch.setattr(speech_service, "router", BackendRouter({"mock": backend}, "mock"))
+    monkeypatch.setattr(speech_service, "cache", AudioCache(max_bytes=1 << 24, max_item_bytes=1 << 22))
+    app = FastAPI()
+    app.include_router(realtime_router)
+    return TestClient(app)
+
+
+def receive_until_done(ws):
+    events, audio = [], []
+    while True:
+        message = ws.receive()
+        if message.get("bytes") is not None:
+            audio.append((len(events), message["bytes"]))
+            continue
+        event = json.loads(message["text"])
+        events.append(event)
+        if event["type"] == "done":
+            return events, audio
+
+
+class TestRealtimeEndpoint:
+    """实时语音端点测试类"""
+
+    def test_dispatches_before_input_closed(self, client):
+        """测试句子完整后即开始返回音频, 无需等待全部文本"""
+        with client.websocket_connect("/v1/audio/speech/realtime?voice=nova") as ws:
+            ws.send_json({"type": "input_text.delta", "delta": "你好，欢迎使用。"})
+            ws.send_json({"type": "input_text.delta", "delta": "今天"})
+            start = ws.receive_json()
+            assert start == {"type": "segment.start", "index": 0, "text": "你好，欢迎使用。"}
+            assert len(ws.receive_bytes()) > 0
+
+            ws.send_json({"type": "input_text.delta", "delta": "天气不错"})
+            ws.send_json({"type": "input_text.close"})
+            events, _ = receive_until_done(ws)
+
+        starts = [e for e in events if e["type"] == "segment.start"]
+        assert [e["text"] for e in starts] == ["今天天气不错"]
+        assert events[-1] == {"type": "done", "segments": 2}
+
+    def test_audio_in_sentence_order(self, client):
+        """测试多句并行合成时音频按句子顺序返回"""
+        text = "第一句话比较长一些，需要更多时间。第二句。第三句话。"
+        with client.websocket_connect("/v1/audio/speech/realtime") as ws:
+            ws.send_json({"type": "input_text.delta", "delta": text})
+            ws.send_json({"type": "input_text.close"})
+            events, audio = receive_until_done(ws)
+
+        kinds = [(e["type"], e.get("index")) for e in events]
+        assert kinds == [
+            ("segment.start", 0), ("segment.done", 0),
+            ("segment.start", 1), ("segment.done", 1),
+            ("segment.start", 2), ("segment.done", 2),
+            ("done", None),
+        ]
+        # 每段音频位于对应的 start 与 done 之间
+        for position, chunk in audio:
+            assert events[position - 1]["type"] == "segment.start"
+            assert chunk[:2] == b"\xff\xf3"
+
+    def test_wav_single_header(self, client):
+        """测试WAV会话只发送一个流式头, 各句以PCM续接"""
+        with client.websocket_connect("/v1/audio/speech/realtime?response_format=wav") as ws:
+            ws.send_json({"type": "input_text.delta", "delta": "第一句。第二句。"})
+            ws.send_json({"type": "input_text.close"})
+            _, audio = receive_until_done(ws)
+        joined = b"".join(chunk for _, chunk in audio)
+        assert joined[:4] == b"RIFF"
+        assert joined.count(b"RIFF") == 1
+
+    def test_session_update_validation(self, client):
+        """测试无效的会话配置返回错误且不断开连接"""
+        with client.websocket_connect("/v1/audio/speech/realtime") as ws:
+            ws.send_json({"type": "session.update", "voice": "nobody"})
+            assert ws.receive_json()["error"]["code"] == "invalid_session"
+            ws.send_json({"type": "session.update", "voice": "echo", "speed": 1.5})
+            assert ws.receive_json()["session"]["voice"] == "echo"
+            ws.send_json({"type": "input_text.close"})
+            assert ws.receive_json() == {"type": "done", "segments": 0}
+
+    def test_invalid_messages(self, client):
+        """测试非JSON、非对象的消息返回错误且不断开连接"""
+        with client.websocket_connect("/v1/audio/speech/realtime") as ws:
+            ws.send_text("not json")
+            assert ws.receive_json()["error"]["code"] == "invalid_message"
+            ws.send_json(["input_text.close"])
+            assert ws.receive_json()["error"]["code"] == "invalid_message"
+            ws.send_bytes(b"\x00")
+            assert ws.receive_json()["error"]["code"] == "invalid_message"
+            ws.send_json({"type": "input_text.close"})
+            assert ws.receive_json() == {"type": "done", "segments": 0}
+
+    def test_requires_api_key(self, client, monkeypatch):
+        """测试启用认证时拒绝无密钥连接, 支持查询参数传递密钥"""
+        monkeypatch.setattr(settings, "ENABLE_API_KEY_AUTH", True)
+        monkeypatch.setattr(settings, "API_KEYS", "sk-test")
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect("/v1/audio/speech/realtime") as ws:
+                ws.receive_json()
+        with client.websocket_connect("/v1/audio/speech/realtime?api_key=sk-test") as ws:
+            ws.send_json({"type": "input_text.close"})
+            assert ws.receive_json()["type"] == "done"
+
+
+class BrokenSocket:
+    """收到的消息依次返回, 之后一直等待; 发送总是失败(连接已不可写)"""
+
+    def __init__(self, messages):
+        self.messages = [{"type": "websocket.receive", "text": json.dumps(m)} for m in messages]
+
+    async def receive(self):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send_json(self, data):
+        raise RuntimeError("connection lost")
+
+    async def send_bytes(self, data):
+        raise RuntimeError("connection lost")
+
+
+class AudioBrokenSocket(BrokenSocket):
+    """JSON消息发送成功, 音频发送失败"""
+
+    async def send_json(self, data):
+        pass
+
+
+class TestRealtimeSession:
+    """实时会话测试类"""
+
+    def test_sender_failure_releases_dispatch(self):
+        """测试发送循环异常结束时会话结束, 不在等待合成槽位时挂起"""
+        service = SpeechService(
+            router=BackendRouter({"mock": MockTTSBackend(ttfb=0, speed=0)}, "mock"),
+            cache=AudioCache(max_bytes=0),
+            breaker=CircuitBreaker(),
+        )
+        socket = BrokenSocket([{"type": "input_text.delta", "delta": "第一句。第二句。第三句。第四句。"}])
+        session = RealtimeSession(socket, "standard", service=service, max_inflight=1)
+        with pytest.raises(RuntimeError):
+            asyncio.run(asyncio.wait_for(session.run(), 2))
+
+    def test_sender_failure_closes_stream(self):
+        """测试发送音频失败时立即关闭进行中的合成流"""
+        closed = []
+
+        async def chunks():
+            try:
+                yield b"a"
+                yield b"b"
+            finally:
+                closed.append(True)
+
+        async def stream(request, priority=None):
+            return SpeechStream(chunks=chunks(), cache_key="k", cache_status="miss")
+
+        service = SpeechService(
+            router=BackendRouter({"mock": MockTTSBackend(ttfb=0, speed=0)}, "mock"),
+            cache=AudioCache(max_bytes=0),
+            breaker=CircuitBreaker(),
+        )
+        service.stream = stream
+        socket = AudioBrokenSocket([{"type": "input_text.delta", "delta": "第一句。第二句。"}])
+        session = RealtimeSession(socket, "standard", service=service)
+
+        async def run():
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(session.run(), 2)
+            # 在事件循环关闭(回收异步生成器)之前检查
+            return list(closed)
+
+        assert asyncio.run(run()) == [True]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,183 @@
+"""上游流量录制与回放测试模块"""
+import asyncio
+import base64
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from app.config import settings
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.doubao_client import DoubaoTTSClient
+from app.services import recorder as recorder_module
+from app.services.recorder import REDACTED, TraceRecorder
+from app.services.request_builder import request_builder
+from app.utils.errors import DoubaoAPIError
+
+ROOT = Path(__file__).resolve().parent.parent
+_spec = importlib.util.spec_from_file_location("replay_server", ROOT / "benchmarks" / "replay_server.py")
+replay_server = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(replay_server)
+
+AUDIO = [b"\xff\xf3" + bytes([i]) * 300 for i in range(3)]
+
+
+def ndjson_chunks():
+    """模拟上游响应: 音频行被切分在任意位置"""
+    lines = "".join(
+        json.dumps({"code": 0, "message": "", "data": base64.b64encode(audio).decode()}) + "\n"
+        for audio in AUDIO
+    ) + json.dumps({"code": 20000000, "message": "OK", "data": None}) + "\n"
+    return [lines[i:i + 150].encode() for i in range(0, len(lines), 150)]
+
+
+def make_client(handler, directory) -> DoubaoTTSClient:
+    client = DoubaoTTSClient(TraceRecorder(str(directory)))
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def prepared(text: str = "录制测试"):
+    return request_builder.build(OpenAISpeechRequest(model="tts-1", input=text, voice="alloy"))
+
+
+async def collect(client, request):
+    try:
+        return b"".join([chunk async for chunk in client.synthesize_stream(request)])
+    finally:
+        await client.close()
+
+
+def read_trace(directory: Path):
+    (path,) = directory.glob("*.jsonl")
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class TestRecorder:
+    """录制测试类"""
+
+    def test_records_raw_stream_and_redacts(self, tmp_path):
+        """测试原样记录响应文本块与时间戳, 凭证已脱敏"""
+        async def handler(request):
+            async def body():
+                for chunk in ndjson_chunks():
+                    yield chunk
+            return httpx.Response(
+                200, headers={"X-Tt-Logid": "log-1", "Set-Cookie": "session=secret"}, content=body()
+            )
+
+        audio = asyncio.run(collect(make_client(handler, tmp_path), prepared()))
+        assert audio == b"".join(AUDIO)
+
+        records = read_trace(tmp_path)
+        request, response, *chunks, end = records
+        assert request["type"] == "request"
+        assert request["headers"]["X-Api-Access-Key"] == REDACTED
+        assert request["headers"]["X-Api-App-Id"] == REDACTED
+        assert request["body"]["req_params"]["text"] == "录制测试"
+        assert "test_token" not in json.dumps(records)
+        assert response["status"] == 200
+        assert response["headers"]["x-tt-logid"] == "log-1"
+        assert response["headers"]["set-cookie"] == REDACTED
+        assert "".join(c["data"] for c in chunks).encode() == b"".join(ndjson_chunks())
+        assert [c["t"] for c in chunks] == sorted(c["t"] for c in chunks)
+        assert end == {"type": "end", "t": end["t"], "error": None}
+
+    def test_records_error_response(self, tmp_path):
+        """测试上游错误响应同样被记录"""
+        def handler(request):
+            return httpx.Response(429, json={"message": "quota exceeded"})
+
+        with pytest.raises(DoubaoAPIError):
+            asyncio.run(collect(make_client(handler, tmp_path), prepared()))
+        request, response, chunk, end = read_trace(tmp_path)
+        assert response["status"] == 429
+        assert json.loads(chunk["data"]) == {"message": "quota exceeded"}
+        assert "DoubaoAPIError" in end["error"]
+
+    def test_buffered_writes_off_loop(self, tmp_path, monkeypatch):
+        """测试缓冲写满后在线程中按顺序写入, 事件循环上不写文件"""
+        monkeypatch.setattr(recorder_module, "FLUSH_BYTES", 100)
+        writes = []
+        original = asyncio.to_thread
+
+        async def to_thread(func, *args):
+            writes.append(func.__name__)
+            return await original(func, *args)
+
+        monkeypatch.setattr(recorder_module.asyncio, "to_thread", to_thread)
+
+        async def run():
+            writer = TraceRecorder(str(tmp_path / "traces")).start("http://upstream", {}, b"{}")
+            for index in range(20):
+                writer.chunk(f"chunk-{index}")
+            await writer.close()
+
+        asyncio.run(run())
+        request, *chunks, end = read_trace(tmp_path / "traces")
+        assert [c["data"] for c in chunks] == [f"chunk-{index}" for index in range(20)]
+        assert end["type"] == "end"
+        assert len(writes) > 1 and set(writes) == {"_append_sync"}
+
+    def test_disabled_without_directory(self, monkeypatch):
+        """测试未配置目录时不录制"""
+        monkeypatch.setattr(settings, "DOUBAO_RECORD_DIR", None)
+        recorder = TraceRecorder()
+        assert not recorder.enabled
+        assert recorder.start("http://upstream", {}, b"{}") is None
+
+
+class TestReplay:
+    """回放测试类"""
+
+    def test_replay_round_trip(self, tmp_path):
+        """测试回放录制的轨迹得到相同音频, 并按文本匹配轨迹"""
+        async def handler(request):
+            async def body():
+                for chunk in ndjson_chunks():
+                    await asyncio.sleep(0.01)
+                    yield chunk
+            return httpx.Response(200, content=body())
+
+        asyncio.run(collect(make_client(handler, tmp_path / "traces"), prepared()))
+        (trace,) = replay_server.load_traces(tmp_path / "traces")
+        assert len(trace.chunks) == len(ndjson_chunks())
+
+        app = replay_server.ReplayApp([trace], speed=0)
+        replay = DoubaoTTSClient(TraceRecorder(None))
+        replay.http_url = "http://replay/api/v3/tts/unidirectional"
+        replay._http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+        assert asyncio.run(collect(replay, prepared())) == b"".join(AUDIO)
+        assert app.served == 1 and app.unmatched == 0
+
+    def test_replay_speed(self, tmp_path):
+        """测试按倍速保持块间间隔"""
+        trace = replay_server.Trace(
+            path=tmp_path, body={}, response_at=0.0,
+            chunks=[(0.1, "a"), (0.2, "b")],
+        )
+
+        async def fetch(speed):
+            app = replay_server.ReplayApp([trace], speed=speed)
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app)) as client:
+                loop = asyncio.get_running_loop()
+                start = loop.time()
+                response = await client.post("http://replay/", content=b"{}")
+                return response.text, loop.time() - start
+
+        text, elapsed = asyncio.run(fetch(1.0))
+        assert text == "ab" and elapsed >= 0.19
+        _, elapsed = asyncio.run(fetch(4.0))
+        assert elapsed < 0.15
+        assert replay_server.parse_speed("max") == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
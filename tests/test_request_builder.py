@@ -0,0 +1,67 @@
+"""上游请求构建测试模块"""
+import importlib
+import itertools
+import json
+import os
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from app.services.converter import ParameterConverter
+from app.services.doubao_client import DoubaoTTSClient
+from app.services.request_builder import RequestBuilder
+from app.models.openai_models import OpenAISpeechRequest
+
+request_builder_module = importlib.import_module("app.services.request_builder")
+
+TEXTS = ["测试文本", 'quote " and \\ backslash', "换行\n与emoji 🎉"]
+FORMATS = ["mp3", "opus", "aac", "flac", "wav", "pcm"]
+
+
+class TestRequestBuilder:
+    """请求构建器测试类"""
+
+    def setup_method(self):
+        """测试初始化"""
+        self.converter = ParameterConverter()
+        self.builder = RequestBuilder(self.converter)
+
+    @pytest.mark.parametrize("response_format", FORMATS)
+    def test_matches_reference_models(self, response_format):
+        """测试与参考实现(Pydantic模型)序列化结果等价"""
+        for text, voice, speed in itertools.product(TEXTS, ["alloy", "echo"], [0.25, 1.0, 1.5, 4.0]):
+            request = OpenAISpeechRequest(
+                model="tts-1", input=text, voice=voice,
+                speed=speed, response_format=response_format
+            )
+            reference = self.converter.convert(request)
+            prepared = self.builder.build(request)
+            assert json.loads(prepared.body) == reference.model_dump(exclude_none=True)
+            assert prepared.cache_key == self.builder.from_model(reference).cache_key
+
+    def test_stdlib_backend(self, monkeypatch):
+        """测试未安装orjson时使用标准库序列化"""
+        monkeypatch.setattr(request_builder_module, "orjson", None)
+        builder = RequestBuilder(self.converter)
+        request = OpenAISpeechRequest(model="tts-1", input="你好", voice="nova")
+        assert json.loads(builder.build(request).body) == \
+            self.converter.convert(request).model_dump(exclude_none=True)
+
+    def test_text_override(self):
+        """测试覆盖文本"""
+        request = OpenAISpeechRequest(model="tts-1", input="原文", voice="alloy")
+        prepared = self.builder.build(request, text="剩余文本")
+        assert json.loads(prepared.body)["req_params"]["text"] == "剩余文本"
+
+    def test_headers_cached(self):
+        """测试请求头只构建一次"""
+        client = DoubaoTTSClient()
+        assert client._headers("seed-tts-2.0") is client._headers("seed-tts-2.0")
+        assert client._headers("seed-tts-2.0")["X-Api-Resource-Id"] == "seed-tts-2.0"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,157 @@
+"""上游中断续传测试模块"""
+import asyncio
+import base64
+import json
+import os
+import random
+import re
+
+import httpx
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.doubao_client import DoubaoTTSClient
+from app.services.framing import StreamSplicer, wav_header
+from app.services.mock_backend import generate_audio
+from app.services.recorder import TraceRecorder
+from app.services.request_builder import request_builder
+from app.utils.errors import DoubaoAPIError
+
+TEXT = "".join(f"第{i}句用于测试续传的文本。" for i in range(12))
+
+
+def sentence_audio(sentence: str, audio_format: str) -> bytes:
+    # wav 只在流开头带一个头, 各句为PCM
+    audio_format = "pcm" if audio_format == "wav" else audio_format
+    return generate_audio(audio_format, 0.4, sentence.encode("utf-8"), 24000)
+
+
+def expected_audio(text: str, audio_format: str) -> bytes:
+    header = wav_header(24000) if audio_format == "wav" else b""
+    return header + b"".join(sentence_audio(s, audio_format) for s in re.findall(r"[^。]+。", text))
+
+
+class FakeUpstream:
+    """按句返回确定性音频与句子时间戳的上游, 可在指定字节处断开连接"""
+
+    def __init__(self, cuts=(), sentences: bool = True, chunk_bytes: int = 333):
+        self.cuts = list(cuts)
+        self.sentences = sentences
+        self.chunk_bytes = chunk_bytes
+        self.texts = []
+
+    def lines(self, text: str, audio_format: str) -> bytes:
+        out = []
+        if audio_format == "wav":
+            out.append({"code": 0, "message": "", "data": base64.b64encode(wav_header(24000)).decode()})
+        for sentence in re.findall(r"[^。]+。", text):
+            audio = sentence_audio(sentence, audio_format)
+            for i in range(0, len(audio), self.chunk_bytes):
+                data = base64.b64encode(audio[i:i + self.chunk_bytes]).decode()
+                out.append({"code": 0, "message": "", "data": data})
+            if self.sentences:
+                out.append({"code": 0, "message": "", "data": None, "sentence": {"text": sentence, "words": []}})
+        out.append({"code": 20000000, "message": "OK", "data": None})
+        return "".join(json.dumps(line) + "\n" for line in out).encode()
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        params = json.loads(request.content)["req_params"]
+        self.texts.append(params["text"])
+        payload = self.lines(params["text"], params["audio_params"]["format"])
+        cut = self.cuts.pop(0) if self.cuts else None
+
+        async def body():
+            end = len(payload) if cut is None else min(cut, len(payload))
+            for i in range(0, end, 500):
+                yield payload[i:min(i + 500, end)]
+            if cut is not None:
+                raise httpx.RemoteProtocolError("peer closed connection without sending complete message body")
+
+        return httpx.Response(200, content=body())
+
+
+def synthesize(upstream: FakeUpstream, audio_format: str = "mp3", attempts: int = 3, text: str = TEXT) -> bytes:
+    client = DoubaoTTSClient(TraceRecorder(None))
+    client.resume_attempts = attempts
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(upstream.handler))
+    request = request_builder.build(
+        OpenAISpeechRequest(model="tts-1", input=text, voice="alloy", response_format=audio_format)
+    )
+
+    async def run():
+        try:
+            return b"".join([chunk async for chunk in client.synthesize_stream(request)])
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+
+class TestResume:
+    """续传测试类"""
+
+    @pytest.mark.parametrize("audio_format", ["mp3", "pcm", "aac", "wav"])
+    def test_random_cuts_splice_seamlessly(self, audio_format):
+        """测试在随机位置断开后续传的音频与未中断时完全一致"""
+        full = FakeUpstream().lines(TEXT, audio_format)
+        rng = random.Random(audio_format)
+        resumed_mid_text = 0
+        for _ in range(5):
+            upstream = FakeUpstream(cuts=[rng.randrange(50, len(full) // 2) for _ in range(2)])
+            audio = synthesize(upstream, audio_format)
+            assert audio == expected_audio(TEXT, audio_format)
+            assert 2 <= len(upstream.texts) <= 3
+            # 续传只请求最后一个完整句子之后的文本
+            assert all(TEXT.endswith(text) for text in upstream.texts[1:])
+            resumed_mid_text += len(upstream.texts[1]) < len(TEXT)
+        assert resumed_mid_text > 0
+
+    def test_without_sentence_timestamps_restarts_from_beginning(self):
+        """测试没有句子时间戳时从头重新请求, 已输出的音频不重复"""
+        upstream = FakeUpstream(cuts=[4000], sentences=False)
+        assert synthesize(upstream) == expected_audio(TEXT, "mp3")
+        assert upstream.texts == [TEXT, TEXT]
+
+    def test_cut_after_last_sentence(self):
+        """测试全部句子到达后只缺结束标记时不再请求"""
+        upstream = FakeUpstream()
+        payload = upstream.lines(TEXT, "mp3")
+        upstream.cuts = [payload.rindex(b'{"code": 20000000')]
+        assert synthesize(upstream) == expected_audio(TEXT, "mp3")
+        assert len(upstream.texts) == 1
+
+    def test_attempts_exhausted(self):
+        """测试续传次数用尽后返回网络错误"""
+        upstream = FakeUpstream(cuts=[3000, 3000, 3000])
+        with pytest.raises(DoubaoAPIError) as exc:
+            synthesize(upstream, attempts=2)
+        assert exc.value.doubao_code == 3040
+        assert len(upstream.texts) == 3
+
+    def test_ogg_not_resumed(self):
+        """测试Ogg格式不续传"""
+        upstream = FakeUpstream(cuts=[3000])
+        with pytest.raises(DoubaoAPIError):
+            synthesize(upstream, "opus")
+        assert len(upstream.texts) == 1
+
+
+class TestStreamSplicer:
+    """续传拼接器测试类"""
+
+    def test_skips_emitted_frames(self):
+        """测试续传流跳过边界后已输出的帧与开头的ID3标签"""
+        first = generate_audio("mp3", 0.4, b"a", 24000)
+        second = generate_audio("mp3", 0.4, b"b", 24000)
+        tag = b"ID3\x04\x00\x00" + bytes([0, 0, 0, 2]) + b"xx"
+        splicer = StreamSplicer("mp3")
+        out = splicer.feed(tag + first)
+        splicer.mark()
+        out += splicer.feed(second[:1000])
+        splicer.restart()
+        out += splicer.feed(tag + second) + splicer.flush()
+        assert out == tag + first + second
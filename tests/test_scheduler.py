@@ -0,0 +1,174 @@
+"""上游调度器测试模块"""
+import asyncio
+import os
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from app.config import settings
+from app.middleware.priority import pick_priority
+from app.services.scheduler import IDLE_PRIORITY, SlotTicket, UpstreamScheduler, estimate_cost
+
+WEIGHTS = {"interactive": 8, "standard": 4, "bulk": 1}
+
+
+async def _dispatch_order(scheduler, jobs):
+    """占满槽位后提交任务, 返回任务获得槽位的顺序"""
+    order = []
+    await scheduler.acquire("standard", 1)
+
+    async def job(name, priority, cost):
+        async with scheduler.slot(priority, cost):
+            order.append(name)
+
+    tasks = []
+    for name, priority, cost in jobs:
+        tasks.append(asyncio.create_task(job(name, priority, cost)))
+        await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+class TestUpstreamScheduler:
+    """调度器测试类"""
+
+    def test_priority_class_wins(self):
+        """测试高优先级类别先获得槽位"""
+        scheduler = UpstreamScheduler(max_concurrency=1, weights=WEIGHTS, starvation_seconds=60)
+        order = asyncio.run(_dispatch_order(scheduler, [
+            ("bulk", "bulk", 10),
+            ("interactive", "interactive", 10),
+        ]))
+        assert order == ["interactive", "bulk"]
+
+    def test_shortest_job_first_within_class(self):
+        """测试同类别内短任务优先"""
+        scheduler = UpstreamScheduler(max_concurrency=1, weights=WEIGHTS, starvation_seconds=60)
+        order = asyncio.run(_dispatch_order(scheduler, [
+            ("long", "standard", 5000),
+            ("short", "standard", 30),
+        ]))
+        assert order == ["short", "long"]
+
+    def test_starvation_protection(self):
+        """测试等待超时的低优先级任务优先派发"""
+        scheduler = UpstreamScheduler(max_concurrency=1, weights=WEIGHTS, starvation_seconds=0)
+        order = asyncio.run(_dispatch_order(scheduler, [
+            ("bulk", "bulk", 5000),
+            ("interactive", "interactive", 10),
+        ]))
+        assert order == ["bulk", "interactive"]
+
+    def test_cancelled_waiter_removed(self):
+        """测试排队中被取消的任务不占用槽位"""
+        scheduler = UpstreamScheduler(max_concurrency=1, weights=WEIGHTS, starvation_seconds=60)
+
+        async def run():
+            await scheduler.acquire("standard", 1)
+            task = asyncio.create_task(scheduler.acquire("bulk", 1))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert scheduler.queue_depth == 0
+            scheduler.release()
+            assert scheduler.in_flight == 0
+
+        asyncio.run(run())
+
+    def test_idle_uses_only_spare_slots(self):
+        """测试空闲类别在其他类别排队时让出, 且不占用预留槽位"""
+        scheduler = UpstreamScheduler(max_concurrency=3, weights=WEIGHTS, starvation_seconds=0, reserved_slots=1)
+
+        async def run():
+            order = []
+
+            async def job(name, priority):
+                await scheduler.acquire(priority, 1)
+                order.append(name)
+
+            await scheduler.acquire("standard", 1)
+            await scheduler.acquire("standard", 1)
+            idle = asyncio.create_task(job("idle", IDLE_PRIORITY))
+            await asyncio.sleep(0)
+            # 剩下的是预留槽位, 空闲类别不可用
+            assert not idle.done() and scheduler.queue_depth == 0 and scheduler.idle_depth == 1
+            bulk = asyncio.create_task(job("bulk", "bulk"))
+            await asyncio.sleep(0)
+            scheduler.release()
+            await asyncio.sleep(0)
+            assert order == ["bulk"]
+            scheduler.release()
+            await asyncio.gather(idle, bulk)
+            assert order == ["bulk", "idle"] and scheduler.in_flight == 2
+
+        asyncio.run(run())
+
+    def test_promote_queued_ticket(self):
+        """测试排队中的空闲申请被提升后按新类别派发, 取消时从新队列移除"""
+        scheduler = UpstreamScheduler(max_concurrency=1, weights=WEIGHTS, starvation_seconds=60, reserved_slots=0)
+
+        async def run():
+            order = []
+
+            async def job(name, ticket):
+                async with scheduler.slot(ticket.priority, ticket.cost, ticket):
+                    order.append(name)
+
+            await scheduler.acquire("standard", 1)
+            prefetch = SlotTicket(IDLE_PRIORITY, 1)
+            tasks = [
+                asyncio.create_task(job("prefetch", prefetch)),
+                asyncio.create_task(job("bulk", SlotTicket("bulk", 1))),
+            ]
+            await asyncio.sleep(0)
+            scheduler.promote(prefetch, "interactive")
+            scheduler.promote(prefetch, "bulk")
+            assert prefetch.priority == "interactive" and scheduler.idle_depth == 0
+            scheduler.release()
+            await asyncio.gather(*tasks)
+            assert order == ["prefetch", "bulk"]
+
+            await scheduler.acquire("standard", 1)
+            ticket = SlotTicket(IDLE_PRIORITY, 1)
+            task = asyncio.create_task(scheduler.acquire(IDLE_PRIORITY, 1, ticket))
+            await asyncio.sleep(0)
+            scheduler.promote(ticket, "standard")
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert scheduler.queue_depth == 0 and scheduler.in_flight == 1
+
+        asyncio.run(run())
+
+    def test_cost_estimate(self):
+        """测试开销估计随文本长度和格式增长"""
+        assert estimate_cost(100, "mp3") > estimate_cost(10, "mp3")
+        assert estimate_cost(100, "wav") > estimate_cost(100, "mp3")
+
+
+class TestPriorityResolution:
+    """优先级解析测试类"""
+
+    def test_header_selects_class(self):
+        """测试请求头选择类别"""
+        assert pick_priority("bulk", None) == "bulk"
+        assert pick_priority("INTERACTIVE", None) == "interactive"
+        assert pick_priority("unknown", None) == settings.DEFAULT_PRIORITY
+        assert pick_priority(None, None) == settings.DEFAULT_PRIORITY
+
+    def test_api_key_ceiling(self, monkeypatch):
+        """测试API密钥优先级上限"""
+        monkeypatch.setattr(settings, "API_KEY_PRIORITIES", "sk-batch:bulk,sk-app:interactive")
+        assert pick_priority(None, "sk-batch") == "bulk"
+        assert pick_priority("interactive", "sk-batch") == "bulk"
+        assert pick_priority(None, "sk-app") == "interactive"
+        assert pick_priority("bulk", "sk-app") == "bulk"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,185 @@
+"""按句缓存测试模块"""
+import asyncio
+import os
+import struct
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.models.openai_models import OpenAISpeechRequest
+from app.routes.audio import router as audio_router
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.audio_pack import AudioPack, PackWriter
+from app.services.framing import audio_duration, mp3_frame_length, strip_id3
+from app.services.mock_backend import MockTTSBackend
+from app.services.speech_service import SpeechService, speech_service
+from app.services.timestamps import TimingStore
+
+SENTENCES = [f"这是长文档中的第{i}句话，内容用于测试按句缓存的复用效果。" for i in range(64)]
+DOCUMENT = "".join(SENTENCES)
+
+
+def make_service(backend: MockTTSBackend) -> SpeechService:
+    return SpeechService(
+        router=BackendRouter({"mock": backend}, "mock"),
+        cache=AudioCache(max_bytes=1 << 26, max_item_bytes=1 << 22),
+    )
+
+
+def request(text: str, response_format: str = "mp3") -> OpenAISpeechRequest:
+    return OpenAISpeechRequest(model="tts-1", input=text, voice="alloy", response_format=response_format)
+
+
+async def read(service: SpeechService, req: OpenAISpeechRequest):
+    stream = await service.stream(req)
+    audio = b"".join([chunk async for chunk in stream.chunks])
+    return stream, audio
+
+
+@pytest.fixture(autouse=True)
+def segment_settings(monkeypatch):
+    monkeypatch.setattr(settings, "SEGMENT_CACHE_MIN_CHARS", 300)
+    monkeypatch.setattr(settings, "SEGMENT_CACHE_MAX_INFLIGHT", 4)
+
+
+class TestSegmentCache:
+    """按句缓存测试类"""
+
+    def test_edit_one_sentence_synthesizes_one(self):
+        """测试修改长文档中的一句只合成该句"""
+        backend = MockTTSBackend(ttfb=0.05, speed=0)
+        service = make_service(backend)
+        edited = list(SENTENCES)
+        edited[40] = "这一句在修订版本中被改写了。"
+
+        async def run():
+            first, _ = await read(service, request(DOCUMENT))
+            calls = backend.calls
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            second, _ = await read(service, request("".join(edited)))
+            return first, calls, second, loop.time() - start
+
+        first, calls, second, elapsed = asyncio.run(run())
+        assert first.segments == len(SENTENCES) and first.segment_hits == 0
+        assert first.cache_status == "miss"
+        assert calls == len(SENTENCES)
+        assert backend.calls == calls + 1
+        assert second.segment_hits == len(SENTENCES) - 1
+        assert second.cache_status == "partial"
+        # 大约一句的上游时间
+        assert elapsed < 0.05 * 3
+
+    def test_mp3_concatenation_is_valid(self):
+        """测试拼接结果由完整的MP3帧组成且与逐句合成一致"""
+        service = make_service(MockTTSBackend(ttfb=0, speed=0, chunk_bytes=700))
+
+        async def run():
+            _, joined = await read(service, request(DOCUMENT))
+            parts = [
+                (await service.synthesize(request(sentence))).audio
+                for sentence in service.split_segments(request(DOCUMENT))
+            ]
+            return joined, parts
+
+        joined, parts = asyncio.run(run())
+        assert joined == b"".join(parts)
+        pos = 0
+        while pos < len(joined):
+            length = mp3_frame_length(joined[pos:pos + 4])
+            assert length
+            pos += length
+        assert pos == len(joined)
+
+    def test_wav_single_header(self):
+        """测试WAV按句合成PCM, 输出只有一个流式WAV头"""
+        service = make_service(MockTTSBackend(ttfb=0, speed=0))
+        stream, audio = asyncio.run(read(service, request(DOCUMENT, "wav")))
+        assert stream.segments > 1
+        assert audio[:4] == b"RIFF" and audio.count(b"RIFF") == 1
+        assert struct.unpack("<I", audio[40:44])[0] == 0xFFFFFFFF
+        assert (len(audio) - 44) % 2 == 0
+
+    def test_not_segmented(self):
+        """测试短文本、opus与flac不按句拆分"""
+        service = make_service(MockTTSBackend(ttfb=0, speed=0))
+        assert service.split_segments(request("第一句。第二句。")) == []
+        assert service.split_segments(request(DOCUMENT, "opus")) == []
+        assert service.split_segments(request(DOCUMENT, "flac")) == []
+        assert len(service.split_segments(request(DOCUMENT, "aac"))) == len(SENTENCES)
+
+    def test_strip_id3(self):
+        """测试去掉开头完整的ID3标签"""
+        tag = b"ID3\x04\x00\x00" + bytes([0, 0, 0, 5]) + b"TAGGG"
+        frame = b"\xff\xf3" + bytes(10)
+        assert strip_id3(tag + frame) == frame
+        assert strip_id3(frame) == frame
+
+
+class TestSegmentEndpoint:
+    """按句缓存端点测试类"""
+
+    def test_pack_segments_counted_and_offset(self, tmp_path, monkeypatch):
+        """测试音频包中的句子计入命中, 没有时间戳时按音频时长推进后续句子的起点"""
+        monkeypatch.setattr(settings, "SEGMENT_CACHE_MIN_CHARS", 20)
+        backend = MockTTSBackend(ttfb=0, speed=0)
+        service = make_service(backend)
+        service.timings = TimingStore()
+        text = "".join(f"这是按句缓存的第{i}句话。" for i in range(3))
+        first = request(service.split_segments(request(text))[0], "pcm")
+        audio = asyncio.run(make_service(MockTTSBackend(ttfb=0, speed=0)).synthesize(first)).audio
+
+        path = tmp_path / "segments.pack"
+        with PackWriter(path) as writer:
+            writer.add(service.cache_key(first), audio)
+        service.pack = AudioPack(path)
+        service.pack.open()
+        try:
+            stream, _ = asyncio.run(read(service, request(text, "pcm")))
+        finally:
+            service.pack.close()
+        assert stream.segment_hits == 1 and stream.cache_status == "partial"
+        assert backend.calls == 2
+        assert len(stream.timings) == 2
+        assert stream.timings[0].start == pytest.approx(len(audio) / (24000 * 2))
+
+    def test_audio_duration(self):
+        """测试由帧头计算mp3与PCM时长"""
+        backend = MockTTSBackend(ttfb=0, speed=0)
+        audio = asyncio.run(make_service(backend).synthesize(request("时长测试。"))).audio
+        frames, pos = 0, 0
+        audio = strip_id3(audio)
+        while pos < len(audio):
+            pos += mp3_frame_length(audio[pos:pos + 4])
+            frames += 1
+        assert audio_duration(audio, "mp3", 24000) == pytest.approx(frames * 576 / 24000)
+        assert audio_duration(b"\x00" * 48000, "pcm", 24000) == 1.0
+        assert audio_duration(b"", "ogg_opus", 24000) is None
+
+    def test_segment_header(self, monkeypatch):
+        """测试响应头报告句子命中比例"""
+        monkeypatch.setattr(speech_service, "router", BackendRouter({"mock": MockTTSBackend(ttfb=0, speed=0)}, "mock"))
+        monkeypatch.setattr(speech_service, "cache", AudioCache(max_bytes=1 << 26, max_item_bytes=1 << 22))
+        app = FastAPI()
+        app.include_router(audio_router)
+        client = TestClient(app)
+
+        body = {"model": "tts-1", "input": DOCUMENT, "voice": "alloy"}
+        first = client.post("/v1/audio/speech", json=body)
+        second = client.post("/v1/audio/speech", json={**body, "input": DOCUMENT + "最后新增一句。"})
+        assert first.headers["x-cache-segments"] == f"0/{len(SENTENCES)}"
+        assert second.headers["x-cache"] == "PARTIAL"
+        assert second.headers["x-cache-segments"] == f"{len(SENTENCES)}/{len(SENTENCES) + 1}"
+        assert second.content.startswith(first.content)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
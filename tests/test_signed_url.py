@@ -0,0 +1,190 @@
+"""签名URL与条件请求测试模块"""
+import os
+
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.openai_models import OpenAISpeechRequest
+from app.routes import audio as audio_routes
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.mock_backend import MockTTSBackend
+from app.services.signed_url import URLSigner
+from app.services.speech_service import SpeechService
+from app.utils.errors import TTSProxyError
+from app.utils.http_cache import parse_range, strong_etag
+
+BODY = {"model": "tts-1", "input": "欢迎致电，请按一号键。", "voice": "alloy", "response_format": "wav"}
+
+
+class TestURLSigner:
+    """签名器测试类"""
+
+    def test_deterministic_round_trip(self):
+        """测试相同参数得到相同地址, 校验后还原请求"""
+        signer = URLSigner("secret")
+        request = OpenAISpeechRequest(**BODY)
+        name = signer.sign(request)
+        assert name == signer.sign(OpenAISpeechRequest(**BODY))
+        assert name.endswith(".wav")
+        restored = signer.verify(name)
+        assert (restored.input, restored.voice, restored.response_format, restored.speed) == (
+            request.input, "alloy", "wav", 1.0
+        )
+        assert URLSigner("other").sign(request) != name
+
+    @pytest.mark.parametrize("tamper", [
+        lambda name: "x" + name,
+        lambda name: name.rsplit(".", 1)[0] + ".mp3",
+        lambda name: name.replace(".", "", 1),
+        lambda name: "not-a-token",
+        lambda name: "é" + name,
+        lambda name: name.replace(".", "é.", 1),
+    ])
+    def test_rejects_tampered(self, tamper):
+        """测试篡改参数、签名或扩展名时拒绝"""
+        signer = URLSigner("secret")
+        with pytest.raises(TTSProxyError) as info:
+            signer.verify(tamper(signer.sign(OpenAISpeechRequest(**BODY))))
+        assert info.value.status_code == 403
+
+    def test_disabled_without_secret(self, monkeypatch):
+        """测试未配置密钥时不接受任何地址"""
+        monkeypatch.setattr(audio_routes.settings, "SIGNED_URL_SECRET", None)
+        signer = URLSigner()
+        assert not signer.enabled
+        with pytest.raises(TTSProxyError):
+            signer.verify(URLSigner("secret").sign(OpenAISpeechRequest(**BODY)))
+
+
+class TestParseRange:
+    """Range解析测试类"""
+
+    def test_ranges(self):
+        """测试起止、开放结尾、后缀与无效范围"""
+        assert parse_range("bytes=0-99", 1000) == (0, 99)
+        assert parse_range("bytes=900-", 1000) == (900, 999)
+        assert parse_range("bytes=950-2000", 1000) == (950, 999)
+        assert parse_range("bytes=-100", 1000) == (900, 999)
+        assert parse_range("bytes=-5000", 1000) == (0, 999)
+        # 无法解析或多个范围时按完整内容响应
+        assert parse_range(None, 1000) is None
+        assert parse_range("bytes=0-1,5-6", 1000) is None
+        assert parse_range("items=0-1", 1000) is None
+        assert parse_range("bytes=abc", 1000) is None
+        assert parse_range("bytes=9-1", 1000) is None
+        with pytest.raises(ValueError):
+            parse_range("bytes=1000-", 1000)
+
+
+class TestSignedEndpoint:
+    """签名URL端点测试类"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        backend = MockTTSBackend(ttfb=0, speed=0)
+        service = SpeechService(
+            router=BackendRouter({"mock": backend}, "mock"),
+            cache=AudioCache(max_bytes=1 << 26, max_item_bytes=1 << 22),
+            breaker=CircuitBreaker(),
+        )
+        monkeypatch.setattr(audio_routes, "speech_service", service)
+        monkeypatch.setattr(audio_routes, "url_signer", URLSigner("secret"))
+        app = FastAPI()
+        app.include_router(audio_routes.router)
+        client = TestClient(app)
+        client.backend = backend
+        client.service = service
+        return client
+
+    def test_post_returns_content_location(self, client):
+        """测试POST响应的 Content-Location 与签名端点返回同一地址"""
+        response = client.post("/v1/audio/speech", json=BODY)
+        assert response.status_code == 200
+        signed = client.post("/v1/audio/speech/sign", json={**BODY, "input": " 欢迎致电，请按一号键。 "})
+        assert signed.json()["url"] == response.headers["content-location"]
+
+        response = client.get(response.headers["content-location"])
+        assert response.status_code == 200
+        assert response.headers["x-cache"] == "HIT"
+        assert response.headers["cache-control"] == "public, max-age=86400"
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.content[:4] == b"RIFF"
+        assert client.backend.calls == 1
+
+    def test_conditional_and_range(self, client):
+        """测试强ETag、304、206与416"""
+        url = client.post("/v1/audio/speech/sign", json=BODY).json()["url"]
+        full = client.get(url)
+        assert full.status_code == 200 and full.headers["x-cache"] == "MISS"
+        etag = full.headers["etag"]
+        assert etag.startswith('"') and not etag.startswith("W/")
+        assert etag == strong_etag(full.content)
+
+        response = client.get(url, headers={"If-None-Match": f'"other", {etag}'})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+
+        response = client.get(url, headers={"Range": "bytes=4-11"})
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 4-11/{len(full.content)}"
+        assert response.content == full.content[4:12]
+
+        # If-Range 不匹配时返回完整内容
+        response = client.get(url, headers={"Range": "bytes=4-11", "If-Range": '"stale"'})
+        assert response.status_code == 200 and response.content == full.content
+
+        response = client.get(url, headers={"Range": f"bytes={len(full.content)}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(full.content)}"
+        assert client.backend.calls == 1
+
+    def test_etag_follows_content(self, client):
+        """测试淘汰后重新合成得到等长但不同的音频时ETag变化, 旧ETag的 If-Range 返回完整内容"""
+        url = client.post("/v1/audio/speech/sign", json=BODY).json()["url"]
+        full = client.get(url)
+        etag = full.headers["etag"]
+        key = client.service.cache_key(OpenAISpeechRequest(**BODY))
+        changed = full.content[:-1] + bytes([full.content[-1] ^ 1])
+        client.service.cache = AudioCache(max_bytes=1 << 26, max_item_bytes=1 << 22)
+        client.service.cache.put(key, changed)
+
+        response = client.get(url, headers={"Range": "bytes=4-11", "If-Range": etag})
+        assert response.status_code == 200 and response.content == changed
+        assert response.headers["etag"] == strong_etag(changed) != etag
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert client.backend.calls == 1
+
+    def test_url_length_cap(self, client, monkeypatch):
+        """测试地址超过长度上限时不返回 Content-Location, 签名端点返回400"""
+        url = client.post("/v1/audio/speech/sign", json=BODY).json()["url"]
+        monkeypatch.setattr(audio_routes.settings, "SIGNED_URL_MAX_LENGTH", len(url) - 1)
+        response = client.post("/v1/audio/speech", json=BODY)
+        assert response.status_code == 200
+        assert "content-location" not in response.headers
+        response = client.post("/v1/audio/speech/sign", json=BODY)
+        assert response.status_code == 400
+        assert response.json()["detail"]["error"]["code"] == "signed_url_too_long"
+        monkeypatch.setattr(audio_routes.settings, "SIGNED_URL_MAX_LENGTH", 0)
+        assert client.post("/v1/audio/speech/sign", json=BODY).json()["url"] == url
+
+    def test_invalid_signature(self, client):
+        """测试签名无效时返回403且不调用上游"""
+        url = client.post("/v1/audio/speech/sign", json=BODY).json()["url"]
+        response = client.get(url.replace(".wav", ".mp3"))
+        assert response.status_code == 403
+        response = client.get("/v1/audio/speech/signed/%C3%A9.abc.mp3")
+        assert response.status_code == 403
+        assert client.backend.calls == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
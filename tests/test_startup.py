@@ -0,0 +1,79 @@
+"""启动开销测试模块"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _run_in_clean_process(code: str, cwd: Path) -> subprocess.CompletedProcess:
+    """在独立进程中执行代码, 避免受当前测试进程已导入模块的影响"""
+    env = {
+        **os.environ,
+        "DOUBAO_APPID": "test_appid",
+        "DOUBAO_ACCESS_TOKEN": "test_token",
+        "PYTHONPATH": str(ROOT),
+    }
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+
+class TestStartup:
+    """冷启动测试类"""
+
+    def test_import_has_no_filesystem_side_effects(self, tmp_path):
+        """测试导入app.main不会创建日志目录"""
+        result = _run_in_clean_process("import app.main", tmp_path)
+        assert result.returncode == 0, result.stderr
+        assert not (tmp_path / "logs").exists()
+
+    def test_httpx_imported_lazily(self, tmp_path):
+        """测试导入app.main时不加载httpx"""
+        result = _run_in_clean_process(
+            "import sys, app.main; print('httpx' in sys.modules)",
+            tmp_path
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "False"
+
+    def test_optional_features_imported_lazily(self, tmp_path):
+        """测试导入app.main时不加载可选功能的模块与numpy"""
+        modules = [
+            "numpy",
+            "app.services.prefetch",
+            "app.services.realtime",
+            "app.services.profiler",
+            "app.routes.peer",
+            "app.routes.admin",
+            "app.services.audio_pack",
+            "app.services.peer_cache",
+            "app.services.transcoder",
+            "app.services.time_stretch",
+        ]
+        result = _run_in_clean_process(
+            f"import sys, app.main; print([m for m in {modules!r} if m in sys.modules])",
+            tmp_path
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
+
+    def test_warmup_creates_client(self):
+        """测试预热会创建HTTP客户端"""
+        from app.services.doubao_client import DoubaoTTSClient
+
+        client = DoubaoTTSClient()
+        assert client._http_client is None
+        client.warmup()
+        assert client._http_client is not None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,188 @@
+"""本地变速测试模块"""
+import asyncio
+import os
+import stat
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from app.config import settings
+from app.models.openai_models import OpenAISpeechRequest
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.mock_backend import MockTTSBackend
+from app.services.speech_service import SpeechService
+from app.services.time_stretch import TimeStretcher, stretch
+from app.services.timestamps import TimingStore
+from app.services.transcoder import Transcoder
+from app.utils.errors import TTSProxyError
+
+SAMPLE_RATE = 24000
+
+
+def tone(seconds: float, frequency: float = 440.0) -> bytes:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * frequency * t) * 32767).astype("<i2").tobytes()
+
+
+def peak_frequency(pcm: bytes) -> float:
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float64)
+    spectrum = np.abs(np.fft.rfft(samples))
+    return float(np.fft.rfftfreq(len(samples), 1 / SAMPLE_RATE)[np.argmax(spectrum)])
+
+
+def fake_ffmpeg(tmp_path, script: str = "cat") -> str:
+    """ffmpeg替身, 默认把输入原样输出"""
+    path = tmp_path / "ffmpeg"
+    path.write_text(f"#!/bin/sh\n{script}\n")
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def make_service(backend: MockTTSBackend, transcoder: Transcoder = None) -> SpeechService:
+    return SpeechService(
+        router=BackendRouter({"mock": backend}, "mock"),
+        cache=AudioCache(max_bytes=1 << 26, max_item_bytes=1 << 24),
+        breaker=CircuitBreaker(),
+        transcoder=transcoder or Transcoder(ffmpeg_path="missing-ffmpeg-binary"),
+        timings=TimingStore(100),
+    )
+
+
+def request(speed: float, response_format: str = "pcm") -> OpenAISpeechRequest:
+    return OpenAISpeechRequest(
+        model="tts-1", input="第一句话。第二句话。", voice="alloy", speed=speed, response_format=response_format
+    )
+
+
+class TestTimeStretcher:
+    """WSOLA变速器测试类"""
+
+    @pytest.mark.parametrize("ratio", [0.25, 0.5, 1.5, 3.0, 4.0])
+    def test_length_and_pitch(self, ratio):
+        """测试输出时长为输入的 1/ratio 且音高不变"""
+        pcm = tone(2.0)
+        out = stretch(pcm, ratio, SAMPLE_RATE)
+        assert len(out) // 2 == round(2.0 * SAMPLE_RATE / ratio)
+        assert peak_frequency(out) == pytest.approx(440.0, abs=2.0)
+
+    def test_streaming_matches_whole(self):
+        """测试逐块输入(块边界可落在样本中间)与整段输入的结果一致"""
+        pcm = tone(1.0, 300.0)
+        stretcher = TimeStretcher(1.7, SAMPLE_RATE)
+        out = b"".join(stretcher.feed(pcm[i:i + 1001]) for i in range(0, len(pcm), 1001)) + stretcher.flush()
+        assert out == stretch(pcm, 1.7, SAMPLE_RATE)
+
+
+class TestLocalSpeed:
+    """合成服务本地变速测试类"""
+
+    def test_modes(self, monkeypatch):
+        """测试各模式下上游语速与本地变速倍数"""
+        service = make_service(MockTTSBackend(ttfb=0, speed=0))
+        assert service.local_speed(request(3.0)) is None
+        monkeypatch.setattr(settings, "LOCAL_SPEED_MODE", "extend")
+        assert service.local_speed(request(1.5)) is None
+        assert service.local_speed(request(3.0)) == (2.0, 1.5)
+        assert service.local_speed(request(0.25)) == (0.5, 0.5)
+        # 未安装ffmpeg时mp3仍按上游语速合成
+        assert service.local_speed(request(3.0, "mp3")) is None
+        monkeypatch.setattr(settings, "LOCAL_SPEED_MODE", "all")
+        assert service.local_speed(request(1.5)) == (1.0, 1.5)
+        assert service.local_speed(request(1.0)) is None
+
+    def test_speeds_share_base_audio(self, monkeypatch):
+        """测试各语速由同一份1.0倍音频得到, 只调用一次上游"""
+        monkeypatch.setattr(settings, "LOCAL_SPEED_MODE", "all")
+        backend = MockTTSBackend(ttfb=0, speed=0, chunk_bytes=4096)
+        service = make_service(backend)
+
+        async def run():
+            base = await service.synthesize(request(1.0))
+            fast = await service.synthesize(request(3.0))
+            slow = await service.synthesize(request(0.5, "wav"))
+            return base, fast, slow
+
+        base, fast, slow = asyncio.run(run())
+        assert backend.calls == 1
+        assert fast.cache_status == "hit" and slow.cache_status == "hit"
+        assert len(fast.audio) // 2 == round(len(base.audio) // 2 / 3.0)
+        assert slow.audio[:4] == b"RIFF" and len(slow.audio) - 44 == len(base.audio) * 2
+        assert fast.cache_key != base.cache_key
+
+    def test_timings_scaled(self, monkeypatch):
+        """测试句子时间戳按变速倍数缩放"""
+        monkeypatch.setattr(settings, "LOCAL_SPEED_MODE", "all")
+        service = make_service(MockTTSBackend(ttfb=0, speed=0))
+
+        async def run():
+            base = await service.synthesize(request(1.0))
+            fast = await service.synthesize(request(2.0))
+            return base, fast
+
+        base, fast = asyncio.run(run())
+        assert [t.text for t in fast.timings] == [t.text for t in base.timings]
+        assert fast.timings[-1].end == pytest.approx(base.timings[-1].end / 2)
+
+    def test_encoded_formats_streamed(self, monkeypatch, tmp_path):
+        """测试ffmpeg格式的变速结果逐块送入编码器, 结果与整段变速一致"""
+        monkeypatch.setattr(settings, "LOCAL_SPEED_MODE", "all")
+        service = make_service(MockTTSBackend(ttfb=0, speed=0), Transcoder(ffmpeg_path=fake_ffmpeg(tmp_path)))
+
+        async def run():
+            base = await service.synthesize(request(1.0))
+            stream = await service.stream(request(3.0, "mp3"))
+            return base, b"".join([chunk async for chunk in stream.chunks])
+
+        base, audio = asyncio.run(run())
+        assert audio == stretch(base.audio, 3.0, SAMPLE_RATE)
+
+
+class TestEncodeStream:
+    """增量编码测试类"""
+
+    def test_output_before_finish(self, tmp_path):
+        """测试输入结束前即可取到已编码的数据"""
+        transcoder = Transcoder(ffmpeg_path=fake_ffmpeg(tmp_path))
+
+        async def run():
+            encoder = await transcoder.open_stream("mp3", SAMPLE_RATE)
+            try:
+                received = await encoder.feed(b"\x01\x02" * 1000)
+                for _ in range(100):
+                    if len(received) == 2000:
+                        break
+                    await asyncio.sleep(0.01)
+                    received += await encoder.feed(b"")
+                assert len(received) == 2000
+                await encoder.feed(b"\x03\x04")
+                return received + await encoder.finish()
+            finally:
+                await encoder.close()
+
+        assert asyncio.run(run()) == b"\x01\x02" * 1000 + b"\x03\x04"
+
+    def test_failure_raises(self, tmp_path):
+        """测试编码进程失败时抛出错误"""
+        transcoder = Transcoder(ffmpeg_path=fake_ffmpeg(tmp_path, "echo broken >&2; exit 1"))
+
+        async def run():
+            encoder = await transcoder.open_stream("opus", SAMPLE_RATE)
+            try:
+                await encoder.feed(b"\x00" * 100)
+                await encoder.finish()
+            finally:
+                await encoder.close()
+
+        with pytest.raises(TTSProxyError, match="broken"):
+            asyncio.run(run())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
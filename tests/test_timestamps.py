@@ -0,0 +1,214 @@
+"""句子时间戳与字幕测试模块"""
+import asyncio
+import base64
+import json
+import os
+import re
+
+import httpx
+import pytest
+
+# 设置环境变量供测试使用
+os.environ["DOUBAO_APPID"] = "test_appid"
+os.environ["DOUBAO_ACCESS_TOKEN"] = "test_token"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.models.openai_models import OpenAISpeechRequest
+from app.routes.audio import router as audio_router
+from app.services.audio_cache import AudioCache
+from app.services.backend_router import BackendRouter
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.doubao_client import DoubaoTTSClient
+from app.services.mock_backend import MockTTSBackend, generate_audio
+from app.services.recorder import TraceRecorder
+from app.services.request_builder import request_builder
+from app.services.speech_service import SpeechService, speech_service
+from app.services.timestamps import SentenceTiming, TimingStore, parse_sentence, to_srt, to_vtt
+from app.services.transcoder import Transcoder
+
+TEXT = "第一句话。第二句话。第三句话。"
+
+
+def make_service(backend: MockTTSBackend) -> SpeechService:
+    return SpeechService(
+        router=BackendRouter({"mock": backend}, "mock"),
+        cache=AudioCache(max_bytes=1 << 26, max_item_bytes=1 << 22),
+        breaker=CircuitBreaker(),
+        transcoder=Transcoder(ffmpeg_path="missing-ffmpeg-binary"),
+        timings=TimingStore(100),
+    )
+
+
+def request(text: str = TEXT, **kwargs) -> OpenAISpeechRequest:
+    return OpenAISpeechRequest(model="tts-1", input=text, voice="alloy", **kwargs)
+
+
+class TestParsing:
+    """时间戳解析与字幕生成测试类"""
+
+    def test_parse_sentence(self):
+        """测试解析逐字时间(秒或毫秒字段)并按续传起点平移"""
+        timing = parse_sentence({"text": "你好。", "words": [
+            {"word": "你", "startTime": 0.1, "endTime": 0.3},
+            {"word": "好", "start_time": 300, "end_time": 650},
+        ]}, offset=2.0)
+        assert timing.text == "你好。"
+        assert timing.start == pytest.approx(2.1) and timing.end == pytest.approx(2.65)
+        assert parse_sentence({"text": "没有逐字时间。", "words": []}) is None
+        assert parse_sentence(None) is None
+
+    def test_subtitles(self):
+        """测试WebVTT与SRT输出"""
+        timings = [SentenceTiming("第一句。", 0.0, 1.25), SentenceTiming("第二句。", 1.25, 3661.5)]
+        assert to_vtt(timings) == (
+            "WEBVTT\n\n"
+            "00:00:00.000 --> 00:00:01.250\n第一句。\n\n"
+            "00:00:01.250 --> 01:01:01.500\n第二句。\n"
+        )
+        assert to_srt(timings) == (
+            "1\n00:00:00,000 --> 00:00:01,250\n第一句。\n\n"
+            "2\n00:00:01,250 --> 01:01:01,500\n第二句。\n"
+        )
+
+
+class SentenceUpstream:
+    """每句0.4秒音频并返回逐字时间戳的上游, 可在指定字节处断开一次"""
+
+    def __init__(self, cut=None):
+        self.cut = cut
+        self.texts = []
+
+    def lines(self, text: str) -> bytes:
+        out = []
+        for index, sentence in enumerate(re.findall(r"[^。]+。", text)):
+            audio = generate_audio("mp3", 0.4, sentence.encode("utf-8"), 24000)
+            # 时间相对于本次请求的开头, 句末与音频末尾对齐
+            words = [{"word": sentence[:-1], "startTime": 0.4 * index + 0.05, "endTime": 0.4 * (index + 1)}]
+            out.append({"code": 0, "message": "", "data": base64.b64encode(audio).decode()})
+            out.append({"code": 0, "message": "", "data": None, "sentence": {"text": sentence, "words": words}})
+        out.append({"code": 20000000, "message": "OK", "data": None})
+        return "".join(json.dumps(line) + "\n" for line in out).encode()
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        text = json.loads(request.content)["req_params"]["text"]
+        self.texts.append(text)
+        payload = self.lines(text)
+        cut, self.cut = self.cut, None
+
+        async def body():
+            end = len(payload) if cut is None else cut
+            for i in range(0, end, 500):
+                yield payload[i:min(i + 500, end)]
+            if cut is not None:
+                raise httpx.RemoteProtocolError("peer closed connection")
+
+        return httpx.Response(200, content=body())
+
+
+class TestDoubaoTimestamps:
+    """豆包客户端时间戳测试类"""
+
+    def test_resume_keeps_absolute_times(self):
+        """测试续传后的时间戳平移到整段音频的时间轴, 且不重复"""
+        text = "".join(f"第{i}句。" for i in range(6))
+        full = SentenceUpstream().lines(text)
+        # 在第三句的时间戳之后、第四句的音频中间断开
+        cut = full.index(json.dumps("第2句。").encode()) + 2000
+        upstream = SentenceUpstream(cut=cut)
+        client = DoubaoTTSClient(TraceRecorder(None))
+        client.resume_attempts = 2
+        client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(upstream.handler))
+        prepared = request_builder.build(request(text))
+        timings = []
+
+        async def run():
+            try:
+                return b"".join([c async for c in client.synthesize_stream(prepared, on_sentence=timings.append)])
+            finally:
+                await client.close()
+
+        asyncio.run(run())
+        assert len(upstream.texts) == 2 and upstream.texts[1].startswith("第3句")
+        assert [t.text for t in timings] == [f"第{i}句。" for i in range(6)]
+        assert [round(t.start, 2) for t in timings] == [0.05, 0.45, 0.85, 1.25, 1.65, 2.05]
+
+
+class TestServiceTimestamps:
+    """合成服务时间戳测试类"""
+
+    def test_stream_and_cache_hit_share_timings(self):
+        """测试流式结果的时间戳随合成增长, 命中缓存时返回同一份"""
+        service = make_service(MockTTSBackend(ttfb=0, speed=0, chunk_bytes=512))
+
+        async def run():
+            first = await service.synthesize(request())
+            second = await service.synthesize(request())
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert [t.text for t in first.timings] == ["第一句话。", "第二句话。", "第三句话。"]
+        assert first.timings[0].start == 0 and first.timings[-1].end > first.timings[0].end
+        assert second.cache_status == "hit" and second.timings == first.timings
+
+    def test_segments_are_offset(self, monkeypatch):
+        """测试按句缓存拼接时各句时间戳依次平移"""
+        monkeypatch.setattr(settings, "SEGMENT_CACHE_MIN_CHARS", 20)
+        service = make_service(MockTTSBackend(ttfb=0, speed=0))
+        text = "".join(f"这是按句缓存的第{i}句话。" for i in range(4))
+        result = asyncio.run(service.synthesize(request(text)))
+        assert len(result.timings) == 4
+        starts = [t.start for t in result.timings]
+        assert starts == sorted(starts) and starts[0] == 0
+        assert result.timings[1].start == pytest.approx(result.timings[0].end)
+
+
+class TestTimestampEndpoints:
+    """时间戳输出端点测试类"""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        service = make_service(MockTTSBackend(ttfb=0, speed=0, chunk_bytes=512))
+        for name in ("stream", "synthesize_formats", "format_subtitles", "format_audio"):
+            monkeypatch.setattr(speech_service, name, getattr(service, name))
+        app = FastAPI()
+        app.include_router(audio_router)
+        return TestClient(app)
+
+    def test_sse_events(self, client):
+        """测试SSE同时输出音频增量与句子时间戳"""
+        body = {"model": "tts-1", "input": TEXT, "voice": "alloy", "response_format": "pcm", "stream_format": "sse"}
+        response = client.post("/v1/audio/speech", json=body)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [json.loads(line[6:]) for line in response.text.split("\n\n") if line.startswith("data: ")]
+        types = [event["type"] for event in events]
+        assert types[0] == "speech.audio.delta" and types[-1] == "speech.audio.done"
+        sentences = [event for event in events if event["type"] == "speech.audio.sentence"]
+        assert [event["text"] for event in sentences] == ["第一句话。", "第二句话。", "第三句话。"]
+        # 第一句的时间戳在第一个音频块之后, 最后一个音频块之前
+        assert types.index("speech.audio.sentence") < len(types) - 2
+        audio = b"".join(base64.b64decode(e["audio"]) for e in events if e["type"] == "speech.audio.delta")
+        assert len(audio) > 0 and events[-1]["sentences"] == 3
+
+    def test_json_and_subtitles(self, client):
+        """测试JSON结果附带时间戳, 字幕可内联或按ID获取"""
+        body = {"model": "tts-1", "input": TEXT, "voice": "alloy", "formats": ["wav"],
+                "subtitles": ["vtt", "srt"], "inline": True}
+        response = client.post("/v1/audio/speech/formats", json=body)
+        assert response.status_code == 200
+        result = response.json()
+        assert [t["text"] for t in result["timestamps"]] == ["第一句话。", "第二句话。", "第三句话。"]
+        assert result["subtitles"]["vtt"]["data"].startswith("WEBVTT\n\n00:00:00.000 --> ")
+
+        response = client.get(result["subtitles"]["srt"]["url"])
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-subrip")
+        assert response.text.startswith("1\n00:00:00,000 --> ") and "第三句话" in response.text
+        assert client.get("/v1/audio/speech/formats/unknown/vtt").status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])